@@ -0,0 +1,53 @@
+"""documentos_vectoriales
+
+Revision ID: a8c41f7e2d93
+Revises: f2c9a7b3e514
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c41f7e2d93'
+down_revision: Union[str, Sequence[str], None] = 'f2c9a7b3e514'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Debe coincidir con INDICE_VECTORIAL_DIMENSION
+DIMENSION = 256
+
+
+def upgrade() -> None:
+    """Tabla de embeddings con pgvector e índice HNSW, si la extensión está disponible."""
+    disponible = op.get_bind().execute(
+        text("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'")
+    ).scalar()
+    if not disponible:
+        # Sin pgvector el índice vectorial queda en memoria (app/service/indice_vectorial.py)
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.execute(f"""
+        CREATE TABLE documentos_vectoriales (
+            tipo varchar(20) NOT NULL,
+            id_origen integer NOT NULL,
+            id_clinica integer,
+            texto text NOT NULL,
+            huella varchar(16) NOT NULL,
+            embedding vector({DIMENSION}) NOT NULL,
+            PRIMARY KEY (tipo, id_origen)
+        )
+    """)
+    op.execute("CREATE INDEX idx_documentos_vectoriales_clinica ON documentos_vectoriales (id_clinica)")
+    op.execute("""
+        CREATE INDEX idx_documentos_vectoriales_hnsw ON documentos_vectoriales
+        USING hnsw (embedding vector_cosine_ops)
+    """)
+
+
+def downgrade() -> None:
+    """Eliminar la tabla de embeddings (la extensión queda instalada)."""
+    op.execute("DROP TABLE IF EXISTS documentos_vectoriales")
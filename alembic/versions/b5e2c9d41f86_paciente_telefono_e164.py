@@ -0,0 +1,52 @@
+"""paciente_telefono_e164
+
+Revision ID: b5e2c9d41f86
+Revises: a8c41f7e2d93
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.telefono import normalizar_telefono
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e2c9d41f86'
+down_revision: Union[str, Sequence[str], None] = 'a8c41f7e2d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LOTE = 5000
+
+
+def upgrade() -> None:
+    """Teléfono normalizado a E.164, completado para los pacientes existentes, con índice."""
+    op.add_column('pacientes', sa.Column('telefono_e164', sa.String(length=16), nullable=True))
+
+    # La normalización es Python (reglas de app/utils/telefono.py): se recorre por lotes de id
+    conexion = op.get_bind()
+    actualizar = sa.text("UPDATE pacientes SET telefono_e164 = :e164 WHERE id = :id")
+    ultimo = 0
+    while True:
+        filas = conexion.execute(
+            sa.text("SELECT id, telefono FROM pacientes WHERE id > :ultimo ORDER BY id LIMIT :lote"),
+            {"ultimo": ultimo, "lote": LOTE},
+        ).all()
+        if not filas:
+            break
+        valores = [{"id": id, "e164": normalizar_telefono(telefono)} for id, telefono in filas]
+        valores = [v for v in valores if v["e164"] is not None]
+        if valores:
+            conexion.execute(actualizar, valores)
+        ultimo = filas[-1][0]
+
+    op.create_index('idx_paciente_telefono_e164', 'pacientes', ['telefono_e164'], unique=False)
+
+
+def downgrade() -> None:
+    """Eliminar el teléfono normalizado."""
+    op.drop_index('idx_paciente_telefono_e164', table_name='pacientes')
+    op.drop_column('pacientes', 'telefono_e164')
@@ -0,0 +1,110 @@
+"""particionar_logs_ia
+
+Revision ID: b7d41e2a9c10
+Revises: ee03c1329669
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41e2a9c10'
+down_revision: Union[str, Sequence[str], None] = 'ee03c1329669'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MESES_ADELANTE = 3
+
+
+def _sumar_meses(fecha: date, meses: int) -> date:
+    indice = fecha.year * 12 + (fecha.month - 1) + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def _crear_indices() -> None:
+    op.create_index('idx_log_fecha_confianza', 'logs_ia', ['fecha', 'confianza'], unique=False)
+    op.create_index(op.f('ix_logs_ia_fecha'), 'logs_ia', ['fecha'], unique=False)
+    op.create_index(op.f('ix_logs_ia_id'), 'logs_ia', ['id'], unique=False)
+
+
+def _borrar_indices() -> None:
+    op.drop_index(op.f('ix_logs_ia_id'), table_name='logs_ia')
+    op.drop_index(op.f('ix_logs_ia_fecha'), table_name='logs_ia')
+    op.drop_index('idx_log_fecha_confianza', table_name='logs_ia')
+
+
+def upgrade() -> None:
+    """Convertir logs_ia en una tabla particionada por mes sobre `fecha`."""
+    _borrar_indices()
+    op.rename_table('logs_ia', 'logs_ia_legacy')
+    op.execute("ALTER TABLE logs_ia_legacy RENAME CONSTRAINT logs_ia_pkey TO logs_ia_legacy_pkey")
+
+    # La PK de una tabla particionada debe incluir la clave de partición
+    op.execute("""
+        CREATE TABLE logs_ia (
+            id INTEGER NOT NULL DEFAULT nextval('logs_ia_id_seq'),
+            mensaje TEXT NOT NULL,
+            respuesta_ia TEXT NOT NULL,
+            confianza VARCHAR(20),
+            fecha TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            metadatos JSON,
+            PRIMARY KEY (id, fecha)
+        ) PARTITION BY RANGE (fecha)
+    """)
+    op.execute("CREATE TABLE logs_ia_default PARTITION OF logs_ia DEFAULT")
+
+    # Particiones mensuales desde el log más viejo hasta unos meses adelante
+    bind = op.get_bind()
+    minimo = bind.execute(sa.text("SELECT min(fecha) FROM logs_ia_legacy")).scalar()
+    hoy = datetime.now(timezone.utc).date()
+    inicio = date((minimo or hoy).year, (minimo or hoy).month, 1)
+    fin = _sumar_meses(date(hoy.year, hoy.month, 1), MESES_ADELANTE)
+    while inicio <= fin:
+        siguiente = _sumar_meses(inicio, 1)
+        op.execute(
+            f"CREATE TABLE logs_ia_{inicio.year:04d}_{inicio.month:02d} PARTITION OF logs_ia "
+            f"FOR VALUES FROM ('{inicio.isoformat()}') TO ('{siguiente.isoformat()}')"
+        )
+        inicio = siguiente
+
+    _crear_indices()
+
+    op.execute("""
+        INSERT INTO logs_ia (id, mensaje, respuesta_ia, confianza, fecha, metadatos)
+        SELECT id, mensaje, respuesta_ia, confianza, COALESCE(fecha, now()), metadatos
+        FROM logs_ia_legacy
+    """)
+    op.execute("ALTER SEQUENCE logs_ia_id_seq OWNED BY logs_ia.id")
+    op.drop_table('logs_ia_legacy')
+
+
+def downgrade() -> None:
+    """Volver a una tabla logs_ia sin particionar."""
+    _borrar_indices()
+    op.rename_table('logs_ia', 'logs_ia_particionada')
+    op.execute("ALTER TABLE logs_ia_particionada RENAME CONSTRAINT logs_ia_pkey TO logs_ia_particionada_pkey")
+    op.execute("""
+        CREATE TABLE logs_ia (
+            id INTEGER NOT NULL DEFAULT nextval('logs_ia_id_seq'),
+            mensaje TEXT NOT NULL,
+            respuesta_ia TEXT NOT NULL,
+            confianza VARCHAR(20),
+            fecha TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            metadatos JSON,
+            PRIMARY KEY (id)
+        )
+    """)
+    _crear_indices()
+    op.execute("""
+        INSERT INTO logs_ia (id, mensaje, respuesta_ia, confianza, fecha, metadatos)
+        SELECT id, mensaje, respuesta_ia, confianza, fecha, metadatos
+        FROM logs_ia_particionada
+    """)
+    op.execute("ALTER SEQUENCE logs_ia_id_seq OWNED BY logs_ia.id")
+    # Borrar el padre elimina también todas sus particiones
+    op.drop_table('logs_ia_particionada')
@@ -0,0 +1,47 @@
+"""resumen_confianza_logs_ia
+
+Revision ID: c3e8f5a1d247
+Revises: b7d41e2a9c10
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8f5a1d247'
+down_revision: Union[str, Sequence[str], None] = 'b7d41e2a9c10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crear el rollup logs_ia_resumen_hora y cargarlo con el histórico."""
+    op.create_table('logs_ia_resumen_hora',
+    sa.Column('hora', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('id_clinica', sa.Integer(), nullable=False),
+    sa.Column('confianza', sa.String(length=20), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('hora', 'id_clinica', 'confianza')
+    )
+    op.create_index('idx_log_resumen_clinica_hora', 'logs_ia_resumen_hora', ['id_clinica', 'hora'], unique=False)
+
+    op.execute(r"""
+        INSERT INTO logs_ia_resumen_hora (hora, id_clinica, confianza, cantidad)
+        SELECT date_trunc('hour', fecha),
+               CASE WHEN metadatos->>'id_clinica' ~ '^\d+$'
+                    THEN (metadatos->>'id_clinica')::int ELSE 0 END,
+               COALESCE(confianza, 'sin_dato'),
+               count(*)
+        FROM logs_ia
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    """Eliminar el rollup."""
+    op.drop_index('idx_log_resumen_clinica_hora', table_name='logs_ia_resumen_hora')
+    op.drop_table('logs_ia_resumen_hora')
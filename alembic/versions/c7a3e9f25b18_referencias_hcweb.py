@@ -0,0 +1,51 @@
+"""referencias_hcweb
+
+Revision ID: c7a3e9f25b18
+Revises: b5e2c9d41f86
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a3e9f25b18'
+down_revision: Union[str, Sequence[str], None] = 'b5e2c9d41f86'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Espejo local de datos de referencia de HCWEB y estado de su sincronización."""
+    op.create_table(
+        'referencias_hcweb',
+        sa.Column('dataset', sa.String(length=50), nullable=False),
+        sa.Column('clave', sa.String(length=100), nullable=False),
+        sa.Column('datos', sa.JSON().with_variant(postgresql.JSONB(), 'postgresql'), nullable=False),
+        sa.Column('hash', sa.String(length=32), nullable=False),
+        sa.Column('fecha_actualizacion', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('dataset', 'clave'),
+    )
+    op.create_table(
+        'sincronizaciones_hcweb',
+        sa.Column('dataset', sa.String(length=50), nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('hash', sa.String(length=32), nullable=True),
+        sa.Column('registros', sa.Integer(), nullable=False),
+        sa.Column('insertados', sa.Integer(), nullable=False),
+        sa.Column('actualizados', sa.Integer(), nullable=False),
+        sa.Column('eliminados', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('ultimo_intento', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('ultimo_exito', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('dataset'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('sincronizaciones_hcweb')
+    op.drop_table('referencias_hcweb')
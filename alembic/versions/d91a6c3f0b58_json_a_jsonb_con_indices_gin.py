@@ -0,0 +1,65 @@
+"""json_a_jsonb_con_indices_gin
+
+Revision ID: d91a6c3f0b58
+Revises: c3e8f5a1d247
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91a6c3f0b58'
+down_revision: Union[str, Sequence[str], None] = 'c3e8f5a1d247'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNAS_JSON = [
+    ('clinicas', 'configuraciones'),
+    ('profesionales', 'especialidades'),
+    ('profesionales', 'horarios'),
+    ('logs_ia', 'metadatos'),  # en una tabla particionada el ALTER se propaga a las particiones
+]
+
+# Sólo se indexan las columnas que se consultan por contenido (@>)
+INDICES_GIN = [
+    ('idx_clinica_configuraciones_gin', 'clinicas', 'configuraciones'),
+    ('idx_profesional_especialidades_gin', 'profesionales', 'especialidades'),
+    ('idx_log_metadatos_gin', 'logs_ia', 'metadatos'),
+]
+
+
+def upgrade() -> None:
+    """Migrar las columnas JSON a JSONB y crear los índices GIN (jsonb_path_ops)."""
+    for tabla, columna in COLUMNAS_JSON:
+        op.alter_column(
+            tabla, columna,
+            type_=postgresql.JSONB(),
+            existing_type=sa.JSON(),
+            existing_nullable=True,
+            postgresql_using=f'{columna}::jsonb',
+        )
+    for nombre, tabla, columna in INDICES_GIN:
+        op.create_index(
+            nombre, tabla, [columna], unique=False,
+            postgresql_using='gin',
+            postgresql_ops={columna: 'jsonb_path_ops'},
+        )
+
+
+def downgrade() -> None:
+    """Volver a JSON plano, sin índices GIN."""
+    for nombre, tabla, _ in INDICES_GIN:
+        op.drop_index(nombre, table_name=tabla)
+    for tabla, columna in COLUMNAS_JSON:
+        op.alter_column(
+            tabla, columna,
+            type_=sa.JSON(),
+            existing_type=postgresql.JSONB(),
+            existing_nullable=True,
+            postgresql_using=f'{columna}::json',
+        )
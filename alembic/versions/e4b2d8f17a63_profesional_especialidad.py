@@ -0,0 +1,50 @@
+"""profesional_especialidad
+
+Revision ID: e4b2d8f17a63
+Revises: d91a6c3f0b58
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b2d8f17a63'
+down_revision: Union[str, Sequence[str], None] = 'd91a6c3f0b58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crear la asociación profesional_especialidad y migrar la lista JSON."""
+    op.create_table('profesional_especialidad',
+    sa.Column('id_profesional', sa.Integer(), nullable=False),
+    sa.Column('id_especialidad', sa.Integer(), nullable=False),
+    sa.Column('fecha_creacion', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['id_profesional'], ['profesionales.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['id_especialidad'], ['especialidades.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id_profesional', 'id_especialidad')
+    )
+    op.create_index('idx_prof_esp_especialidad_profesional', 'profesional_especialidad', ['id_especialidad', 'id_profesional'], unique=False)
+
+    # Los nombres que no están en especialidades se ignoran, igual que en
+    # ProfesionalRepository.sincronizar_especialidades: se asocian al crear la especialidad.
+    # Con nombres repetidos en especialidades se asocia la de menor id
+    op.execute("""
+        INSERT INTO profesional_especialidad (id_profesional, id_especialidad)
+        SELECT DISTINCT p.id, e.id
+        FROM profesionales p
+        CROSS JOIN LATERAL jsonb_array_elements_text(p.especialidades) AS n(nombre)
+        JOIN (SELECT nombre, min(id) AS id FROM especialidades GROUP BY nombre) e ON e.nombre = n.nombre
+        WHERE jsonb_typeof(p.especialidades) = 'array'
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Eliminar la asociación (la lista JSON en profesionales se conserva)."""
+    op.drop_index('idx_prof_esp_especialidad_profesional', table_name='profesional_especialidad')
+    op.drop_table('profesional_especialidad')
@@ -0,0 +1,52 @@
+"""busqueda_trigramas_y_texto
+
+Revision ID: f2c9a7b3e514
+Revises: e4b2d8f17a63
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c9a7b3e514'
+down_revision: Union[str, Sequence[str], None] = 'e4b2d8f17a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDICES_TRIGRAMAS = [
+    ('idx_paciente_nombre_trgm', 'pacientes'),
+    ('idx_profesional_nombre_trgm', 'profesionales'),
+    ('idx_especialidad_nombre_trgm', 'especialidades'),
+]
+
+
+def upgrade() -> None:
+    """Extensiones pg_trgm/unaccent e índices GIN de trigramas y tsvector."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() es STABLE; para usarla en índices hace falta un wrapper IMMUTABLE
+    op.execute("""
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+
+    for nombre, tabla in INDICES_TRIGRAMAS:
+        op.execute(f"CREATE INDEX {nombre} ON {tabla} USING gin (f_unaccent(lower(nombre)) gin_trgm_ops)")
+
+    op.execute("""
+        CREATE INDEX idx_especialidad_texto_tsv ON especialidades USING gin (
+            to_tsvector('spanish', f_unaccent(coalesce(nombre, '') || ' ' || coalesce(descripcion, '')))
+        )
+    """)
+
+
+def downgrade() -> None:
+    """Eliminar los índices de búsqueda (las extensiones quedan instaladas)."""
+    op.execute("DROP INDEX IF EXISTS idx_especialidad_texto_tsv")
+    for nombre, _ in INDICES_TRIGRAMAS:
+        op.execute(f"DROP INDEX IF EXISTS {nombre}")
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
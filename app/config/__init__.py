@@ -0,0 +1,96 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+API_URL = os.getenv("API_URL")
+APP_ENV = os.getenv("APP_ENV", "production")
+DEFAULT_TIMEOUT = int(os.getenv("DEFAULT_TIMEOUT", "5"))
+#en este config, declaro las variables que tomo desde el .env y uso de manera global en el proyecto, por ejemplo en Redis y Services
+class Config:
+    REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+    REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+    REDIS_DB = int(os.getenv("REDIS_DB", 0))
+    API_BASE_MERCEDARIO =os.getenv("API_BASE_MERCEDARIO")
+    API_BASE_HCWEB = os.getenv("API_BASE_HCWEB")
+
+    # Pipeline de ingesta de LogIA (cola en memoria + escritura por lotes)
+    LOG_IA_COLA_MAX = int(os.getenv("LOG_IA_COLA_MAX", 10000))
+    LOG_IA_LOTE_MAX = int(os.getenv("LOG_IA_LOTE_MAX", 500))
+    LOG_IA_FLUSH_SEGUNDOS = float(os.getenv("LOG_IA_FLUSH_SEGUNDOS", 1.0))
+    LOG_IA_POLITICA_DESCARTE = os.getenv("LOG_IA_POLITICA_DESCARTE", "descartar_nuevos")  # descartar_nuevos, descartar_antiguos, bloquear
+    LOG_IA_RETENCION_MESES = int(os.getenv("LOG_IA_RETENCION_MESES", 12))
+
+    # Webhook de WhatsApp y cola de mensajes entrantes
+    WHATSAPP_VERIFY_TOKEN = os.getenv("WHATSAPP_VERIFY_TOKEN")
+    WHATSAPP_APP_SECRET = os.getenv("WHATSAPP_APP_SECRET")  # si está, se valida X-Hub-Signature-256
+    COLA_MENSAJES_BACKEND = os.getenv("COLA_MENSAJES_BACKEND", "redis")  # redis, memoria
+    COLA_MENSAJES_STREAM = os.getenv("COLA_MENSAJES_STREAM", "whatsapp:entrantes")
+    COLA_MENSAJES_GRUPO = os.getenv("COLA_MENSAJES_GRUPO", "bot")
+    COLA_MENSAJES_PARTICIONES = int(os.getenv("COLA_MENSAJES_PARTICIONES", 1))  # streams por wa_id
+    COLA_MENSAJES_MAX_ENTREGAS = int(os.getenv("COLA_MENSAJES_MAX_ENTREGAS", 5))
+    COLA_MENSAJES_VISIBILIDAD_SEGUNDOS = float(os.getenv("COLA_MENSAJES_VISIBILIDAD_SEGUNDOS", 30))
+    WORKERS_MENSAJES = int(os.getenv("WORKERS_MENSAJES", 8))
+
+    # Envío de mensajes salientes (límite de tasa por did_whatsapp)
+    WHATSAPP_API_URL = os.getenv("WHATSAPP_API_URL", "https://graph.facebook.com/v20.0")
+    WHATSAPP_API_TOKEN = os.getenv("WHATSAPP_API_TOKEN")
+    SALIDA_WHATSAPP_TASA = float(os.getenv("SALIDA_WHATSAPP_TASA", 20))  # mensajes/segundo por DID
+    SALIDA_WHATSAPP_RAFAGA = float(os.getenv("SALIDA_WHATSAPP_RAFAGA", 40))
+    SALIDA_WHATSAPP_CONEXIONES = int(os.getenv("SALIDA_WHATSAPP_CONEXIONES", 20))
+    SALIDA_WHATSAPP_INTENTOS = int(os.getenv("SALIDA_WHATSAPP_INTENTOS", 5))
+
+    # Instrumentación (/metrics)
+    METRICAS_HABILITADAS = os.getenv("METRICAS_HABILITADAS", "false").lower() in ("1", "true", "si")
+    METRICAS_REQUEST_LENTO_MS = float(os.getenv("METRICAS_REQUEST_LENTO_MS", 1000))
+
+    # Registro de consultas lentas (app/core/consultas_lentas.py)
+    CONSULTAS_LENTAS_HABILITADAS = os.getenv("CONSULTAS_LENTAS_HABILITADAS", "false").lower() in ("1", "true", "si")
+    CONSULTAS_LENTAS_UMBRAL_MS = float(os.getenv("CONSULTAS_LENTAS_UMBRAL_MS", 200))
+    CONSULTAS_LENTAS_EXPLAIN_MUESTREO = float(os.getenv("CONSULTAS_LENTAS_EXPLAIN_MUESTREO", 0.1))  # 0 a 1
+    CONSULTAS_LENTAS_ARCHIVO = os.getenv("CONSULTAS_LENTAS_ARCHIVO", "logs/consultas_lentas.jsonl")
+    CONSULTAS_LENTAS_MAX_MB = int(os.getenv("CONSULTAS_LENTAS_MAX_MB", 10))
+    CONSULTAS_LENTAS_COPIAS = int(os.getenv("CONSULTAS_LENTAS_COPIAS", 5))
+
+    # Caché de respuestas de catálogos con ETag (app/core/cache_http.py)
+    CACHE_HTTP_TTL_SEGUNDOS = float(os.getenv("CACHE_HTTP_TTL_SEGUNDOS", 60))
+    CACHE_HTTP_MAX_ENTRADAS = int(os.getenv("CACHE_HTTP_MAX_ENTRADAS", 1000))
+
+    # Eventos de cambios de los repositorios entre procesos (app/core/eventos.py)
+    EVENTOS_CAMBIOS_BACKEND = os.getenv("EVENTOS_CAMBIOS_BACKEND", "local")  # local, redis, postgres
+    EVENTOS_CAMBIOS_CANAL = os.getenv("EVENTOS_CAMBIOS_CANAL", "cambios_entidades")
+
+    # Caché de respuestas del LLM por clínica (app/service/respuestas_ia.py)
+    RESPUESTAS_CACHE_MAX_POR_CLINICA = int(os.getenv("RESPUESTAS_CACHE_MAX_POR_CLINICA", 500))
+    RESPUESTAS_CACHE_TTL_SEGUNDOS = float(os.getenv("RESPUESTAS_CACHE_TTL_SEGUNDOS", 86400))
+
+    # Índice vectorial de preguntas frecuentes (app/service/indice_vectorial.py)
+    INDICE_VECTORIAL_DIMENSION = int(os.getenv("INDICE_VECTORIAL_DIMENSION", 256))  # igual a la columna de la migración
+    INDICE_VECTORIAL_UMBRAL_PGVECTOR = int(os.getenv("INDICE_VECTORIAL_UMBRAL_PGVECTOR", 20000))  # documentos por clínica
+
+    # Agenda diaria precalculada por profesional (app/service/agenda.py)
+    AGENDA_BACKEND = os.getenv("AGENDA_BACKEND", "memoria")  # memoria, redis
+    AGENDA_ZONA_HORARIA = os.getenv("AGENDA_ZONA_HORARIA", "America/Argentina/Buenos_Aires")
+    AGENDA_DURACION_TURNO_MINUTOS = int(os.getenv("AGENDA_DURACION_TURNO_MINUTOS", 30))
+    AGENDA_TTL_DIAS = int(os.getenv("AGENDA_TTL_DIAS", 2))  # días que se conserva un snapshot pasada su fecha
+
+    # Teléfonos e identidad de pacientes por WhatsApp (app/utils/telefono.py, app/service/identidad.py)
+    TELEFONO_PAIS = os.getenv("TELEFONO_PAIS", "54")  # para números sin código de país
+    TELEFONO_AREA = os.getenv("TELEFONO_AREA", "11")  # para números sin código de área
+    IDENTIDAD_BACKEND = os.getenv("IDENTIDAD_BACKEND", "memoria")  # memoria, redis
+    IDENTIDAD_TTL_POSITIVO_SEGUNDOS = int(os.getenv("IDENTIDAD_TTL_POSITIVO_SEGUNDOS", 86400))
+    IDENTIDAD_TTL_NEGATIVO_SEGUNDOS = int(os.getenv("IDENTIDAD_TTL_NEGATIVO_SEGUNDOS", 300))
+
+    # Clientes SOAP de HCWEB y Mercedario (app/service/WsHcweb.py)
+    HCWEB_CONCURRENCIA = int(os.getenv("HCWEB_CONCURRENCIA", 20))  # llamadas simultáneas por proceso
+    HCWEB_CONEXIONES = int(os.getenv("HCWEB_CONEXIONES", 20))
+    HCWEB_TIMEOUT_SEGUNDOS = float(os.getenv("HCWEB_TIMEOUT_SEGUNDOS", 15))
+    MERCEDARIO_CONCURRENCIA = int(os.getenv("MERCEDARIO_CONCURRENCIA", 10))
+    MERCEDARIO_CONEXIONES = int(os.getenv("MERCEDARIO_CONEXIONES", 10))
+    HCWEB_PLAZO_LOTE_SEGUNDOS = float(os.getenv("HCWEB_PLAZO_LOTE_SEGUNDOS", 5))  # llamar_lote
+
+    # Espejo local de datos de referencia de HCWEB (app/service/espejo_hcweb.py)
+    ESPEJO_HCWEB_HABILITADO = os.getenv("ESPEJO_HCWEB_HABILITADO", "false").lower() in ("1", "true", "si")  # sincronizar desde la API
+    ESPEJO_HCWEB_INTERVALO_SEGUNDOS = float(os.getenv("ESPEJO_HCWEB_INTERVALO_SEGUNDOS", 900))
+    ESPEJO_HCWEB_PLAZO_SEGUNDOS = float(os.getenv("ESPEJO_HCWEB_PLAZO_SEGUNDOS", 60))
+    ESPEJO_HCWEB_DATASETS = os.getenv("ESPEJO_HCWEB_DATASETS")  # JSON, reemplaza los DATASETS por defecto
@@ -3,19 +3,42 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sess
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import DeclarativeBase
 from dotenv import load_dotenv
+from app.config import Config
+from app.core.metricas import metricas, instrumentar_engine
 
 # Cargar las variables de entorno
 load_dotenv()
 
 # Configuración de la base de datos
 DATABASE_PG_URL = os.getenv("DATABASE_PG_URL")
+DATABASE_ECHO = os.getenv("DATABASE_ECHO", "true").lower() in ("1", "true", "si")
+
+# El pool es por proceso: con N workers el máximo de conexiones a PostgreSQL es
+# N * (DATABASE_POOL_SIZE + DATABASE_MAX_OVERFLOW)
+opciones_pool = {}
+if not (DATABASE_PG_URL or "").startswith("sqlite"):
+    opciones_pool = {
+        "pool_size": int(os.getenv("DATABASE_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DATABASE_MAX_OVERFLOW", 10)),
+    }
+
 # Motor async para PostgreSQL
 engine = create_async_engine(
     DATABASE_PG_URL,
-    echo=True,  # Para debug, cambiar a False en producción
-    future=True
+    echo=DATABASE_ECHO,  # Para debug, DATABASE_ECHO=false en producción
+    future=True,
+    **opciones_pool
 )
 
+# Duración de cada consulta (sólo si la instrumentación está habilitada)
+if metricas.habilitadas:
+    instrumentar_engine(engine)
+
+# Consultas lentas a un archivo rotativo, con EXPLAIN muestreado (opt-in)
+if Config.CONSULTAS_LENTAS_HABILITADAS:
+    from app.core.consultas_lentas import instalar_registro
+    instalar_registro(engine)
+
 # Factory para sesiones async
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -0,0 +1,177 @@
+"""Caché de respuestas con ETag para los endpoints de catálogo (clínicas, profesionales, especialidades).
+
+El ETag de una respuesta sale de la versión de los datos: max(coalesce(fecha_actualizacion,
+fecha_creacion)) y count(id) de las filas que devuelve (el count detecta los borrados). Un
+cliente que manda `If-None-Match` con el ETag vigente recibe 304 sin cuerpo.
+
+Además el proceso guarda el cuerpo serializado de cada respuesta: mientras la entrada está
+vigente no se consulta la base ni para calcular la versión. Las escrituras por los
+repositorios llegan como eventos del bus de cambios (app/core/eventos.py, también desde
+otros procesos si hay un puente configurado): un listado se descarta ante cualquier cambio
+de su tabla y el detalle de un registro sólo si el evento incluye su id. El TTL acota lo
+que puede quedar viejo por escrituras por fuera de los repositorios.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, FrozenSet, Hashable, Iterable, Optional
+
+from fastapi import Request, Response
+
+from app.config import Config
+from app.core.eventos import EventoCambio, bus_cambios
+
+
+@dataclass
+class EntradaCache:
+    etag: str
+    cuerpo: bytes
+    tablas: FrozenSet[str]
+    expira: float
+    # Ids de los registros que incluye (detalle); None si depende de toda la tabla (listados)
+    ids: Optional[FrozenSet[str]] = None
+
+
+@dataclass
+class EstadisticasCache:
+    aciertos: int = 0
+    fallos: int = 0
+    no_modificados: int = 0
+    invalidaciones: int = 0
+
+    @property
+    def tasa_aciertos(self) -> float:
+        total = self.aciertos + self.fallos
+        return self.aciertos / total if total else 0.0
+
+
+class CacheHttp:
+    """LRU de respuestas serializadas, por clave de request, con invalidación por tabla"""
+
+    def __init__(
+        self,
+        *,
+        ttl: float = Config.CACHE_HTTP_TTL_SEGUNDOS,
+        max_entradas: int = Config.CACHE_HTTP_MAX_ENTRADAS,
+        reloj: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.reloj = reloj
+        self._entradas: "OrderedDict[Hashable, EntradaCache]" = OrderedDict()
+        self.estadisticas = EstadisticasCache()
+        self._desuscribir = None
+
+    def obtener(self, clave: Hashable) -> Optional[EntradaCache]:
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        if entrada.expira <= self.reloj():
+            del self._entradas[clave]
+            return None
+        self._entradas.move_to_end(clave)
+        return entrada
+
+    def guardar(
+        self, clave: Hashable, etag: str, cuerpo: bytes, tablas: Iterable[str], ids: Optional[Iterable[Any]] = None
+    ) -> EntradaCache:
+        entrada = EntradaCache(
+            etag, cuerpo, frozenset(tablas), self.reloj() + self.ttl,
+            frozenset(str(i) for i in ids) if ids is not None else None,
+        )
+        self._entradas[clave] = entrada
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+        return entrada
+
+    def invalidar(self, tabla: str, ids: Optional[Iterable[Any]] = None) -> int:
+        """Descartar las respuestas que dependen de `tabla` (de esos `ids` si se indican); devuelve cuántas"""
+        cambiados = frozenset(str(i) for i in ids) if ids else None
+        claves = [
+            clave for clave, entrada in self._entradas.items()
+            if tabla in entrada.tablas
+            and (cambiados is None or entrada.ids is None or not entrada.ids.isdisjoint(cambiados))
+        ]
+        for clave in claves:
+            del self._entradas[clave]
+        self.estadisticas.invalidaciones += len(claves)
+        return len(claves)
+
+    def limpiar(self) -> None:
+        self._entradas.clear()
+        self.estadisticas = EstadisticasCache()
+
+    def al_cambiar(self, evento: EventoCambio) -> None:
+        """Suscriptor del bus de cambios"""
+        self.invalidar(evento.entidad, evento.ids)
+
+    def suscribir(self) -> "CacheHttp":
+        if self._desuscribir is None:
+            self._desuscribir = bus_cambios.suscribir(self.al_cambiar)
+        return self
+
+    def desuscribir(self) -> None:
+        if self._desuscribir is not None:
+            self._desuscribir()
+            self._desuscribir = None
+
+
+# Caché del proceso (se suscribe al bus en Recursos.iniciar)
+cache_http = CacheHttp()
+
+
+def calcular_etag(*partes: Any) -> str:
+    huella = hashlib.sha1("|".join(str(p) for p in partes).encode()).hexdigest()[:20]
+    return f'"{huella}"'
+
+
+def coincide_etag(if_none_match: Optional[str], etag: str) -> bool:
+    """Semántica de If-None-Match: lista de ETags (comparación débil) o `*`"""
+    if not if_none_match:
+        return False
+    etiquetas = [e.strip() for e in if_none_match.split(",")]
+    return "*" in etiquetas or any(e.removeprefix("W/") == etag for e in etiquetas)
+
+
+def _respuesta(request: Request, etag: str, cuerpo: Optional[bytes]) -> Response:
+    encabezados = {"ETag": etag, "Cache-Control": "no-cache"}
+    if cuerpo is None or coincide_etag(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=encabezados)
+    return Response(content=cuerpo, media_type="application/json", headers=encabezados)
+
+
+async def responder_con_cache(
+    request: Request,
+    *,
+    clave: Hashable,
+    tablas: Iterable[str],
+    version: Callable[[], Awaitable[Any]],
+    cuerpo: Callable[[], Awaitable[bytes]],
+    ids: Optional[Iterable[Any]] = None,
+    cache: CacheHttp = cache_http,
+) -> Response:
+    """Respuesta desde la caché, 304 si el cliente tiene la versión, o armada y guardada.
+
+    `version` consulta la versión de los datos (barato) y `cuerpo` arma el JSON (caro); sólo
+    se llaman si no hay entrada vigente, y `cuerpo` sólo si el cliente no está al día.
+    Con `ids` la entrada sólo se invalida por cambios en esos registros de `tablas`.
+    """
+    entrada = cache.obtener(clave)
+    if entrada is not None:
+        cache.estadisticas.aciertos += 1
+        respuesta = _respuesta(request, entrada.etag, entrada.cuerpo)
+    else:
+        cache.estadisticas.fallos += 1
+        etag = calcular_etag(clave, await version())
+        if coincide_etag(request.headers.get("if-none-match"), etag):
+            respuesta = _respuesta(request, etag, None)
+        else:
+            # La versión se calcula antes que el cuerpo: si algo cambia en el medio, el ETag
+            # queda viejo y el próximo request del cliente trae el cuerpo nuevo
+            entrada = cache.guardar(clave, etag, await cuerpo(), tablas, ids)
+            respuesta = _respuesta(request, entrada.etag, entrada.cuerpo)
+    if respuesta.status_code == 304:
+        cache.estadisticas.no_modificados += 1
+    return respuesta
@@ -0,0 +1,316 @@
+"""Registro de consultas lentas con plan de ejecución opcional.
+
+Con CONSULTAS_LENTAS_HABILITADAS=true, cada sentencia que tarda más de
+CONSULTAS_LENTAS_UMBRAL_MS se guarda como una línea JSON en un archivo rotativo
+(CONSULTAS_LENTAS_ARCHIVO) con:
+- el SQL normalizado y su huella (listas IN expandidas colapsadas),
+- los parámetros normalizados (tipo y valor truncado, nunca el valor completo),
+- la duración y el origen: el método del repositorio y el código que lo llamó.
+
+En PostgreSQL, una muestra de las SELECT lentas (CONSULTAS_LENTAS_EXPLAIN_MUESTREO) se
+vuelve a ejecutar con `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)` en segundo plano, en otra
+conexión, y el plan se guarda en el mismo archivo. Las que toman locks de filas (FOR UPDATE,
+FOR SHARE, ...) o escriben desde un WITH sólo se explican sin ANALYZE, que no las ejecuta.
+Las consultas rápidas sólo pagan una resta de tiempos.
+
+Para revisar lo registrado, agrupado por huella:
+    python -m app.core.consultas_lentas [archivo]
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import random
+import re
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from greenlet import getcurrent
+from sqlalchemy import event
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+_ESPACIOS = re.compile(r"\s+")
+# "IN ($1, $2, $3)" / "IN (?, ?, ?)" / "IN (%(p_1)s, ...)" -> "IN (...)"
+_LISTAS = re.compile(r"\((?:\s*(?:\$\d+|\?|%\(\w+\)s|:\w+)\s*,)+\s*(?:\$\d+|\?|%\(\w+\)s|:\w+)\s*\)")
+# Cláusulas de lock de filas y escrituras dentro de un WITH: ANALYZE las ejecutaría
+_BLOQUEOS = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b", re.IGNORECASE)
+_ESCRITURAS = re.compile(r"\b(?:INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+_DIRECTORIO_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_DIRECTORIO_REPOSITORIOS = os.path.join(_DIRECTORIO_APP, "repositories")
+_DIRECTORIO_CORE = os.path.dirname(os.path.abspath(__file__))
+
+
+def normalizar_sql(sql: str) -> str:
+    return _LISTAS.sub("(...)", _ESPACIOS.sub(" ", sql).strip())
+
+
+def huella_sql(sql_normalizado: str) -> str:
+    return hashlib.sha1(sql_normalizado.encode()).hexdigest()[:12]
+
+
+def opciones_explain(sql_normalizado: str) -> str:
+    """Opciones de EXPLAIN para una SELECT/WITH: con ANALYZE sólo si ejecutarla no bloquea ni escribe"""
+    if _BLOQUEOS.search(sql_normalizado) or (
+        sql_normalizado.upper().startswith("WITH") and _ESCRITURAS.search(sql_normalizado)
+    ):
+        return "FORMAT JSON"
+    return "ANALYZE, BUFFERS, FORMAT JSON"
+
+
+def normalizar_parametro(valor: Any) -> Any:
+    """Tipo y valor acotado: suficiente para reproducir el plan sin volcar datos completos"""
+    if valor is None or isinstance(valor, (bool, int, float)):
+        return valor
+    if isinstance(valor, str):
+        return valor if len(valor) <= 32 else f"{valor[:32]}...({len(valor)})"
+    if isinstance(valor, (list, tuple, set)):
+        return {"tipo": type(valor).__name__, "largo": len(valor)}
+    if isinstance(valor, dict):
+        return {"tipo": "dict", "claves": sorted(map(str, valor))[:10]}
+    return {"tipo": type(valor).__name__, "valor": str(valor)[:32]}
+
+
+def normalizar_parametros(parametros: Any) -> Any:
+    if isinstance(parametros, dict):
+        return {str(k): normalizar_parametro(v) for k, v in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        if parametros and isinstance(parametros[0], (list, tuple, dict)):
+            # executemany: basta con el primero y la cantidad
+            return {"filas": len(parametros), "primera": normalizar_parametros(parametros[0])}
+        return [normalizar_parametro(v) for v in parametros]
+    return normalizar_parametro(parametros)
+
+
+def _marco_llamador():
+    """Marco de Python de quien ejecutó la consulta.
+
+    Con el engine async, la consulta corre en un greenlet hijo: la pila del repositorio
+    (la corrutina) está en el greenlet padre.
+    """
+    padre = getcurrent().parent
+    if padre is not None and padre.gr_frame is not None:
+        return padre.gr_frame
+    return sys._getframe(2)
+
+
+def origen_consulta(limite: int = 60) -> Dict[str, Optional[str]]:
+    """Método de repositorio que originó la consulta y código de la app que lo llamó"""
+    repositorio, llamador = None, None
+    marco = _marco_llamador()
+    while marco is not None and limite:
+        archivo = marco.f_code.co_filename
+        if archivo.startswith(_DIRECTORIO_REPOSITORIOS):
+            # Se queda con el más externo (el método público, no sus auxiliares)
+            instancia = marco.f_locals.get("self")
+            clase = type(instancia).__name__ if instancia is not None else os.path.basename(archivo)
+            repositorio, llamador = f"{clase}.{marco.f_code.co_name}", None
+        elif archivo.startswith(_DIRECTORIO_APP) and not archivo.startswith(_DIRECTORIO_CORE) and llamador is None:
+            ruta = os.path.relpath(archivo, os.path.dirname(_DIRECTORIO_APP))
+            llamador = f"{ruta}:{marco.f_lineno} {marco.f_code.co_name}"
+        marco = marco.f_back
+        limite -= 1
+    return {"repositorio": repositorio, "llamador": llamador}
+
+
+def crear_almacen(archivo: str, max_bytes: int, copias: int) -> logging.Logger:
+    """Logger propio con RotatingFileHandler: una línea JSON por registro"""
+    almacen = logging.getLogger(f"consultas_lentas.{archivo}")
+    almacen.propagate = False
+    almacen.setLevel(logging.INFO)
+    if not almacen.handlers:
+        os.makedirs(os.path.dirname(os.path.abspath(archivo)), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            archivo, maxBytes=max_bytes, backupCount=copias, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        almacen.addHandler(handler)
+    return almacen
+
+
+class RegistroConsultasLentas:
+    """Listener del engine que guarda las consultas lentas y sus planes"""
+
+    def __init__(
+        self,
+        *,
+        umbral_ms: float = Config.CONSULTAS_LENTAS_UMBRAL_MS,
+        muestreo_explain: float = Config.CONSULTAS_LENTAS_EXPLAIN_MUESTREO,
+        explains_por_minuto: int = 30,
+        archivo: str = Config.CONSULTAS_LENTAS_ARCHIVO,
+        max_bytes: int = Config.CONSULTAS_LENTAS_MAX_MB * 1024 * 1024,
+        copias: int = Config.CONSULTAS_LENTAS_COPIAS
+    ):
+        self.umbral = umbral_ms / 1000
+        self.muestreo_explain = muestreo_explain
+        self.explains_por_minuto = explains_por_minuto
+        self.archivo = archivo
+        self.almacen = crear_almacen(archivo, max_bytes, copias)
+        self.engine = None
+        self.registradas = 0
+        self._explains: List[float] = []
+        self._pendientes: set = set()
+
+    def instalar(self, engine) -> None:
+        self.engine = engine
+        motor = getattr(engine, "sync_engine", engine)
+        if not event.contains(motor, "before_cursor_execute", self._antes):
+            event.listen(motor, "before_cursor_execute", self._antes)
+            event.listen(motor, "after_cursor_execute", self._despues)
+
+    def desinstalar(self) -> None:
+        if self.engine is None:
+            return
+        motor = getattr(self.engine, "sync_engine", self.engine)
+        if event.contains(motor, "before_cursor_execute", self._antes):
+            event.remove(motor, "before_cursor_execute", self._antes)
+            event.remove(motor, "after_cursor_execute", self._despues)
+
+    async def esperar_planes(self) -> None:
+        """Esperar a que terminen los EXPLAIN en curso (tests, apagado)"""
+        if self._pendientes:
+            await asyncio.gather(*self._pendientes, return_exceptions=True)
+
+    def _antes(self, conn, cursor, statement, parameters, context, executemany):
+        context._inicio_consulta_lenta = time.perf_counter()
+
+    def _despues(self, conn, cursor, statement, parameters, context, executemany):
+        inicio = getattr(context, "_inicio_consulta_lenta", None)
+        if inicio is None or conn.info.get("explicando"):
+            return
+        duracion = time.perf_counter() - inicio
+        if duracion < self.umbral:
+            return
+        sql = normalizar_sql(statement)
+        registro = {
+            "tipo": "consulta",
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            "huella": huella_sql(sql),
+            "duracion_ms": round(duracion * 1000, 3),
+            "sql": sql,
+            "parametros": normalizar_parametros(parameters),
+            "executemany": executemany,
+            **origen_consulta(),
+        }
+        self.registradas += 1
+        self.almacen.info(json.dumps(registro, default=str, ensure_ascii=False))
+        if self._muestrear(conn, sql, executemany):
+            self._programar_explain(registro, statement, parameters, opciones_explain(sql))
+
+    def _muestrear(self, conn, sql: str, executemany: bool) -> bool:
+        if executemany or conn.dialect.name != "postgresql" or not sql.upper().startswith(("SELECT", "WITH")):
+            return False  # nunca sobre escrituras (ver opciones_explain para SELECT ... FOR UPDATE)
+        if random.random() >= self.muestreo_explain:
+            return False
+        ahora = time.monotonic()
+        self._explains = [t for t in self._explains if ahora - t < 60]
+        if len(self._explains) >= self.explains_por_minuto:
+            return False
+        self._explains.append(ahora)
+        return True
+
+    def _programar_explain(self, registro: Dict[str, Any], statement: str, parameters: Any, opciones: str) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        tarea = loop.create_task(self._explicar(registro, statement, parameters, opciones))
+        self._pendientes.add(tarea)
+        tarea.add_done_callback(self._pendientes.discard)
+
+    async def _explicar(self, registro: Dict[str, Any], statement: str, parameters: Any, opciones: str) -> None:
+        try:
+            async with self.engine.connect() as conn:
+                conn.sync_connection.info["explicando"] = True
+                try:
+                    resultado = await conn.exec_driver_sql(
+                        f"EXPLAIN ({opciones}) {statement}", parameters
+                    )
+                    plan = resultado.scalar()
+                finally:
+                    await conn.rollback()
+                    conn.sync_connection.info.pop("explicando", None)
+        except Exception as e:
+            logger.warning("No se pudo obtener el plan de %s: %r", registro["huella"], e)
+            return
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        self.almacen.info(json.dumps({
+            "tipo": "plan",
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            "huella": registro["huella"],
+            "duracion_ms": registro["duracion_ms"],
+            "repositorio": registro["repositorio"],
+            "analyze": opciones.startswith("ANALYZE"),
+            "plan": plan,
+        }, default=str, ensure_ascii=False))
+
+
+def leer_registros(archivo: str) -> List[Dict[str, Any]]:
+    """Registros del archivo y sus copias rotadas, del más viejo al más nuevo"""
+    archivos = sorted(
+        (f for f in os.listdir(os.path.dirname(os.path.abspath(archivo)) or ".")
+         if f == os.path.basename(archivo) or f.startswith(os.path.basename(archivo) + ".")),
+        key=lambda f: -int(f.rsplit(".", 1)[1]) if f.rsplit(".", 1)[1].isdigit() else 0,
+    )
+    registros = []
+    for nombre in archivos:
+        with open(os.path.join(os.path.dirname(os.path.abspath(archivo)), nombre), encoding="utf-8") as f:
+            registros.extend(json.loads(linea) for linea in f if linea.strip())
+    return registros
+
+
+def resumir(registros: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Consultas agrupadas por huella, ordenadas por tiempo total"""
+    grupos: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"duraciones": [], "origenes": set(), "planes": 0})
+    for r in registros:
+        grupo = grupos[r["huella"]]
+        if r["tipo"] == "plan":
+            grupo["planes"] += 1
+            continue
+        grupo["sql"] = r["sql"]
+        grupo["duraciones"].append(r["duracion_ms"])
+        grupo["origenes"].add(r.get("repositorio") or r.get("llamador") or "?")
+    resumen = []
+    for huella, g in grupos.items():
+        if not g["duraciones"]:
+            continue
+        duraciones = sorted(g["duraciones"])
+        resumen.append({
+            "huella": huella,
+            "cantidad": len(duraciones),
+            "total_ms": round(sum(duraciones), 1),
+            "p95_ms": duraciones[min(len(duraciones) - 1, int(0.95 * len(duraciones)))],
+            "max_ms": duraciones[-1],
+            "origenes": sorted(g["origenes"]),
+            "planes": g["planes"],
+            "sql": g["sql"],
+        })
+    return sorted(resumen, key=lambda r: -r["total_ms"])
+
+
+# Registro del proceso (se instala en app/config/database.py si está habilitado)
+registro_consultas_lentas: Optional[RegistroConsultasLentas] = None
+
+
+def instalar_registro(engine) -> RegistroConsultasLentas:
+    global registro_consultas_lentas
+    if registro_consultas_lentas is None:
+        registro_consultas_lentas = RegistroConsultasLentas()
+    registro_consultas_lentas.instalar(engine)
+    return registro_consultas_lentas
+
+
+if __name__ == "__main__":
+    archivo = sys.argv[1] if len(sys.argv) > 1 else Config.CONSULTAS_LENTAS_ARCHIVO
+    for r in resumir(leer_registros(archivo)):
+        print(f"{r['huella']}  n={r['cantidad']:<5} total={r['total_ms']:>9.1f}ms p95={r['p95_ms']:>8.1f}ms "
+              f"max={r['max_ms']:>8.1f}ms planes={r['planes']}  {', '.join(r['origenes'])}")
+        print(f"    {r['sql'][:200]}")
@@ -0,0 +1,233 @@
+"""Eventos de cambios de los repositorios, para invalidar cachés con precisión.
+
+BaseRepository publica un EventoCambio (tabla, ids, operación) después de cada commit de
+create/update/delete/bulk_create. El bus es en proceso y síncrono: los suscriptores (p. ej.
+app/core/cache_http.py) se ejecutan en el momento y no deben hacer I/O.
+
+Con EVENTOS_CAMBIOS_BACKEND=redis o postgres un puente reenvía los eventos locales a los
+demás procesos (Redis pub/sub o LISTEN/NOTIFY) y publica en el bus local los que llegan de
+ellos. El envío es write-behind: una tarea drena una cola, así el request que escribió no
+espera a la red. Los eventos de otros procesos se reconocen por `origen` y no se repiten.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+def _nuevo_origen() -> str:
+    return f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+# Identifica a este proceso en los eventos que viajan por el puente
+ORIGEN = _nuevo_origen()
+
+
+def origen_local() -> str:
+    """Origen de este proceso. Se regenera en los hijos de un fork posterior a la importación
+    (gunicorn --preload): si no, los workers hermanos descartarían los eventos entre sí."""
+    global ORIGEN
+    if not ORIGEN.startswith(f"{os.getpid()}-"):
+        ORIGEN = _nuevo_origen()
+    return ORIGEN
+
+
+@dataclass(frozen=True)
+class EventoCambio:
+    entidad: str  # nombre de la tabla
+    operacion: str  # create, update, delete, bulk_create
+    ids: Tuple = ()
+    origen: str = field(default_factory=origen_local)
+    momento: float = field(default_factory=time.time)
+
+    def a_mensaje(self) -> str:
+        return json.dumps(asdict(self), default=str)
+
+    @classmethod
+    def desde_mensaje(cls, mensaje: str) -> "EventoCambio":
+        datos = json.loads(mensaje)
+        datos["ids"] = tuple(datos.get("ids") or ())
+        return cls(**datos)
+
+
+Suscriptor = Callable[[EventoCambio], None]
+
+
+class BusCambios:
+    """Bus en proceso: publicar() llama a los suscriptores de la entidad (o de todas)"""
+
+    def __init__(self):
+        self._suscriptores: List[Tuple[Optional[frozenset], Suscriptor]] = []
+        self.puente: Optional["PuenteCambios"] = None
+        self.publicados = 0
+        self.recibidos = 0
+
+    def suscribir(self, suscriptor: Suscriptor, entidades: Optional[List[str]] = None) -> Callable[[], None]:
+        """Registrar un suscriptor; devuelve la función que lo da de baja"""
+        entrada = (frozenset(entidades) if entidades else None, suscriptor)
+        self._suscriptores.append(entrada)
+        return lambda: self._suscriptores.remove(entrada)
+
+    def publicar(self, evento: EventoCambio) -> None:
+        if evento.origen == origen_local():
+            self.publicados += 1
+            if self.puente is not None:
+                self.puente.enviar(evento)
+        else:
+            self.recibidos += 1
+        for entidades, suscriptor in list(self._suscriptores):
+            if entidades is None or evento.entidad in entidades:
+                try:
+                    suscriptor(evento)
+                except Exception:
+                    logger.exception("Error en un suscriptor de %s", evento.entidad)
+
+
+# Bus del proceso
+bus_cambios = BusCambios()
+
+
+class PuenteCambios(ABC):
+    """Reenvío de los eventos del bus local a otros procesos y viceversa"""
+
+    def __init__(self, bus: BusCambios = bus_cambios, canal: str = Config.EVENTOS_CAMBIOS_CANAL):
+        self.bus = bus
+        self.canal = canal
+        self._cola: Optional[asyncio.Queue] = None
+        self._tareas: List[asyncio.Task] = []
+
+    async def iniciar(self) -> None:
+        self._cola = asyncio.Queue()
+        await self._conectar()
+        self._tareas = [asyncio.create_task(self._enviar_pendientes()), asyncio.create_task(self._escuchar())]
+        self.bus.puente = self
+
+    async def detener(self) -> None:
+        if self.bus.puente is self:
+            self.bus.puente = None
+        if self._cola is not None:
+            await self._cola.join()
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        await self._desconectar()
+
+    def enviar(self, evento: EventoCambio) -> None:
+        if self._cola is not None:
+            self._cola.put_nowait(evento)
+
+    def recibir(self, mensaje: str) -> None:
+        """Publicar en el bus local un evento llegado de otro proceso"""
+        try:
+            evento = EventoCambio.desde_mensaje(mensaje)
+        except (ValueError, TypeError):
+            logger.warning("Evento de cambio inválido: %r", mensaje)
+            return
+        if evento.origen != origen_local():
+            self.bus.publicar(evento)
+
+    async def _enviar_pendientes(self) -> None:
+        while True:
+            evento = await self._cola.get()
+            try:
+                await self._publicar(evento.a_mensaje())
+            except Exception:
+                # Los otros procesos se quedan con su TTL: no se reintenta
+                logger.warning("No se pudo reenviar el evento de %s", evento.entidad, exc_info=True)
+            finally:
+                self._cola.task_done()
+
+    async def _conectar(self) -> None:
+        pass
+
+    async def _desconectar(self) -> None:
+        pass
+
+    @abstractmethod
+    async def _publicar(self, mensaje: str) -> None:
+        ...
+
+    @abstractmethod
+    async def _escuchar(self) -> None:
+        ...
+
+
+class PuenteRedis(PuenteCambios):
+    """Redis pub/sub: PUBLISH al canal y una conexión suscrita que escucha"""
+
+    def __init__(self, cliente, **kwargs):
+        super().__init__(**kwargs)
+        self.cliente = cliente
+        self._pubsub = None
+
+    async def _conectar(self) -> None:
+        self._pubsub = self.cliente.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.canal)
+
+    async def _desconectar(self) -> None:
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+
+    async def _publicar(self, mensaje: str) -> None:
+        await self.cliente.publish(self.canal, mensaje)
+
+    async def _escuchar(self) -> None:
+        while True:
+            try:
+                async for mensaje in self._pubsub.listen():
+                    if mensaje.get("type") == "message":
+                        self.recibir(mensaje["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Se cortó la suscripción a %s; reintentando", self.canal, exc_info=True)
+                await asyncio.sleep(1)
+                await self._pubsub.subscribe(self.canal)
+
+
+class PuentePostgres(PuenteCambios):
+    """LISTEN/NOTIFY de PostgreSQL con una conexión asyncpg dedicada a escuchar"""
+
+    def __init__(self, engine, **kwargs):
+        super().__init__(**kwargs)
+        self.engine = engine
+        self._conexion = None
+
+    async def _conectar(self) -> None:
+        self._conexion = await self.engine.connect()
+        crudo = await self._conexion.get_raw_connection()
+        await crudo.driver_connection.add_listener(self.canal, self._al_notificar)
+
+    async def _desconectar(self) -> None:
+        if self._conexion is not None:
+            crudo = await self._conexion.get_raw_connection()
+            await crudo.driver_connection.remove_listener(self.canal, self._al_notificar)
+            await self._conexion.close()
+
+    def _al_notificar(self, conexion, pid, canal, mensaje) -> None:
+        self.recibir(mensaje)
+
+    async def _publicar(self, mensaje: str) -> None:
+        from sqlalchemy import text
+        async with self.engine.begin() as conn:
+            await conn.execute(text("SELECT pg_notify(:canal, :mensaje)"), {"canal": self.canal, "mensaje": mensaje})
+
+    async def _escuchar(self) -> None:
+        # asyncpg entrega las notificaciones por callback; la tarea sólo mantiene viva la conexión
+        await asyncio.Event().wait()
+
+
+def crear_puente_cambios(backend: str = Config.EVENTOS_CAMBIOS_BACKEND, *, cliente_redis=None, engine=None) -> Optional[PuenteCambios]:
+    if backend == "redis":
+        return PuenteRedis(cliente_redis)
+    if backend == "postgres":
+        return PuentePostgres(engine)
+    return None
@@ -0,0 +1,281 @@
+"""Instrumentación de latencia: spans por request e histogramas en formato Prometheus.
+
+Puntos de medición:
+- MiddlewareMetricas: duración de cada request por método, ruta y status, más el desglose
+  de los spans del request en el header `Server-Timing` (db, redis, hcweb).
+- instrumentar_engine: eventos de SQLAlchemy sobre el engine (app/config/database.py).
+- instrumentar / span: decoradores y context managers para redis_session, WsHcweb y el LLM.
+
+Se habilita con METRICAS_HABILITADAS=true. Deshabilitado, cada punto de medición cuesta
+una lectura de atributo y los listeners del engine no se registran. Las métricas son por
+proceso: con varios workers, cada uno expone las suyas en /metrics.
+"""
+import asyncio
+import bisect
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Límites de los buckets en segundos (de 1ms a 10s)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CUANTILES = (0.5, 0.95, 0.99)
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+
+
+class Histograma:
+    """Buckets acumulables (Prometheus) + ventana de muestras recientes para p50/p95/p99"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS, ventana: int = 2048):
+        self.buckets = buckets
+        self.conteos = [0] * (len(buckets) + 1)
+        self.cantidad = 0
+        self.suma = 0.0
+        self.muestras: Deque[float] = deque(maxlen=ventana)
+
+    def observar(self, valor: float) -> None:
+        self.conteos[bisect.bisect_left(self.buckets, valor)] += 1
+        self.cantidad += 1
+        self.suma += valor
+        self.muestras.append(valor)
+
+    def cuantiles(self, cuantiles: Tuple[float, ...] = CUANTILES) -> Dict[float, float]:
+        if not self.muestras:
+            return {q: 0.0 for q in cuantiles}
+        ordenadas = sorted(self.muestras)
+        return {q: ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))] for q in cuantiles}
+
+
+@dataclass
+class Traza:
+    """Spans de un request: (tipo, nombre, duración en segundos)"""
+    spans: List[Tuple[str, str, float]] = field(default_factory=list)
+
+    def totales(self) -> Dict[str, Tuple[int, float]]:
+        totales: Dict[str, Tuple[int, float]] = {}
+        for tipo, _, duracion in self.spans:
+            cantidad, suma = totales.get(tipo, (0, 0.0))
+            totales[tipo] = (cantidad + 1, suma + duracion)
+        return totales
+
+
+_traza_actual: ContextVar[Optional[Traza]] = ContextVar("traza_actual", default=None)
+
+# Nombre del histograma y de la etiqueta del nombre para cada tipo de span
+_HISTOGRAMAS_SPAN = {
+    "db": ("db_query_duration_seconds", "operacion"),
+    "redis": ("redis_duration_seconds", "operacion"),
+    "hcweb": ("hcweb_call_duration_seconds", "metodo"),
+    "llm": ("llm_call_duration_seconds", "cliente"),
+}
+
+
+class Metricas:
+    """Registro de histogramas del proceso"""
+
+    def __init__(self, habilitadas: bool = False):
+        self.habilitadas = habilitadas
+        self._histogramas: Dict[str, Dict[Etiquetas, Histograma]] = {}
+        # Los spans de redis_session y WsHcweb pueden venir de hilos (asyncio.to_thread)
+        self._lock = threading.Lock()
+
+    def observar(self, nombre: str, valor: float, **etiquetas: str) -> None:
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            por_etiquetas = self._histogramas.setdefault(nombre, {})
+            histograma = por_etiquetas.get(clave)
+            if histograma is None:
+                histograma = por_etiquetas[clave] = Histograma()
+            histograma.observar(valor)
+
+    def histograma(self, nombre: str, **etiquetas: str) -> Optional[Histograma]:
+        return self._histogramas.get(nombre, {}).get(tuple(sorted(etiquetas.items())))
+
+    def registrar_span(self, tipo: str, nombre: str, duracion: float) -> None:
+        metrica, etiqueta = _HISTOGRAMAS_SPAN.get(tipo, (f"{tipo}_duration_seconds", "nombre"))
+        self.observar(metrica, duracion, **{etiqueta: nombre})
+        traza = _traza_actual.get()
+        if traza is not None:
+            traza.spans.append((tipo, nombre, duracion))
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._histogramas.clear()
+
+    def exportar(self) -> str:
+        """Texto en formato de exposición de Prometheus (histogramas + resumen de cuantiles)"""
+        lineas = []
+        with self._lock:
+            copia = {nombre: dict(series) for nombre, series in self._histogramas.items()}
+        for nombre in sorted(copia):
+            series = copia[nombre]
+            lineas.append(f"# TYPE {nombre} histogram")
+            for etiquetas, h in series.items():
+                acumulado = 0
+                for limite, conteo in zip([repr(b) for b in h.buckets] + ["+Inf"], h.conteos):
+                    acumulado += conteo
+                    lineas.append(f"{nombre}_bucket{_formatear(etiquetas + (('le', limite),))} {acumulado}")
+                lineas.append(f"{nombre}_sum{_formatear(etiquetas)} {h.suma:.6f}")
+                lineas.append(f"{nombre}_count{_formatear(etiquetas)} {h.cantidad}")
+            # Cuantiles de las muestras recientes, como summary aparte
+            lineas.append(f"# TYPE {nombre}_cuantiles summary")
+            for etiquetas, h in series.items():
+                for q, valor in h.cuantiles().items():
+                    lineas.append(f"{nombre}_cuantiles{_formatear(etiquetas + (('quantile', str(q)),))} {valor:.6f}")
+                lineas.append(f"{nombre}_cuantiles_sum{_formatear(etiquetas)} {h.suma:.6f}")
+                lineas.append(f"{nombre}_cuantiles_count{_formatear(etiquetas)} {h.cantidad}")
+        return "\n".join(lineas) + "\n"
+
+
+def _formatear(etiquetas: Etiquetas) -> str:
+    if not etiquetas:
+        return ""
+    valores = ",".join(
+        f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in etiquetas
+    )
+    return "{" + valores + "}"
+
+
+# Registro global del proceso
+metricas = Metricas(Config.METRICAS_HABILITADAS)
+
+
+class _Span:
+    __slots__ = ("tipo", "nombre", "inicio")
+
+    def __init__(self, tipo: str, nombre: str):
+        self.tipo = tipo
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        metricas.registrar_span(self.tipo, self.nombre, time.perf_counter() - self.inicio)
+        return False
+
+
+class _SinSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_SIN_SPAN = _SinSpan()
+
+
+def span(tipo: str, nombre: str):
+    """Medir un bloque como span del request actual (`with span("hcweb", metodo): ...`)"""
+    if not metricas.habilitadas:
+        return _SIN_SPAN
+    return _Span(tipo, nombre)
+
+
+def instrumentar(tipo: str, nombre: Optional[str] = None) -> Callable:
+    """Decorador: medir cada llamada (sync o async) como span `tipo`/`nombre`"""
+
+    def decorador(funcion: Callable) -> Callable:
+        etiqueta = nombre or funcion.__name__
+
+        if asyncio.iscoroutinefunction(funcion):
+            @functools.wraps(funcion)
+            async def envoltura_async(*args, **kwargs):
+                if not metricas.habilitadas:
+                    return await funcion(*args, **kwargs)
+                inicio = time.perf_counter()
+                try:
+                    return await funcion(*args, **kwargs)
+                finally:
+                    metricas.registrar_span(tipo, etiqueta, time.perf_counter() - inicio)
+            return envoltura_async
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not metricas.habilitadas:
+                return funcion(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                metricas.registrar_span(tipo, etiqueta, time.perf_counter() - inicio)
+        return envoltura
+
+    return decorador
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    context._inicio_metricas = time.perf_counter()
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "_inicio_metricas", None)
+    if inicio is not None and metricas.habilitadas:
+        operacion = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+        metricas.registrar_span("db", operacion, time.perf_counter() - inicio)
+
+
+def instrumentar_engine(engine) -> None:
+    """Registrar los eventos de SQLAlchemy que miden cada consulta (idempotente)"""
+    motor = getattr(engine, "sync_engine", engine)
+    if not event.contains(motor, "before_cursor_execute", _antes_de_ejecutar):
+        event.listen(motor, "before_cursor_execute", _antes_de_ejecutar)
+        event.listen(motor, "after_cursor_execute", _despues_de_ejecutar)
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI: histograma por ruta y spans del request en `Server-Timing`"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metricas.habilitadas:
+            await self.app(scope, receive, send)
+            return
+
+        traza = Traza()
+        token = _traza_actual.set(traza)
+        inicio = time.perf_counter()
+        estado = {"status": 500}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["status"] = mensaje["status"]
+                total = time.perf_counter() - inicio
+                tiempos = [f"{tipo};dur={suma * 1000:.2f};desc=\"{cantidad}\"" for tipo, (cantidad, suma) in traza.totales().items()]
+                tiempos.append(f"app;dur={total * 1000:.2f}")
+                mensaje = dict(mensaje)
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [(b"server-timing", ", ".join(tiempos).encode())]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _traza_actual.reset(token)
+            duracion = time.perf_counter() - inicio
+            ruta = getattr(scope.get("route"), "path", None) or "sin_ruta"
+            metricas.observar(
+                "http_request_duration_seconds", duracion,
+                method=scope["method"], route=ruta, status=str(estado["status"]),
+            )
+            if duracion * 1000 >= Config.METRICAS_REQUEST_LENTO_MS:
+                logger.warning(
+                    "Request lento %s %s: %.1fms %s", scope["method"], ruta, duracion * 1000,
+                    ", ".join(f"{tipo}={suma * 1000:.1f}ms/{n}" for tipo, (n, suma) in traza.totales().items()),
+                )
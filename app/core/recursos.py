@@ -0,0 +1,172 @@
+"""Recursos de cada proceso de la API, creados y liberados en el lifespan.
+
+Con varios workers (serve.py, gunicorn_conf.py) cada proceso arranca su propio lifespan:
+los pools (Redis, HTTP, conexiones a la base) se crean ahí y no en la importación, así no
+se heredan sockets abiertos por un fork (el cliente síncrono de redis_session se crea con el
+primer uso en cada proceso y se cierra acá). Si el proceso es hijo de un fork posterior a la
+importación (gunicorn --preload), el pool del engine se descarta sin cerrar las conexiones
+del padre.
+
+Al apagar se drena en orden: dejar de consumir mensajes entrantes, enviar los salientes
+pendientes, escribir los logs IA en cola y recién entonces cerrar Redis y la base.
+"""
+import logging
+import os
+from typing import Optional
+
+import redis.asyncio as aioredis
+from sqlalchemy import text
+
+from app.config import Config
+from app.config.database import AsyncSessionLocal, close_db, engine
+from app.core.cache_http import cache_http
+from app.core.eventos import PuenteCambios, crear_puente_cambios
+from app.core.redis_async import crear_cliente_redis
+from app.repositories.redis_session import cerrar_redis_client
+from app.service.busqueda import buscador
+from app.service.agenda import Agenda, crear_agenda
+from app.service.cola_mensajes import ColaMensajes, crear_cola_mensajes
+from app.service.conversacion import flujos_clinicas
+from app.service.espejo_hcweb import EspejoHcweb
+from app.service.identidad import ResolutorIdentidad, crear_resolutor_identidad
+from app.service.WsHcweb import registro_hcweb
+from app.service.log_ia_pipeline import log_ia_pipeline
+from app.service.procesador_mensajes import procesar_mensaje
+from app.service.salida_whatsapp import DespachadorSalida, crear_despachador_salida
+from app.service.workers_mensajes import PoolWorkers
+
+logger = logging.getLogger(__name__)
+
+PID_IMPORTACION = os.getpid()
+
+
+class Recursos:
+    """Contenedor de los recursos compartidos del proceso"""
+
+    def __init__(self, backend: str = Config.COLA_MENSAJES_BACKEND):
+        self.backend = backend
+        self.pid: Optional[int] = None
+        self.redis: Optional[aioredis.Redis] = None
+        self.cola_mensajes: Optional[ColaMensajes] = None
+        self.despachador_salida: Optional[DespachadorSalida] = None
+        self.workers_mensajes: Optional[PoolWorkers] = None
+        self.puente_cambios: Optional[PuenteCambios] = None
+        self.agenda: Optional[Agenda] = None
+        self.identidad: Optional[ResolutorIdentidad] = None
+        self.espejo_hcweb: Optional[EspejoHcweb] = None
+
+    @property
+    def iniciado(self) -> bool:
+        return self.pid == os.getpid()
+
+    async def iniciar(self) -> None:
+        if self.iniciado:
+            return
+        if os.getpid() != PID_IMPORTACION:
+            # Conexiones heredadas del proceso padre: se sueltan sin cerrarlas
+            await engine.dispose(close=False)
+
+        if self.backend != "memoria":
+            self.redis = crear_cliente_redis()
+        self.cola_mensajes = crear_cola_mensajes(self.backend, cliente=self.redis)
+        self.despachador_salida = crear_despachador_salida(self.backend, cliente_redis=self.redis)
+
+        await self.calentar()
+        if Config.EVENTOS_CAMBIOS_BACKEND != "local":
+            if Config.EVENTOS_CAMBIOS_BACKEND == "redis" and self.redis is None:
+                self.redis = crear_cliente_redis()
+            self.puente_cambios = crear_puente_cambios(cliente_redis=self.redis, engine=engine)
+            try:
+                await self.puente_cambios.iniciar()
+            except Exception:
+                # Sin puente cada proceso invalida sólo lo propio y el TTL cubre el resto
+                logger.warning("No se pudo iniciar el puente de eventos de cambios", exc_info=True)
+                self.puente_cambios = None
+        if "redis" in (Config.AGENDA_BACKEND, Config.IDENTIDAD_BACKEND) and self.redis is None:
+            self.redis = crear_cliente_redis()
+        self.agenda = crear_agenda(Config.AGENDA_BACKEND, cliente_redis=self.redis).suscribir()
+        self.identidad = crear_resolutor_identidad(Config.IDENTIDAD_BACKEND, cliente_redis=self.redis).suscribir()
+        buscador.suscribir()
+        cache_http.suscribir()
+        flujos_clinicas.suscribir()
+        await log_ia_pipeline.iniciar()
+        await self.despachador_salida.iniciar()
+        if Config.ESPEJO_HCWEB_HABILITADO:
+            # Con varios workers conviene sincronizar en un solo proceso (sincronizar_hcweb.py)
+            self.espejo_hcweb = EspejoHcweb()
+            await self.espejo_hcweb.iniciar()
+        # Con la cola en memoria los workers tienen que correr en este proceso;
+        # con Redis corren aparte (worker.py)
+        if self.backend == "memoria":
+            self.workers_mensajes = PoolWorkers(self.cola_mensajes, procesar_mensaje)
+            await self.workers_mensajes.iniciar()
+        self.pid = os.getpid()
+        logger.info("Recursos iniciados en el proceso %s", self.pid)
+
+    async def calentar(self) -> None:
+        """Abrir las primeras conexiones y cargar cachés antes de recibir tráfico"""
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(text("SELECT 1"))
+                if db.get_bind().dialect.name != "postgresql":
+                    await buscador.cargar_indice(db)
+        except Exception:
+            logger.warning("No se pudo precalentar la base de datos", exc_info=True)
+        if self.redis is not None:
+            try:
+                await self.redis.ping()
+            except Exception:
+                logger.warning("Redis no responde al iniciar", exc_info=True)
+
+    async def detener(self, timeout: float = 10.0) -> None:
+        if self.workers_mensajes is not None:
+            await self.workers_mensajes.detener(timeout)
+        if self.despachador_salida is not None:
+            await self.despachador_salida.detener(timeout)
+        if self.cola_mensajes is not None:
+            await self.cola_mensajes.cerrar()
+        await log_ia_pipeline.detener()
+        if self.espejo_hcweb is not None:
+            await self.espejo_hcweb.detener()
+        if self.puente_cambios is not None:
+            await self.puente_cambios.detener()
+        if self.agenda is not None:
+            self.agenda.desuscribir()
+        if self.identidad is not None:
+            self.identidad.desuscribir()
+        buscador.desuscribir()
+        cache_http.desuscribir()
+        flujos_clinicas.desuscribir()
+        await registro_hcweb.cerrar()
+        cerrar_redis_client()
+        if self.redis is not None:
+            await self.redis.aclose()
+        await close_db()
+        self.__init__(self.backend)
+
+    def requerir(self, nombre: str):
+        """Recurso iniciado o error (p. ej. si se usa fuera del lifespan)"""
+        recurso = getattr(self, nombre)
+        if recurso is None or not self.iniciado:
+            raise RuntimeError(f"Recurso '{nombre}' no iniciado: la aplicación no pasó por el lifespan")
+        return recurso
+
+
+# Recursos del proceso actual
+recursos = Recursos()
+
+
+def get_cola_mensajes() -> ColaMensajes:
+    return recursos.requerir("cola_mensajes")
+
+
+def get_despachador_salida() -> DespachadorSalida:
+    return recursos.requerir("despachador_salida")
+
+
+def get_agenda() -> Agenda:
+    return recursos.requerir("agenda")
+
+
+def get_resolutor_identidad() -> ResolutorIdentidad:
+    return recursos.requerir("identidad")
@@ -0,0 +1,18 @@
+"""Clientes redis.asyncio de la aplicación.
+
+Un cliente por proceso (y por event loop): el pool de conexiones no se comparte entre
+procesos, así que se crea en el arranque de cada worker (ver app/core/recursos.py).
+"""
+import redis.asyncio as aioredis
+
+from app.config import Config
+
+
+def crear_cliente_redis(max_conexiones: int = 50) -> aioredis.Redis:
+    return aioredis.Redis(
+        host=Config.REDIS_HOST,
+        port=Config.REDIS_PORT,
+        db=Config.REDIS_DB,
+        decode_responses=True,
+        max_connections=max_conexiones,
+    )
@@ -0,0 +1,28 @@
+"""Respuesta JSON renderizada con orjson.
+
+orjson serializa dict/list/datetime/UUID/Enum directamente y varias veces más rápido que
+json.dumps. Los modelos Pydantic se vuelcan con su serializador (model_dump en modo JSON) y
+los bytes ya serializados (p. ej. de TypeAdapter.dump_json) se envían tal cual.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+def _por_defecto(valor: Any) -> Any:
+    if isinstance(valor, BaseModel):
+        return valor.model_dump(mode="json")
+    if isinstance(valor, (set, frozenset)):
+        return list(valor)
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+class RespuestaORJSON(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS)
@@ -1,21 +1,30 @@
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.config.database import Base
 from datetime import datetime
 from typing import Optional
 
+# JSONB en PostgreSQL (indexable con GIN); JSON genérico en el resto (SQLite en tests)
+JSONVariante = JSON().with_variant(JSONB(), "postgresql")
+
 
 class Clinica(Base):
     __tablename__ = "clinicas"
     
     id = Column(Integer, primary_key=True, index=True)
     nombre = Column(String(100), nullable=False, index=True)
-    configuraciones = Column(JSON, nullable=True)  # JSONB para configuraciones
+    configuraciones = Column(JSONVariante, nullable=True)  # JSONB para configuraciones
     did_whatsapp = Column(String(50), unique=True, index=True)
     activa = Column(Boolean, default=True, nullable=False)
     fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
-    fecha_actualizacion = Column(DateTime(timezone=True), onupdate=func.now())        
+    fecha_actualizacion = Column(DateTime(timezone=True), onupdate=func.now())
+
+    # Índices
+    __table_args__ = (
+        Index('idx_clinica_configuraciones_gin', 'configuraciones', postgresql_using='gin', postgresql_ops={'configuraciones': 'jsonb_path_ops'}),
+    )
 
 
 class Paciente(Base):
@@ -24,6 +33,7 @@ class Paciente(Base):
     id = Column(Integer, primary_key=True, index=True)
     dni = Column(String(20), nullable=False, index=True)
     telefono = Column(String(20), nullable=False, index=True)
+    telefono_e164 = Column(String(16), nullable=True)  # normalizado (app/utils/telefono.py); lo escribe el repositorio
     nombre = Column(String(255), nullable=False, index=True)
     email = Column(String(255), nullable=True)    
     fecha_registro = Column(DateTime(timezone=True), server_default=func.now())
@@ -36,6 +46,7 @@ class Paciente(Base):
     __table_args__ = (
         Index('idx_paciente_dni', 'dni'),
         Index('idx_paciente_telefono', 'telefono'),
+        Index('idx_paciente_telefono_e164', 'telefono_e164'),
     )
 
 
@@ -44,13 +55,22 @@ class Profesional(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     nombre = Column(String(255), nullable=False, index=True)
-    especialidades = Column(JSON, nullable=True)  # JSONB para especialidades
-    horarios = Column(JSON, nullable=True)  # JSONB para horarios    
+    especialidades = Column(JSONVariante, nullable=True)  # JSONB con los nombres; la relación indexada está en profesional_especialidad
+    horarios = Column(JSONVariante, nullable=True)  # JSONB para horarios (sin índice: no se consulta por contenido)
     activo = Column(Boolean, default=True, nullable=False)
     fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
     fecha_actualizacion = Column(DateTime(timezone=True), onupdate=func.now())
         
     turnos = relationship("Turno", back_populates="profesional", cascade="all, delete-orphan")
+    # Sólo lectura: las asociaciones se escriben desde ProfesionalRepository
+    especialidades_asignadas = relationship(
+        "Especialidad", secondary="profesional_especialidad", back_populates="profesionales", viewonly=True
+    )
+
+    # Índices
+    __table_args__ = (
+        Index('idx_profesional_especialidades_gin', 'especialidades', postgresql_using='gin', postgresql_ops={'especialidades': 'jsonb_path_ops'}),
+    )
 
 
 class Especialidad(Base):
@@ -62,6 +82,10 @@ class Especialidad(Base):
     preparacion_previa = Column(Text, nullable=True)    
     fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
     fecha_actualizacion = Column(DateTime(timezone=True), onupdate=func.now())
+
+    profesionales = relationship(
+        "Profesional", secondary="profesional_especialidad", back_populates="especialidades_asignadas", viewonly=True
+    )
         
     # Índice compuesto
     __table_args__ = (
@@ -69,6 +93,20 @@ class Especialidad(Base):
     )
 
 
+class ProfesionalEspecialidad(Base):
+    __tablename__ = "profesional_especialidad"
+
+    # La PK (id_profesional, id_especialidad) resuelve profesional -> especialidades
+    id_profesional = Column(Integer, ForeignKey("profesionales.id", ondelete="CASCADE"), primary_key=True)
+    id_especialidad = Column(Integer, ForeignKey("especialidades.id", ondelete="CASCADE"), primary_key=True)
+    fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Índice compuesto inverso: especialidad -> profesionales
+    __table_args__ = (
+        Index('idx_prof_esp_especialidad_profesional', 'id_especialidad', 'id_profesional'),
+    )
+
+
 class Turno(Base):
     __tablename__ = "turnos"
     
@@ -98,15 +136,61 @@ class Turno(Base):
 
 class LogIA(Base):
     __tablename__ = "logs_ia"
+    # En PostgreSQL la tabla está particionada por mes sobre `fecha` y su PK real
+    # es (id, fecha); ver la migración b7d41e2a9c10 y app/service/log_ia_retencion.py
     
     id = Column(Integer, primary_key=True, index=True)
     mensaje = Column(Text, nullable=False)
     respuesta_ia = Column(Text, nullable=False)
     confianza = Column(String(20), nullable=True)  # baja, media, alta
-    fecha = Column(DateTime(timezone=True), server_default=func.now(), index=True)
-    metadatos = Column(JSON, nullable=True)  # JSONB para metadata adicional
+    fecha = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    metadatos = Column(JSONVariante, nullable=True)  # JSONB para metadata adicional
     
     # Índices
     __table_args__ = (
         Index('idx_log_fecha_confianza', 'fecha', 'confianza'),
-    )
\ No newline at end of file
+        Index('idx_log_metadatos_gin', 'metadatos', postgresql_using='gin', postgresql_ops={'metadatos': 'jsonb_path_ops'}),
+    )
+
+class LogIAResumenHora(Base):
+    __tablename__ = "logs_ia_resumen_hora"
+    # Rollup incremental de logs_ia: cantidad de logs por hora, clínica y confianza.
+    # Lo mantiene LogIAResumenRepository.incrementar en la misma transacción que el INSERT.
+
+    hora = Column(DateTime(timezone=True), primary_key=True)
+    id_clinica = Column(Integer, primary_key=True, default=0)  # 0 = sin clínica en metadatos
+    confianza = Column(String(20), primary_key=True)  # baja, media, alta, sin_dato
+    cantidad = Column(Integer, nullable=False, default=0)
+
+    # Índices
+    __table_args__ = (
+        Index('idx_log_resumen_clinica_hora', 'id_clinica', 'hora'),
+    )
+
+
+class ReferenciaHcweb(Base):
+    __tablename__ = "referencias_hcweb"
+    # Espejo local de datos de referencia de HCWEB (profesionales, coberturas, ...): el bot
+    # lee de acá en vez de llamar al upstream. Lo escribe app/service/espejo_hcweb.py.
+
+    dataset = Column(String(50), primary_key=True)
+    clave = Column(String(100), primary_key=True)  # id del registro en HCWEB
+    datos = Column(JSONVariante, nullable=False)
+    hash = Column(String(32), nullable=False)  # hash del contenido: sólo se reescribe si cambia
+    fecha_actualizacion = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class SincronizacionHcweb(Base):
+    __tablename__ = "sincronizaciones_hcweb"
+    # Estado de la última sincronización de cada dataset del espejo de HCWEB
+
+    dataset = Column(String(50), primary_key=True)
+    estado = Column(String(20), nullable=False)  # ok, sin_cambios, error
+    hash = Column(String(32), nullable=True)  # del dataset completo en la última sincronización correcta
+    registros = Column(Integer, nullable=False, default=0)
+    insertados = Column(Integer, nullable=False, default=0)
+    actualizados = Column(Integer, nullable=False, default=0)
+    eliminados = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    ultimo_intento = Column(DateTime(timezone=True), nullable=True)
+    ultimo_exito = Column(DateTime(timezone=True), nullable=True)
@@ -1,11 +1,17 @@
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar, Type, Optional, List, Dict, Any
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Generic, TypeVar, Type, Optional, List, Dict, Any, AsyncIterator, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from sqlalchemy import update, delete, func
+from sqlalchemy import update, delete, exists, func, inspect, literal_column, type_coerce, case, cast, Integer, Row
+from sqlalchemy.dialects import postgresql, sqlite
 from pydantic import BaseModel
 from app.config.database import Base
+from app.core.eventos import EventoCambio, bus_cambios
+from app.models.entities import Especialidad, ProfesionalEspecialidad, Turno
+from app.utils.telefono import normalizar_telefono
 
 # Type variables para genéricos
 ModelType = TypeVar("ModelType", bound=Base)
@@ -13,6 +19,48 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+def insert_dialecto(db: AsyncSession, model: Type[ModelType]):
+    """INSERT del dialecto activo, para poder usar ON CONFLICT (PostgreSQL y SQLite)"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+def contiene_json(documento: Any, contenido: Any) -> bool:
+    """Semántica del operador @> de JSONB, para motores sin él (SQLite en tests)"""
+    if isinstance(contenido, dict):
+        return isinstance(documento, dict) and all(
+            clave in documento and contiene_json(documento[clave], valor)
+            for clave, valor in contenido.items()
+        )
+    if isinstance(contenido, list):
+        if not isinstance(documento, list):
+            return False
+        return all(any(contiene_json(elemento, valor) for elemento in documento) for valor in contenido)
+    if isinstance(documento, list):
+        # En JSONB un arreglo contiene a un escalar que sea uno de sus elementos
+        return contenido in documento
+    return documento == contenido
+
+
+def truncar_hora(db: AsyncSession, columna):
+    """Expresión SQL que trunca un timestamp a la hora"""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc("hour", columna)
+    return func.strftime("%Y-%m-%d %H:00:00.000000", columna)
+
+
+def entero_json(db: AsyncSession, valor, defecto: int):
+    """Expresión SQL con el entero de un campo JSON, o `defecto` si falta o no es numérico"""
+    # Sin el filtro, Postgres falla con valores como "abc" y SQLite los guarda como texto
+    texto = valor.as_string()
+    if db.get_bind().dialect.name == "postgresql":
+        es_entero = texto.regexp_match(r"^\d+$")
+    else:
+        es_entero = texto.op("GLOB")("[0-9]*") & ~texto.op("GLOB")("*[^0-9]*")
+    return case((es_entero, cast(texto, Integer)), else_=defecto)
+
+
 class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """Repositorio base con operaciones CRUD async"""
     
@@ -24,10 +72,22 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj_in_data = obj_in.model_dump() if hasattr(obj_in, 'model_dump') else obj_in.dict()
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
+        await self._antes_de_commit(db, db_obj=db_obj, cambios=obj_in_data, operacion="create")
         await db.commit()
         await db.refresh(db_obj)
+        self._despues_de_commit(operacion="create", ids=[db_obj.id])
         return db_obj
     
+    async def _antes_de_commit(
+        self, db: AsyncSession, *, db_obj: ModelType, cambios: Dict[str, Any], operacion: str
+    ) -> None:
+        """Hook de create/update/delete/bulk_create para escribir datos derivados en la misma transacción"""
+        pass
+
+    def _despues_de_commit(self, *, operacion: str, ids: List[Any]) -> None:
+        """Hook de create/update/delete/bulk_create una vez confirmados los cambios"""
+        bus_cambios.publicar(EventoCambio(self.model.__tablename__, operacion, tuple(ids)))
+    
     async def get(self, db: AsyncSession, id: int) -> Optional[ModelType]:
         """Obtener un registro por ID"""
         result = await db.execute(select(self.model).filter(self.model.id == id))
@@ -58,7 +118,8 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         self, 
         db: AsyncSession, 
         *, 
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        condiciones: Optional[List[Any]] = None
     ) -> int:
         """Contar registros con filtros opcionales"""
         query = select(func.count(self.model.id))
@@ -68,10 +129,31 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             for key, value in filters.items():
                 if hasattr(self.model, key) and value is not None:
                     query = query.filter(getattr(self.model, key) == value)
+        if condiciones:
+            query = query.filter(*condiciones)
         
         result = await db.execute(query)
         return result.scalar()
     
+    async def get_version(
+        self,
+        db: AsyncSession,
+        *,
+        filters: Optional[Dict[str, Any]] = None,
+        condiciones: Optional[List[Any]] = None
+    ) -> tuple:
+        """(última modificación, cantidad) de los registros filtrados, para armar ETags"""
+        modificacion = func.max(func.coalesce(self.model.fecha_actualizacion, self.model.fecha_creacion))
+        query = select(modificacion, func.count(self.model.id))
+        if filters:
+            for key, value in filters.items():
+                if hasattr(self.model, key) and value is not None:
+                    query = query.filter(getattr(self.model, key) == value)
+        if condiciones:
+            query = query.filter(*condiciones)
+        result = await db.execute(query)
+        return tuple(result.one())
+    
     async def update(
         self, 
         db: AsyncSession, 
@@ -87,16 +169,20 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 setattr(db_obj, field, value)
         
         db.add(db_obj)
+        await self._antes_de_commit(db, db_obj=db_obj, cambios=obj_data, operacion="update")
         await db.commit()
         await db.refresh(db_obj)
+        self._despues_de_commit(operacion="update", ids=[db_obj.id])
         return db_obj
     
     async def delete(self, db: AsyncSession, *, id: int) -> Optional[ModelType]:
         """Eliminar un registro por ID"""
         db_obj = await self.get(db, id)
         if db_obj:
+            await self._antes_de_commit(db, db_obj=db_obj, cambios={}, operacion="delete")
             await db.delete(db_obj)
             await db.commit()
+            self._despues_de_commit(operacion="delete", ids=[id])
         return db_obj
     
     async def get_by_field(
@@ -131,6 +217,41 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         result = await db.execute(query)
         return result.scalars().all()
     
+    async def get_multi_by_json(
+        self, 
+        db: AsyncSession, 
+        *, 
+        field: str, 
+        contenido: Any,
+        filters: Optional[Dict[str, Any]] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[ModelType]:
+        """Obtener registros cuyo campo JSON contiene `contenido` (operador @> de JSONB)"""
+        if not hasattr(self.model, field):
+            return []
+
+        query = select(self.model)
+        if filters:
+            for key, value in filters.items():
+                if hasattr(self.model, key) and value is not None:
+                    query = query.filter(getattr(self.model, key) == value)
+        query = query.order_by(self.model.id)
+
+        if db.get_bind().dialect.name == "postgresql":
+            # Usa el índice GIN (jsonb_path_ops) de la columna
+            columna = type_coerce(getattr(self.model, field), postgresql.JSONB)
+            query = query.filter(columna.contains(contenido)).offset(skip).limit(limit)
+            result = await db.execute(query)
+            return result.scalars().all()
+
+        result = await db.execute(query)
+        coincidencias = [
+            obj for obj in result.scalars().all()
+            if contiene_json(getattr(obj, field), contenido)
+        ]
+        return coincidencias[skip:skip + limit]
+    
     async def exists(self, db: AsyncSession, *, id: int) -> bool:
         """Verificar si existe un registro por ID"""
         query = select(func.count(self.model.id)).filter(self.model.id == id)
@@ -138,6 +259,76 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         count = result.scalar()
         return count > 0
     
+    def _seleccion(self, columnas: List[str]):
+        """Columnas `campo` del modelo y `relacion.campo` de sus relaciones (con outer join)"""
+        seleccion, relaciones = [], {}
+        for nombre in columnas:
+            if "." in nombre:
+                relacion, campo = nombre.split(".", 1)
+                if relacion not in relaciones:
+                    relaciones[relacion] = getattr(self.model, relacion)
+                destino = relaciones[relacion].property.mapper.class_
+                seleccion.append(getattr(destino, campo).label(nombre))
+            else:
+                seleccion.append(getattr(self.model, nombre))
+        query = select(*seleccion).select_from(self.model)
+        for relacion in relaciones.values():
+            query = query.outerjoin(relacion)
+        return query
+
+    async def get_filas(
+        self,
+        db: AsyncSession,
+        *,
+        columnas: List[str],
+        filters: Optional[Dict[str, Any]] = None,
+        condiciones: Optional[List[Any]] = None,
+        order_by: Optional[List[Any]] = None,
+        skip: int = 0,
+        limit: int = 100
+    ) -> Sequence[Row]:
+        """Tuplas con `columnas` (admite `relacion.campo`), sin construir objetos ORM"""
+        query = self._seleccion(columnas)
+        if filters:
+            for key, value in filters.items():
+                if hasattr(self.model, key) and value is not None:
+                    query = query.filter(getattr(self.model, key) == value)
+        if condiciones:
+            query = query.filter(*condiciones)
+        query = query.order_by(*(order_by or [self.model.id])).offset(skip).limit(limit)
+        result = await db.execute(query)
+        return result.all()
+
+    async def stream_multi(
+        self,
+        db: AsyncSession,
+        *,
+        columnas: Optional[List[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        condiciones: Optional[List[Any]] = None,
+        lote: int = 1000
+    ) -> AsyncIterator[Sequence[Row]]:
+        """Recorrer registros en lotes con un cursor del servidor (memoria constante).
+
+        Devuelve filas con las `columnas` pedidas (todas si no se indican), ordenadas por id.
+        """
+        seleccion = [getattr(self.model, c) for c in columnas] if columnas else list(self.model.__table__.columns)
+        query = select(*seleccion)
+        if filters:
+            for key, value in filters.items():
+                if hasattr(self.model, key) and value is not None:
+                    query = query.filter(getattr(self.model, key) == value)
+        if condiciones:
+            query = query.filter(*condiciones)
+        query = query.order_by(self.model.id).execution_options(yield_per=lote)
+
+        result = await db.stream(query)
+        try:
+            async for particion in result.partitions():
+                yield particion
+        finally:
+            await result.close()
+
     async def bulk_create(
         self, 
         db: AsyncSession, 
@@ -146,20 +337,66 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     ) -> List[ModelType]:
         """Crear múltiples registros en lote"""
         db_objs = []
+        datos = []
         for obj_in in objs_in:
             obj_in_data = obj_in.model_dump() if hasattr(obj_in, 'model_dump') else obj_in.dict()
             db_obj = self.model(**obj_in_data)
             db_objs.append(db_obj)
+            datos.append(obj_in_data)
         
         db.add_all(db_objs)
+        for db_obj, obj_in_data in zip(db_objs, datos):
+            await self._antes_de_commit(db, db_obj=db_obj, cambios=obj_in_data, operacion="bulk_create")
         await db.commit()
         
         # Refresh all objects
         for db_obj in db_objs:
             await db.refresh(db_obj)
+        self._despues_de_commit(operacion="bulk_create", ids=[db_obj.id for db_obj in db_objs])
         
         return db_objs
 
+    async def bulk_upsert(
+        self,
+        db: AsyncSession,
+        *,
+        registros: List[Dict[str, Any]],
+        claves: List[str],
+        actualizar: Optional[List[str]] = None,
+        solo_si_cambia: Optional[str] = None,
+        commit: bool = True
+    ) -> int:
+        """INSERT ... ON CONFLICT (claves) DO UPDATE por lotes; devuelve las filas escritas.
+
+        `actualizar`: columnas que se pisan en un conflicto (por defecto, todas menos las claves).
+        `solo_si_cambia`: columna (p. ej. un hash del contenido) que tiene que ser distinta para
+        actualizar; si es igual la fila no se toca. Con `commit=False` queda en la transacción
+        del llamador (y no se publica el evento de cambios).
+        """
+        escritas = 0
+        if registros:
+            columnas = actualizar if actualizar is not None else [c for c in registros[0] if c not in claves]
+            # Límite de parámetros por sentencia (asyncpg: 32767)
+            lote = max(1, 30_000 // len(registros[0]))
+            for inicio in range(0, len(registros), lote):
+                stmt = insert_dialecto(db, self.model).values(registros[inicio:inicio + lote])
+                if columnas:
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=claves,
+                        set_={c: stmt.excluded[c] for c in columnas},
+                        where=getattr(self.model, solo_si_cambia) != stmt.excluded[solo_si_cambia] if solo_si_cambia else None,
+                    )
+                else:
+                    stmt = stmt.on_conflict_do_nothing(index_elements=claves)
+                result = await db.execute(stmt)
+                escritas += result.rowcount
+        if commit:
+            await db.commit()
+            if registros:
+                ids = [r[claves[0]] if len(claves) == 1 else tuple(r[c] for c in claves) for r in registros]
+                self._despues_de_commit(operacion="bulk_upsert", ids=ids)
+        return escritas
+
 
 # Repositorios específicos con métodos personalizados
 class ClinicaRepository(BaseRepository):
@@ -173,6 +410,133 @@ class ClinicaRepository(BaseRepository):
         """Obtener solo clínicas activas"""
         return await self.get_multi_by_field(db, field="activa", value=True)
 
+    async def get_by_configuracion(self, db: AsyncSession, *, configuracion: Dict[str, Any]) -> List[ModelType]:
+        """Obtener clínicas cuyas configuraciones contienen `configuracion`"""
+        return await self.get_multi_by_json(db, field="configuraciones", contenido=configuracion)
+
+
+class ProfesionalRepository(BaseRepository):
+    """Repositorio específico para Profesional"""
+
+    async def get_by_especialidad(
+        self, 
+        db: AsyncSession, 
+        *, 
+        especialidad: str,
+        solo_activos: bool = True,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[ModelType]:
+        """Obtener profesionales que atienden una especialidad"""
+        return await self.get_multi_by_json(
+            db,
+            field="especialidades",
+            contenido=[especialidad],
+            filters={"activo": True} if solo_activos else None,
+            skip=skip,
+            limit=limit
+        )
+
+    async def get_by_id_especialidad(
+        self, 
+        db: AsyncSession, 
+        *, 
+        id_especialidad: int,
+        solo_activos: bool = True,
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[ModelType]:
+        """Obtener profesionales de una especialidad (un join por idx_prof_esp_especialidad_profesional)"""
+        query = select(self.model).join(
+            ProfesionalEspecialidad,
+            ProfesionalEspecialidad.id_profesional == self.model.id
+        ).filter(ProfesionalEspecialidad.id_especialidad == id_especialidad)
+        if solo_activos:
+            query = query.filter(self.model.activo.is_(True))
+        query = query.order_by(self.model.id).offset(skip).limit(limit)
+        result = await db.execute(query)
+        return result.scalars().all()
+
+    async def _antes_de_commit(
+        self, db: AsyncSession, *, db_obj: ModelType, cambios: Dict[str, Any], operacion: str
+    ) -> None:
+        """Mantener profesional_especialidad alineada con la lista `especialidades`"""
+        if "especialidades" in cambios:
+            await self.sincronizar_especialidades(db, profesional=db_obj)
+
+    async def sincronizar_especialidades(self, db: AsyncSession, *, profesional: ModelType) -> List[int]:
+        """Reescribir las asociaciones del profesional según los nombres de su lista JSON.
+
+        Los nombres que no existen en `especialidades` se ignoran (como en la migración
+        e4b2d8f17a63): quedan asociados cuando se crea la especialidad. No hace commit.
+        """
+        await db.flush()  # asegura el id del profesional recién creado
+        nombres = profesional.especialidades or []
+        ids_especialidad = []
+        if nombres:
+            result = await db.execute(
+                select(func.min(Especialidad.id)).filter(Especialidad.nombre.in_(nombres)).group_by(Especialidad.nombre)
+            )
+            ids_especialidad = sorted(result.scalars().all())
+
+        await db.execute(delete(ProfesionalEspecialidad).filter(
+            ProfesionalEspecialidad.id_profesional == profesional.id
+        ))
+        if ids_especialidad:
+            await db.execute(insert_dialecto(db, ProfesionalEspecialidad).values([
+                {"id_profesional": profesional.id, "id_especialidad": id_especialidad}
+                for id_especialidad in ids_especialidad
+            ]))
+        return ids_especialidad
+
+
+class EspecialidadRepository(BaseRepository):
+    """Repositorio específico para Especialidad: al crear o renombrar, reasocia a los profesionales"""
+
+    def __init__(self, model, profesional_repo: ProfesionalRepository):
+        super().__init__(model)
+        self.profesional_repo = profesional_repo
+
+    async def _antes_de_commit(
+        self, db: AsyncSession, *, db_obj: ModelType, cambios: Dict[str, Any], operacion: str
+    ) -> None:
+        """Resincronizar a los profesionales que nombran a la especialidad (nombre anterior o nuevo)"""
+        if operacion == "delete" or "nombre" not in cambios:
+            return
+        historial = inspect(db_obj).attrs.nombre.history
+        nombres = {db_obj.nombre, *historial.deleted} - {None}
+        await db.flush()  # la especialidad nueva tiene que existir para asociarla
+        profesionales = {}
+        for nombre in nombres:
+            skip, lote = 0, 500
+            while True:
+                pagina = await self.profesional_repo.get_multi_by_json(
+                    db, field="especialidades", contenido=[nombre], skip=skip, limit=lote
+                )
+                profesionales.update((profesional.id, profesional) for profesional in pagina)
+                if len(pagina) < lote:
+                    break
+                skip += lote
+        for profesional in profesionales.values():
+            await self.profesional_repo.sincronizar_especialidades(db, profesional=profesional)
+
+    async def get_by_nombre(self, db: AsyncSession, *, nombre: str) -> Optional[ModelType]:
+        """Obtener especialidad por nombre (la primera si hay repetidas)"""
+        query = select(self.model).filter(self.model.nombre == nombre).order_by(self.model.id).limit(1)
+        result = await db.execute(query)
+        return result.scalar_one_or_none()
+
+    async def get_by_profesional(self, db: AsyncSession, *, id_profesional: int) -> List[ModelType]:
+        """Obtener las especialidades de un profesional (un join por la PK de la asociación)"""
+        query = select(self.model).join(
+            ProfesionalEspecialidad,
+            ProfesionalEspecialidad.id_especialidad == self.model.id
+        ).filter(
+            ProfesionalEspecialidad.id_profesional == id_profesional
+        ).order_by(self.model.nombre)
+        result = await db.execute(query)
+        return result.scalars().all()
+
 
 class PacienteRepository(BaseRepository):
     """Repositorio específico para Paciente"""
@@ -186,12 +550,46 @@ class PacienteRepository(BaseRepository):
         return result.scalar_one_or_none()
 
     async def get_by_telefono(self, db: AsyncSession, *, telefono: str) -> Optional[ModelType]:
-        """Obtener paciente por teléfono"""
-        query = select(self.model).filter(
-            self.model.telefono == telefono,            
-        )
+        """Obtener paciente por teléfono, en cualquier formato (por idx_paciente_telefono_e164).
+
+        Si varios pacientes comparten el número (p. ej. una familia) devuelve el de menor id.
+        """
+        e164 = normalizar_telefono(telefono)
+        columna = self.model.telefono_e164 if e164 else self.model.telefono
+        query = select(self.model).filter(columna == (e164 or telefono)).order_by(self.model.id).limit(1)
         result = await db.execute(query)
-        return result.scalar_one_or_none()
+        return result.scalars().first()
+
+    async def _antes_de_commit(
+        self, db: AsyncSession, *, db_obj: ModelType, cambios: Dict[str, Any], operacion: str
+    ) -> None:
+        """Mantener telefono_e164 alineado con telefono"""
+        if "telefono" in cambios:
+            db_obj.telefono_e164 = normalizar_telefono(db_obj.telefono)
+
+    async def stream_exportacion(
+        self,
+        db: AsyncSession,
+        *,
+        columnas: List[str],
+        id_clinica: Optional[int] = None,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        lote: int = 1000
+    ) -> AsyncIterator[Sequence[Row]]:
+        """Pacientes registrados en [desde, hasta) que tienen algún turno en la clínica, en lotes"""
+        condiciones = []
+        if id_clinica is not None:
+            condiciones.append(exists().where(
+                Turno.id_paciente == self.model.id,
+                Turno.id_clinica == id_clinica,
+            ))
+        if desde is not None:
+            condiciones.append(self.model.fecha_registro >= desde)
+        if hasta is not None:
+            condiciones.append(self.model.fecha_registro < hasta)
+        async for filas in self.stream_multi(db, columnas=columnas, condiciones=condiciones, lote=lote):
+            yield filas
 
 
 class TurnoRepository(BaseRepository):
@@ -215,6 +613,27 @@ class TurnoRepository(BaseRepository):
         result = await db.execute(query)
         return result.scalars().all()
     
+    async def stream_exportacion(
+        self,
+        db: AsyncSession,
+        *,
+        columnas: List[str],
+        id_clinica: Optional[int] = None,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None,
+        lote: int = 1000
+    ) -> AsyncIterator[Sequence[Row]]:
+        """Turnos de una clínica con fecha_hora en [desde, hasta), en lotes"""
+        condiciones = []
+        if desde is not None:
+            condiciones.append(self.model.fecha_hora >= desde)
+        if hasta is not None:
+            condiciones.append(self.model.fecha_hora < hasta)
+        async for filas in self.stream_multi(
+            db, columnas=columnas, filters={"id_clinica": id_clinica}, condiciones=condiciones, lote=lote
+        ):
+            yield filas
+
     async def get_by_paciente(
         self, 
         db: AsyncSession, 
@@ -230,4 +649,202 @@ class TurnoRepository(BaseRepository):
             value=id_paciente,
             skip=skip,
             limit=limit
-        )
\ No newline at end of file
+        )
+
+
+class LogIARepository(BaseRepository):
+    """Repositorio específico para LogIA: mantiene el rollup por hora al crear, actualizar y eliminar"""
+
+    def __init__(self, model, resumen_repo: "LogIAResumenRepository"):
+        super().__init__(model)
+        self.resumen_repo = resumen_repo
+
+    async def _antes_de_commit(
+        self, db: AsyncSession, *, db_obj: ModelType, cambios: Dict[str, Any], operacion: str
+    ) -> None:
+        """Sumar (o restar, al eliminar) el log en el rollup en la misma transacción"""
+        if db_obj.fecha is None:
+            db_obj.fecha = datetime.now(timezone.utc)
+        registro = {"fecha": db_obj.fecha, "confianza": db_obj.confianza, "metadatos": db_obj.metadatos}
+        if operacion == "update":
+            # El setattr ya se hizo: los valores confirmados quedan en el historial del atributo
+            estado = inspect(db_obj)
+            anterior = dict(registro)
+            for campo in registro:
+                historial = estado.attrs[campo].history
+                if historial.deleted:
+                    anterior[campo] = historial.deleted[0]
+            clave = self.resumen_repo.clave
+            if clave(anterior) != clave(registro):
+                await self.resumen_repo.decrementar(db, registros=[anterior])
+                await self.resumen_repo.incrementar(db, registros=[registro])
+        elif operacion == "delete":
+            await self.resumen_repo.decrementar(db, registros=[registro])
+        else:
+            await self.resumen_repo.incrementar(db, registros=[registro])
+
+    async def get_by_metadatos(
+        self, 
+        db: AsyncSession, 
+        *, 
+        metadatos: Dict[str, Any],
+        skip: int = 0,
+        limit: int = 100
+    ) -> List[ModelType]:
+        """Obtener logs cuyos metadatos contienen `metadatos` (p. ej. {"id_clinica": 1})"""
+        return await self.get_multi_by_json(db, field="metadatos", contenido=metadatos, skip=skip, limit=limit)
+
+
+class LogIAResumenRepository(BaseRepository):
+    """Repositorio del rollup de confianza de LogIA por hora y clínica"""
+
+    SIN_CLINICA = 0
+    SIN_CONFIANZA = "sin_dato"
+
+    @classmethod
+    def clave(cls, registro: Dict[str, Any]) -> tuple:
+        """(hora, id_clinica, confianza) de un log, tal como se agrupa en el rollup"""
+        hora = registro["fecha"].replace(minute=0, second=0, microsecond=0)
+        metadatos = registro.get("metadatos") or {}
+        id_clinica = metadatos.get("id_clinica")
+        try:
+            id_clinica = int(id_clinica) if id_clinica is not None else cls.SIN_CLINICA
+        except (TypeError, ValueError):
+            id_clinica = cls.SIN_CLINICA
+        confianza = registro.get("confianza")
+        confianza = getattr(confianza, "value", confianza) or cls.SIN_CONFIANZA
+        return hora, id_clinica, confianza
+
+    async def incrementar(self, db: AsyncSession, *, registros: List[Dict[str, Any]]) -> None:
+        """Sumar un lote de logs al rollup (no hace commit: va en la transacción del INSERT)"""
+        conteo = Counter(self.clave(registro) for registro in registros)
+        if not conteo:
+            return
+        filas = [
+            {"hora": hora, "id_clinica": id_clinica, "confianza": confianza, "cantidad": cantidad}
+            for (hora, id_clinica, confianza), cantidad in conteo.items()
+        ]
+        stmt = insert_dialecto(db, self.model).values(filas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["hora", "id_clinica", "confianza"],
+            set_={"cantidad": self.model.cantidad + stmt.excluded.cantidad},
+        )
+        await db.execute(stmt)
+
+    async def decrementar(self, db: AsyncSession, *, registros: List[Dict[str, Any]]) -> None:
+        """Restar logs eliminados del rollup (sin commit); las horas que quedan en cero se borran"""
+        conteo = Counter(self.clave(registro) for registro in registros)
+        for (hora, id_clinica, confianza), cantidad in conteo.items():
+            clave = (self.model.hora == hora, self.model.id_clinica == id_clinica, self.model.confianza == confianza)
+            await db.execute(update(self.model).filter(*clave).values(cantidad=self.model.cantidad - cantidad))
+            await db.execute(delete(self.model).filter(*clave, self.model.cantidad <= 0))
+
+    async def get_por_hora(
+        self,
+        db: AsyncSession,
+        *,
+        desde: datetime,
+        hasta: datetime,
+        id_clinica: Optional[int] = None
+    ) -> List[ModelType]:
+        """Filas del rollup en [desde, hasta), opcionalmente de una clínica"""
+        query = select(self.model).filter(
+            self.model.hora >= desde,
+            self.model.hora < hasta,
+        )
+        if id_clinica is not None:
+            query = query.filter(self.model.id_clinica == id_clinica)
+        query = query.order_by(self.model.hora, self.model.id_clinica, self.model.confianza)
+        result = await db.execute(query)
+        return result.scalars().all()
+
+    async def get_totales(
+        self,
+        db: AsyncSession,
+        *,
+        desde: datetime,
+        hasta: datetime,
+        id_clinica: Optional[int] = None
+    ) -> Dict[int, Dict[str, int]]:
+        """Totales por clínica y confianza en [desde, hasta)"""
+        query = select(
+            self.model.id_clinica,
+            self.model.confianza,
+            func.sum(self.model.cantidad),
+        ).filter(
+            self.model.hora >= desde,
+            self.model.hora < hasta,
+        ).group_by(self.model.id_clinica, self.model.confianza)
+        if id_clinica is not None:
+            query = query.filter(self.model.id_clinica == id_clinica)
+        result = await db.execute(query)
+
+        totales: Dict[int, Dict[str, int]] = {}
+        for clinica, confianza, cantidad in result.all():
+            totales.setdefault(clinica, {})[confianza] = int(cantidad)
+        return totales
+
+    async def reconstruir(
+        self,
+        db: AsyncSession,
+        *,
+        log_model: Type[ModelType],
+        desde: datetime,
+        hasta: datetime
+    ) -> int:
+        """Recalcular el rollup de [desde, hasta) agregando logs_ia (backfill o reparación)"""
+        hora = truncar_hora(db, log_model.fecha)
+        id_clinica = entero_json(db, log_model.metadatos["id_clinica"], self.SIN_CLINICA)
+        confianza = func.coalesce(log_model.confianza, self.SIN_CONFIANZA)
+        agregado = select(hora, id_clinica, confianza, func.count(literal_column("*"))).filter(
+            log_model.fecha >= desde,
+            log_model.fecha < hasta,
+        ).group_by(hora, id_clinica, confianza)
+
+        await db.execute(delete(self.model).filter(
+            self.model.hora >= desde,
+            self.model.hora < hasta,
+        ))
+        result = await db.execute(
+            insert_dialecto(db, self.model).from_select(
+                ["hora", "id_clinica", "confianza", "cantidad"], agregado
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+
+class ReferenciaHcwebRepository(BaseRepository):
+    """Repositorio del espejo local de datos de referencia de HCWEB"""
+
+    async def get_dataset(self, db: AsyncSession, *, dataset: str) -> List[Dict[str, Any]]:
+        """Registros de un dataset, ordenados por clave"""
+        result = await db.execute(
+            select(self.model.datos).filter(self.model.dataset == dataset).order_by(self.model.clave)
+        )
+        return list(result.scalars().all())
+
+    async def get_registro(self, db: AsyncSession, *, dataset: str, clave: Any) -> Optional[Dict[str, Any]]:
+        result = await db.execute(
+            select(self.model.datos).filter(self.model.dataset == dataset, self.model.clave == str(clave))
+        )
+        return result.scalar_one_or_none()
+
+    async def get_hashes(self, db: AsyncSession, *, dataset: str) -> Dict[str, str]:
+        """clave -> hash de los registros guardados de un dataset"""
+        result = await db.execute(select(self.model.clave, self.model.hash).filter(self.model.dataset == dataset))
+        return dict(result.all())
+
+    async def delete_claves(self, db: AsyncSession, *, dataset: str, claves: List[str], lote: int = 1000) -> int:
+        """Eliminar registros de un dataset por clave (sin commit)"""
+        eliminados = 0
+        for inicio in range(0, len(claves), lote):
+            result = await db.execute(
+                delete(self.model).where(self.model.dataset == dataset, self.model.clave.in_(claves[inicio:inicio + lote]))
+            )
+            eliminados += result.rowcount
+        return eliminados
+
+    def publicar_sincronizacion(self, *, dataset: str) -> None:
+        """Avisar por el bus de cambios que un dataset se sincronizó (después del commit)"""
+        self._despues_de_commit(operacion="sincronizacion", ids=[dataset])
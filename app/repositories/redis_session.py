@@ -1,34 +1,62 @@
+import os
+import threading
+
 import redis
 import json
 from app.config import Config
+from app.core.metricas import instrumentar
 
 SESSION_EXPIRATION = 3600  # segundos (1 hora)
 
+# Un cliente (y su pool de conexiones) por proceso, compartido por los hilos de asyncio.to_thread
+_cliente = None
+_pid = None
+_lock = threading.Lock()
+
 def get_redis_client():
-    return redis.StrictRedis(
-        host=Config.REDIS_HOST,
-        port=Config.REDIS_PORT,
-        db=0,
-        decode_responses=True,
-    )
+    global _cliente, _pid
+    if _cliente is None or _pid != os.getpid():
+        with _lock:
+            if _cliente is None or _pid != os.getpid():
+                # En un proceso hijo (fork) el pool del padre no se usa ni se cierra
+                _cliente = redis.StrictRedis(
+                    host=Config.REDIS_HOST,
+                    port=Config.REDIS_PORT,
+                    db=0,
+                    decode_responses=True,
+                )
+                _pid = os.getpid()
+    return _cliente
+
+def cerrar_redis_client():
+    """Cerrar el pool del proceso (al apagar); el próximo get_redis_client crea otro"""
+    global _cliente
+    with _lock:
+        if _cliente is not None and _pid == os.getpid():
+            _cliente.close()
+        _cliente = None
 
+@instrumentar("redis")
 def set_user_session(wa_id, key, value):
     redis_client = get_redis_client()
     session_key = f"user_session:{wa_id}"
     redis_client.hset(session_key, key, json.dumps(value))
     redis_client.expire(session_key, SESSION_EXPIRATION)
 
+@instrumentar("redis")
 def get_user_session(wa_id):
     redis_client = get_redis_client()
     session_key = f"user_session:{wa_id}"
     data = redis_client.hgetall(session_key)
     return {k: json.loads(v) for k, v in data.items()}
 
+# Sin span propio: se mide en get_user_session y set_user_session
 def update_user_session(wa_id, session_key, new_data):
     session_data = get_user_session(wa_id).get(session_key, {})
     session_data.update(new_data)
     set_user_session(wa_id, session_key, session_data)
 
+@instrumentar("redis")
 def eliminar_sesion_usuario(wa_id):
     clave = f"user:{wa_id}"
     r= get_redis_client()
@@ -1,4 +1,6 @@
-from app.models.entities import Clinica, Paciente, Profesional, Especialidad, Turno, LogIA
+from app.models.entities import (
+    Clinica, Paciente, Profesional, Especialidad, Turno, LogIA, LogIAResumenHora, ReferenciaHcweb, SincronizacionHcweb
+)
 from app.schemas.responses import (
     ClinicaCreate, ClinicaUpdate,
     PacienteCreate, PacienteUpdate,
@@ -7,12 +9,18 @@ from app.schemas.responses import (
     TurnoCreate, TurnoUpdate,
     LogIACreate
 )
-from .base import BaseRepository, ClinicaRepository, PacienteRepository, TurnoRepository
+from .base import (
+    BaseRepository, ClinicaRepository, PacienteRepository, ProfesionalRepository, EspecialidadRepository, TurnoRepository,
+    LogIARepository, LogIAResumenRepository, ReferenciaHcwebRepository
+)
 
 # Instancias de repositorios
 clinica_repo = ClinicaRepository(Clinica)
 paciente_repo = PacienteRepository(Paciente)
-profesional_repo = BaseRepository[Profesional, ProfesionalCreate, ProfesionalUpdate](Profesional)
-especialidad_repo = BaseRepository[Especialidad, EspecialidadCreate, EspecialidadUpdate](Especialidad)
+profesional_repo = ProfesionalRepository(Profesional)
+especialidad_repo = EspecialidadRepository(Especialidad, profesional_repo)
 turno_repo = TurnoRepository(Turno)
-log_ia_repo = BaseRepository[LogIA, LogIACreate, dict](LogIA)
\ No newline at end of file
+log_ia_resumen_repo = LogIAResumenRepository(LogIAResumenHora)
+log_ia_repo = LogIARepository(LogIA, log_ia_resumen_repo)
+referencia_hcweb_repo = ReferenciaHcwebRepository(ReferenciaHcweb)
+sincronizacion_hcweb_repo = BaseRepository(SincronizacionHcweb)
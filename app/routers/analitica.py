@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_db
+from app.repositories.repositories import log_ia_resumen_repo
+from app.schemas.responses import ConfianzaPorHoraResponse, ConfianzaTotalesResponse
+
+router = APIRouter(prefix="/api/analitica", tags=["analitica"])
+
+VENTANA_POR_DEFECTO = timedelta(hours=24)
+VENTANA_MAXIMA = timedelta(days=366)
+
+
+def _rango(desde: Optional[datetime], hasta: Optional[datetime]) -> tuple:
+    hasta = hasta or datetime.now(timezone.utc)
+    desde = desde or hasta - VENTANA_POR_DEFECTO
+    if desde >= hasta:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'desde' debe ser anterior a 'hasta'")
+    if hasta - desde > VENTANA_MAXIMA:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El rango no puede superar un año")
+    return desde, hasta
+
+
+@router.get("/logs-ia/confianza/horas", response_model=List[ConfianzaPorHoraResponse])
+async def confianza_por_hora(
+    desde: Optional[datetime] = Query(None),
+    hasta: Optional[datetime] = Query(None),
+    id_clinica: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Cantidad de logs IA por hora, clínica y confianza"""
+    desde, hasta = _rango(desde, hasta)
+    return await log_ia_resumen_repo.get_por_hora(db, desde=desde, hasta=hasta, id_clinica=id_clinica)
+
+
+@router.get("/logs-ia/confianza/totales", response_model=List[ConfianzaTotalesResponse])
+async def confianza_totales(
+    desde: Optional[datetime] = Query(None),
+    hasta: Optional[datetime] = Query(None),
+    id_clinica: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Totales de baja/media/alta por clínica en el rango"""
+    desde, hasta = _rango(desde, hasta)
+    totales = await log_ia_resumen_repo.get_totales(db, desde=desde, hasta=hasta, id_clinica=id_clinica)
+    return [
+        ConfianzaTotalesResponse(id_clinica=clinica, total=sum(conteo.values()), **conteo)
+        for clinica, conteo in sorted(totales.items())
+    ]
@@ -0,0 +1,19 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_db
+from app.schemas.responses import ResultadoBusquedaResponse
+from app.service.busqueda import TIPOS_BUSQUEDA, buscador
+
+router = APIRouter(prefix="/api/busqueda", tags=["busqueda"])
+
+
+@router.get("", response_model=List[ResultadoBusquedaResponse])
+async def buscar(
+    q: str = Query(..., min_length=2, max_length=100),
+    tipo: Optional[List[str]] = Query(None, description="paciente, profesional o especialidad"),
+    limite: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db)
+):
+    """Búsqueda tolerante a errores de tipeo y acentos, ordenada por relevancia"""
+    return await buscador.buscar(db, q, tipos=tipo or TIPOS_BUSQUEDA, limite=limite)
@@ -0,0 +1,144 @@
+from typing import Any, Dict, List, Optional, Tuple
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import exists
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_db
+from app.core.cache_http import responder_con_cache
+from app.models.entities import Clinica, Especialidad, Profesional, ProfesionalEspecialidad
+from app.repositories.base import BaseRepository
+from app.repositories.repositories import clinica_repo, especialidad_repo, profesional_repo
+from app.schemas.responses import (
+    ClinicaListResponse, ClinicaResponse,
+    EspecialidadListResponse, EspecialidadResponse,
+    ProfesionalListResponse, ProfesionalResponse
+)
+from app.schemas.serializacion import PlanRespuesta
+
+router = APIRouter(prefix="/api", tags=["catalogo"])
+
+PLAN_CLINICAS = PlanRespuesta(ClinicaResponse, Clinica)
+PLAN_PROFESIONALES = PlanRespuesta(ProfesionalResponse, Profesional)
+PLAN_ESPECIALIDADES = PlanRespuesta(EspecialidadResponse, Especialidad)
+
+
+async def _listar(
+    request: Request,
+    db: AsyncSession,
+    repo: BaseRepository,
+    plan: PlanRespuesta,
+    *,
+    filtros: Dict[str, Any],
+    condiciones: Optional[List[Any]] = None,
+    clave_filtros: tuple,
+    page: int,
+    size: int,
+    otras_tablas: Tuple[str, ...] = ()
+):
+    """Listado paginado; `otras_tablas` son las que también usan las condiciones (invalidan la caché)"""
+    tabla = repo.model.__tablename__
+
+    async def version():
+        return await repo.get_version(db, filters=filtros, condiciones=condiciones)
+
+    async def cuerpo():
+        filas = await repo.get_filas(
+            db, columnas=plan.columnas, filters=filtros, condiciones=condiciones,
+            skip=(page - 1) * size, limit=size,
+        )
+        total = await repo.get_count(db, filters=filtros, condiciones=condiciones)
+        return orjson.dumps({"items": plan.como_dicts(filas), "total": total, "page": page, "size": size})
+
+    return await responder_con_cache(
+        request, clave=(tabla, clave_filtros, page, size), tablas=[tabla, *otras_tablas], version=version, cuerpo=cuerpo
+    )
+
+
+async def _obtener(request: Request, db: AsyncSession, repo: BaseRepository, plan: PlanRespuesta, id: int):
+    tabla = repo.model.__tablename__
+
+    async def version():
+        modificacion, cantidad = await repo.get_version(db, filters={"id": id})
+        if not cantidad:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No existe el registro {id} en {tabla}")
+        return modificacion
+
+    async def cuerpo():
+        filas = await repo.get_filas(db, columnas=plan.columnas, filters={"id": id}, limit=1)
+        if not filas:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No existe el registro {id} en {tabla}")
+        return orjson.dumps(plan.como_dicts(filas)[0])
+
+    return await responder_con_cache(
+        request, clave=(tabla, id), tablas=[tabla], ids=[id], version=version, cuerpo=cuerpo
+    )
+
+
+@router.get("/clinicas", response_model=ClinicaListResponse)
+async def listar_clinicas(
+    request: Request,
+    activa: Optional[bool] = Query(None),
+    page: int = Query(1, ge=1),
+    size: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Clínicas con sus configuraciones (ETag + If-None-Match)"""
+    return await _listar(
+        request, db, clinica_repo, PLAN_CLINICAS,
+        filtros={"activa": activa}, clave_filtros=(activa,), page=page, size=size,
+    )
+
+
+@router.get("/clinicas/{id}", response_model=ClinicaResponse)
+async def obtener_clinica(request: Request, id: int, db: AsyncSession = Depends(get_db)):
+    return await _obtener(request, db, clinica_repo, PLAN_CLINICAS, id)
+
+
+@router.get("/profesionales", response_model=ProfesionalListResponse)
+async def listar_profesionales(
+    request: Request,
+    activo: Optional[bool] = Query(None),
+    id_especialidad: Optional[int] = Query(None),
+    page: int = Query(1, ge=1),
+    size: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Profesionales, opcionalmente de una especialidad (ETag + If-None-Match)"""
+    condiciones = []
+    otras_tablas = ()
+    if id_especialidad is not None:
+        condiciones.append(exists().where(
+            ProfesionalEspecialidad.id_profesional == Profesional.id,
+            ProfesionalEspecialidad.id_especialidad == id_especialidad,
+        ))
+        # Borrar una especialidad quita sus asociaciones sin tocar a los profesionales
+        otras_tablas = ("especialidades",)
+    return await _listar(
+        request, db, profesional_repo, PLAN_PROFESIONALES,
+        filtros={"activo": activo}, condiciones=condiciones,
+        clave_filtros=(activo, id_especialidad), page=page, size=size, otras_tablas=otras_tablas,
+    )
+
+
+@router.get("/profesionales/{id}", response_model=ProfesionalResponse)
+async def obtener_profesional(request: Request, id: int, db: AsyncSession = Depends(get_db)):
+    return await _obtener(request, db, profesional_repo, PLAN_PROFESIONALES, id)
+
+
+@router.get("/especialidades", response_model=EspecialidadListResponse)
+async def listar_especialidades(
+    request: Request,
+    page: int = Query(1, ge=1),
+    size: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Especialidades (ETag + If-None-Match)"""
+    return await _listar(
+        request, db, especialidad_repo, PLAN_ESPECIALIDADES,
+        filtros={}, clave_filtros=(), page=page, size=size,
+    )
+
+
+@router.get("/especialidades/{id}", response_model=EspecialidadResponse)
+async def obtener_especialidad(request: Request, id: int, db: AsyncSession = Depends(get_db)):
+    return await _obtener(request, db, especialidad_repo, PLAN_ESPECIALIDADES, id)
@@ -0,0 +1,64 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from app.config.database import AsyncSessionLocal
+from app.repositories.repositories import paciente_repo, turno_repo
+from app.service.exportacion import FORMATOS, serializar
+
+router = APIRouter(prefix="/api/exportar", tags=["exportacion"])
+
+LOTE_EXPORTACION = 2000
+
+COLUMNAS_TURNOS = [
+    "id", "id_paciente", "id_profesional", "id_clinica", "fecha_hora", "estado", "observaciones", "fecha_creacion",
+]
+COLUMNAS_PACIENTES = ["id", "dni", "telefono", "nombre", "email", "fecha_registro"]
+
+
+def _validar(formato: str, desde: Optional[datetime], hasta: Optional[datetime]) -> None:
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Formato inválido: use {', '.join(FORMATOS)}")
+    if desde and hasta and desde >= hasta:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'desde' debe ser anterior a 'hasta'")
+
+
+def _respuesta(repo, columnas, nombre: str, formato: str, **filtros) -> StreamingResponse:
+    async def contenido():
+        # La sesión vive mientras dura el envío, no sólo mientras corre el endpoint
+        async with AsyncSessionLocal() as db:
+            lotes = repo.stream_exportacion(db, columnas=columnas, lote=LOTE_EXPORTACION, **filtros)
+            async for bloque in serializar(lotes, columnas, formato):
+                yield bloque
+
+    return StreamingResponse(
+        contenido(),
+        media_type=FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'},
+    )
+
+
+@router.get("/turnos")
+async def exportar_turnos(
+    id_clinica: Optional[int] = Query(None),
+    desde: Optional[datetime] = Query(None, description="fecha_hora desde (inclusive)"),
+    hasta: Optional[datetime] = Query(None, description="fecha_hora hasta (exclusive)"),
+    formato: str = Query("csv", description="csv o jsonl"),
+):
+    """Agenda completa de turnos, en streaming"""
+    _validar(formato, desde, hasta)
+    nombre = f"turnos_clinica_{id_clinica}" if id_clinica else "turnos"
+    return _respuesta(turno_repo, COLUMNAS_TURNOS, nombre, formato, id_clinica=id_clinica, desde=desde, hasta=hasta)
+
+
+@router.get("/pacientes")
+async def exportar_pacientes(
+    id_clinica: Optional[int] = Query(None, description="sólo pacientes con turnos en la clínica"),
+    desde: Optional[datetime] = Query(None, description="fecha_registro desde (inclusive)"),
+    hasta: Optional[datetime] = Query(None, description="fecha_registro hasta (exclusive)"),
+    formato: str = Query("csv", description="csv o jsonl"),
+):
+    """Padrón de pacientes, en streaming"""
+    _validar(formato, desde, hasta)
+    nombre = f"pacientes_clinica_{id_clinica}" if id_clinica else "pacientes"
+    return _respuesta(paciente_repo, COLUMNAS_PACIENTES, nombre, formato, id_clinica=id_clinica, desde=desde, hasta=hasta)
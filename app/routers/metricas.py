@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.metricas import metricas
+
+router = APIRouter(tags=["metricas"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def exportar_metricas():
+    """Histogramas del proceso en formato de exposición de Prometheus"""
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
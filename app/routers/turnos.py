@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_db
+from app.core.respuestas import RespuestaORJSON
+from app.models.entities import Turno
+from app.repositories.repositories import turno_repo
+from app.schemas.responses import TurnoListResponse, TurnoResponse
+from app.schemas.serializacion import PlanRespuesta
+
+router = APIRouter(prefix="/api/turnos", tags=["turnos"])
+
+# Columnas de TurnoResponse con paciente, profesional y clínica anidados, resuelto una vez
+PLAN_TURNOS = PlanRespuesta(TurnoResponse, Turno)
+
+
+@router.get("", response_model=TurnoListResponse, response_class=RespuestaORJSON)
+async def listar_turnos(
+    id_clinica: Optional[int] = Query(None),
+    id_profesional: Optional[int] = Query(None),
+    estado: Optional[str] = Query(None),
+    desde: Optional[datetime] = Query(None, description="fecha_hora desde (inclusive)"),
+    hasta: Optional[datetime] = Query(None, description="fecha_hora hasta (exclusive)"),
+    page: int = Query(1, ge=1),
+    size: int = Query(50, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Turnos con sus relaciones, paginados (serializados desde tuplas con orjson)"""
+    if desde and hasta and desde >= hasta:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'desde' debe ser anterior a 'hasta'")
+    filtros = {"id_clinica": id_clinica, "id_profesional": id_profesional, "estado": estado}
+    condiciones = []
+    if desde is not None:
+        condiciones.append(Turno.fecha_hora >= desde)
+    if hasta is not None:
+        condiciones.append(Turno.fecha_hora < hasta)
+
+    filas = await turno_repo.get_filas(
+        db, columnas=PLAN_TURNOS.columnas, filters=filtros, condiciones=condiciones,
+        order_by=[Turno.fecha_hora, Turno.id], skip=(page - 1) * size, limit=size,
+    )
+    total = await turno_repo.get_count(db, filters=filtros, condiciones=condiciones)
+    # Datos de la base: se devuelve la respuesta ya armada, sin validar con response_model
+    return RespuestaORJSON({"items": PLAN_TURNOS.como_dicts(filas), "total": total, "page": page, "size": size})
@@ -0,0 +1,55 @@
+import hashlib
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+from pydantic import ValidationError
+from app.config import Config
+from app.schemas.whatsapp import WhatsAppWebhook, extraer_mensajes
+from app.core.recursos import get_cola_mensajes
+from app.service.cola_mensajes import ColaMensajes
+
+router = APIRouter(prefix="/webhook", tags=["webhook"])
+
+
+def firma_valida(cuerpo: bytes, firma: Optional[str], secreto: str) -> bool:
+    """Validar X-Hub-Signature-256 (HMAC-SHA256 del cuerpo con el app secret)"""
+    if not firma or not firma.startswith("sha256="):
+        return False
+    esperada = hmac.new(secreto.encode(), cuerpo, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(esperada, firma.removeprefix("sha256="))
+
+
+@router.get("/whatsapp", response_class=PlainTextResponse)
+async def verificar_webhook(
+    modo: str = Query(..., alias="hub.mode"),
+    token: str = Query(..., alias="hub.verify_token"),
+    desafio: str = Query(..., alias="hub.challenge")
+):
+    """Verificación de la suscripción del webhook (Meta)"""
+    if modo != "subscribe" or not Config.WHATSAPP_VERIFY_TOKEN or token != Config.WHATSAPP_VERIFY_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token de verificación inválido")
+    return desafio
+
+
+@router.post("/whatsapp")
+async def recibir_webhook(request: Request, cola: ColaMensajes = Depends(get_cola_mensajes)):
+    """Recibir mensajes de WhatsApp: se encolan y se responde 200 enseguida.
+
+    El procesamiento lo hacen los workers (app/service/workers_mensajes.py), así una
+    respuesta lenta del bot nunca provoca reintentos del proveedor.
+    """
+    cuerpo = await request.body()
+    if Config.WHATSAPP_APP_SECRET and not firma_valida(
+        cuerpo, request.headers.get("X-Hub-Signature-256"), Config.WHATSAPP_APP_SECRET
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Firma inválida")
+    try:
+        payload = WhatsAppWebhook.model_validate_json(cuerpo)
+    except ValidationError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Payload inválido")
+
+    mensajes = extraer_mensajes(payload)
+    for mensaje in mensajes:
+        await cola.publicar(mensaje.model_dump(), clave=mensaje.wa_id)
+    return {"encolados": len(mensajes)}
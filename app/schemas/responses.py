@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -20,13 +20,12 @@ class ConfianzaIA(str, Enum):
 
 # Base schemas
 class BaseResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     fecha_creacion: Optional[datetime] = None
     fecha_actualizacion: Optional[datetime] = None
 
-    class ConfigDict:
-        from_attributes = True
-
 
 # Clinica schemas
 class ClinicaBase(BaseModel):
@@ -228,4 +227,33 @@ class LogIAListResponse(BaseModel):
     items: List[LogIAResponse]
     total: int
     page: int = 1
-    size: int = 50
\ No newline at end of file
+    size: int = 50
+
+
+# Analítica de LogIA (lee sólo el rollup logs_ia_resumen_hora)
+class ConfianzaPorHoraResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    hora: datetime
+    id_clinica: int
+    confianza: str
+    cantidad: int
+
+
+class ConfianzaTotalesResponse(BaseModel):
+    id_clinica: int
+    baja: int = 0
+    media: int = 0
+    alta: int = 0
+    sin_dato: int = 0
+    total: int = 0
+
+
+# Búsqueda
+class ResultadoBusquedaResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    tipo: str
+    id: int
+    nombre: str
+    puntaje: float
@@ -0,0 +1,105 @@
+"""Armado rápido de respuestas desde filas de la base (datos confiables, sin validar).
+
+Las respuestas de listas validaban cada objeto ORM con Pydantic. Para datos que salen de
+nuestra propia base eso es trabajo repetido. Acá hay dos caminos más baratos:
+
+- PlanRespuesta: traduce un modelo de respuesta (con relaciones anidadas, p. ej.
+  TurnoResponse.paciente) a columnas planas `campo` / `relacion.campo`. Con las tuplas que
+  devuelve BaseRepository.get_filas arma dicts listos para orjson (`como_dicts`) o
+  instancias sin validar (`como_modelos`, con model_construct).
+- adaptador_lista / volcar_json: TypeAdapter de List[Modelo] construido una sola vez, que
+  valida objetos ORM y serializa a JSON en pydantic-core.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+
+def _modelo_anidado(anotacion: Any) -> Optional[Type[BaseModel]]:
+    """Modelo de un campo `Optional[Modelo]` o `Modelo`, si lo es"""
+    candidatos = getattr(anotacion, "__args__", None) or (anotacion,)
+    for candidato in candidatos:
+        if isinstance(candidato, type) and issubclass(candidato, BaseModel):
+            return candidato
+    return None
+
+
+class PlanRespuesta:
+    """Columnas planas de un modelo de respuesta y cómo volver a anidarlas"""
+
+    def __init__(self, modelo: Type[BaseModel], entidad: Any):
+        self.modelo = modelo
+        tabla = entidad.__table__
+        self.columnas: List[str] = []
+        # (índice de columna, campo) del nivel superior
+        self.campos: List[Tuple[int, str]] = []
+        # Campos del modelo que no son columnas de la tabla: van con su default
+        self.constantes: Dict[str, Any] = {}
+        # (campo, modelo, índice del id de la relación, [(índice, subcampo)], defaults faltantes)
+        self.anidados: List[Tuple[str, Type[BaseModel], int, List[Tuple[int, str]], Dict[str, Any]]] = []
+
+        for nombre, campo in modelo.model_fields.items():
+            anidado = _modelo_anidado(campo.annotation)
+            relacion = getattr(entidad, nombre, None)
+            if anidado is not None and relacion is not None and hasattr(relacion, "property"):
+                destino = relacion.property.mapper.class_.__table__
+                campos = []
+                for subcampo in anidado.model_fields:
+                    if subcampo in destino.c:
+                        campos.append((self._agregar(f"{nombre}.{subcampo}"), subcampo))
+                faltantes = {c: anidado.model_fields[c].get_default() for c in anidado.model_fields if c not in destino.c}
+                indice_id = next(i for i, c in campos if c == "id")
+                self.anidados.append((nombre, anidado, indice_id, campos, faltantes))
+            elif nombre in tabla.c:
+                self.campos.append((self._agregar(nombre), nombre))
+            else:
+                self.constantes[nombre] = campo.get_default()
+
+    def _agregar(self, columna: str) -> int:
+        self.columnas.append(columna)
+        return len(self.columnas) - 1
+
+    def como_dicts(self, filas: Sequence[Sequence[Any]]) -> List[Dict[str, Any]]:
+        """Dicts con la forma JSON del modelo (relaciones sin fila -> None)"""
+        campos, constantes, anidados = self.campos, self.constantes, self.anidados
+        resultado = []
+        for fila in filas:
+            item = {campo: fila[i] for i, campo in campos}
+            if constantes:
+                item.update(constantes)
+            for nombre, _, indice_id, subcampos, faltantes in anidados:
+                if fila[indice_id] is None:
+                    item[nombre] = None
+                else:
+                    item[nombre] = {campo: fila[i] for i, campo in subcampos}
+                    if faltantes:
+                        item[nombre].update(faltantes)
+            resultado.append(item)
+        return resultado
+
+    def como_modelos(self, filas: Sequence[Sequence[Any]]) -> List[BaseModel]:
+        """Instancias del modelo con model_construct (sin validación: sólo datos de la base)"""
+        construir = self.modelo.model_construct
+        resultado = []
+        for item in self.como_dicts(filas):
+            for nombre, anidado, _, _, _ in self.anidados:
+                if item[nombre] is not None:
+                    item[nombre] = anidado.model_construct(**item[nombre])
+            resultado.append(construir(**item))
+        return resultado
+
+
+@lru_cache(maxsize=None)
+def adaptador_lista(modelo: Type[BaseModel]) -> TypeAdapter:
+    """TypeAdapter de List[modelo], construido una vez por modelo"""
+    return TypeAdapter(List[modelo])
+
+
+def validar_orm(modelo: Type[BaseModel], objetos: Sequence[Any]) -> List[BaseModel]:
+    return adaptador_lista(modelo).validate_python(objetos, from_attributes=True)
+
+
+def volcar_json(modelo: Type[BaseModel], items: Sequence[BaseModel]) -> bytes:
+    # warnings=False: las instancias de model_construct pueden traer str donde hay Enum
+    return adaptador_lista(modelo).dump_json(items, warnings=False)
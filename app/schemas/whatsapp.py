@@ -0,0 +1,76 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Dict, Any
+
+
+# Payload del webhook de WhatsApp Cloud API (sólo los campos que usa el bot;
+# el resto se acepta y se conserva en `crudo`)
+class WhatsAppBase(BaseModel):
+    model_config = ConfigDict(extra="allow", populate_by_name=True)
+
+
+class WhatsAppTexto(WhatsAppBase):
+    body: str
+
+
+class WhatsAppMensaje(WhatsAppBase):
+    from_: str = Field(..., alias="from")
+    id: str
+    timestamp: str
+    type: str
+    text: Optional[WhatsAppTexto] = None
+
+
+class WhatsAppMetadata(WhatsAppBase):
+    display_phone_number: str
+    phone_number_id: str
+
+
+class WhatsAppValor(WhatsAppBase):
+    messaging_product: str
+    metadata: WhatsAppMetadata
+    messages: Optional[List[WhatsAppMensaje]] = None
+    statuses: Optional[List[Dict[str, Any]]] = None
+
+
+class WhatsAppCambio(WhatsAppBase):
+    field: str
+    value: WhatsAppValor
+
+
+class WhatsAppEntrada(WhatsAppBase):
+    id: str
+    changes: List[WhatsAppCambio]
+
+
+class WhatsAppWebhook(WhatsAppBase):
+    object: str
+    entry: List[WhatsAppEntrada]
+
+
+class MensajeEntrante(BaseModel):
+    """Mensaje ya aplanado, tal como viaja por la cola"""
+    wa_id: str
+    id_mensaje: str
+    did_whatsapp: str
+    timestamp: int
+    tipo: str
+    texto: Optional[str] = None
+    crudo: Dict[str, Any]
+
+
+def extraer_mensajes(payload: WhatsAppWebhook) -> List[MensajeEntrante]:
+    """Aplanar las entradas del webhook en mensajes (se ignoran los statuses)"""
+    mensajes = []
+    for entrada in payload.entry:
+        for cambio in entrada.changes:
+            for mensaje in cambio.value.messages or []:
+                mensajes.append(MensajeEntrante(
+                    wa_id=mensaje.from_,
+                    id_mensaje=mensaje.id,
+                    did_whatsapp=cambio.value.metadata.display_phone_number,
+                    timestamp=int(mensaje.timestamp),
+                    tipo=mensaje.type,
+                    texto=mensaje.text.body if mensaje.text else None,
+                    crudo=mensaje.model_dump(by_alias=True),
+                ))
+    return mensajes
@@ -1,40 +1,203 @@
-import requests
-import xml.etree.ElementTree as ET
+"""Clientes SOAP de HCWEB y Mercedario.
+
+Cada upstream (`API_BASE_HCWEB`, `API_BASE_MERCEDARIO`) tiene su WsHcweb: un
+httpx.AsyncClient con pool keep-alive, un semáforo que limita las llamadas simultáneas
+(el upstream no aguanta ráfagas) y hooks al abrir y cerrar el pool. Un AsyncClient no se
+puede usar desde otro event loop ni después de un fork, así que `registro_hcweb` guarda un
+cliente por (proceso, event loop, upstream) y lo crea en el primer uso, sin locks: dentro de
+un loop la creación no cede el control y cada hilo tiene su propio loop.
+
+`llamar_lote` hace varias llamadas de un mismo turno del bot a la vez (cobertura,
+profesionales, turnos) con un plazo para el lote y un resultado o error por llamada.
+`call_method` queda para código sincrónico: usa una requests.Session por hilo.
+"""
+import asyncio
+import inspect
 import json
-from threading import Lock
+import logging
+import os
+import threading
+import time
+import weakref
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import httpx
+import requests
+
 from app.config import Config
+from app.core.metricas import span
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "http://iosepscript.excelenciadigitial.net.ar/"
+
+Hook = Callable[["WsHcweb"], Union[None, Awaitable[None]]]
+
+
+class ErrorHcweb(Exception):
+    """Error HTTP o de red al llamar a un upstream SOAP"""
+
+
+class ErrorRespuestaHcweb(ErrorHcweb):
+    """El upstream respondió con ContainsErrors o con una respuesta que no se entiende"""
+
+    def __init__(self, mensaje: str, *, del_upstream: bool = False):
+        super().__init__(mensaje)
+        self.del_upstream = del_upstream
+
+
+@dataclass
+class ResultadoLlamada:
+    """Resultado de una llamada de un lote: `valor` si salió bien, `error` si no"""
+    metodo: str
+    valor: Any = None
+    error: Optional[str] = None
+    tipo_error: Optional[str] = None  # upstream, respuesta, http, red, plazo, inesperado
+    segundos: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
 
 class WsHcweb:
-    _instance = None
-    _lock = Lock()
-
-    def __new__(cls):
-        with cls._lock:
-            if cls._instance is None:
-                cls._instance = super(WsHcweb, cls).__new__(cls)
-                cls._instance._initialized = False
-        return cls._instance
-
-    def __init__(self):
-        if self._initialized:
-            return
-        self.url = Config.API_BASE_HCWEB
-        self._initialized = True
-
-    def call_method(self, method_name: str, parameters: dict) -> any:
-        soap_action = f"http://iosepscript.excelenciadigitial.net.ar/{method_name}"
-        headers = {
-            "Content-Type": "text/xml; charset=utf-8",
-            "SOAPAction": soap_action
-        }
-        print("Parámetros enviados:", parameters)
+    """Cliente de un upstream SOAP con pool de conexiones y límite de concurrencia"""
+
+    def __init__(
+        self,
+        url: Optional[str] = Config.API_BASE_HCWEB,
+        *,
+        nombre: str = "hcweb",
+        concurrencia: int = Config.HCWEB_CONCURRENCIA,
+        conexiones: int = Config.HCWEB_CONEXIONES,
+        timeout: float = Config.HCWEB_TIMEOUT_SEGUNDOS,
+        al_abrir: Optional[List[Hook]] = None,
+        al_cerrar: Optional[List[Hook]] = None,
+    ):
+        self.url = url
+        self.nombre = nombre
+        self.concurrencia = concurrencia
+        self.conexiones = conexiones
+        self.timeout = timeout
+        self.al_abrir = list(al_abrir or [])
+        self.al_cerrar = list(al_cerrar or [])
+        self.llamadas = 0
+        self.en_curso = 0
+        self._http: Optional[httpx.AsyncClient] = None
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._sesiones = threading.local()
+
+    async def _abrir(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.conexiones, max_keepalive_connections=self.conexiones),
+                timeout=self.timeout,
+            )
+            self._semaforo = asyncio.Semaphore(self.concurrencia)
+            await _ejecutar_hooks(self.al_abrir, self)
+        return self._http
+
+    def _headers(self, method_name: str) -> Dict[str, str]:
+        return {"Content-Type": "text/xml; charset=utf-8", "SOAPAction": f"{NAMESPACE}{method_name}"}
+
+    def _metrica(self, method_name: str) -> str:
+        return method_name if self.nombre == "hcweb" else f"{self.nombre}.{method_name}"
+
+    async def llamar(self, method_name: str, parameters: dict, *, estricto: bool = False) -> Any:
+        """Llamar un método SOAP; devuelve el JSON de SuccessMessage.
+
+        Si el upstream informa un error devuelve None, o levanta ErrorRespuestaHcweb con `estricto`.
+        """
+        http = await self._abrir()
+        body = self._build_soap_body(method_name, parameters)
+        async with self._semaforo:
+            self.en_curso += 1
+            try:
+                with span("hcweb", self._metrica(method_name)):
+                    response = await http.post(self.url, content=body, headers=self._headers(method_name))
+            except httpx.TransportError as e:
+                raise ErrorHcweb(f"Error de red en {self.nombre}.{method_name}: {e!r}") from e
+            finally:
+                self.en_curso -= 1
+                self.llamadas += 1
+
+        if response.status_code != 200:
+            raise ErrorHcweb(f"SOAP Error {response.status_code}: {response.text}")
+
+        with span("hcweb_parseo", method_name):
+            if estricto:
+                return self._interpretar_respuesta(response.text, method_name)
+            return self._parse_response(response.text, method_name)
+
+    async def llamar_lote(
+        self, llamadas: Sequence[Tuple[str, dict]], *, plazo: float = Config.HCWEB_PLAZO_LOTE_SEGUNDOS
+    ) -> List[ResultadoLlamada]:
+        """Hacer las llamadas (método, parámetros) a la vez, con un plazo para todo el lote.
+
+        Devuelve un resultado por llamada, en el mismo orden: las que fallan o no terminan en
+        `plazo` segundos (se cancelan) traen su error y no afectan a las demás. El límite de
+        concurrencia del cliente se respeta: la espera por el semáforo cuenta en el plazo.
+        """
+        inicio = time.perf_counter()
+        resultados = [ResultadoLlamada(metodo) for metodo, _ in llamadas]
+
+        async def una(resultado: ResultadoLlamada, parametros: dict) -> None:
+            try:
+                resultado.valor = await self.llamar(resultado.metodo, parametros, estricto=True)
+            except ErrorRespuestaHcweb as e:
+                resultado.error, resultado.tipo_error = str(e), "upstream" if e.del_upstream else "respuesta"
+            except ErrorHcweb as e:
+                resultado.error = str(e)
+                resultado.tipo_error = "red" if isinstance(e.__cause__, httpx.TransportError) else "http"
+            except Exception as e:
+                logger.exception("Error inesperado en %s.%s", self.nombre, resultado.metodo)
+                resultado.error, resultado.tipo_error = repr(e), "inesperado"
+            finally:
+                resultado.segundos = time.perf_counter() - inicio
+
+        tareas = [asyncio.create_task(una(r, p)) for r, (_, p) in zip(resultados, llamadas)]
+        if not tareas:
+            return resultados
+        pendientes = set(tareas)
+        try:
+            _, pendientes = await asyncio.wait(tareas, timeout=plazo)
+        finally:
+            # También si cancelan a quien espera el lote: no quedan llamadas huérfanas
+            for tarea in pendientes:
+                tarea.cancel()
+            await asyncio.gather(*pendientes, return_exceptions=True)
+        for resultado, tarea in zip(resultados, tareas):
+            if tarea in pendientes:
+                resultado.valor, resultado.segundos = None, plazo
+                resultado.error, resultado.tipo_error = f"Plazo de {plazo:g} s vencido", "plazo"
+        return resultados
+
+    def call_method(self, method_name: str, parameters: dict) -> Any:
+        """Versión sincrónica de `llamar`, con keep-alive por hilo y sin límite de concurrencia"""
+        sesion = getattr(self._sesiones, "sesion", None)
+        if sesion is None:
+            sesion = self._sesiones.sesion = requests.Session()
+        logger.debug("%s.%s: %s", self.nombre, method_name, parameters)
         body = self._build_soap_body(method_name, parameters)
-        response = requests.post(self.url, data=body, headers=headers)
+        try:
+            with span("hcweb", self._metrica(method_name)):
+                response = sesion.post(self.url, data=body, headers=self._headers(method_name), timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ErrorHcweb(f"Error de red en {self.nombre}.{method_name}: {e!r}") from e
 
         if response.status_code != 200:
-            raise Exception(f"SOAP Error {response.status_code}: {response.text}")
+            raise ErrorHcweb(f"SOAP Error {response.status_code}: {response.text}")
 
-        return self._parse_response(response.text, method_name)
+        with span("hcweb_parseo", method_name):
+            return self._parse_response(response.text, method_name)
+
+    async def cerrar(self) -> None:
+        if self._http is not None:
+            http, self._http = self._http, None
+            await http.aclose()
+            await _ejecutar_hooks(self.al_cerrar, self)
 
     def _build_soap_body(self, method: str, params: dict) -> str:
         def serialize_param(k, v):
@@ -53,52 +216,118 @@ class WsHcweb:
                     xmlns:xsd="http://www.w3.org/2001/XMLSchema"
                     xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">
         <soap:Body>
-            <{method} xmlns="http://iosepscript.excelenciadigitial.net.ar/">
+            <{method} xmlns="{NAMESPACE}">
             {xml_params}
             </{method}>
         </soap:Body>
         </soap:Envelope>"""
 
-    def _parse_response(self, xml_response: str, method: str) -> any:
+    def _interpretar_respuesta(self, xml_response: str, method: str) -> Any:
+        """JSON de SuccessMessage; ErrorRespuestaHcweb si la respuesta trae un error o no se entiende"""
         ns = {'soap': 'http://schemas.xmlsoap.org/soap/envelope/'}
-        root = ET.fromstring(xml_response)
+        try:
+            root = ET.fromstring(xml_response)
+        except ET.ParseError as e:
+            raise ErrorRespuestaHcweb(f"XML inválido en la respuesta de {method}: {e}") from e
 
         body = root.find('soap:Body', ns)
         if body is None:
-            print("No se encontró el Body en el XML")
-            return None
+            raise ErrorRespuestaHcweb("No se encontró el Body en el XML")
 
-        base_path = f".//{{http://iosepscript.excelenciadigitial.net.ar/}}"
+        base_path = f".//{{{NAMESPACE}}}"
         contains_errors = body.find(f"{base_path}ContainsErrors")
         success_message = body.find(f"{base_path}SuccessMessage")
         error_message = body.find(f"{base_path}ErrorMessage")
 
         if contains_errors is None:
-            print(f"No se encontró ContainsErrors en la respuesta de {method}")
-            return None
-
-        contains_errors_value = contains_errors.text.strip().lower() if contains_errors is not None else ""
-        has_error = contains_errors_value == "true"
+            raise ErrorRespuestaHcweb(f"No se encontró ContainsErrors en la respuesta de {method}")
 
-        if has_error:
+        if (contains_errors.text or "").strip().lower() == "true":
             error_text = (error_message.text or "").strip() if error_message is not None else ""
-            if not error_text:
-                # Log o debug para analizar todo el XML de respuesta
-                print("Advertencia: respuesta con error pero sin mensaje explícito.")
-                print(xml_response)
-                error_text = "La API devolvió un error, pero no proporcionó detalles."
-            print(f"Error en la respuesta de {method}: {error_text}")
-            return None
-
-
+            raise ErrorRespuestaHcweb(
+                f"Error en la respuesta de {method}: "
+                f"{error_text or 'La API devolvió un error, pero no proporcionó detalles.'}",
+                del_upstream=True,
+            )
 
         # Si no hay errores, procesar SuccessMessage
         if success_message is None or not success_message.text:
-            print(f"No se encontró SuccessMessage válido en la respuesta de {method}")
-            return None
+            raise ErrorRespuestaHcweb(f"No se encontró SuccessMessage válido en la respuesta de {method}")
 
         try:
             return json.loads(success_message.text.strip())
-        except Exception as e:
-            print(f"Error al parsear JSON de SuccessMessage: {e}")
-            return None
\ No newline at end of file
+        except ValueError as e:
+            raise ErrorRespuestaHcweb(f"Error al parsear JSON de SuccessMessage: {e}") from e
+
+    def _parse_response(self, xml_response: str, method: str) -> any:
+        """Como _interpretar_respuesta, pero informa el error y devuelve None"""
+        try:
+            return self._interpretar_respuesta(xml_response, method)
+        except ErrorRespuestaHcweb as e:
+            logger.warning("%s.%s: %s", self.nombre, method, e)
+            return None
+
+
+async def _ejecutar_hooks(hooks: List[Hook], cliente: WsHcweb) -> None:
+    for hook in hooks:
+        try:
+            resultado = hook(cliente)
+            if inspect.isawaitable(resultado):
+                await resultado
+        except Exception:
+            logger.exception("Error en un hook del cliente %s", cliente.nombre)
+
+
+@dataclass
+class Upstream:
+    url: Optional[str]
+    concurrencia: int
+    conexiones: int
+    timeout: float = Config.HCWEB_TIMEOUT_SEGUNDOS
+    al_abrir: List[Hook] = field(default_factory=list)
+    al_cerrar: List[Hook] = field(default_factory=list)
+
+
+class RegistroClientesHcweb:
+    """Un WsHcweb por upstream, event loop y proceso"""
+
+    def __init__(self, upstreams: Optional[Dict[str, Upstream]] = None):
+        self.upstreams = upstreams if upstreams is not None else {
+            "hcweb": Upstream(Config.API_BASE_HCWEB, Config.HCWEB_CONCURRENCIA, Config.HCWEB_CONEXIONES),
+            "mercedario": Upstream(Config.API_BASE_MERCEDARIO, Config.MERCEDARIO_CONCURRENCIA, Config.MERCEDARIO_CONEXIONES),
+        }
+        self._pid = os.getpid()
+        self._por_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, WsHcweb]]" = weakref.WeakKeyDictionary()
+
+    def _clientes(self) -> Dict[str, WsHcweb]:
+        if os.getpid() != self._pid:
+            # Proceso hijo: las conexiones del padre no se usan (ni se cierran)
+            self._pid = os.getpid()
+            self._por_loop = weakref.WeakKeyDictionary()
+        loop = asyncio.get_running_loop()
+        clientes = self._por_loop.get(loop)
+        if clientes is None:
+            clientes = self._por_loop[loop] = {}
+        return clientes
+
+    def obtener(self, nombre: str = "hcweb") -> WsHcweb:
+        """Cliente del upstream para el loop actual (hay que llamarlo desde una corrutina)"""
+        clientes = self._clientes()
+        cliente = clientes.get(nombre)
+        if cliente is None:
+            upstream = self.upstreams[nombre]
+            cliente = clientes[nombre] = WsHcweb(
+                upstream.url, nombre=nombre, concurrencia=upstream.concurrencia, conexiones=upstream.conexiones,
+                timeout=upstream.timeout, al_abrir=upstream.al_abrir, al_cerrar=upstream.al_cerrar,
+            )
+        return cliente
+
+    async def cerrar(self) -> None:
+        """Cerrar los clientes del loop actual"""
+        clientes = self._clientes()
+        while clientes:
+            _, cliente = clientes.popitem()
+            await cliente.cerrar()
+
+
+registro_hcweb = RegistroClientesHcweb()
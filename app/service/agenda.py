@@ -0,0 +1,466 @@
+"""Agenda diaria precalculada por profesional: grilla de turnos como bitsets.
+
+Para cada (profesional, día) se guarda un DiaAgenda: el minuto del primer slot, la duración
+del turno, un bitset de slots habilitados (sale de `Profesional.horarios`) y qué turno ocupa
+cada slot. "¿Qué tiene libre el martes?" o "¿está libre a las 10?" se responden con
+operaciones de bits sobre el snapshot, sin consultar turnos.
+
+La duración del turno es `horarios["duracion_turno"]` del profesional o
+AGENDA_DURACION_TURNO_MINUTOS: un profesional puede atender en varias clínicas y la agenda es
+una sola. Los días se calculan en AGENDA_ZONA_HORARIA; una fecha sin zona se toma como local.
+
+Los snapshots se arman la primera vez que se piden (una consulta por día) y después se
+actualizan de a un turno: los eventos de cambios de `turnos` (create/update/delete) anotan
+los ids y `aplicar_pendientes` los relee por PK y mueve cada turno de slot. Un cambio en el
+profesional descarta sus días; uno en las clínicas, todos. Si se juntan más de
+MAXIMO_PENDIENTES cambios sin que nadie consulte la agenda, se descartan todos los días en
+lugar de seguir anotando. `verificar` compara los snapshots con la base y opcionalmente los
+repara.
+
+Almacenes: AlmacenAgendaMemoria (por proceso) y AlmacenAgendaRedis (compartido entre
+workers; cada turno es un campo del hash del día, así ocupar y liberar son atómicos).
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+import redis.asyncio as aioredis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Config
+from app.core.eventos import EventoCambio, bus_cambios
+from app.models.entities import Profesional, Turno
+from app.utils.texto import quitar_acentos
+
+ESTADOS_OCUPAN = frozenset({"programado", "confirmado", "completado"})
+DIAS_SEMANA = ("lunes", "martes", "miercoles", "jueves", "viernes", "sabado", "domingo")
+FUERA_DE_GRILLA = -1  # turnos que no caen en un slot (otro horario o duración)
+
+ZONA = ZoneInfo(Config.AGENDA_ZONA_HORARIA)
+
+Dia = Tuple[int, date]  # (id_profesional, fecha)
+
+
+def _minutos(hora: str) -> int:
+    horas, minutos = hora.split(":")[:2]
+    return int(horas) * 60 + int(minutos)
+
+
+def local(momento: datetime) -> datetime:
+    return momento.replace(tzinfo=ZONA) if momento.tzinfo is None else momento.astimezone(ZONA)
+
+
+@dataclass
+class DiaAgenda:
+    inicio: int  # minuto del día del slot 0
+    duracion: int  # minutos por slot
+    habilitados: int  # bit i: el slot i está dentro de una franja de atención
+    turnos: Dict[int, int] = field(default_factory=dict)  # id_turno -> slot
+    _ocupados: Optional[int] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def desde_horarios(cls, horarios: Optional[Dict[str, Any]], fecha: date, duracion: int) -> "DiaAgenda":
+        franjas = []
+        for dia, lista in (horarios or {}).items():
+            if quitar_acentos(str(dia).casefold()) == DIAS_SEMANA[fecha.weekday()] and isinstance(lista, list):
+                franjas.extend((_minutos(f["inicio"]), _minutos(f["fin"])) for f in lista if f.get("inicio") and f.get("fin"))
+        if not franjas:
+            return cls(0, duracion, 0)
+        inicio = min(desde for desde, _ in franjas)
+        habilitados = 0
+        for desde, hasta in franjas:
+            primero = -(-(desde - inicio) // duracion)  # primer slot que empieza dentro de la franja
+            for slot in range(primero, (hasta - inicio) // duracion):
+                habilitados |= 1 << slot
+        return cls(inicio, duracion, habilitados)
+
+    @property
+    def ocupados(self) -> int:
+        if self._ocupados is None:
+            ocupados = 0
+            for slot in self.turnos.values():
+                if slot >= 0:
+                    ocupados |= 1 << slot
+            self._ocupados = ocupados
+        return self._ocupados
+
+    @property
+    def libres(self) -> int:
+        return self.habilitados & ~self.ocupados
+
+    def slot(self, momento: datetime) -> int:
+        minuto = momento.hour * 60 + momento.minute - self.inicio
+        if minuto < 0 or minuto % self.duracion:
+            return FUERA_DE_GRILLA
+        return minuto // self.duracion
+
+    def esta_libre(self, momento: datetime) -> bool:
+        slot = self.slot(local(momento))
+        return slot >= 0 and bool(self.libres >> slot & 1)
+
+    def ocupar(self, id_turno: int, slot: int) -> None:
+        self.turnos[id_turno] = slot
+        self._ocupados = None
+
+    def liberar(self, id_turno: int) -> None:
+        if self.turnos.pop(id_turno, None) is not None:
+            self._ocupados = None
+
+    def horarios(self, fecha: date, bits: Optional[int] = None) -> List[datetime]:
+        """Inicio de cada slot marcado en `bits` (por defecto, los libres)"""
+        bits = self.libres if bits is None else bits
+        resultado = []
+        while bits:
+            slot = (bits & -bits).bit_length() - 1
+            resultado.append(datetime.combine(fecha, time(), ZONA) + timedelta(minutes=self.inicio + slot * self.duracion))
+            bits &= bits - 1
+        return resultado
+
+    def resumen(self) -> Dict[str, int]:
+        return {
+            "habilitados": self.habilitados.bit_count(),
+            "ocupados": (self.ocupados & self.habilitados).bit_count(),
+            "libres": self.libres.bit_count(),
+            "fuera_de_grilla": sum(1 for s in self.turnos.values() if s < 0 or not self.habilitados >> s & 1),
+        }
+
+    def cabecera(self) -> str:
+        return f"{self.inicio},{self.duracion},{self.habilitados:x}"
+
+    @classmethod
+    def desde_cabecera(cls, cabecera: str, turnos: Dict[int, int]) -> "DiaAgenda":
+        inicio, duracion, habilitados = cabecera.split(",")
+        return cls(int(inicio), int(duracion), int(habilitados, 16), turnos)
+
+
+class AlmacenAgenda(ABC):
+    """Dónde viven los snapshots; `ocupar`/`liberar` no hacen nada si el día no está cargado"""
+
+    @abstractmethod
+    async def obtener(self, dia: Dia) -> Optional[DiaAgenda]:
+        ...
+
+    @abstractmethod
+    async def guardar(self, dia: Dia, agenda: DiaAgenda) -> None:
+        ...
+
+    @abstractmethod
+    async def ocupar(self, dia: Dia, id_turno: int, slot: int) -> bool:
+        ...
+
+    @abstractmethod
+    async def liberar(self, id_turno: int) -> Optional[Dia]:
+        """Sacar el turno del día donde estaba; devuelve ese día"""
+
+    @abstractmethod
+    async def descartar(self, id_profesional: Optional[int] = None) -> None:
+        """Olvidar los días de un profesional (o todos)"""
+
+    @abstractmethod
+    async def dias(self) -> List[Dia]:
+        ...
+
+
+class AlmacenAgendaMemoria(AlmacenAgenda):
+    """Días en un dict del proceso. Un día que no se usa en AGENDA_TTL_DIAS se descarta, y
+    pasados `maximo_dias` se descartan los usados hace más tiempo (se rearman al pedirlos)"""
+
+    def __init__(self, *, ttl_dias: float = Config.AGENDA_TTL_DIAS, maximo_dias: int = 10000):
+        self.ttl = ttl_dias * 86400
+        self.maximo_dias = maximo_dias
+        self._dias: Dict[Dia, DiaAgenda] = {}
+        self._usados: Dict[Dia, float] = {}  # monotonic del último uso, el más viejo primero
+        self._ubicacion: Dict[int, Dia] = {}
+
+    def _quitar(self, dia: Dia) -> None:
+        self._usados.pop(dia, None)
+        for id_turno in self._dias.pop(dia).turnos:
+            self._ubicacion.pop(id_turno, None)
+
+    def _usar(self, dia: Dia) -> None:
+        """Marcar el día como recién usado y quitar los vencidos y los que sobran del máximo"""
+        ahora = monotonic()
+        self._usados.pop(dia, None)
+        self._usados[dia] = ahora
+        for viejo, usado in list(self._usados.items()):
+            if len(self._dias) <= self.maximo_dias and ahora - usado < self.ttl:
+                break
+            self._quitar(viejo)
+
+    async def obtener(self, dia: Dia) -> Optional[DiaAgenda]:
+        usado = self._usados.get(dia)
+        if usado is None:
+            return None
+        if monotonic() - usado >= self.ttl:
+            self._quitar(dia)
+            return None
+        self._usar(dia)
+        return self._dias[dia]
+
+    async def guardar(self, dia: Dia, agenda: DiaAgenda) -> None:
+        if dia in self._dias:
+            self._quitar(dia)
+        self._dias[dia] = agenda
+        for id_turno in agenda.turnos:
+            self._ubicacion[id_turno] = dia
+        self._usar(dia)
+
+    async def ocupar(self, dia: Dia, id_turno: int, slot: int) -> bool:
+        agenda = self._dias.get(dia)
+        if agenda is None:
+            return False
+        agenda.ocupar(id_turno, slot)
+        self._ubicacion[id_turno] = dia
+        return True
+
+    async def liberar(self, id_turno: int) -> Optional[Dia]:
+        dia = self._ubicacion.pop(id_turno, None)
+        if dia is not None and dia in self._dias:
+            self._dias[dia].liberar(id_turno)
+        return dia
+
+    async def descartar(self, id_profesional: Optional[int] = None) -> None:
+        for dia in [d for d in self._dias if id_profesional is None or d[0] == id_profesional]:
+            self._quitar(dia)
+
+    async def dias(self) -> List[Dia]:
+        return list(self._dias)
+
+
+class AlmacenAgendaRedis(AlmacenAgenda):
+    """Un hash por día: campo `_` con la grilla y un campo por turno con su slot.
+
+    `agenda:turnos` guarda en qué día está cada turno, para liberarlo al cancelarlo o moverlo.
+    Los días vencen AGENDA_TTL_DIAS después de la fecha.
+    """
+
+    def __init__(self, cliente: aioredis.Redis, prefijo: str = "agenda", ttl_dias: int = Config.AGENDA_TTL_DIAS):
+        self.cliente = cliente
+        self.prefijo = prefijo
+        self.ttl_dias = ttl_dias
+
+    def _clave(self, dia: Dia) -> str:
+        return f"{self.prefijo}:{dia[0]}:{dia[1].isoformat()}"
+
+    def _vence(self, dia: Dia) -> int:
+        return int(datetime.combine(dia[1] + timedelta(days=self.ttl_dias), time(), ZONA).timestamp())
+
+    async def obtener(self, dia: Dia) -> Optional[DiaAgenda]:
+        campos = await self.cliente.hgetall(self._clave(dia))
+        if not campos:
+            return None
+        campos = {(k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v) for k, v in campos.items()}
+        cabecera = campos.pop("_", None)
+        if cabecera is None:
+            return None
+        return DiaAgenda.desde_cabecera(cabecera, {int(k): int(v) for k, v in campos.items()})
+
+    async def guardar(self, dia: Dia, agenda: DiaAgenda) -> None:
+        clave = self._clave(dia)
+        async with self.cliente.pipeline(transaction=True) as pipe:
+            pipe.delete(clave)
+            pipe.hset(clave, mapping={"_": agenda.cabecera(), **{str(k): v for k, v in agenda.turnos.items()}})
+            pipe.expireat(clave, self._vence(dia))
+            if agenda.turnos:
+                pipe.hset(f"{self.prefijo}:turnos", mapping={str(k): f"{dia[0]}:{dia[1].isoformat()}" for k in agenda.turnos})
+            await pipe.execute()
+
+    async def ocupar(self, dia: Dia, id_turno: int, slot: int) -> bool:
+        clave = self._clave(dia)
+        if not await self.cliente.hexists(clave, "_"):
+            return False
+        async with self.cliente.pipeline(transaction=True) as pipe:
+            pipe.hset(clave, str(id_turno), slot)
+            pipe.hset(f"{self.prefijo}:turnos", str(id_turno), f"{dia[0]}:{dia[1].isoformat()}")
+            await pipe.execute()
+        return True
+
+    async def liberar(self, id_turno: int) -> Optional[Dia]:
+        ubicacion = await self.cliente.hget(f"{self.prefijo}:turnos", str(id_turno))
+        if ubicacion is None:
+            return None
+        id_profesional, fecha = (ubicacion.decode() if isinstance(ubicacion, bytes) else ubicacion).split(":")
+        dia = (int(id_profesional), date.fromisoformat(fecha))
+        async with self.cliente.pipeline(transaction=True) as pipe:
+            pipe.hdel(self._clave(dia), str(id_turno))
+            pipe.hdel(f"{self.prefijo}:turnos", str(id_turno))
+            await pipe.execute()
+        return dia
+
+    async def descartar(self, id_profesional: Optional[int] = None) -> None:
+        patron = f"{self.prefijo}:{id_profesional if id_profesional is not None else '*'}:*"
+        claves = [clave async for clave in self.cliente.scan_iter(match=patron, count=500)]
+        if claves:
+            await self.cliente.delete(*claves)
+
+    async def dias(self) -> List[Dia]:
+        dias = []
+        async for clave in self.cliente.scan_iter(match=f"{self.prefijo}:*:*", count=500):
+            _, id_profesional, fecha = (clave.decode() if isinstance(clave, bytes) else clave).split(":")
+            if id_profesional != "turnos":
+                dias.append((int(id_profesional), date.fromisoformat(fecha)))
+        return dias
+
+
+@dataclass
+class Inconsistencia:
+    id_profesional: int
+    fecha: date
+    sobrantes: List[int]  # turnos en el snapshot que en la base no ocupan ese día
+    faltantes: List[int]  # turnos de la base que el snapshot no tiene (o en otro slot)
+    grilla: bool  # cambió la grilla (horarios o duración)
+
+
+class Agenda:
+    """Consultas de disponibilidad sobre los snapshots, con actualización incremental"""
+
+    # Con más cambios pendientes que esto se descartan todos los días (se rearman al pedirlos)
+    MAXIMO_PENDIENTES = 10000
+
+    def __init__(self, almacen: Optional[AlmacenAgenda] = None, *, duracion: int = Config.AGENDA_DURACION_TURNO_MINUTOS):
+        self.almacen = almacen or AlmacenAgendaMemoria()
+        self.duracion = duracion
+        self._pendientes: Set[int] = set()
+        self._profesionales: Dict[int, Optional[Dict[str, Any]]] = {}
+        self.construidos = 0
+        self._desuscribir = None
+
+    # Armado desde la base
+    async def _horarios(self, db: AsyncSession, id_profesional: int) -> Optional[Dict[str, Any]]:
+        if id_profesional not in self._profesionales:
+            horarios = (await db.execute(
+                select(Profesional.horarios).filter(Profesional.id == id_profesional)
+            )).scalar_one_or_none()
+            self._profesionales[id_profesional] = horarios
+        return self._profesionales[id_profesional]
+
+    def _duracion(self, horarios: Optional[Dict[str, Any]]) -> int:
+        return int((horarios or {}).get("duracion_turno") or self.duracion)
+
+    async def construir(self, db: AsyncSession, id_profesional: int, fecha: date) -> DiaAgenda:
+        """Snapshot del día leído de la base (sin guardarlo)"""
+        horarios = await self._horarios(db, id_profesional)
+        agenda = DiaAgenda.desde_horarios(horarios, fecha, self._duracion(horarios))
+        desde = datetime.combine(fecha, time(), ZONA)
+        filas = (await db.execute(
+            select(Turno.id, Turno.fecha_hora).filter(
+                Turno.id_profesional == id_profesional,
+                Turno.fecha_hora >= desde,
+                Turno.fecha_hora < desde + timedelta(days=1),
+                Turno.estado.in_(ESTADOS_OCUPAN),
+            )
+        )).all()
+        for id_turno, fecha_hora in filas:
+            agenda.turnos[id_turno] = agenda.slot(local(fecha_hora))
+        return agenda
+
+    async def dia(self, db: AsyncSession, id_profesional: int, fecha: date) -> DiaAgenda:
+        if self._pendientes:
+            await self.aplicar_pendientes(db)
+        dia = (id_profesional, fecha)
+        agenda = await self.almacen.obtener(dia)
+        if agenda is None:
+            agenda = await self.construir(db, id_profesional, fecha)
+            await self.almacen.guardar(dia, agenda)
+            self.construidos += 1
+        return agenda
+
+    # Consultas
+    async def libres(self, db: AsyncSession, id_profesional: int, fecha: date) -> List[datetime]:
+        return (await self.dia(db, id_profesional, fecha)).horarios(fecha)
+
+    async def ocupados(self, db: AsyncSession, id_profesional: int, fecha: date) -> List[datetime]:
+        agenda = await self.dia(db, id_profesional, fecha)
+        return agenda.horarios(fecha, agenda.ocupados & agenda.habilitados)
+
+    async def esta_libre(self, db: AsyncSession, id_profesional: int, momento: datetime) -> bool:
+        return (await self.dia(db, id_profesional, local(momento).date())).esta_libre(momento)
+
+    # Actualización incremental
+    def al_cambiar(self, evento: EventoCambio) -> None:
+        """Suscriptor del bus de cambios"""
+        if evento.entidad == "turnos":
+            self._pendientes.update(int(i) for i in evento.ids or (0,))  # sin ids (importación): todo
+        elif evento.entidad == "profesionales":
+            for id in evento.ids or list(self._profesionales):
+                self._profesionales.pop(int(id), None)
+                self._pendientes.add(-int(id))  # días del profesional a descartar
+        elif evento.entidad == "clinicas":
+            self._profesionales.clear()
+            self._pendientes.add(0)
+        if len(self._pendientes) > self.MAXIMO_PENDIENTES:
+            self._pendientes = {0}
+
+    def suscribir(self) -> "Agenda":
+        if self._desuscribir is None:
+            self._desuscribir = bus_cambios.suscribir(self.al_cambiar, entidades=["turnos", "profesionales", "clinicas"])
+        return self
+
+    def desuscribir(self) -> None:
+        if self._desuscribir is not None:
+            self._desuscribir()
+            self._desuscribir = None
+
+    async def registrar(self, id_turno: int, id_profesional: int, fecha_hora: datetime, estado: str) -> None:
+        """Aplicar el estado actual de un turno: sacarlo de donde estaba y ocupar su slot"""
+        await self.almacen.liberar(id_turno)
+        if estado not in ESTADOS_OCUPAN:
+            return
+        momento = local(fecha_hora)
+        dia = (id_profesional, momento.date())
+        agenda = await self.almacen.obtener(dia)
+        if agenda is not None:
+            await self.almacen.ocupar(dia, id_turno, agenda.slot(momento))
+
+    async def aplicar_pendientes(self, db: AsyncSession) -> int:
+        pendientes, self._pendientes = self._pendientes, set()
+        if 0 in pendientes:
+            await self.almacen.descartar()
+        for id in sorted(p for p in pendientes if p < 0):
+            await self.almacen.descartar(-id)
+        ids = [p for p in pendientes if p > 0]
+        if not ids:
+            return 0
+        filas = {fila.id: fila for fila in (await db.execute(
+            select(Turno.id, Turno.id_profesional, Turno.fecha_hora, Turno.estado).filter(Turno.id.in_(ids))
+        )).all()}
+        for id_turno in ids:
+            fila = filas.get(id_turno)
+            if fila is None:
+                await self.almacen.liberar(id_turno)
+            else:
+                await self.registrar(fila.id, fila.id_profesional, fila.fecha_hora, fila.estado)
+        return len(ids)
+
+    # Consistencia
+    async def verificar(
+        self, db: AsyncSession, *, dias: Optional[Iterable[Dia]] = None, reparar: bool = False
+    ) -> List[Inconsistencia]:
+        """Comparar los snapshots guardados (o los `dias` indicados) con la base"""
+        await self.aplicar_pendientes(db)
+        self._profesionales.clear()  # releer horarios: también se verifica la grilla
+        inconsistencias = []
+        for id_profesional, fecha in sorted(dias if dias is not None else await self.almacen.dias()):
+            guardado = await self.almacen.obtener((id_profesional, fecha))
+            if guardado is None:
+                continue
+            esperado = await self.construir(db, id_profesional, fecha)
+            grilla = (guardado.inicio, guardado.duracion, guardado.habilitados) != (esperado.inicio, esperado.duracion, esperado.habilitados)
+            sobrantes = sorted(set(guardado.turnos) - set(esperado.turnos))
+            faltantes = sorted(i for i, slot in esperado.turnos.items() if guardado.turnos.get(i) != slot)
+            if grilla or sobrantes or faltantes:
+                inconsistencias.append(Inconsistencia(id_profesional, fecha, sobrantes, faltantes, grilla))
+                if reparar:
+                    await self.almacen.guardar((id_profesional, fecha), esperado)
+        return inconsistencias
+
+
+def crear_agenda(backend: str = Config.AGENDA_BACKEND, *, cliente_redis: Optional[aioredis.Redis] = None) -> Agenda:
+    if backend == "redis":
+        from app.core.redis_async import crear_cliente_redis
+        return Agenda(AlmacenAgendaRedis(cliente_redis or crear_cliente_redis()))
+    return Agenda(AlmacenAgendaMemoria())
@@ -0,0 +1,260 @@
+"""Búsqueda tolerante a errores sobre pacientes, profesionales y especialidades.
+
+En PostgreSQL se resuelve con pg_trgm (word_similarity sobre `f_unaccent(lower(nombre))`)
+y, para especialidades, además con tsvector en español sobre nombre + descripción; los
+índices GIN los crea la migración f2c9a7b3e514. En otros motores (SQLite en tests) se usa
+IndiceBusquedaMemoria, que reproduce el mismo criterio de trigramas en memoria; el Buscador
+lo mantiene al día con los eventos de `bus_cambios` (relee por PK lo que cambió antes de la
+próxima búsqueda).
+
+Objetivos de latencia (ver benchmarks/bench_busqueda.py):
+- PostgreSQL, 100k pacientes: p95 < 20ms por búsqueda.
+- Índice en memoria, 10k documentos: p95 < 10ms por búsqueda (corpus denso de homónimos).
+"""
+import heapq
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.eventos import EventoCambio, bus_cambios
+from app.models.entities import Especialidad, Paciente, Profesional
+from app.utils.texto import normalizar_nombre, trigramas
+
+TIPOS_BUSQUEDA = ("paciente", "profesional", "especialidad")
+UMBRAL_SIMILITUD = 0.3
+
+
+@dataclass
+class ResultadoBusqueda:
+    tipo: str
+    id: int
+    nombre: str
+    puntaje: float
+
+
+class IndiceBusquedaMemoria:
+    """Índice invertido de trigramas en memoria (fallback sin pg_trgm)"""
+
+    # Los campos extra (descripción) pesan menos que el nombre, como ts_rank frente a similarity
+    PESO_TEXTO = 0.8
+
+    def __init__(self, umbral: float = UMBRAL_SIMILITUD):
+        self.umbral = umbral
+        # clave -> (nombre original, cantidad de trigramas del nombre, trigramas de nombre y de texto)
+        self._documentos: Dict[Tuple[str, int], Tuple[str, int, Set[str], Set[str]]] = {}
+        self._por_nombre: Dict[str, Set[Tuple[str, int]]] = defaultdict(set)
+        self._por_texto: Dict[str, Set[Tuple[str, int]]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._documentos)
+
+    def agregar(self, tipo: str, id: int, nombre: str, *textos: Optional[str]) -> None:
+        """Indexar (o reindexar) un documento; `textos` son campos extra como la descripción"""
+        self.quitar(tipo, id)
+        clave = (tipo, id)
+        tri_nombre = trigramas(normalizar_nombre(nombre))
+        tri_texto = trigramas(normalizar_nombre(" ".join(t for t in textos if t)))
+        self._documentos[clave] = (nombre, len(tri_nombre), tri_nombre, tri_texto)
+        for t in tri_nombre:
+            self._por_nombre[t].add(clave)
+        for t in tri_texto:
+            self._por_texto[t].add(clave)
+
+    def quitar(self, tipo: str, id: int) -> None:
+        anterior = self._documentos.pop((tipo, id), None)
+        if anterior is None:
+            return
+        for invertido, tri in ((self._por_nombre, anterior[2]), (self._por_texto, anterior[3])):
+            for t in tri:
+                claves = invertido.get(t)
+                if claves is not None:
+                    claves.discard((tipo, id))
+                    if not claves:
+                        del invertido[t]
+
+    def buscar(
+        self,
+        consulta: str,
+        *,
+        tipos: Iterable[str] = TIPOS_BUSQUEDA,
+        limite: int = 10
+    ) -> List[ResultadoBusqueda]:
+        tri_consulta = trigramas(normalizar_nombre(consulta))
+        if not tri_consulta:
+            return []
+        tipos = set(tipos)
+        total = len(tri_consulta)
+
+        # Conteo de trigramas en común recorriendo sólo las listas invertidas
+        en_nombre, en_texto = Counter(), Counter()
+        for t in tri_consulta:
+            en_nombre.update(self._por_nombre.get(t, ()))
+            en_texto.update(self._por_texto.get(t, ()))
+
+        # El puntaje nunca supera la cobertura, así que se descarta lo que no llega al umbral
+        minimo = self.umbral * total
+        puntajes: Dict[Tuple[str, int], float] = {}
+        for clave, comunes in en_nombre.items():
+            if comunes >= minimo and clave[0] in tipos:
+                union = total + self._documentos[clave][1] - comunes
+                # Mezcla de cobertura de la consulta (como word_similarity) y Jaccard
+                puntajes[clave] = 0.7 * comunes / total + 0.3 * comunes / union
+        for clave, comunes in en_texto.items():
+            if comunes >= minimo and clave[0] in tipos:
+                puntajes[clave] = max(puntajes.get(clave, 0.0), self.PESO_TEXTO * comunes / total)
+
+        mejores = heapq.nlargest(
+            limite,
+            ((p, clave) for clave, p in puntajes.items() if p >= self.umbral),
+            key=lambda item: (item[0], -item[1][1]),
+        )
+        resultados = [
+            ResultadoBusqueda(clave[0], clave[1], self._documentos[clave][0], round(p, 4))
+            for p, clave in mejores
+        ]
+        resultados.sort(key=lambda r: (-r.puntaje, r.nombre))
+        return resultados
+
+
+# Consultas PostgreSQL; :q llega ya normalizado (minúsculas, sin acentos ni tratamientos)
+_SQL_NOMBRE = """
+    SELECT :tipo AS tipo, id, nombre,
+           word_similarity(:q, f_unaccent(lower(nombre))) AS puntaje
+    FROM {tabla}
+    WHERE :q <% f_unaccent(lower(nombre))
+    ORDER BY puntaje DESC, nombre
+    LIMIT :limite
+"""
+
+_SQL_ESPECIALIDAD = """
+    SELECT 'especialidad' AS tipo, id, nombre,
+           greatest(
+               word_similarity(:q, f_unaccent(lower(nombre))),
+               ts_rank(
+                   to_tsvector('spanish', f_unaccent(coalesce(nombre, '') || ' ' || coalesce(descripcion, ''))),
+                   plainto_tsquery('spanish', :q)
+               )
+           ) AS puntaje
+    FROM especialidades
+    WHERE :q <% f_unaccent(lower(nombre))
+       OR to_tsvector('spanish', f_unaccent(coalesce(nombre, '') || ' ' || coalesce(descripcion, '')))
+          @@ plainto_tsquery('spanish', :q)
+    ORDER BY puntaje DESC, nombre
+    LIMIT :limite
+"""
+
+_TABLAS_NOMBRE = {"paciente": "pacientes", "profesional": "profesionales"}
+_TIPOS_ENTIDAD = {"pacientes": "paciente", "profesionales": "profesional", "especialidades": "especialidad"}
+_MODELOS = {"paciente": Paciente, "profesional": Profesional, "especialidad": Especialidad}
+
+
+class Buscador:
+    """Punto de entrada de la búsqueda: PostgreSQL si está disponible, si no índice en memoria"""
+
+    # Con más ids pendientes que esto conviene recargar el índice entero
+    MAXIMO_PENDIENTES = 1000
+
+    def __init__(self, umbral: float = UMBRAL_SIMILITUD):
+        self.umbral = umbral
+        self.indice: Optional[IndiceBusquedaMemoria] = None
+        self._pendientes: Dict[str, Set[int]] = defaultdict(set)
+        self._desuscribir = None
+
+    def invalidar(self) -> None:
+        """Descartar el índice en memoria; se reconstruye en la próxima búsqueda"""
+        self.indice = None
+        self._pendientes.clear()
+
+    # Actualización incremental
+    def al_cambiar(self, evento: EventoCambio) -> None:
+        """Suscriptor del bus de cambios: anotar qué releer en la próxima búsqueda"""
+        tipo = _TIPOS_ENTIDAD.get(evento.entidad)
+        if tipo is None or self.indice is None:
+            return
+        pendientes = self._pendientes[tipo]
+        pendientes.update(int(i) for i in evento.ids)
+        if not evento.ids or len(pendientes) > self.MAXIMO_PENDIENTES:
+            self.invalidar()
+
+    def suscribir(self) -> "Buscador":
+        if self._desuscribir is None:
+            self._desuscribir = bus_cambios.suscribir(self.al_cambiar, entidades=list(_TIPOS_ENTIDAD))
+        return self
+
+    def desuscribir(self) -> None:
+        if self._desuscribir is not None:
+            self._desuscribir()
+            self._desuscribir = None
+
+    async def aplicar_pendientes(self, db: AsyncSession) -> int:
+        """Releer por PK los documentos que cambiaron y reindexarlos (o quitarlos si ya no están)"""
+        pendientes, self._pendientes = self._pendientes, defaultdict(set)
+        if self.indice is None:
+            return 0
+        for tipo, ids in pendientes.items():
+            modelo = _MODELOS[tipo]
+            columnas = [modelo.id, modelo.nombre]
+            if tipo == "especialidad":
+                columnas.append(Especialidad.descripcion)
+            filas = {fila.id: fila for fila in (await db.execute(select(*columnas).filter(modelo.id.in_(ids)))).all()}
+            for id in ids:
+                fila = filas.get(id)
+                if fila is None:
+                    self.indice.quitar(tipo, id)
+                else:
+                    self.indice.agregar(tipo, id, *fila[1:])
+        return sum(len(ids) for ids in pendientes.values())
+
+    async def cargar_indice(self, db: AsyncSession) -> IndiceBusquedaMemoria:
+        indice = IndiceBusquedaMemoria(self.umbral)
+        self._pendientes.clear()
+        for p in (await db.execute(select(Paciente.id, Paciente.nombre))).all():
+            indice.agregar("paciente", p.id, p.nombre)
+        for p in (await db.execute(select(Profesional.id, Profesional.nombre))).all():
+            indice.agregar("profesional", p.id, p.nombre)
+        for e in (await db.execute(select(Especialidad.id, Especialidad.nombre, Especialidad.descripcion))).all():
+            indice.agregar("especialidad", e.id, e.nombre, e.descripcion)
+        self.indice = indice
+        return indice
+
+    async def buscar(
+        self,
+        db: AsyncSession,
+        consulta: str,
+        *,
+        tipos: Iterable[str] = TIPOS_BUSQUEDA,
+        limite: int = 10
+    ) -> List[ResultadoBusqueda]:
+        """Resultados de todos los `tipos`, ordenados por puntaje"""
+        tipos = [t for t in tipos if t in TIPOS_BUSQUEDA]
+        if db.get_bind().dialect.name != "postgresql":
+            if self.indice is None:
+                await self.cargar_indice(db)
+            elif self._pendientes:
+                await self.aplicar_pendientes(db)
+            indice = self.indice
+            return indice.buscar(consulta, tipos=tipos, limite=limite)
+
+        q = normalizar_nombre(consulta)
+        if not q:
+            return []
+        await db.execute(text(f"SET LOCAL pg_trgm.word_similarity_threshold = {float(self.umbral)}"))
+        resultados = []
+        for tipo in tipos:
+            if tipo == "especialidad":
+                sql = _SQL_ESPECIALIDAD
+            else:
+                sql = _SQL_NOMBRE.format(tabla=_TABLAS_NOMBRE[tipo])
+            result = await db.execute(text(sql), {"tipo": tipo, "q": q, "limite": limite})
+            resultados.extend(
+                ResultadoBusqueda(r.tipo, r.id, r.nombre, round(float(r.puntaje), 4)) for r in result.all()
+            )
+        resultados.sort(key=lambda r: (-r.puntaje, r.nombre))
+        return resultados[:limite]
+
+
+# Instancia global del buscador
+buscador = Buscador()
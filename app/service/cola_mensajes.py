@@ -0,0 +1,283 @@
+"""Cola durable de mensajes entrantes de WhatsApp.
+
+El webhook sólo publica; los workers (app/service/workers_mensajes.py) consumen con
+grupos de consumidores, confirman (ack) lo procesado y mandan a dead-letter lo que
+falla demasiadas veces. En producción la cola es un Redis Stream; ColaMensajesMemoria
+implementa la misma semántica en memoria para tests y desarrollo.
+
+Con COLA_MENSAJES_PARTICIONES > 1 el stream se divide en `<stream>:<n>` y cada mensaje va
+a la partición de su clave (el wa_id). Si cada partición la consume un único proceso, los
+mensajes de un mismo usuario se procesan en orden aunque haya varios procesos de workers.
+"""
+import asyncio
+import itertools
+import json
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Collection, Deque, Dict, Iterable, List, Optional, Tuple
+
+import redis.asyncio as aioredis
+from redis.exceptions import ResponseError
+
+from app.config import Config
+from app.core.redis_async import crear_cliente_redis
+
+
+def particion_de(clave: Optional[str], particiones: int) -> int:
+    """Partición estable de una clave (crc32: igual en todos los procesos, a diferencia de hash())"""
+    if particiones <= 1 or not clave:
+        return 0
+    return zlib.crc32(clave.encode()) % particiones
+
+
+@dataclass
+class MensajeCola:
+    id: str
+    datos: Dict[str, Any]
+    entregas: int = 1
+    stream: Optional[str] = None
+
+
+class ColaMensajes(ABC):
+    """Interfaz común de las colas de mensajes"""
+
+    async def asegurar_grupo(self) -> None:
+        """Crear el grupo de consumidores si no existe"""
+
+    @abstractmethod
+    async def publicar(self, datos: Dict[str, Any], *, clave: Optional[str] = None) -> str:
+        """Agregar un mensaje; `clave` elige la partición (mismo orden para la misma clave)"""
+
+    @abstractmethod
+    async def leer(self, consumidor: str, *, cantidad: int = 10, bloqueo_ms: int = 1000) -> List[MensajeCola]:
+        """Mensajes nuevos para `consumidor` (esperando hasta `bloqueo_ms` si no hay)"""
+
+    @abstractmethod
+    async def reclamar(
+        self, consumidor: str, *, inactividad_ms: int, cantidad: int = 10, excluir: Collection[str] = ()
+    ) -> List[MensajeCola]:
+        """Tomar mensajes entregados y no confirmados hace más de `inactividad_ms`.
+
+        `excluir` son los ids que el consumidor ya tiene en mano (en cola local o en proceso):
+        esos no se reclaman aunque lleven más que `inactividad_ms` esperando.
+        """
+
+    @abstractmethod
+    async def renovar(self, consumidor: str, mensajes: List[MensajeCola]) -> None:
+        """Reiniciar la inactividad de mensajes que `consumidor` todavía tiene en mano, para
+        que otro consumidor no los reclame mientras esperan su turno"""
+
+    @abstractmethod
+    async def confirmar(self, mensaje: MensajeCola) -> None:
+        """Marcar un mensaje como procesado"""
+
+    @abstractmethod
+    async def enviar_a_dead_letter(self, mensaje: MensajeCola, error: str) -> None:
+        """Sacar un mensaje de la cola y guardarlo en la dead-letter"""
+
+    async def cerrar(self) -> None:
+        pass
+
+
+class ColaMensajesRedis(ColaMensajes):
+    """Redis Stream + consumer group; la dead-letter es otro stream `<stream>:dlq`
+
+    `propias` son las particiones que lee esta instancia (por defecto todas); publicar
+    puede hacerlo en cualquiera.
+    """
+
+    def __init__(
+        self,
+        cliente: aioredis.Redis,
+        stream: str,
+        grupo: str,
+        *,
+        particiones: int = 1,
+        propias: Optional[Iterable[int]] = None,
+        max_largo: int = 100_000,
+        cerrar_cliente: bool = True
+    ):
+        self.cliente = cliente
+        self.cerrar_cliente = cerrar_cliente  # False si el cliente es compartido
+        self.stream = stream
+        self.stream_dlq = f"{stream}:dlq"
+        self.grupo = grupo
+        self.particiones = particiones
+        self.streams = [self.stream_particion(p) for p in (propias if propias is not None else range(particiones))]
+        self.max_largo = max_largo
+
+    def stream_particion(self, particion: int) -> str:
+        return self.stream if self.particiones <= 1 else f"{self.stream}:{particion}"
+
+    async def asegurar_grupo(self) -> None:
+        for stream in self.streams:
+            try:
+                await self.cliente.xgroup_create(stream, self.grupo, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    async def publicar(self, datos: Dict[str, Any], *, clave: Optional[str] = None) -> str:
+        stream = self.stream_particion(particion_de(clave, self.particiones))
+        return await self.cliente.xadd(
+            stream, {"datos": json.dumps(datos)}, maxlen=self.max_largo, approximate=True
+        )
+
+    async def leer(self, consumidor: str, *, cantidad: int = 10, bloqueo_ms: int = 1000) -> List[MensajeCola]:
+        respuesta = await self.cliente.xreadgroup(
+            self.grupo, consumidor, {stream: ">" for stream in self.streams}, count=cantidad, block=bloqueo_ms
+        )
+        return [
+            MensajeCola(id=id_mensaje, datos=json.loads(campos["datos"]), stream=stream)
+            for stream, entradas in respuesta or []
+            for id_mensaje, campos in entradas
+        ]
+
+    async def reclamar(
+        self, consumidor: str, *, inactividad_ms: int, cantidad: int = 10, excluir: Collection[str] = ()
+    ) -> List[MensajeCola]:
+        # XPENDING filtrado por inactividad y después XCLAIM de lo que no está en `excluir`
+        # (XAUTOCLAIM tomaría también los mensajes propios que esperan en un shard)
+        excluir = set(excluir)
+        mensajes = []
+        for stream in self.streams:
+            if len(mensajes) >= cantidad:
+                break
+            pendientes = await self.cliente.xpending_range(
+                stream, self.grupo, min="-", max="+", count=cantidad - len(mensajes) + len(excluir),
+                idle=inactividad_ms
+            )
+            entregas = {
+                p["message_id"]: p["times_delivered"] for p in pendientes if p["message_id"] not in excluir
+            }
+            if not entregas:
+                continue
+            ids = list(entregas)[:cantidad - len(mensajes)]
+            # min_idle_time de nuevo: si otro consumidor lo tomó en el medio, XCLAIM no lo devuelve
+            entradas = await self.cliente.xclaim(stream, self.grupo, consumidor, inactividad_ms, ids)
+            for id_mensaje, campos in entradas or []:
+                if not campos:
+                    continue  # la entrada se recortó del stream (MAXLEN) antes de procesarse
+                mensajes.append(MensajeCola(
+                    id=id_mensaje, datos=json.loads(campos["datos"]), entregas=entregas[id_mensaje] + 1, stream=stream
+                ))
+        return mensajes
+
+    async def renovar(self, consumidor: str, mensajes: List[MensajeCola]) -> None:
+        por_stream: Dict[str, List[str]] = {}
+        for mensaje in mensajes:
+            por_stream.setdefault(mensaje.stream or self.stream, []).append(mensaje.id)
+        for stream, ids in por_stream.items():
+            # JUSTID: reinicia la inactividad sin contar una entrega más
+            await self.cliente.xclaim(stream, self.grupo, consumidor, 0, ids, justid=True)
+
+    async def confirmar(self, mensaje: MensajeCola) -> None:
+        await self.cliente.xack(mensaje.stream or self.stream, self.grupo, mensaje.id)
+
+    async def enviar_a_dead_letter(self, mensaje: MensajeCola, error: str) -> None:
+        async with self.cliente.pipeline(transaction=True) as pipe:
+            pipe.xadd(self.stream_dlq, {
+                "datos": json.dumps(mensaje.datos),
+                "id_original": mensaje.id,
+                "entregas": mensaje.entregas,
+                "error": error[:1000],
+            })
+            pipe.xack(mensaje.stream or self.stream, self.grupo, mensaje.id)
+            await pipe.execute()
+
+    async def cerrar(self) -> None:
+        if self.cerrar_cliente:
+            await self.cliente.aclose()
+
+
+class ColaMensajesMemoria(ColaMensajes):
+    """Misma semántica que ColaMensajesRedis, en memoria del proceso (tests, desarrollo)"""
+
+    def __init__(self):
+        self._secuencia = itertools.count(1)
+        self._nuevos: Deque[Tuple[str, Dict[str, Any]]] = deque()
+        # id -> [mensaje, consumidor, momento de la última entrega]
+        self._pendientes: Dict[str, list] = {}
+        self._hay_nuevos = asyncio.Event()
+        self.dead_letter: List[Dict[str, Any]] = []
+
+    @property
+    def cantidad_pendientes(self) -> int:
+        return len(self._nuevos) + len(self._pendientes)
+
+    async def publicar(self, datos: Dict[str, Any], *, clave: Optional[str] = None) -> str:
+        # Un solo proceso: el orden global ya respeta el de cada clave
+        id_mensaje = f"{next(self._secuencia)}-0"
+        # Se copia como lo haría la serialización a Redis
+        self._nuevos.append((id_mensaje, json.loads(json.dumps(datos))))
+        self._hay_nuevos.set()
+        return id_mensaje
+
+    async def leer(self, consumidor: str, *, cantidad: int = 10, bloqueo_ms: int = 1000) -> List[MensajeCola]:
+        if not self._nuevos:
+            self._hay_nuevos.clear()
+            try:
+                await asyncio.wait_for(self._hay_nuevos.wait(), bloqueo_ms / 1000)
+            except asyncio.TimeoutError:
+                return []
+        mensajes = []
+        while self._nuevos and len(mensajes) < cantidad:
+            id_mensaje, datos = self._nuevos.popleft()
+            mensaje = MensajeCola(id=id_mensaje, datos=datos)
+            self._pendientes[id_mensaje] = [mensaje, consumidor, time.monotonic()]
+            mensajes.append(mensaje)
+        return mensajes
+
+    async def reclamar(
+        self, consumidor: str, *, inactividad_ms: int, cantidad: int = 10, excluir: Collection[str] = ()
+    ) -> List[MensajeCola]:
+        limite = time.monotonic() - inactividad_ms / 1000
+        mensajes = []
+        for id_mensaje, pendiente in self._pendientes.items():
+            if len(mensajes) >= cantidad:
+                break
+            mensaje, _, desde = pendiente
+            if desde <= limite and id_mensaje not in excluir:
+                mensaje.entregas += 1
+                pendiente[1:] = [consumidor, time.monotonic()]
+                mensajes.append(mensaje)
+        return mensajes
+
+    async def renovar(self, consumidor: str, mensajes: List[MensajeCola]) -> None:
+        for mensaje in mensajes:
+            pendiente = self._pendientes.get(mensaje.id)
+            if pendiente is not None:
+                pendiente[1:] = [consumidor, time.monotonic()]
+
+    async def confirmar(self, mensaje: MensajeCola) -> None:
+        self._pendientes.pop(mensaje.id, None)
+
+    async def enviar_a_dead_letter(self, mensaje: MensajeCola, error: str) -> None:
+        self._pendientes.pop(mensaje.id, None)
+        self.dead_letter.append({
+            "datos": mensaje.datos,
+            "id_original": mensaje.id,
+            "entregas": mensaje.entregas,
+            "error": error,
+        })
+
+
+def crear_cola_mensajes(
+    backend: str = Config.COLA_MENSAJES_BACKEND,
+    propias: Optional[Iterable[int]] = None,
+    cliente: Optional[aioredis.Redis] = None
+) -> ColaMensajes:
+    """Cola según el backend configurado; la instancia del proceso vive en app/core/recursos.py"""
+    if backend == "memoria":
+        return ColaMensajesMemoria()
+    return ColaMensajesRedis(
+        cliente or crear_cliente_redis(),
+        Config.COLA_MENSAJES_STREAM,
+        Config.COLA_MENSAJES_GRUPO,
+        particiones=Config.COLA_MENSAJES_PARTICIONES,
+        propias=propias,
+        cerrar_cliente=cliente is None,
+    )
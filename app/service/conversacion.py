@@ -0,0 +1,391 @@
+"""Motor de conversación del bot: flujos compilados por clínica y estados compactos.
+
+Un flujo se compila una vez por clínica a partir de `Clinica.configuraciones` y del catálogo
+de especialidades: mensajes ya armados, especialidades normalizadas (y sus alias) en un dict
+y la tabla de qué paso sigue a cuál. Ejecutar un paso es una función pura de (flujo, estado,
+entrada) -> Paso: no consulta la base. Lo que necesita I/O (buscar el paciente por DNI, los
+horarios libres, reservar) se devuelve como un Efecto; quien llama lo ejecuta y vuelve a
+llamar a `paso` con el resultado (ver `conversar`).
+
+Configuración reconocida en `configuraciones`:
+    turnos_online: false            -> se deriva a recepción después del saludo
+    flujo.identificar_paciente      -> pedir DNI antes de la especialidad (true)
+    flujo.intentos_maximos          -> respuestas inválidas seguidas antes de derivar (3)
+    flujo.opciones_horario          -> horarios que se ofrecen (5)
+    flujo.alias_especialidades      -> {"cardio": "Cardiología", ...}
+    flujo.mensajes                  -> reemplazos de MENSAJES
+
+El estado se guarda en la sesión del usuario (redis_session) como una lista corta
+[huella del flujo, nodo, intentos, efecto pendiente, datos].
+"""
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.eventos import EventoCambio, bus_cambios
+from app.repositories.redis_session import get_user_session, set_user_session
+from app.repositories.repositories import clinica_repo, especialidad_repo
+from app.utils.texto import normalizar_texto
+
+# Nodos del flujo de reserva
+SALUDO = "saludo"
+IDENTIFICAR = "identificar"
+ESPECIALIDAD = "especialidad"
+HORARIO = "horario"
+CONFIRMAR = "confirmar"
+FIN = "fin"
+DERIVADO = "derivado"
+
+# Efectos que resuelve quien ejecuta el flujo
+BUSCAR_PACIENTE = "buscar_paciente"  # {"dni"} -> id de paciente o None
+BUSCAR_HORARIOS = "buscar_horarios"  # {"especialidad", "cantidad"} -> [{"inicio", "id_profesional", "profesional"}]
+RESERVAR = "reservar"  # {"id_paciente", "id_profesional", "inicio"} -> True si se reservó
+
+MENSAJES = {
+    "saludo": "¡Hola! Soy el asistente de {clinica}.",
+    "pedir_dni": "Para empezar, ¿me decís tu DNI?",
+    "dni_invalido": "No reconozco ese DNI. Escribilo sólo con números, por favor.",
+    "paciente_no_encontrado": "No encontré un paciente con DNI {dni}. Revisalo y volvé a escribirlo.",
+    "pedir_especialidad": "¿Para qué especialidad querés el turno?\n{opciones}",
+    "especialidad_invalida": "No tenemos esa especialidad. Elegí una de la lista:\n{opciones}",
+    "sin_horarios": "No hay horarios disponibles para {especialidad}. ¿Querés otra especialidad?",
+    "pedir_horario": "Estos son los próximos horarios de {especialidad}:\n{opciones}\nRespondé con el número.",
+    "horario_invalido": "Respondé con un número del 1 al {cantidad}.",
+    "pedir_confirmacion": "¿Confirmás el turno de {especialidad} el {horario}? (sí/no)",
+    "confirmacion_invalida": "Respondé sí o no, por favor.",
+    "confirmado": "¡Listo! Tu turno de {especialidad} quedó reservado para el {horario}.",
+    "no_reservado": "Ese horario ya no está disponible.",
+    "cancelado": "Listo, cancelé la reserva. Escribí cuando quieras empezar de nuevo.",
+    "derivado": "Te comunico con una persona de la clínica.",
+    "sin_turnos_online": "Esta clínica no da turnos por WhatsApp. Te comunico con recepción.",
+}
+
+PALABRAS_CANCELAR = frozenset({"cancelar", "salir", "menu", "inicio", "empezar de nuevo"})
+PALABRAS_SI = frozenset({"si", "s", "dale", "ok", "confirmo", "confirmar", "de acuerdo"})
+PALABRAS_NO = frozenset({"no", "n", "otro", "otra", "cambiar"})
+DIAS_ABREVIADOS = ("lun", "mar", "mié", "jue", "vie", "sáb", "dom")
+
+_DNI = re.compile(r"^\d{7,8}$")
+
+
+@dataclass(frozen=True)
+class Efecto:
+    nombre: str
+    datos: Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class Entrada:
+    """Un mensaje del usuario (`texto`) o el resultado del efecto pendiente"""
+    texto: Optional[str] = None
+    resultado: Any = None
+
+    @property
+    def es_texto(self) -> bool:
+        return self.texto is not None
+
+
+@dataclass
+class EstadoConversacion:
+    nodo: str = SALUDO
+    intentos: int = 0
+    pendiente: Optional[str] = None  # nombre del efecto cuyo resultado se espera
+    # Claves cortas: p=id_paciente, d=dni, e=especialidad, o=horarios ofrecidos, h=horario elegido
+    datos: Dict[str, Any] = field(default_factory=dict)
+
+    def a_snapshot(self, huella: str) -> list:
+        return [huella, self.nodo, self.intentos, self.pendiente, self.datos]
+
+    @classmethod
+    def desde_snapshot(cls, snapshot: Optional[list], flujo: "FlujoCompilado") -> "EstadoConversacion":
+        """Estado guardado, o uno nuevo si no hay o su nodo no existe en el flujo actual"""
+        if not snapshot:
+            return cls()
+        huella, nodo, intentos, pendiente, datos = snapshot
+        if huella != flujo.huella and nodo not in flujo.manejadores:
+            return cls()
+        return cls(nodo, intentos, pendiente, datos)
+
+
+@dataclass(frozen=True)
+class Paso:
+    estado: EstadoConversacion
+    respuestas: Tuple[str, ...] = ()
+    efecto: Optional[Efecto] = None
+
+
+Manejador = Callable[["FlujoCompilado", EstadoConversacion, Entrada], Paso]
+
+
+@dataclass
+class FlujoCompilado:
+    id_clinica: int
+    huella: str
+    mensajes: Dict[str, str]
+    especialidades: Dict[str, str]  # texto normalizado (nombre, alias o número del menú) -> nombre
+    siguiente: Dict[str, str]  # nodo -> nodo al que se pasa cuando se completa
+    manejadores: Dict[str, Manejador]
+    intentos_maximos: int = 3
+    opciones_horario: int = 5
+
+    def paso(self, estado: EstadoConversacion, entrada: Entrada) -> Paso:
+        """Transición pura: no modifica `estado` ni accede a la base"""
+        if entrada.es_texto and normalizar_texto(entrada.texto) in PALABRAS_CANCELAR and estado.nodo != SALUDO:
+            return Paso(EstadoConversacion(), (self.mensajes["cancelado"],))
+        return self.manejadores[estado.nodo](self, estado, entrada)
+
+
+def _formatear_horario(inicio: str) -> str:
+    momento = datetime.fromisoformat(inicio)
+    return f"{DIAS_ABREVIADOS[momento.weekday()]} {momento:%d/%m %H:%M}"
+
+
+def _menu(opciones: Iterable[str]) -> str:
+    return "\n".join(f"{i}. {opcion}" for i, opcion in enumerate(opciones, start=1))
+
+
+def _reintentar(flujo: FlujoCompilado, estado: EstadoConversacion, mensaje: str) -> Paso:
+    intentos = estado.intentos + 1
+    if intentos >= flujo.intentos_maximos:
+        return Paso(replace(estado, nodo=DERIVADO, intentos=0, pendiente=None), (flujo.mensajes["derivado"],))
+    return Paso(replace(estado, intentos=intentos, pendiente=None), (mensaje,))
+
+
+def _avanzar(flujo: FlujoCompilado, estado: EstadoConversacion, desde: str, datos: Dict[str, Any], *previas: str) -> Paso:
+    """Pasar al nodo siguiente a `desde` con su pregunta inicial"""
+    nodo = flujo.siguiente[desde]
+    estado = EstadoConversacion(nodo, 0, None, datos)
+    if nodo == IDENTIFICAR:
+        return Paso(estado, (*previas, flujo.mensajes["pedir_dni"]))
+    if nodo == ESPECIALIDAD:
+        return Paso(estado, (*previas, flujo.mensajes["pedir_especialidad"]))
+    if nodo == DERIVADO:
+        return Paso(estado, (*previas, flujo.mensajes["sin_turnos_online"]))
+    return Paso(estado, previas)
+
+
+def _buscar_horarios(flujo: FlujoCompilado, estado: EstadoConversacion, datos: Dict[str, Any], *previas: str) -> Paso:
+    efecto = Efecto(BUSCAR_HORARIOS, {"especialidad": datos["e"], "cantidad": flujo.opciones_horario})
+    return Paso(EstadoConversacion(ESPECIALIDAD, estado.intentos, BUSCAR_HORARIOS, datos), previas, efecto)
+
+
+def _saludo(flujo: FlujoCompilado, estado: EstadoConversacion, entrada: Entrada) -> Paso:
+    return _avanzar(flujo, estado, SALUDO, {}, flujo.mensajes["saludo"])
+
+
+def _identificar(flujo: FlujoCompilado, estado: EstadoConversacion, entrada: Entrada) -> Paso:
+    if estado.pendiente == BUSCAR_PACIENTE and not entrada.es_texto:
+        if entrada.resultado is None:
+            return _reintentar(flujo, estado, flujo.mensajes["paciente_no_encontrado"].format(dni=estado.datos["d"]))
+        return _avanzar(flujo, estado, IDENTIFICAR, {**estado.datos, "p": entrada.resultado})
+    dni = re.sub(r"[\s.\-]", "", entrada.texto or "")
+    if not _DNI.match(dni):
+        return _reintentar(flujo, estado, flujo.mensajes["dni_invalido"])
+    return Paso(
+        replace(estado, pendiente=BUSCAR_PACIENTE, datos={**estado.datos, "d": dni}),
+        efecto=Efecto(BUSCAR_PACIENTE, {"dni": dni}),
+    )
+
+
+def _especialidad(flujo: FlujoCompilado, estado: EstadoConversacion, entrada: Entrada) -> Paso:
+    if estado.pendiente == BUSCAR_HORARIOS and not entrada.es_texto:
+        especialidad = estado.datos["e"]
+        horarios = list(entrada.resultado or ())[:flujo.opciones_horario]
+        if not horarios:
+            datos = {k: v for k, v in estado.datos.items() if k != "e"}
+            return Paso(EstadoConversacion(ESPECIALIDAD, 0, None, datos),
+                        (flujo.mensajes["sin_horarios"].format(especialidad=especialidad),))
+        ofrecidos = [
+            [h["inicio"] if isinstance(h["inicio"], str) else h["inicio"].isoformat(), h["id_profesional"], h.get("profesional")]
+            for h in horarios
+        ]
+        opciones = _menu(
+            f"{_formatear_horario(inicio)} - {profesional}" if profesional else _formatear_horario(inicio)
+            for inicio, _, profesional in ofrecidos
+        )
+        return Paso(
+            EstadoConversacion(HORARIO, 0, None, {**estado.datos, "o": ofrecidos}),
+            (flujo.mensajes["pedir_horario"].format(especialidad=especialidad, opciones=opciones),),
+        )
+    especialidad = flujo.especialidades.get(normalizar_texto(entrada.texto or ""))
+    if especialidad is None:
+        return _reintentar(flujo, estado, flujo.mensajes["especialidad_invalida"])
+    return _buscar_horarios(flujo, estado, {**estado.datos, "e": especialidad})
+
+
+def _horario(flujo: FlujoCompilado, estado: EstadoConversacion, entrada: Entrada) -> Paso:
+    ofrecidos = estado.datos["o"]
+    texto = normalizar_texto(entrada.texto or "")
+    if not texto.isdigit() or not 1 <= int(texto) <= len(ofrecidos):
+        return _reintentar(flujo, estado, flujo.mensajes["horario_invalido"].format(cantidad=len(ofrecidos)))
+    elegido = ofrecidos[int(texto) - 1]
+    mensaje = flujo.mensajes["pedir_confirmacion"].format(
+        especialidad=estado.datos["e"], horario=_formatear_horario(elegido[0])
+    )
+    return Paso(EstadoConversacion(CONFIRMAR, 0, None, {**estado.datos, "h": elegido}), (mensaje,))
+
+
+def _confirmar(flujo: FlujoCompilado, estado: EstadoConversacion, entrada: Entrada) -> Paso:
+    datos = estado.datos
+    if estado.pendiente == RESERVAR and not entrada.es_texto:
+        if not entrada.resultado:
+            sin_horario = {k: v for k, v in datos.items() if k not in ("o", "h")}
+            return _buscar_horarios(flujo, estado, sin_horario, flujo.mensajes["no_reservado"])
+        mensaje = flujo.mensajes["confirmado"].format(especialidad=datos["e"], horario=_formatear_horario(datos["h"][0]))
+        return Paso(EstadoConversacion(FIN, 0, None, {"p": datos.get("p")}), (mensaje,))
+    texto = normalizar_texto(entrada.texto or "")
+    if texto in PALABRAS_SI:
+        inicio, id_profesional, _ = datos["h"]
+        efecto = Efecto(RESERVAR, {"id_paciente": datos.get("p"), "id_profesional": id_profesional, "inicio": inicio})
+        return Paso(replace(estado, pendiente=RESERVAR), efecto=efecto)
+    if texto in PALABRAS_NO:
+        sin_eleccion = {k: v for k, v in datos.items() if k not in ("e", "o", "h")}
+        return Paso(EstadoConversacion(ESPECIALIDAD, 0, None, sin_eleccion), (flujo.mensajes["pedir_especialidad"],))
+    return _reintentar(flujo, estado, flujo.mensajes["confirmacion_invalida"])
+
+
+def _fin(flujo: FlujoCompilado, estado: EstadoConversacion, entrada: Entrada) -> Paso:
+    # Un mensaje después de reservar empieza otra conversación (conservando el paciente)
+    if estado.datos.get("p") is not None and flujo.siguiente[SALUDO] == IDENTIFICAR:
+        return _avanzar(flujo, estado, IDENTIFICAR, {"p": estado.datos["p"]}, flujo.mensajes["saludo"])
+    return _saludo(flujo, estado, entrada)
+
+
+def _derivado(flujo: FlujoCompilado, estado: EstadoConversacion, entrada: Entrada) -> Paso:
+    # La conversación la sigue una persona: el bot no responde hasta que se cancele
+    return Paso(estado)
+
+
+MANEJADORES: Dict[str, Manejador] = {
+    SALUDO: _saludo,
+    IDENTIFICAR: _identificar,
+    ESPECIALIDAD: _especialidad,
+    HORARIO: _horario,
+    CONFIRMAR: _confirmar,
+    FIN: _fin,
+    DERIVADO: _derivado,
+}
+
+
+def compilar_flujo(id_clinica: int, nombre_clinica: str, configuraciones: Optional[Dict[str, Any]], especialidades: List[str]) -> FlujoCompilado:
+    configuraciones = configuraciones or {}
+    opciones = configuraciones.get("flujo") or {}
+    huella = hashlib.sha1(json.dumps(
+        [nombre_clinica, configuraciones.get("turnos_online", True), opciones, sorted(especialidades)],
+        sort_keys=True, default=str,
+    ).encode()).hexdigest()[:10]
+
+    nombres = sorted(set(especialidades))
+    menu = _menu(nombres)
+    mensajes = {**MENSAJES, **(opciones.get("mensajes") or {})}
+    mensajes = {
+        clave: texto.format(clinica=nombre_clinica, opciones=menu) if clave in ("saludo", "pedir_especialidad", "especialidad_invalida") else texto
+        for clave, texto in mensajes.items()
+    }
+
+    indice = {normalizar_texto(nombre): nombre for nombre in nombres}
+    indice.update((str(i), nombre) for i, nombre in enumerate(nombres, start=1))
+    for alias, nombre in (opciones.get("alias_especialidades") or {}).items():
+        if nombre in indice.values():
+            indice[normalizar_texto(alias)] = nombre
+
+    if configuraciones.get("turnos_online", True) is False:
+        siguiente = {SALUDO: DERIVADO}
+    elif opciones.get("identificar_paciente", True):
+        siguiente = {SALUDO: IDENTIFICAR, IDENTIFICAR: ESPECIALIDAD}
+    else:
+        siguiente = {SALUDO: ESPECIALIDAD}
+    alcanzables = {SALUDO, FIN, DERIVADO, *siguiente.values()}
+    if ESPECIALIDAD in alcanzables:
+        alcanzables |= {HORARIO, CONFIRMAR}
+
+    return FlujoCompilado(
+        id_clinica=id_clinica,
+        huella=huella,
+        mensajes=mensajes,
+        especialidades=indice,
+        siguiente=siguiente,
+        manejadores={nodo: manejador for nodo, manejador in MANEJADORES.items() if nodo in alcanzables},
+        intentos_maximos=int(opciones.get("intentos_maximos", 3)),
+        opciones_horario=int(opciones.get("opciones_horario", 5)),
+    )
+
+
+class FlujosClinicas:
+    """Flujos compilados por clínica; se recompilan cuando cambia la clínica o las especialidades"""
+
+    def __init__(self):
+        self._flujos: Dict[int, FlujoCompilado] = {}
+        self.compilaciones = 0
+        self._desuscribir = None
+
+    async def obtener(self, db: AsyncSession, id_clinica: int) -> Optional[FlujoCompilado]:
+        flujo = self._flujos.get(id_clinica)
+        if flujo is None:
+            clinica = await clinica_repo.get(db, id_clinica)
+            if clinica is None:
+                return None
+            especialidades = [e.nombre for e in await especialidad_repo.get_multi(db, limit=10_000)]
+            flujo = compilar_flujo(clinica.id, clinica.nombre, clinica.configuraciones, especialidades)
+            self._flujos[id_clinica] = flujo
+            self.compilaciones += 1
+        return flujo
+
+    def invalidar(self, ids: Optional[Iterable[Any]] = None) -> None:
+        if ids:
+            for id in ids:
+                self._flujos.pop(int(id), None)
+        else:
+            self._flujos.clear()
+
+    def al_cambiar(self, evento: EventoCambio) -> None:
+        """Suscriptor del bus de cambios"""
+        self.invalidar(evento.ids if evento.entidad == "clinicas" else None)
+
+    def suscribir(self) -> "FlujosClinicas":
+        if self._desuscribir is None:
+            self._desuscribir = bus_cambios.suscribir(self.al_cambiar, entidades=["clinicas", "especialidades"])
+        return self
+
+    def desuscribir(self) -> None:
+        if self._desuscribir is not None:
+            self._desuscribir()
+            self._desuscribir = None
+
+
+# Flujos del proceso (se suscriben al bus en Recursos.iniciar y en worker.py)
+flujos_clinicas = FlujosClinicas()
+
+
+EjecutorEfectos = Callable[[Efecto], Awaitable[Any]]
+
+
+async def conversar(
+    flujo: FlujoCompilado, estado: EstadoConversacion, texto: str, ejecutar: EjecutorEfectos, max_efectos: int = 5
+) -> Tuple[EstadoConversacion, List[str]]:
+    """Procesar un mensaje del usuario resolviendo los efectos que pidan los pasos"""
+    paso = flujo.paso(estado, Entrada(texto=texto))
+    respuestas = list(paso.respuestas)
+    for _ in range(max_efectos):
+        if paso.efecto is None:
+            break
+        paso = flujo.paso(paso.estado, Entrada(resultado=await ejecutar(paso.efecto)))
+        respuestas.extend(paso.respuestas)
+    return paso.estado, respuestas
+
+
+# Persistencia en la sesión del usuario (redis_session es sincrónico: usar desde un hilo)
+CLAVE_SESION = "conversacion"
+
+
+def cargar_estado(wa_id: str, flujo: FlujoCompilado) -> EstadoConversacion:
+    return EstadoConversacion.desde_snapshot(get_user_session(wa_id).get(CLAVE_SESION), flujo)
+
+
+def guardar_estado(wa_id: str, flujo: FlujoCompilado, estado: EstadoConversacion) -> None:
+    set_user_session(wa_id, CLAVE_SESION, estado.a_snapshot(flujo.huella))
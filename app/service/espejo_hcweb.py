@@ -0,0 +1,233 @@
+"""Espejo local de los datos de referencia de HCWEB (profesionales, coberturas, especialidades).
+
+Estos datos cambian poco y se consultaban en vivo en cada conversación, con la latencia del
+upstream. EspejoHcweb los trae cada tanto con WsHcweb (los datasets de un mismo upstream en
+un solo `llamar_lote`) y los guarda en `referencias_hcweb`; el bot lee de la base con
+`registros`/`registro`.
+
+Detección de cambios por hash del contenido: si el hash del dataset completo es el de la
+última sincronización no se escribe nada; si no, sólo se hace upsert (INSERT ... ON
+CONFLICT, `BaseRepository.bulk_upsert`) de los registros cuyo hash cambió y se borran los que
+ya no vienen. Cada dataset se aplica en una transacción junto con su fila de
+`sincronizaciones_hcweb` (estado, conteos, último intento y último éxito). Si el upstream
+falla se registra el error y quedan los datos de la sincronización anterior; una lista vacía
+para un dataset que tenía registros también cuenta como error (salvo `permitir_vacio`), así
+una respuesta vacía por una falla del upstream no borra todo.
+
+Los nombres de los métodos SOAP de DATASETS se pueden reemplazar con
+ESPEJO_HCWEB_DATASETS (JSON: [{"nombre", "metodo", "parametros", "clave", "upstream", "permitir_vacio"}]).
+La sincronización periódica corre en un solo proceso (`python sincronizar_hcweb.py`, o en el
+proceso web con ESPEJO_HCWEB_HABILITADO).
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Config
+from app.config.database import AsyncSessionLocal
+from app.repositories.repositories import referencia_hcweb_repo, sincronizacion_hcweb_repo
+from app.service.WsHcweb import RegistroClientesHcweb, ResultadoLlamada, registro_hcweb
+
+logger = logging.getLogger(__name__)
+
+OK = "ok"
+SIN_CAMBIOS = "sin_cambios"
+ERROR = "error"
+
+
+@dataclass(frozen=True)
+class DatasetHcweb:
+    nombre: str
+    metodo: str
+    parametros: Dict[str, Any] = field(default_factory=dict)
+    clave: str = "id"  # campo de cada registro que lo identifica en HCWEB
+    upstream: str = "hcweb"
+    permitir_vacio: bool = False  # si no, una respuesta vacía no borra un dataset con registros
+
+
+DATASETS = (
+    DatasetHcweb("profesionales", "ObtenerProfesionales"),
+    DatasetHcweb("especialidades", "ObtenerEspecialidades"),
+    DatasetHcweb("coberturas", "ObtenerCoberturas"),
+)
+
+
+def datasets_configurados() -> Sequence[DatasetHcweb]:
+    if not Config.ESPEJO_HCWEB_DATASETS:
+        return DATASETS
+    return tuple(DatasetHcweb(**d) for d in json.loads(Config.ESPEJO_HCWEB_DATASETS))
+
+
+def hash_contenido(valor: Any) -> str:
+    """Hash estable de un registro JSON (no depende del orden de las claves)"""
+    texto = json.dumps(valor, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(texto.encode(), digest_size=16).hexdigest()
+
+
+@dataclass
+class ResultadoSincronizacion:
+    dataset: str
+    estado: str
+    registros: int = 0
+    insertados: int = 0
+    actualizados: int = 0
+    eliminados: int = 0
+    segundos: float = 0.0
+    error: Optional[str] = None
+
+    def como_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class EspejoHcweb:
+    """Sincroniza los datasets de referencia de HCWEB en la base y los lee de ahí"""
+
+    def __init__(
+        self,
+        datasets: Optional[Sequence[DatasetHcweb]] = None,
+        *,
+        clientes: RegistroClientesHcweb = registro_hcweb,
+        sesiones: Callable[[], AsyncSession] = AsyncSessionLocal,
+        intervalo: float = Config.ESPEJO_HCWEB_INTERVALO_SEGUNDOS,
+        plazo: float = Config.ESPEJO_HCWEB_PLAZO_SEGUNDOS,
+    ):
+        self.datasets = {d.nombre: d for d in (datasets if datasets is not None else datasets_configurados())}
+        self.clientes = clientes
+        self.sesiones = sesiones
+        self.intervalo = intervalo
+        self.plazo = plazo
+        self._tarea: Optional[asyncio.Task] = None
+
+    # Lectura (lo que usa el bot)
+    async def registros(self, db: AsyncSession, dataset: str) -> List[Dict[str, Any]]:
+        return await referencia_hcweb_repo.get_dataset(db, dataset=dataset)
+
+    async def registro(self, db: AsyncSession, dataset: str, clave: Any) -> Optional[Dict[str, Any]]:
+        return await referencia_hcweb_repo.get_registro(db, dataset=dataset, clave=clave)
+
+    async def estado(self, db: AsyncSession) -> List[Dict[str, Any]]:
+        filas = await sincronizacion_hcweb_repo.get_filas(
+            db, columnas=["dataset", "estado", "registros", "ultimo_intento", "ultimo_exito", "error"],
+            order_by=[sincronizacion_hcweb_repo.model.dataset], limit=len(self.datasets) + 100,
+        )
+        return [dict(fila._mapping) for fila in filas]
+
+    # Sincronización
+    async def sincronizar(self, nombres: Optional[Sequence[str]] = None) -> List[ResultadoSincronizacion]:
+        """Traer los datasets (todos o `nombres`) y aplicarlos; un upstream, un lote de llamadas"""
+        datasets = [self.datasets[n] for n in (nombres if nombres is not None else self.datasets)]
+        por_upstream: Dict[str, List[DatasetHcweb]] = {}
+        for dataset in datasets:
+            por_upstream.setdefault(dataset.upstream, []).append(dataset)
+
+        async def traer(upstream: str, lista: List[DatasetHcweb]) -> List[ResultadoLlamada]:
+            try:
+                cliente = self.clientes.obtener(upstream)
+                return await cliente.llamar_lote([(d.metodo, d.parametros) for d in lista], plazo=self.plazo)
+            except Exception as e:
+                # P. ej. un upstream que no está configurado: fallan sus datasets, no los demás
+                logger.exception("Espejo HCWEB: no se pudo llamar a %s", upstream)
+                return [ResultadoLlamada(d.metodo, error=repr(e), tipo_error="inesperado") for d in lista]
+
+        respuestas = await asyncio.gather(*(traer(u, l) for u, l in por_upstream.items()))
+        resultados = []
+        for lista, llamadas in zip(por_upstream.values(), respuestas):
+            for dataset, llamada in zip(lista, llamadas):
+                async with self.sesiones() as db:
+                    resultados.append(await self.aplicar(db, dataset, llamada))
+        return resultados
+
+    async def aplicar(self, db: AsyncSession, dataset: DatasetHcweb, llamada: ResultadoLlamada) -> ResultadoSincronizacion:
+        """Escribir la respuesta de un dataset (o su error) con su estado, en una transacción"""
+        inicio = time.perf_counter()
+        ahora = datetime.now(timezone.utc)
+        anterior = await sincronizacion_hcweb_repo.get_by_field(db, field="dataset", value=dataset.nombre)
+        try:
+            registros = self._registros(dataset, llamada, guardados=anterior.registros if anterior else 0)
+        except ValueError as e:
+            resultado = ResultadoSincronizacion(dataset.nombre, ERROR, error=str(e))
+            await self._guardar_estado(db, resultado, ahora, hash_dataset=None)
+            await db.commit()
+            logger.warning("Espejo HCWEB: %s no se sincronizó: %s", dataset.nombre, e)
+            return resultado
+
+        hashes = {clave: hash_contenido(valor) for clave, valor in registros.items()}
+        hash_dataset = hash_contenido(sorted(hashes.items()))
+        resultado = ResultadoSincronizacion(dataset.nombre, SIN_CAMBIOS, registros=len(registros))
+        if anterior is None or anterior.hash != hash_dataset:
+            guardados = await referencia_hcweb_repo.get_hashes(db, dataset=dataset.nombre)
+            cambios = [
+                {"dataset": dataset.nombre, "clave": clave, "datos": registros[clave], "hash": hash, "fecha_actualizacion": ahora}
+                for clave, hash in hashes.items() if guardados.get(clave) != hash
+            ]
+            resultado.estado = OK
+            resultado.insertados = sum(1 for c in cambios if c["clave"] not in guardados)
+            resultado.actualizados = len(cambios) - resultado.insertados
+            resultado.eliminados = await referencia_hcweb_repo.delete_claves(
+                db, dataset=dataset.nombre, claves=sorted(set(guardados) - set(hashes))
+            )
+            await referencia_hcweb_repo.bulk_upsert(
+                db, registros=cambios, claves=["dataset", "clave"], solo_si_cambia="hash", commit=False
+            )
+        resultado.segundos = time.perf_counter() - inicio
+        await self._guardar_estado(db, resultado, ahora, hash_dataset=hash_dataset)
+        await db.commit()
+        if resultado.estado == OK:
+            referencia_hcweb_repo.publicar_sincronizacion(dataset=dataset.nombre)
+        return resultado
+
+    def _registros(self, dataset: DatasetHcweb, llamada: ResultadoLlamada, *, guardados: int = 0) -> Dict[str, Any]:
+        """clave -> registro de la respuesta; ValueError si el upstream falló, no es una lista o
+        vino vacía cuando había `guardados` registros (y el dataset no permite vaciarse)"""
+        if not llamada.ok:
+            raise ValueError(f"{llamada.tipo_error}: {llamada.error}")
+        if not isinstance(llamada.valor, list):
+            raise ValueError(f"{dataset.metodo} no devolvió una lista")
+        registros = {}
+        for valor in llamada.valor:
+            if isinstance(valor, dict) and valor.get(dataset.clave) not in (None, ""):
+                registros[str(valor[dataset.clave])] = valor
+        if llamada.valor and not registros:
+            raise ValueError(f"Ningún registro de {dataset.metodo} tiene '{dataset.clave}'")
+        if not registros and guardados and not dataset.permitir_vacio:
+            raise ValueError(f"{dataset.metodo} devolvió una lista vacía (había {guardados} registros)")
+        return registros
+
+    async def _guardar_estado(
+        self, db: AsyncSession, resultado: ResultadoSincronizacion, ahora: datetime, *, hash_dataset: Optional[str]
+    ) -> None:
+        fila = {"dataset": resultado.dataset, "estado": resultado.estado, "error": resultado.error, "ultimo_intento": ahora}
+        if resultado.estado != ERROR:
+            fila.update(
+                hash=hash_dataset, registros=resultado.registros, insertados=resultado.insertados,
+                actualizados=resultado.actualizados, eliminados=resultado.eliminados, ultimo_exito=ahora,
+            )
+        await sincronizacion_hcweb_repo.bulk_upsert(db, registros=[fila], claves=["dataset"], commit=False)
+
+    # Tarea periódica
+    async def _bucle(self) -> None:
+        while True:
+            try:
+                for resultado in await self.sincronizar():
+                    if resultado.estado == OK:
+                        logger.info("Espejo HCWEB: %s", resultado.como_dict())
+            except Exception:
+                logger.exception("Error sincronizando el espejo de HCWEB")
+            await asyncio.sleep(self.intervalo)
+
+    async def iniciar(self) -> None:
+        if self._tarea is None:
+            self._tarea = asyncio.create_task(self._bucle())
+
+    async def detener(self) -> None:
+        if self._tarea is not None:
+            self._tarea.cancel()
+            await asyncio.gather(self._tarea, return_exceptions=True)
+            self._tarea = None
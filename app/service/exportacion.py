@@ -0,0 +1,62 @@
+"""Serialización incremental de exportaciones a CSV o JSONL.
+
+Los repositorios entregan las filas en lotes (`stream_exportacion`, con un cursor del
+servidor); acá cada lote se convierte en un bloque de texto que StreamingResponse envía
+apenas está listo. La memoria depende del tamaño del lote, no de la cantidad de filas.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, AsyncIterator, List, Sequence
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+}
+
+
+def _json(valor: Any) -> str:
+    return json.dumps(valor, ensure_ascii=False)
+
+
+# Conversión por tipo exacto: el resto de los valores (str, int, bool) pasa sin tocar.
+# Un dict de tipos evita una cadena de isinstance por celda.
+_CONVERSION_JSON = {datetime: datetime.isoformat, date: date.isoformat}
+_CONVERSION_CSV = {**_CONVERSION_JSON, dict: _json, list: _json}
+
+
+def bloque_csv(filas: Sequence[Sequence[Any]], encabezado: List[str] = None) -> str:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, lineterminator="\n")
+    if encabezado:
+        escritor.writerow(encabezado)
+    conversion = _CONVERSION_CSV
+    # csv escribe None como celda vacía
+    escritor.writerows(
+        [v if (c := conversion.get(type(v))) is None else c(v) for v in fila] for fila in filas
+    )
+    return buffer.getvalue()
+
+
+def bloque_jsonl(filas: Sequence[Sequence[Any]], columnas: List[str]) -> str:
+    conversion = _CONVERSION_JSON
+    return "".join(
+        json.dumps(
+            {col: v if (c := conversion.get(type(v))) is None else c(v) for col, v in zip(columnas, fila)},
+            ensure_ascii=False,
+        ) + "\n"
+        for fila in filas
+    )
+
+
+async def serializar(lotes: AsyncIterator[Sequence[Sequence[Any]]], columnas: List[str], formato: str) -> AsyncIterator[bytes]:
+    """Bloques de bytes de la exportación: un bloque por lote de filas"""
+    if formato == "csv":
+        # El encabezado sale aunque no haya filas
+        yield bloque_csv([], columnas).encode("utf-8")
+        async for filas in lotes:
+            yield bloque_csv(filas).encode("utf-8")
+    else:
+        async for filas in lotes:
+            yield bloque_jsonl(filas, columnas).encode("utf-8")
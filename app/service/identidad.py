@@ -0,0 +1,239 @@
+"""Resolución del paciente a partir del número de WhatsApp (wa_id -> id de paciente).
+
+Cada mensaje empieza por saber quién escribe. El número se normaliza a E.164 y se busca en
+la caché; si no está, se consulta `pacientes.telefono_e164` (indexado) y se guarda el
+resultado. También se guarda que un número no es de ningún paciente (caché negativa, con un
+TTL corto: el número puede registrarse en cualquier momento).
+
+Los eventos de cambios de `pacientes` anotan los ids y, antes de la siguiente resolución,
+se borran las entradas del teléfono anterior (por el índice inverso paciente -> teléfono) y
+del actual (que pudo estar en la caché negativa). Un cambio sin ids, o más de
+MAXIMO_PENDIENTES pacientes cambiados entre dos resoluciones, vacía la caché entera.
+
+Cachés: CacheIdentidadMemoria (por proceso) y CacheIdentidadRedis (compartida entre workers).
+"""
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+import redis.asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Config
+from app.core.eventos import EventoCambio, bus_cambios
+from app.models.entities import Paciente
+from app.repositories.repositories import paciente_repo
+from app.utils.telefono import normalizar_telefono
+
+NO_REGISTRADO = 0  # en la caché: el número no es de ningún paciente
+
+
+class CacheIdentidad(ABC):
+    """teléfono E.164 -> id de paciente (o NO_REGISTRADO), con TTL"""
+
+    @abstractmethod
+    async def obtener(self, telefono: str) -> Optional[int]:
+        """None si el teléfono no está en la caché"""
+
+    @abstractmethod
+    async def guardar(self, telefono: str, id_paciente: int, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    async def descartar(self, *, telefonos: Iterable[str] = (), pacientes: Iterable[int] = ()) -> None:
+        """Borrar las entradas de esos teléfonos y las que apuntan a esos pacientes"""
+
+    @abstractmethod
+    async def vaciar(self) -> None:
+        """Borrar todas las entradas"""
+
+
+class CacheIdentidadMemoria(CacheIdentidad):
+    """LRU de hasta `maximo` teléfonos; los vencidos se barren cada `intervalo_limpieza` segundos"""
+
+    def __init__(self, reloj=time.monotonic, *, maximo: int = 100000, intervalo_limpieza: float = 60.0):
+        self.reloj = reloj
+        self.maximo = maximo
+        self.intervalo_limpieza = intervalo_limpieza
+        self._telefonos: Dict[str, Tuple[int, float]] = {}  # en orden de uso, el último al final
+        self._pacientes: Dict[int, str] = {}
+        self._proxima_limpieza = reloj() + intervalo_limpieza
+
+    def _quitar(self, telefono: str) -> None:
+        entrada = self._telefonos.pop(telefono, None)
+        if entrada is not None and self._pacientes.get(entrada[0]) == telefono:
+            del self._pacientes[entrada[0]]
+
+    async def obtener(self, telefono: str) -> Optional[int]:
+        entrada = self._telefonos.get(telefono)
+        if entrada is None:
+            return None
+        if entrada[1] <= self.reloj():
+            self._quitar(telefono)
+            return None
+        self._telefonos[telefono] = self._telefonos.pop(telefono)
+        return entrada[0]
+
+    async def guardar(self, telefono: str, id_paciente: int, ttl: int) -> None:
+        ahora = self.reloj()
+        self._quitar(telefono)
+        self._telefonos[telefono] = (id_paciente, ahora + ttl)
+        if id_paciente != NO_REGISTRADO:
+            self._pacientes[id_paciente] = telefono
+        if ahora >= self._proxima_limpieza:
+            self._proxima_limpieza = ahora + self.intervalo_limpieza
+            for vencido in [t for t, (_, vence) in self._telefonos.items() if vence <= ahora]:
+                self._quitar(vencido)
+        while len(self._telefonos) > self.maximo:
+            self._quitar(next(iter(self._telefonos)))
+
+    async def descartar(self, *, telefonos: Iterable[str] = (), pacientes: Iterable[int] = ()) -> None:
+        for telefono in telefonos:
+            self._quitar(telefono)
+        for id_paciente in pacientes:
+            telefono = self._pacientes.get(id_paciente)
+            if telefono is not None:
+                self._quitar(telefono)
+
+    async def vaciar(self) -> None:
+        self._telefonos.clear()
+        self._pacientes.clear()
+
+
+class CacheIdentidadRedis(CacheIdentidad):
+    """`identidad:tel:<e164>` con el id (0 = no registrado) e `identidad:pac:<id>` con el teléfono"""
+
+    def __init__(self, cliente: aioredis.Redis, prefijo: str = "identidad"):
+        self.cliente = cliente
+        self.prefijo = prefijo
+
+    def _telefono(self, telefono: str) -> str:
+        return f"{self.prefijo}:tel:{telefono}"
+
+    def _paciente(self, id_paciente: int) -> str:
+        return f"{self.prefijo}:pac:{id_paciente}"
+
+    async def obtener(self, telefono: str) -> Optional[int]:
+        valor = await self.cliente.get(self._telefono(telefono))
+        return None if valor is None else int(valor)
+
+    async def guardar(self, telefono: str, id_paciente: int, ttl: int) -> None:
+        async with self.cliente.pipeline(transaction=False) as pipe:
+            pipe.set(self._telefono(telefono), id_paciente, ex=ttl)
+            if id_paciente != NO_REGISTRADO:
+                pipe.set(self._paciente(id_paciente), telefono, ex=ttl)
+            await pipe.execute()
+
+    async def descartar(self, *, telefonos: Iterable[str] = (), pacientes: Iterable[int] = ()) -> None:
+        claves = [self._telefono(t) for t in telefonos]
+        pacientes = [self._paciente(p) for p in pacientes]
+        if pacientes:
+            anteriores = await self.cliente.mget(pacientes)
+            claves += pacientes + [self._telefono(t.decode() if isinstance(t, bytes) else t) for t in anteriores if t]
+        if claves:
+            await self.cliente.delete(*claves)
+
+    async def vaciar(self) -> None:
+        claves = [clave async for clave in self.cliente.scan_iter(match=f"{self.prefijo}:*", count=500)]
+        if claves:
+            await self.cliente.delete(*claves)
+
+
+@dataclass
+class EstadisticasIdentidad:
+    aciertos: int = 0
+    aciertos_negativos: int = 0
+    consultas: int = 0  # fallos de caché: se fue a la base
+    invalidos: int = 0  # números que no se pudieron normalizar
+
+    def como_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ResolutorIdentidad:
+    """wa_id (o un teléfono en cualquier formato) -> id del paciente, con caché"""
+
+    # Con más pacientes cambiados que esto (o un cambio sin ids) se vacía la caché entera
+    MAXIMO_PENDIENTES = 10000
+
+    def __init__(
+        self,
+        cache: Optional[CacheIdentidad] = None,
+        *,
+        ttl_positivo: int = Config.IDENTIDAD_TTL_POSITIVO_SEGUNDOS,
+        ttl_negativo: int = Config.IDENTIDAD_TTL_NEGATIVO_SEGUNDOS,
+    ):
+        self.cache = cache or CacheIdentidadMemoria()
+        self.ttl_positivo = ttl_positivo
+        self.ttl_negativo = ttl_negativo
+        self.estadisticas = EstadisticasIdentidad()
+        self._pendientes: Set[int] = set()
+        self._vaciar = False
+        self._desuscribir = None
+
+    async def resolver(self, db: AsyncSession, wa_id: str) -> Optional[int]:
+        """Id del paciente con ese número, o None si no hay ninguno"""
+        if self._pendientes or self._vaciar:
+            await self.aplicar_pendientes(db)
+        telefono = normalizar_telefono(wa_id)
+        if telefono is None:
+            self.estadisticas.invalidos += 1
+            return None
+        id_paciente = await self.cache.obtener(telefono)
+        if id_paciente is not None:
+            if id_paciente == NO_REGISTRADO:
+                self.estadisticas.aciertos_negativos += 1
+                return None
+            self.estadisticas.aciertos += 1
+            return id_paciente
+
+        self.estadisticas.consultas += 1
+        filas = await paciente_repo.get_filas(
+            db, columnas=["id"], filters={"telefono_e164": telefono}, order_by=[Paciente.id], limit=1
+        )
+        id_paciente = filas[0][0] if filas else NO_REGISTRADO
+        await self.cache.guardar(telefono, id_paciente, self.ttl_positivo if id_paciente else self.ttl_negativo)
+        return id_paciente or None
+
+    def al_cambiar(self, evento: EventoCambio) -> None:
+        """Suscriptor del bus de cambios: sin I/O, se aplica en la próxima resolución"""
+        if self._vaciar:
+            return
+        self._pendientes.update(int(id) for id in evento.ids)
+        if not evento.ids or len(self._pendientes) > self.MAXIMO_PENDIENTES:
+            self._pendientes.clear()
+            self._vaciar = True
+
+    async def aplicar_pendientes(self, db: AsyncSession) -> int:
+        pendientes, self._pendientes = self._pendientes, set()
+        if self._vaciar:
+            self._vaciar = False
+            await self.cache.vaciar()
+            return len(pendientes)
+        if not pendientes:
+            return 0
+        filas = await paciente_repo.get_filas(
+            db, columnas=["telefono_e164"], condiciones=[Paciente.id.in_(pendientes)], limit=len(pendientes)
+        )
+        await self.cache.descartar(telefonos=[t for t, in filas if t], pacientes=pendientes)
+        return len(pendientes)
+
+    def suscribir(self) -> "ResolutorIdentidad":
+        if self._desuscribir is None:
+            self._desuscribir = bus_cambios.suscribir(self.al_cambiar, entidades=["pacientes"])
+        return self
+
+    def desuscribir(self) -> None:
+        if self._desuscribir is not None:
+            self._desuscribir()
+            self._desuscribir = None
+
+
+def crear_resolutor_identidad(
+    backend: str = Config.IDENTIDAD_BACKEND, *, cliente_redis: Optional[aioredis.Redis] = None
+) -> ResolutorIdentidad:
+    if backend == "redis":
+        from app.core.redis_async import crear_cliente_redis
+        return ResolutorIdentidad(CacheIdentidadRedis(cliente_redis or crear_cliente_redis()))
+    return ResolutorIdentidad(CacheIdentidadMemoria())
@@ -0,0 +1,370 @@
+"""Importación masiva de CSV/JSONL con COPY (asyncpg), para cargar históricos de una clínica.
+
+Cada archivo del directorio de origen se llama como su tabla (`turnos.csv`, `pacientes.jsonl`,
+...). Los ids del origen son externos: se reservan ids nuevos de la secuencia de cada tabla y
+las claves foráneas se traducen con mapas en memoria (id externo -> id nuevo). Si la tabla
+referenciada no se importa en la misma corrida, el valor se usa tal cual (ids ya existentes).
+Una fila cuya referencia no está en el mapa se descarta y se informa.
+
+Las tablas sin dependencias entre sí se cargan en paralelo, cada una en su conexión y su
+transacción; turnos arranca cuando terminaron clínicas, pacientes y profesionales. Al final se
+derivan profesional_especialidad (de la lista `especialidades`) y el rollup de logs IA, y se
+publica en el bus de cambios un evento sin ids por tabla escrita (los cachés la descartan entera).
+
+Fuera de PostgreSQL (SQLite en tests) se usa INSERT por lotes y las tablas van en serie.
+"""
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Boolean, DateTime, Integer, JSON, Table, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.config.database import AsyncSessionLocal, engine as engine_app
+from app.core.eventos import EventoCambio, bus_cambios
+from app.models.entities import (
+    Clinica, Especialidad, LogIA, Paciente, Profesional, ProfesionalEspecialidad, Turno
+)
+from app.repositories.repositories import log_ia_resumen_repo
+from app.utils.telefono import normalizar_telefono
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES = (".csv", ".jsonl")
+MAX_ERRORES = 20
+
+
+@dataclass(frozen=True)
+class TablaImportable:
+    modelo: Any
+    # columna -> tabla referenciada (por id externo)
+    claves: Dict[str, str] = field(default_factory=dict)
+    # clave dentro de una columna JSON -> tabla referenciada
+    claves_json: Dict[Tuple[str, str], str] = field(default_factory=dict)
+    # tablas que tienen que estar cargadas antes, además de las de `claves`
+    despues_de: Tuple[str, ...] = ()
+    # columna -> función que la calcula a partir de la fila de origen
+    derivadas: Dict[str, Callable[[Dict[str, Any]], Any]] = field(default_factory=dict)
+
+    @property
+    def dependencias(self) -> Tuple[str, ...]:
+        return tuple(dict.fromkeys([*self.claves.values(), *self.claves_json.values(), *self.despues_de]))
+
+
+TABLAS: Dict[str, TablaImportable] = {
+    "clinicas": TablaImportable(Clinica),
+    "especialidades": TablaImportable(Especialidad),
+    "pacientes": TablaImportable(Paciente, derivadas={"telefono_e164": lambda fila: normalizar_telefono(fila.get("telefono"))}),
+    # profesional_especialidad se deriva por nombre: las especialidades van antes
+    "profesionales": TablaImportable(Profesional, despues_de=("especialidades",)),
+    "turnos": TablaImportable(
+        Turno, claves={"id_paciente": "pacientes", "id_profesional": "profesionales", "id_clinica": "clinicas"}
+    ),
+    "logs_ia": TablaImportable(LogIA, claves_json={("metadatos", "id_clinica"): "clinicas"}),
+}
+
+
+@dataclass
+class ResultadoTabla:
+    tabla: str
+    filas: int = 0
+    descartadas: int = 0
+    segundos: float = 0.0
+    errores: List[str] = field(default_factory=list)
+
+    def descartar(self, linea: int, motivo: str) -> None:
+        self.descartadas += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append(f"línea {linea}: {motivo}")
+
+
+Progreso = Callable[[ResultadoTabla], None]
+
+
+class FilaInvalida(ValueError):
+    pass
+
+
+def archivos_de_origen(directorio: str, tablas: Optional[List[str]] = None) -> Dict[str, str]:
+    """Tabla -> archivo para los CSV/JSONL del directorio con nombre de tabla importable"""
+    encontrados = {}
+    for nombre in sorted(os.listdir(directorio)):
+        tabla, extension = os.path.splitext(nombre)
+        if extension in EXTENSIONES and tabla in TABLAS and (tablas is None or tabla in tablas):
+            encontrados[tabla] = os.path.join(directorio, nombre)
+    return encontrados
+
+
+def leer_filas(archivo: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(número de línea, fila) de un CSV con encabezado o de un JSONL"""
+    with open(archivo, encoding="utf-8", newline="") as origen:
+        if archivo.endswith(".csv"):
+            lector = csv.DictReader(origen)
+            for fila in lector:
+                yield lector.line_num, fila
+        else:
+            for linea, texto in enumerate(origen, start=1):
+                if texto.strip():
+                    yield linea, json.loads(texto)
+
+
+def leer_lotes(archivo: str, tamanio: int) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    lote = []
+    for item in leer_filas(archivo):
+        lote.append(item)
+        if len(lote) >= tamanio:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _conversor(columna, json_como_texto: bool) -> Callable[[Any], Any]:
+    """Función que lleva un valor de CSV/JSONL al tipo Python de la columna"""
+    tipo = columna.type
+    if isinstance(tipo, JSON):
+        def convertir(valor):
+            if isinstance(valor, str):
+                valor = json.loads(valor)
+            # El codec jsonb de SQLAlchemy para asyncpg espera el JSON ya serializado
+            return json.dumps(valor, ensure_ascii=False) if json_como_texto else valor
+        return convertir
+    if isinstance(tipo, Boolean):
+        return lambda valor: valor if isinstance(valor, bool) else str(valor).strip().lower() in ("1", "true", "t", "si", "sí")
+    if isinstance(tipo, Integer):
+        return int
+    if isinstance(tipo, DateTime):
+        def convertir(valor):
+            fecha = valor if isinstance(valor, datetime) else datetime.fromisoformat(valor)
+            return fecha if fecha.tzinfo else fecha.replace(tzinfo=timezone.utc)
+        return convertir
+    return str
+
+
+class ImportadorMasivo:
+    """Carga un directorio de CSV/JSONL en las tablas de la aplicación"""
+
+    def __init__(
+        self,
+        engine: AsyncEngine = engine_app,
+        *,
+        lote: int = 50_000,
+        concurrencia: int = 4,
+        progreso: Optional[Progreso] = None
+    ):
+        self.engine = engine
+        self.lote = lote
+        self.es_postgres = engine.dialect.name == "postgresql"
+        # SQLite tiene una sola conexión de escritura: las tablas van en serie
+        self.concurrencia = asyncio.Semaphore(concurrencia if self.es_postgres else 1)
+        self.progreso = progreso
+        self.mapas: Dict[str, Dict[str, int]] = {}
+        self.especialidades_profesionales: Dict[int, List[str]] = {}
+        self.rango_logs: Optional[Tuple[datetime, datetime]] = None
+
+    async def importar(self, archivos: Dict[str, str]) -> Dict[str, ResultadoTabla]:
+        """Importar `tabla -> archivo` respetando dependencias; devuelve el resultado por tabla"""
+        tareas: Dict[str, asyncio.Task] = {}
+        for tabla in _orden_topologico(list(archivos)):
+            previas = [tareas[d] for d in TABLAS[tabla].dependencias if d in tareas]
+            tareas[tabla] = asyncio.create_task(self._importar_despues(tabla, archivos[tabla], previas))
+        try:
+            resultados = dict(zip(tareas, await asyncio.gather(*tareas.values())))
+        except BaseException:
+            for tarea in tareas.values():
+                tarea.cancel()
+            await asyncio.gather(*tareas.values(), return_exceptions=True)
+            raise
+
+        if "profesionales" in archivos:
+            resultados["profesional_especialidad"] = await self._derivar_profesional_especialidad()
+        if self.rango_logs is not None:
+            async with AsyncSessionLocal(bind=self.engine) as db:
+                desde, hasta = self.rango_logs
+                await log_ia_resumen_repo.reconstruir(
+                    db, log_model=LogIA,
+                    desde=desde.replace(minute=0, second=0, microsecond=0),
+                    hasta=hasta.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1),
+                )
+        for tabla in resultados:
+            bus_cambios.publicar(EventoCambio(tabla, "importacion"))
+        return resultados
+
+    async def _importar_despues(self, tabla: str, archivo: str, previas: List[asyncio.Task]) -> ResultadoTabla:
+        for previa in previas:
+            await previa
+        async with self.concurrencia:
+            return await self.importar_tabla(tabla, archivo)
+
+    async def importar_tabla(self, tabla: str, archivo: str) -> ResultadoTabla:
+        """Cargar un archivo en una transacción, por lotes de `self.lote` filas"""
+        spec = TABLAS[tabla]
+        destino: Table = spec.modelo.__table__
+        resultado = ResultadoTabla(tabla)
+        mapa = self.mapas.setdefault(tabla, {})
+        inicio = time.perf_counter()
+
+        async with self.engine.begin() as conn:
+            lotes = leer_lotes(archivo, self.lote)
+            columnas, conversores = None, None
+            siguiente_id = None
+            # El lote siguiente se lee (en un hilo) mientras la base procesa el actual
+            lectura = asyncio.create_task(asyncio.to_thread(next, lotes, None))
+            while True:
+                lote = await lectura
+                if lote is None:
+                    break
+                lectura = asyncio.create_task(asyncio.to_thread(next, lotes, None))
+                if columnas is None:
+                    columnas = self._columnas(spec, destino, lote[0][1])
+                    conversores = [_conversor(destino.c[c], self.es_postgres) for c in columnas]
+                    siguiente_id = None if self.es_postgres else await self._maximo_id(conn, destino)
+
+                ids = await self._reservar_ids(conn, destino, len(lote), siguiente_id)
+                if siguiente_id is not None:
+                    siguiente_id += len(lote)
+                filas = []
+                for (linea, origen), nuevo_id in zip(lote, ids):
+                    try:
+                        filas.append(self._fila(tabla, spec, destino, columnas, conversores, origen, nuevo_id))
+                    except (FilaInvalida, ValueError, TypeError, KeyError) as exc:
+                        resultado.descartar(linea, str(exc))
+                        continue
+                    externo = origen.get("id")
+                    if externo not in (None, ""):
+                        mapa[str(externo)] = nuevo_id
+                await self._escribir(conn, destino, columnas, filas)
+                resultado.filas += len(filas)
+                resultado.segundos = time.perf_counter() - inicio
+                if self.progreso:
+                    self.progreso(resultado)
+
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
+
+    def _columnas(self, spec: TablaImportable, destino: Table, primera: Dict[str, Any]) -> List[str]:
+        """id + columnas presentes en el origen + derivadas + las que tienen default escalar en el modelo"""
+        columnas = ["id"]
+        for columna in destino.columns:
+            if columna.name == "id":
+                continue
+            if (columna.name in primera or columna.name in spec.derivadas
+                    or (columna.default is not None and columna.default.is_scalar)):
+                columnas.append(columna.name)
+        return columnas
+
+    def _fila(self, tabla, spec, destino, columnas, conversores, origen, nuevo_id) -> tuple:
+        valores = [nuevo_id]
+        for nombre, convertir in zip(columnas[1:], conversores[1:]):
+            if nombre in spec.derivadas:
+                valores.append(spec.derivadas[nombre](origen))
+                continue
+            valor = origen.get(nombre)
+            if valor is None or valor == "":
+                columna = destino.c[nombre]
+                if columna.default is not None and columna.default.is_scalar:
+                    valor = columna.default.arg
+                elif not columna.nullable:
+                    raise FilaInvalida(f"falta {nombre}")
+                else:
+                    valores.append(None)
+                    continue
+            if nombre in spec.claves:
+                valor = self._traducir(spec.claves[nombre], valor)
+            elif any(c == nombre for c, _ in spec.claves_json):
+                valor = self._traducir_json(spec, nombre, valor)
+            valores.append(convertir(valor))
+
+        if tabla == "profesionales":
+            especialidades = origen.get("especialidades")
+            if isinstance(especialidades, str) and especialidades:
+                especialidades = json.loads(especialidades)
+            if especialidades:
+                self.especialidades_profesionales[nuevo_id] = list(especialidades)
+        elif tabla == "logs_ia" and "fecha" in columnas:
+            fecha = valores[columnas.index("fecha")]
+            desde, hasta = self.rango_logs or (fecha, fecha)
+            self.rango_logs = (min(desde, fecha), max(hasta, fecha))
+        return tuple(valores)
+
+    def _traducir(self, referenciada: str, valor: Any) -> int:
+        mapa = self.mapas.get(referenciada)
+        if mapa is None:
+            return int(valor)  # tabla no importada: id existente
+        try:
+            return mapa[str(valor)]
+        except KeyError:
+            raise FilaInvalida(f"{referenciada} {valor} no existe en el origen") from None
+
+    def _traducir_json(self, spec: TablaImportable, columna: str, valor: Any) -> Any:
+        documento = json.loads(valor) if isinstance(valor, str) else dict(valor)
+        for (nombre, clave), referenciada in spec.claves_json.items():
+            if nombre == columna and documento.get(clave) not in (None, ""):
+                documento[clave] = self._traducir(referenciada, documento[clave])
+        return documento
+
+    async def _maximo_id(self, conn: AsyncConnection, destino: Table) -> int:
+        return (await conn.execute(select(func.coalesce(func.max(destino.c.id), 0)))).scalar() + 1
+
+    async def _reservar_ids(self, conn: AsyncConnection, destino: Table, cantidad: int, siguiente: Optional[int]) -> List[int]:
+        if siguiente is not None:
+            return list(range(siguiente, siguiente + cantidad))
+        # nextval es atómico aunque otras sesiones inserten en paralelo
+        result = await conn.execute(
+            text("SELECT nextval(pg_get_serial_sequence(:tabla, 'id')) FROM generate_series(1, :cantidad)"),
+            {"tabla": destino.name, "cantidad": cantidad},
+        )
+        return [fila[0] for fila in result.all()]
+
+    async def _escribir(self, conn: AsyncConnection, destino: Table, columnas: List[str], filas: List[tuple]) -> None:
+        if not filas:
+            return
+        if self.es_postgres:
+            # COPY por la conexión de asyncpg, dentro de la transacción abierta por SQLAlchemy
+            crudo = await conn.get_raw_connection()
+            await crudo.driver_connection.copy_records_to_table(destino.name, records=filas, columns=columnas)
+        else:
+            await conn.execute(insert(destino), [dict(zip(columnas, fila)) for fila in filas])
+
+    async def _derivar_profesional_especialidad(self) -> ResultadoTabla:
+        """Asociaciones de los profesionales importados según los nombres de su lista JSON"""
+        resultado = ResultadoTabla("profesional_especialidad")
+        inicio = time.perf_counter()
+        async with self.engine.begin() as conn:
+            filas = await conn.execute(select(Especialidad.nombre, func.min(Especialidad.id)).group_by(Especialidad.nombre))
+            por_nombre = dict(filas.all())
+            asociaciones = sorted({
+                (id_profesional, por_nombre[nombre])
+                for id_profesional, nombres in self.especialidades_profesionales.items()
+                for nombre in nombres if nombre in por_nombre
+            })
+            for i in range(0, len(asociaciones), self.lote):
+                await self._escribir(
+                    conn, ProfesionalEspecialidad.__table__, ["id_profesional", "id_especialidad"],
+                    asociaciones[i:i + self.lote],
+                )
+        resultado.filas = len(asociaciones)
+        resultado.segundos = time.perf_counter() - inicio
+        return resultado
+
+
+def _orden_topologico(tablas: List[str]) -> List[str]:
+    orden: List[str] = []
+
+    def visitar(tabla: str) -> None:
+        if tabla in orden:
+            return
+        for dependencia in TABLAS[tabla].dependencias:
+            if dependencia in tablas:
+                visitar(dependencia)
+        orden.append(tabla)
+
+    for tabla in tablas:
+        visitar(tabla)
+    return orden
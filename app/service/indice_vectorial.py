@@ -0,0 +1,528 @@
+"""Recuperación por similitud de vectores para responder preguntas de pacientes.
+
+Documentos indexados:
+- especialidad: nombre, descripción y preparación previa (comunes a todas las clínicas).
+- clinica: nombre y configuraciones de cada clínica, aplanadas a texto.
+- log_ia: preguntas de LogIA con confianza alta y su respuesta, por clínica (metadatos.id_clinica).
+
+Dos almacenes con la misma interfaz:
+- IndiceVectorialMemoria: matrices float32 normalizadas por clínica, búsqueda exacta por
+  producto punto (NumPy). Para clínicas chicas: con pocos miles de documentos es más rápido
+  que ir a la base.
+- IndiceVectorialPostgres: tabla `documentos_vectoriales` con pgvector e índice HNSW
+  (migración a8c41f7e2d93). Para clínicas con más de INDICE_VECTORIAL_UMBRAL_PGVECTOR
+  documentos; si la extensión no está instalada no se usa.
+
+IndiceVectorial decide por clínica y se actualiza de a poco: los eventos de cambios de
+clínicas y especialidades marcan los ids a releer, y los LogIA (que el pipeline inserta por
+lotes, sin eventos) se leen desde el último id indexado: `buscar` lo hace como mucho cada
+`intervalo_logs` segundos (una consulta por rango de id que normalmente no trae nada).
+`sincronizar` re-embebe sólo los documentos cuyo texto cambió.
+
+El Embebedor es intercambiable; EmbebedorHashing es determinístico y local (tests,
+benchmarks y entornos sin modelo de embeddings).
+"""
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Config
+from app.core.eventos import EventoCambio, bus_cambios
+from app.models.entities import Clinica, Especialidad, LogIA
+from app.utils.texto import normalizar_texto
+
+Clave = Tuple[str, int]  # (tipo, id de la fila de origen)
+
+# Palabras vacías del español: en textos cortos dominan el producto punto si se embeben
+PALABRAS_VACIAS = frozenset(
+    "a al algo como con de del el en es esta este hay la las le lo los me mi mis para por que se si "
+    "su sus te tengo tiene un una uno y yo ir hacer puedo quiero".split()
+)
+
+@dataclass(frozen=True)
+class Documento:
+    tipo: str
+    id: int
+    id_clinica: Optional[int]  # None: común a todas las clínicas
+    texto: str
+
+    @property
+    def clave(self) -> Clave:
+        return (self.tipo, self.id)
+
+    @property
+    def huella(self) -> str:
+        return hashlib.blake2b(f"{self.id_clinica}|{self.texto}".encode(), digest_size=8).hexdigest()
+
+
+@dataclass(frozen=True)
+class ResultadoVectorial:
+    tipo: str
+    id: int
+    texto: str
+    puntaje: float
+
+
+class Embebedor(ABC):
+    """Convierte textos en vectores float32 de norma 1, uno por fila"""
+
+    dimension: int
+
+    @abstractmethod
+    def embeber(self, textos: Sequence[str]) -> np.ndarray:
+        ...
+
+
+class EmbebedorHashing(Embebedor):
+    """Hashing trick sobre palabras y trigramas de caracteres (determinístico entre procesos).
+
+    Los trigramas acercan variantes ("ayuno"/"ayunas"); las palabras vacías se descartan.
+    """
+
+    def __init__(self, dimension: int = Config.INDICE_VECTORIAL_DIMENSION, peso_trigramas: float = 0.5):
+        self.dimension = dimension
+        self.peso_trigramas = peso_trigramas
+        self._cache: Dict[str, Tuple[int, float]] = {}
+
+    def _rasgo(self, rasgo: str) -> Tuple[int, float]:
+        indice = self._cache.get(rasgo)
+        if indice is None:
+            digest = int.from_bytes(hashlib.blake2b(rasgo.encode(), digest_size=8).digest(), "little")
+            indice = self._cache[rasgo] = (digest % self.dimension, 1.0 if digest >> 63 else -1.0)
+        return indice
+
+    def embeber(self, textos: Sequence[str]) -> np.ndarray:
+        matriz = np.zeros((len(textos), self.dimension), dtype=np.float32)
+        for fila, texto in enumerate(textos):
+            for palabra in normalizar_texto(texto).split():
+                if palabra in PALABRAS_VACIAS:
+                    continue
+                columna, signo = self._rasgo(palabra)
+                matriz[fila, columna] += signo
+                relleno = f" {palabra} "
+                for i in range(len(relleno) - 2):
+                    columna, signo = self._rasgo(relleno[i:i + 3])
+                    matriz[fila, columna] += signo * self.peso_trigramas
+        normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+        np.divide(matriz, normas, out=matriz, where=normas > 0)
+        return matriz
+
+
+# Tipo de documento -> código numérico de las filas de las matrices
+_CODIGOS: Dict[str, int] = {}
+
+
+class _MatrizClinica:
+    """Vectores de una clínica en una matriz que crece de a bloques; quitar mueve la última fila"""
+
+    def __init__(self, dimension: int, capacidad: int = 64):
+        self.vectores = np.zeros((capacidad, dimension), dtype=np.float32)
+        self.codigos = np.zeros(capacidad, dtype=np.int16)  # tipo de cada fila, para filtrar
+        self.claves: List[Clave] = []
+        self.textos: List[str] = []
+        self.filas: Dict[Clave, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.claves)
+
+    def poner(self, clave: Clave, texto: str, vector: np.ndarray) -> None:
+        fila = self.filas.get(clave)
+        if fila is None:
+            fila = len(self.claves)
+            if fila == len(self.vectores):
+                self.vectores = np.resize(self.vectores, (2 * len(self.vectores), self.vectores.shape[1]))
+                self.codigos = np.resize(self.codigos, 2 * len(self.codigos))
+            self.claves.append(clave)
+            self.textos.append(texto)
+            self.filas[clave] = fila
+        self.vectores[fila] = vector
+        self.codigos[fila] = _CODIGOS.setdefault(clave[0], len(_CODIGOS))
+        self.textos[fila] = texto
+
+    def quitar(self, clave: Clave) -> bool:
+        fila = self.filas.pop(clave, None)
+        if fila is None:
+            return False
+        ultima = len(self.claves) - 1
+        if fila != ultima:
+            self.vectores[fila] = self.vectores[ultima]
+            self.codigos[fila] = self.codigos[ultima]
+            self.claves[fila] = self.claves[ultima]
+            self.textos[fila] = self.textos[ultima]
+            self.filas[self.claves[fila]] = fila
+        self.claves.pop()
+        self.textos.pop()
+        return True
+
+
+class IndiceVectorialMemoria:
+    """Búsqueda exacta por coseno sobre matrices por clínica (más la matriz común)"""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self._clinicas: Dict[Optional[int], _MatrizClinica] = {}
+        self._ubicacion: Dict[Clave, Optional[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ubicacion)
+
+    def cantidad(self, id_clinica: Optional[int]) -> int:
+        matriz = self._clinicas.get(id_clinica)
+        return len(matriz) if matriz is not None else 0
+
+    def poner(self, documentos: Sequence[Documento], vectores: np.ndarray) -> None:
+        for documento, vector in zip(documentos, vectores):
+            anterior = self._ubicacion.get(documento.clave, documento.id_clinica)
+            if anterior != documento.id_clinica:
+                self._clinicas[anterior].quitar(documento.clave)
+            matriz = self._clinicas.get(documento.id_clinica)
+            if matriz is None:
+                matriz = self._clinicas[documento.id_clinica] = _MatrizClinica(self.dimension)
+            matriz.poner(documento.clave, documento.texto, vector)
+            self._ubicacion[documento.clave] = documento.id_clinica
+
+    def quitar(self, claves: Iterable[Clave]) -> None:
+        for clave in claves:
+            if clave in self._ubicacion:
+                self._clinicas[self._ubicacion.pop(clave)].quitar(clave)
+
+    def quitar_clinica(self, id_clinica: Optional[int]) -> None:
+        matriz = self._clinicas.pop(id_clinica, None)
+        for clave in matriz.claves if matriz is not None else ():
+            del self._ubicacion[clave]
+
+    def buscar(
+        self, id_clinica: Optional[int], consultas: np.ndarray, k: int, tipos: Optional[Set[str]] = None
+    ) -> List[List[ResultadoVectorial]]:
+        """Top-k por consulta (las filas de `consultas`) entre los documentos de la clínica y los comunes"""
+        matrices = [m for m in (self._clinicas.get(id_clinica), self._clinicas.get(None) if id_clinica is not None else None) if m]
+        if not matrices:
+            return [[] for _ in range(len(consultas))]
+        # Puntajes de cada matriz lado a lado (sin copiar los vectores); la columna j es la fila
+        # j - desde[m] de la matriz m
+        partes = []
+        for matriz in matrices:
+            puntajes = consultas @ matriz.vectores[:len(matriz)].T
+            if tipos is not None:
+                codigos = [c for tipo, c in _CODIGOS.items() if tipo in tipos]
+                puntajes[:, ~np.isin(matriz.codigos[:len(matriz)], codigos)] = -np.inf
+            partes.append(puntajes)
+        puntajes = partes[0] if len(partes) == 1 else np.hstack(partes)
+        desde = np.cumsum([0] + [len(m) for m in matrices])
+
+        total = puntajes.shape[1]
+        k = min(k, total)
+        mejores = np.argpartition(-puntajes, k - 1, axis=1)[:, :k] if k < total else np.tile(np.arange(k), (len(puntajes), 1))
+        resultados = []
+        for fila, candidatos in enumerate(mejores):
+            orden = candidatos[np.argsort(-puntajes[fila, candidatos])]
+            encontrados = []
+            for j in orden:
+                puntaje = float(puntajes[fila, j])
+                if puntaje == -np.inf:
+                    continue
+                m = int(np.searchsorted(desde, j, side="right")) - 1
+                tipo, id = matrices[m].claves[j - desde[m]]
+                encontrados.append(ResultadoVectorial(tipo, id, matrices[m].textos[j - desde[m]], round(puntaje, 4)))
+            resultados.append(encontrados)
+        return resultados
+
+
+# Consultas de pgvector; los vectores viajan como texto '[x,y,...]' y se castean en la base
+_SQL_UPSERT = """
+    INSERT INTO documentos_vectoriales (tipo, id_origen, id_clinica, texto, huella, embedding)
+    VALUES (:tipo, :id_origen, :id_clinica, :texto, :huella, CAST(:embedding AS vector))
+    ON CONFLICT (tipo, id_origen) DO UPDATE SET
+        id_clinica = excluded.id_clinica, texto = excluded.texto,
+        huella = excluded.huella, embedding = excluded.embedding
+"""
+
+_SQL_BUSCAR = """
+    SELECT q.n, d.tipo, d.id_origen, d.texto, 1 - d.distancia AS puntaje
+    FROM unnest(CAST(:consultas AS text[])) WITH ORDINALITY AS q(v, n)
+    CROSS JOIN LATERAL (
+        SELECT tipo, id_origen, texto, embedding <=> CAST(q.v AS vector) AS distancia
+        FROM documentos_vectoriales
+        WHERE (id_clinica = :id_clinica OR id_clinica IS NULL)
+          AND (CAST(:tipos AS text[]) IS NULL OR tipo = ANY(CAST(:tipos AS text[])))
+        ORDER BY embedding <=> CAST(q.v AS vector)
+        LIMIT :k
+    ) d
+    ORDER BY q.n, puntaje DESC
+"""
+
+
+def _literal(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{x:.6g}" for x in vector.tolist()) + "]"
+
+
+class IndiceVectorialPostgres:
+    """Documentos en `documentos_vectoriales` (pgvector, índice HNSW por coseno)"""
+
+    async def disponible(self, db: AsyncSession) -> bool:
+        if db.get_bind().dialect.name != "postgresql":
+            return False
+        return bool((await db.execute(text("SELECT to_regclass('documentos_vectoriales') IS NOT NULL"))).scalar())
+
+    async def huellas(self, db: AsyncSession, claves: Iterable[Clave]) -> Dict[Clave, str]:
+        por_tipo = defaultdict(list)
+        for tipo, id in claves:
+            por_tipo[tipo].append(id)
+        huellas = {}
+        for tipo, ids in por_tipo.items():
+            result = await db.execute(
+                text("SELECT id_origen, huella FROM documentos_vectoriales WHERE tipo = :tipo AND id_origen = ANY(:ids)"),
+                {"tipo": tipo, "ids": ids},
+            )
+            huellas.update(((tipo, id), huella) for id, huella in result.all())
+        return huellas
+
+    async def poner(self, db: AsyncSession, documentos: Sequence[Documento], vectores: np.ndarray) -> None:
+        await db.execute(text(_SQL_UPSERT), [
+            {"tipo": d.tipo, "id_origen": d.id, "id_clinica": d.id_clinica, "texto": d.texto,
+             "huella": d.huella, "embedding": _literal(v)}
+            for d, v in zip(documentos, vectores)
+        ])
+
+    async def quitar(self, db: AsyncSession, claves: Iterable[Clave]) -> None:
+        for tipo, id in claves:
+            await db.execute(text("DELETE FROM documentos_vectoriales WHERE tipo = :tipo AND id_origen = :id"), {"tipo": tipo, "id": id})
+
+    async def buscar(
+        self, db: AsyncSession, id_clinica: Optional[int], consultas: np.ndarray, k: int, tipos: Optional[Set[str]] = None
+    ) -> List[List[ResultadoVectorial]]:
+        """Una sola consulta para todo el lote (LATERAL por vector)"""
+        result = await db.execute(text(_SQL_BUSCAR), {
+            "consultas": [_literal(v) for v in consultas], "id_clinica": id_clinica,
+            "tipos": sorted(tipos) if tipos is not None else None, "k": k,
+        })
+        resultados: List[List[ResultadoVectorial]] = [[] for _ in range(len(consultas))]
+        for n, tipo, id, texto_doc, puntaje in result.all():
+            resultados[n - 1].append(ResultadoVectorial(tipo, id, texto_doc, round(float(puntaje), 4)))
+        return resultados
+
+
+def _aplanar(valor: Any, prefijo: str = "") -> Iterable[str]:
+    """Configuraciones JSON a líneas 'clave: valor' legibles para el embebedor"""
+    if isinstance(valor, dict):
+        for clave, interno in valor.items():
+            yield from _aplanar(interno, f"{prefijo}{str(clave).replace('_', ' ')} ")
+    elif isinstance(valor, list):
+        for interno in valor:
+            yield from _aplanar(interno, prefijo)
+    elif valor is not None:
+        yield f"{prefijo.strip()}: {valor}"
+
+
+def documento_especialidad(fila) -> Documento:
+    partes = [fila.nombre, fila.descripcion, f"Preparación: {fila.preparacion_previa}" if fila.preparacion_previa else None]
+    return Documento("especialidad", fila.id, None, ". ".join(p for p in partes if p))
+
+
+def documento_clinica(fila) -> Documento:
+    lineas = [fila.nombre, *_aplanar(fila.configuraciones or {})]
+    return Documento("clinica", fila.id, fila.id, ". ".join(lineas))
+
+
+def documento_log(fila) -> Optional[Documento]:
+    id_clinica = (fila.metadatos or {}).get("id_clinica")
+    try:
+        id_clinica = int(id_clinica)
+    except (TypeError, ValueError):
+        return None
+    return Documento("log_ia", fila.id, id_clinica, f"{fila.mensaje}\n{fila.respuesta_ia}")
+
+
+class IndiceVectorial:
+    """Índice por clínica: NumPy en memoria para las chicas, pgvector para las grandes"""
+
+    def __init__(
+        self,
+        embebedor: Optional[Embebedor] = None,
+        *,
+        umbral_pgvector: int = Config.INDICE_VECTORIAL_UMBRAL_PGVECTOR,
+        lote: int = 512,
+        intervalo_logs: float = 1.0,
+    ):
+        self.embebedor = embebedor or EmbebedorHashing()
+        self.memoria = IndiceVectorialMemoria(self.embebedor.dimension)
+        self.postgres = IndiceVectorialPostgres()
+        self.umbral_pgvector = umbral_pgvector
+        self.lote = lote
+        self.intervalo_logs = intervalo_logs
+        self._huellas: Dict[Clave, str] = {}
+        self._ubicacion: Dict[Clave, Optional[int]] = {}
+        self._conteos: Counter = Counter()
+        # Clínicas que pasaron el umbral: se consultan en pgvector y no se guardan en memoria
+        self._grandes: Set[int] = set()
+        self._cargado = False
+        self._usar_postgres: Optional[bool] = None
+        self._pendientes: Dict[str, Set[int]] = defaultdict(set)
+        self._todo_pendiente: Set[str] = set()
+        self._ultimo_log = 0
+        self._logs_revisados = 0.0  # time.monotonic() de la última lectura de LogIA nuevos
+        self.embebidos = 0
+        self._desuscribir = None
+
+    # Cambios
+    def al_cambiar(self, evento: EventoCambio) -> None:
+        """Suscriptor del bus de cambios: anotar qué releer en el próximo `sincronizar`"""
+        tipo = {"especialidades": "especialidad", "clinicas": "clinica"}.get(evento.entidad)
+        if tipo is None:
+            return
+        if evento.ids:
+            self._pendientes[tipo].update(int(i) for i in evento.ids)
+        else:
+            self._todo_pendiente.add(tipo)
+
+    def suscribir(self) -> "IndiceVectorial":
+        if self._desuscribir is None:
+            self._desuscribir = bus_cambios.suscribir(self.al_cambiar, entidades=["especialidades", "clinicas"])
+        return self
+
+    def desuscribir(self) -> None:
+        if self._desuscribir is not None:
+            self._desuscribir()
+            self._desuscribir = None
+
+    # Carga incremental
+    async def sincronizar(self, db: AsyncSession) -> int:
+        """Indexar lo que cambió desde la última vez; devuelve cuántos documentos se embebieron"""
+        if self._usar_postgres is None:
+            self._usar_postgres = await self.postgres.disponible(db)
+        if not self._cargado:
+            self._todo_pendiente.update(("especialidad", "clinica"))
+        embebidos = 0
+        for tipo, modelo, columnas, armar in (
+            ("especialidad", Especialidad, ("id", "nombre", "descripcion", "preparacion_previa"), documento_especialidad),
+            ("clinica", Clinica, ("id", "nombre", "configuraciones"), documento_clinica),
+        ):
+            todo = tipo in self._todo_pendiente
+            ids = self._pendientes.pop(tipo, set())
+            self._todo_pendiente.discard(tipo)
+            if not todo and not ids:
+                continue
+            query = select(*(getattr(modelo, c) for c in columnas))
+            if not todo:
+                query = query.filter(modelo.id.in_(ids))
+            documentos = [armar(fila) for fila in (await db.execute(query)).all()]
+            presentes = {d.id for d in documentos}
+            if todo:
+                borrados = [c for c in self._huellas if c[0] == tipo and c[1] not in presentes]
+            else:
+                borrados = [(tipo, id) for id in ids if id not in presentes]
+            await self._quitar(db, borrados)
+            embebidos += await self._poner(db, documentos)
+
+        embebidos += await self._indexar_logs(db)
+        if self._usar_postgres:
+            await db.commit()
+        self._cargado = True
+        self.embebidos += embebidos
+        return embebidos
+
+    async def _indexar_logs(self, db: AsyncSession) -> int:
+        """LogIA: sólo los nuevos (el pipeline no emite eventos y los logs no se editan)"""
+        self._logs_revisados = time.monotonic()
+        embebidos = 0
+        while True:
+            filas = (await db.execute(
+                select(LogIA.id, LogIA.mensaje, LogIA.respuesta_ia, LogIA.metadatos)
+                .filter(LogIA.id > self._ultimo_log, LogIA.confianza == "alta")
+                .order_by(LogIA.id).limit(self.lote)
+            )).all()
+            if not filas:
+                return embebidos
+            self._ultimo_log = filas[-1].id
+            embebidos += await self._poner(db, [d for d in map(documento_log, filas) if d is not None])
+
+    def _en_memoria(self, id_clinica: Optional[int]) -> bool:
+        return id_clinica is None or id_clinica not in self._grandes
+
+    def _ubicar(self, clave: Clave, id_clinica: Optional[int]) -> None:
+        if clave in self._ubicacion:
+            self._conteos[self._ubicacion[clave]] -= 1
+        self._ubicacion[clave] = id_clinica
+        self._conteos[id_clinica] += 1
+        if self._usar_postgres and id_clinica is not None and self._conteos[id_clinica] > self.umbral_pgvector:
+            self._grandes.add(id_clinica)
+
+    async def _poner(self, db: AsyncSession, documentos: List[Documento]) -> int:
+        cambiados = [d for d in documentos if self._huellas.get(d.clave) != d.huella]
+        if not cambiados:
+            return 0
+        # Lo que ya está en pgvector con el mismo texto (p. ej. de otro proceso) no se reescribe
+        en_postgres = await self.postgres.huellas(db, [d.clave for d in cambiados]) if self._usar_postgres else {}
+        for documento in cambiados:
+            self._ubicar(documento.clave, documento.id_clinica)
+        for clinica in {d.id_clinica for d in cambiados} & self._grandes:
+            self.memoria.quitar_clinica(clinica)
+
+        embebidos = 0
+        for inicio in range(0, len(cambiados), self.lote):
+            tanda = cambiados[inicio:inicio + self.lote]
+            a_memoria = [d for d in tanda if self._en_memoria(d.id_clinica)]
+            a_postgres = [d for d in tanda if self._usar_postgres and en_postgres.get(d.clave) != d.huella]
+            a_embeber = list({d.clave: d for d in a_memoria + a_postgres}.values())
+            if a_embeber:
+                vectores = self.embebedor.embeber([d.texto for d in a_embeber])
+                fila = {d.clave: i for i, d in enumerate(a_embeber)}
+                if a_memoria:
+                    self.memoria.poner(a_memoria, vectores[[fila[d.clave] for d in a_memoria]])
+                if a_postgres:
+                    await self.postgres.poner(db, a_postgres, vectores[[fila[d.clave] for d in a_postgres]])
+                embebidos += len(a_embeber)
+            self._huellas.update((d.clave, d.huella) for d in tanda)
+        return embebidos
+
+    async def _quitar(self, db: AsyncSession, claves: List[Clave]) -> None:
+        self.memoria.quitar(claves)
+        if self._usar_postgres:
+            await self.postgres.quitar(db, claves)
+        for clave in claves:
+            self._huellas.pop(clave, None)
+            if clave in self._ubicacion:
+                self._conteos[self._ubicacion.pop(clave)] -= 1
+
+    # Consultas
+    async def buscar(
+        self,
+        db: AsyncSession,
+        id_clinica: int,
+        consultas: Sequence[str],
+        *,
+        k: int = 5,
+        tipos: Optional[Iterable[str]] = None,
+    ) -> List[List[ResultadoVectorial]]:
+        """Top-k para cada consulta del lote, entre los documentos de la clínica y los comunes"""
+        if not self._cargado or self._pendientes or self._todo_pendiente:
+            await self.sincronizar(db)
+        elif time.monotonic() - self._logs_revisados >= self.intervalo_logs:
+            embebidos = await self._indexar_logs(db)
+            if embebidos and self._usar_postgres:
+                await db.commit()
+            self.embebidos += embebidos
+        if not consultas:
+            return []
+        vectores = self.embebedor.embeber(consultas)
+        tipos = set(tipos) if tipos is not None else None
+        if id_clinica in self._grandes:
+            return await self.postgres.buscar(db, id_clinica, vectores, k, tipos)
+        return self.memoria.buscar(id_clinica, vectores, k, tipos)
+
+
+def recall_at_k(exactos: List[List[ResultadoVectorial]], aproximados: List[List[ResultadoVectorial]]) -> float:
+    """Fracción de los top-k exactos que aparece en los aproximados (promedio por consulta)"""
+    valores = []
+    for esperado, obtenido in zip(exactos, aproximados):
+        if esperado:
+            claves = {(r.tipo, r.id) for r in obtenido}
+            valores.append(sum((r.tipo, r.id) in claves for r in esperado) / len(esperado))
+    return sum(valores) / len(valores) if valores else 1.0
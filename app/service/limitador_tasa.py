@@ -0,0 +1,77 @@
+"""Token buckets por clave (p. ej. por did_whatsapp) para respetar límites de tasa.
+
+LimitadorTasaRedis guarda el bucket en Redis y lo actualiza con un script Lua atómico,
+así el límite se respeta entre todos los procesos que envían con el mismo número.
+LimitadorTasaMemoria hace lo mismo dentro de un proceso (tests, desarrollo).
+"""
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Tuple
+
+import redis.asyncio as aioredis
+
+# Devuelve "0" si tomó un token, o los segundos que faltan para que haya uno.
+# Usa el reloj de Redis (TIME) para que todos los procesos compartan la misma hora.
+_SCRIPT_TOKEN_BUCKET = """
+local capacidad = tonumber(ARGV[1])
+local tasa = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local ahora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local datos = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(datos[1]) or capacidad
+local ts = tonumber(datos[2]) or ahora
+tokens = math.min(capacidad, tokens + math.max(0, ahora - ts) * tasa)
+local espera = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    espera = (1 - tokens) / tasa
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(ahora))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacidad / tasa * 1000) + 1000)
+return tostring(espera)
+"""
+
+
+class LimitadorTasa(ABC):
+    """`tasa` tokens por segundo con ráfagas de hasta `capacidad`"""
+
+    def __init__(self, tasa: float, capacidad: float):
+        self.tasa = tasa
+        self.capacidad = capacidad
+
+    @abstractmethod
+    async def reservar(self, clave: str) -> float:
+        """Tomar un token: devuelve 0 si lo obtuvo, si no los segundos a esperar (no toma nada)"""
+
+
+class LimitadorTasaRedis(LimitadorTasa):
+
+    def __init__(self, cliente: aioredis.Redis, tasa: float, capacidad: float, *, prefijo: str = "limite_tasa"):
+        super().__init__(tasa, capacidad)
+        self.cliente = cliente
+        self.prefijo = prefijo
+        self._script = cliente.register_script(_SCRIPT_TOKEN_BUCKET)
+
+    async def reservar(self, clave: str) -> float:
+        espera = await self._script(keys=[f"{self.prefijo}:{clave}"], args=[self.capacidad, self.tasa])
+        return float(espera)
+
+
+class LimitadorTasaMemoria(LimitadorTasa):
+
+    def __init__(self, tasa: float, capacidad: float):
+        super().__init__(tasa, capacidad)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def reservar(self, clave: str) -> float:
+        ahora = time.monotonic()
+        tokens, ts = self._buckets.get(clave, (self.capacidad, ahora))
+        tokens = min(self.capacidad, tokens + (ahora - ts) * self.tasa)
+        espera = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            espera = (1 - tokens) / self.tasa
+        self._buckets[clave] = (tokens, ahora)
+        return espera
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Union
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import Config
+from app.config.database import AsyncSessionLocal
+from app.models.entities import LogIA
+from app.repositories.repositories import log_ia_resumen_repo
+from app.schemas.responses import LogIACreate
+
+logger = logging.getLogger(__name__)
+
+POLITICAS_DESCARTE = ("descartar_nuevos", "descartar_antiguos", "bloquear")
+COLUMNAS_LOG_IA = ("mensaje", "respuesta_ia", "confianza", "fecha", "metadatos")
+
+
+@dataclass
+class EstadisticasPipeline:
+    """Contadores del pipeline, útiles para métricas y para ajustar la cola"""
+    encolados: int = 0
+    descartados: int = 0
+    escritos: int = 0
+    lotes: int = 0
+    errores: int = 0
+
+    def como_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class LogIAPipeline:
+    """Ingesta asíncrona de LogIA.
+
+    Los logs se encolan en memoria (cola acotada) y una tarea de fondo los
+    escribe por lotes, cuando se junta `max_lote` o pasa `intervalo_flush`.
+    En PostgreSQL/asyncpg el lote se escribe con COPY; en otros motores con
+    un INSERT multi-fila. Si la cola se llena se aplica la política de descarte.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        *,
+        max_cola: int = Config.LOG_IA_COLA_MAX,
+        max_lote: int = Config.LOG_IA_LOTE_MAX,
+        intervalo_flush: float = Config.LOG_IA_FLUSH_SEGUNDOS,
+        politica: str = Config.LOG_IA_POLITICA_DESCARTE,
+        espera_bloqueo: float = 0.05,
+    ):
+        if politica not in POLITICAS_DESCARTE:
+            raise ValueError(f"Política de descarte inválida: {politica}")
+        self.session_factory = session_factory
+        self.max_cola = max_cola
+        self.max_lote = max_lote
+        self.intervalo_flush = intervalo_flush
+        self.politica = politica
+        self.espera_bloqueo = espera_bloqueo
+        self.estadisticas = EstadisticasPipeline()
+        self._cola: Optional[asyncio.Queue] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._detenido: Optional[asyncio.Event] = None
+        self._escribiendo = False
+
+    @property
+    def activo(self) -> bool:
+        return self._tarea is not None and not self._tarea.done()
+
+    @property
+    def pendientes(self) -> int:
+        return self._cola.qsize() if self._cola is not None else 0
+
+    async def iniciar(self) -> None:
+        """Crear la cola y lanzar la tarea de escritura en el loop actual"""
+        if self.activo:
+            return
+        self._cola = asyncio.Queue(maxsize=self.max_cola)
+        self._detenido = asyncio.Event()
+        self._tarea = asyncio.create_task(self._bucle_escritura(), name="log_ia_pipeline")
+
+    async def detener(self) -> None:
+        """Detener la tarea de fondo y escribir todo lo que quedó en la cola"""
+        if self._tarea is not None:
+            self._detenido.set()
+            # Sólo se cancela mientras espera la cola; un lote en escritura se termina
+            if not self._escribiendo:
+                self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+        await self.flush()
+
+    async def registrar(self, obj_in: Union[LogIACreate, Dict[str, Any]]) -> bool:
+        """Encolar un log sin tocar la base. Devuelve False si fue descartado"""
+        if self._cola is None:
+            raise RuntimeError("El pipeline de LogIA no fue iniciado")
+
+        registro = self._a_registro(obj_in)
+        try:
+            self._cola.put_nowait(registro)
+        except asyncio.QueueFull:
+            if not await self._aplicar_politica(registro):
+                self.estadisticas.descartados += 1
+                return False
+        self.estadisticas.encolados += 1
+        return True
+
+    async def flush(self) -> int:
+        """Escribir inmediatamente todo lo pendiente. Devuelve la cantidad escrita"""
+        escritos = 0
+        while self.pendientes:
+            lote = self._tomar_disponibles()
+            await self._escribir_lote(lote)
+            escritos += len(lote)
+        return escritos
+
+    async def _aplicar_politica(self, registro: Dict[str, Any]) -> bool:
+        if self.politica == "descartar_antiguos":
+            try:
+                self._cola.get_nowait()
+                self.estadisticas.descartados += 1
+            except asyncio.QueueEmpty:
+                pass
+            self._cola.put_nowait(registro)
+            return True
+
+        if self.politica == "bloquear":
+            # Backpressure acotada: el request espera un poco, nunca indefinidamente
+            try:
+                await asyncio.wait_for(self._cola.put(registro), self.espera_bloqueo)
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+        return False
+
+    def _a_registro(self, obj_in: Union[LogIACreate, Dict[str, Any]]) -> Dict[str, Any]:
+        datos = obj_in.model_dump() if hasattr(obj_in, "model_dump") else dict(obj_in)
+        confianza = datos.get("confianza")
+        return {
+            "mensaje": datos["mensaje"],
+            "respuesta_ia": datos["respuesta_ia"],
+            "confianza": getattr(confianza, "value", confianza),
+            # La fecha se fija al encolar: el lote puede escribirse más tarde
+            "fecha": datos.get("fecha") or datetime.now(timezone.utc),
+            "metadatos": datos.get("metadatos"),
+        }
+
+    def _tomar_disponibles(self, cantidad: Optional[int] = None) -> List[Dict[str, Any]]:
+        cantidad = self.max_lote if cantidad is None else cantidad
+        lote = []
+        while len(lote) < cantidad:
+            try:
+                lote.append(self._cola.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return lote
+
+    async def _bucle_escritura(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._detenido.is_set():
+            lote: List[Dict[str, Any]] = []
+            try:
+                lote.append(await self._cola.get())
+                limite = loop.time() + self.intervalo_flush
+                while len(lote) < self.max_lote:
+                    lote.extend(self._tomar_disponibles(self.max_lote - len(lote)))
+                    restante = limite - loop.time()
+                    if len(lote) >= self.max_lote or restante <= 0:
+                        break
+                    try:
+                        lote.append(await asyncio.wait_for(self._cola.get(), restante))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Cancelada mientras juntaba: se escribe lo ya tomado de la cola
+                await self._escribir_lote(lote)
+                raise
+            self._escribiendo = True
+            try:
+                await self._escribir_lote(lote)
+            finally:
+                self._escribiendo = False
+
+    async def _escribir_lote(self, lote: List[Dict[str, Any]]) -> None:
+        if not lote:
+            return
+        try:
+            async with self.session_factory() as db:
+                if db.get_bind().dialect.driver == "asyncpg":
+                    await self._copiar(db, lote)
+                else:
+                    await db.execute(insert(LogIA), lote)
+                # El rollup por hora se actualiza en la misma transacción del lote
+                await log_ia_resumen_repo.incrementar(db, registros=lote)
+                await db.commit()
+        except Exception:
+            self.estadisticas.errores += 1
+            logger.exception("No se pudo escribir un lote de %d logs IA", len(lote))
+            return
+        self.estadisticas.lotes += 1
+        self.estadisticas.escritos += len(lote)
+
+    async def _copiar(self, db: AsyncSession, lote: List[Dict[str, Any]]) -> None:
+        """COPY binario vía asyncpg directo a la tabla particionada"""
+        conexion = await db.connection()
+        raw = await conexion.get_raw_connection()
+        registros = [
+            (
+                r["mensaje"],
+                r["respuesta_ia"],
+                r["confianza"],
+                r["fecha"],
+                json.dumps(r["metadatos"]) if r["metadatos"] is not None else None,
+            )
+            for r in lote
+        ]
+        await raw.driver_connection.copy_records_to_table(
+            LogIA.__tablename__, records=registros, columns=COLUMNAS_LOG_IA
+        )
+
+
+# Instancia global del pipeline (se inicia en el lifespan de la app)
+log_ia_pipeline = LogIAPipeline()
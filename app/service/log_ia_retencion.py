@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Config
+from app.config.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# logs_ia está particionada por rango mensual sobre `fecha` (ver migración b7d41e2a9c10).
+# Cada partición se llama logs_ia_AAAA_MM; logs_ia_default recibe lo que quede fuera.
+TABLA_LOGS_IA = "logs_ia"
+PATRON_PARTICION = re.compile(r"^logs_ia_(\d{4})_(\d{2})$")
+
+
+def inicio_mes(fecha: date) -> date:
+    return date(fecha.year, fecha.month, 1)
+
+
+def sumar_meses(fecha: date, meses: int) -> date:
+    """Primer día del mes desplazado `meses` desde `fecha`"""
+    indice = fecha.year * 12 + (fecha.month - 1) + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def nombre_particion(fecha: date) -> str:
+    return f"{TABLA_LOGS_IA}_{fecha.year:04d}_{fecha.month:02d}"
+
+
+def _es_postgres(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+async def listar_particiones(db: AsyncSession) -> List[str]:
+    """Nombres de las particiones adjuntas a logs_ia"""
+    result = await db.execute(text(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :tabla
+        ORDER BY c.relname
+        """
+    ), {"tabla": TABLA_LOGS_IA})
+    return [row[0] for row in result.all()]
+
+
+async def crear_particiones(
+    db: AsyncSession,
+    *,
+    desde: Optional[date] = None,
+    meses: int = 3
+) -> List[str]:
+    """Crear (si faltan) las particiones del mes de `desde` y los `meses` siguientes"""
+    if not _es_postgres(db):
+        return []
+
+    desde = inicio_mes(desde or datetime.now(timezone.utc).date())
+    existentes = set(await listar_particiones(db))
+    creadas = []
+    for i in range(meses + 1):
+        inicio = sumar_meses(desde, i)
+        nombre = nombre_particion(inicio)
+        if nombre in existentes:
+            continue
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {nombre} PARTITION OF {TABLA_LOGS_IA} "
+            f"FOR VALUES FROM ('{inicio.isoformat()}') TO ('{sumar_meses(inicio, 1).isoformat()}')"
+        ))
+        creadas.append(nombre)
+    await db.commit()
+    return creadas
+
+
+async def purgar_particiones(
+    db: AsyncSession,
+    *,
+    retencion_meses: int = Config.LOG_IA_RETENCION_MESES,
+    hoy: Optional[date] = None
+) -> List[str]:
+    """Desadjuntar y eliminar las particiones más viejas que la retención"""
+    if not _es_postgres(db):
+        return []
+
+    limite = sumar_meses(inicio_mes(hoy or datetime.now(timezone.utc).date()), -retencion_meses)
+    eliminadas = []
+    for nombre in await listar_particiones(db):
+        coincidencia = PATRON_PARTICION.match(nombre)
+        if not coincidencia:
+            continue
+        inicio = date(int(coincidencia.group(1)), int(coincidencia.group(2)), 1)
+        if inicio >= limite:
+            continue
+        # DETACH primero: el DROP sobre una tabla suelta no bloquea al padre
+        await db.execute(text(f"ALTER TABLE {TABLA_LOGS_IA} DETACH PARTITION {nombre}"))
+        await db.execute(text(f"DROP TABLE {nombre}"))
+        eliminadas.append(nombre)
+    await db.commit()
+    return eliminadas
+
+
+async def mantener_particiones(meses_adelante: int = 3) -> None:
+    """Tarea de mantenimiento: crear particiones futuras y purgar las viejas"""
+    async with AsyncSessionLocal() as db:
+        creadas = await crear_particiones(db, meses=meses_adelante)
+        eliminadas = await purgar_particiones(db)
+    logger.info("Particiones logs_ia creadas=%s eliminadas=%s", creadas, eliminadas)
+
+
+if __name__ == "__main__":
+    # Pensado para correr desde cron, por ejemplo una vez por día
+    asyncio.run(mantener_particiones())
@@ -0,0 +1,22 @@
+"""Procesamiento de un mensaje entrante de WhatsApp (lo ejecutan los workers de la cola)"""
+import asyncio
+from typing import Any, Dict
+
+from app.repositories.redis_session import update_user_session
+from app.schemas.whatsapp import MensajeEntrante
+
+
+async def procesar_mensaje(datos: Dict[str, Any]) -> None:
+    """Registrar el mensaje en la sesión del usuario.
+
+    Las excepciones no se atrapan: el worker no confirma el mensaje y se reintenta.
+    """
+    mensaje = MensajeEntrante.model_validate(datos)
+    # redis_session es sincrónico; se corre en un hilo para no bloquear el loop
+    await asyncio.to_thread(update_user_session, mensaje.wa_id, "ultimo_mensaje", {
+        "id": mensaje.id_mensaje,
+        "did_whatsapp": mensaje.did_whatsapp,
+        "timestamp": mensaje.timestamp,
+        "tipo": mensaje.tipo,
+        "texto": mensaje.texto,
+    })
@@ -0,0 +1,303 @@
+"""Respuestas a mensajes libres: preguntas frecuentes, caché de respuestas y el LLM.
+
+El LLM es el paso más lento y caro de un mensaje, así que antes de llamarlo:
+1. Preguntas frecuentes que salen de los datos: el horario de atención
+   (`configuraciones["horario_atencion"]`) y la preparación de una especialidad
+   (`Especialidad.preparacion_previa`). Se responden sin modelo ni caché sólo si el mensaje
+   es una pregunta corta sobre eso: con cualquier otra palabra ("quiero cambiar el horario
+   de mi turno", "no abren los domingos?") decide el LLM.
+2. Caché por clínica de respuestas anteriores de confianza alta, con el mensaje normalizado
+   (minúsculas, sin acentos ni puntuación, sin saludos de cortesía) como clave y LRU.
+   No se guardan mensajes con números: suelen traer DNI, fechas u otros datos personales.
+3. El cliente LLM (ClienteLLM; en tests, ClienteLLMFalso).
+
+Cada respuesta del LLM se registra como LogIA por el pipeline de ingesta (LogIAPipeline, sin
+esperar a la base) y la caché se puede precargar desde los LogIA recientes de confianza alta.
+Un cambio de la clínica descarta sus respuestas cacheadas; uno de especialidades, las de todas.
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import Config
+from app.core.eventos import EventoCambio, bus_cambios
+from app.core.metricas import span
+from app.models.entities import LogIA
+from app.repositories.repositories import clinica_repo, especialidad_repo, log_ia_repo
+from app.service.log_ia_pipeline import LogIAPipeline, log_ia_pipeline
+from app.utils.texto import normalizar_texto
+
+# Palabras que no cambian la pregunta ("hola, buenas, ¿a qué hora abren?")
+CORTESIA = frozenset({"hola", "buenas", "buenos", "buen", "dia", "dias", "tardes", "noches", "por", "favor", "gracias", "consulta"})
+PALABRAS_HORARIO = frozenset({"horario", "horarios", "atienden", "abren", "cierran", "abierto", "abierta"})
+PALABRAS_PREPARACION = frozenset({"preparacion", "preparo", "preparar", "prepararme", "ayuno", "ayunas", "llevar"})
+# Lo que puede acompañar a esas palabras en una pregunta frecuente ("¿en qué horario atienden?")
+PALABRAS_PREGUNTA = frozenset({
+    "a", "al", "como", "cual", "cuales", "de", "del", "el", "en", "es", "hay", "hora", "horas", "la", "las", "lo",
+    "los", "me", "para", "que", "saber", "se", "son", "su", "sus", "tengo", "tienen", "un", "una", "y", "atencion",
+    "hacer", "ir", "necesito", "quisiera", "queria", "estan", "esta",
+})
+
+FAQ = "faq"
+CACHE = "cache"
+LLM = "llm"
+
+
+@dataclass(frozen=True)
+class RespuestaIA:
+    texto: str
+    confianza: str  # baja, media, alta
+    origen: str = LLM  # faq, cache, llm
+
+
+class ClienteLLM(ABC):
+    """Cliente del modelo: recibe el mensaje y el contexto de la clínica"""
+
+    nombre = "llm"
+
+    @abstractmethod
+    async def responder(self, mensaje: str, contexto: Dict[str, Any]) -> RespuestaIA:
+        ...
+
+
+class ClienteLLMFalso(ClienteLLM):
+    """Respuestas fijas por mensaje normalizado, para tests y benchmarks"""
+
+    nombre = "falso"
+
+    def __init__(self, respuestas: Optional[Dict[str, Tuple[str, str]]] = None, demora: float = 0.0):
+        self.respuestas = {normalizar_texto(m): r for m, r in (respuestas or {}).items()}
+        self.demora = demora
+        self.llamadas: List[str] = []
+
+    async def responder(self, mensaje: str, contexto: Dict[str, Any]) -> RespuestaIA:
+        self.llamadas.append(mensaje)
+        if self.demora:
+            await asyncio.sleep(self.demora)
+        texto, confianza = self.respuestas.get(normalizar_texto(mensaje), ("No estoy seguro, te derivo a recepción.", "baja"))
+        return RespuestaIA(texto, confianza)
+
+
+def clave_mensaje(mensaje: str) -> str:
+    """Mensaje normalizado y sin palabras de cortesía"""
+    return " ".join(p for p in normalizar_texto(mensaje).split() if p not in CORTESIA)
+
+
+@dataclass
+class ConocimientoClinica:
+    """Datos de la clínica para responder preguntas frecuentes sin el modelo"""
+    nombre: str
+    horario_atencion: Optional[str] = None
+    preparaciones: Dict[str, Tuple[str, str]] = field(default_factory=dict)  # nombre normalizado -> (nombre, texto)
+
+    def responder(self, clave: str) -> Optional[str]:
+        """Respuesta si `clave` es sólo una pregunta por el horario o por una preparación"""
+        restantes = set(clave.split()) - PALABRAS_PREGUNTA
+        if restantes & PALABRAS_PREPARACION:
+            for normalizada, (nombre, texto) in self.preparaciones.items():
+                if normalizada in clave and restantes <= PALABRAS_PREPARACION | set(normalizada.split()):
+                    return f"Preparación para {nombre}: {texto}"
+        if restantes & PALABRAS_HORARIO and restantes <= PALABRAS_HORARIO and self.horario_atencion:
+            return f"{self.nombre} atiende {self.horario_atencion}."
+        return None
+
+
+def _formatear_horario_atencion(horario: Any) -> Optional[str]:
+    if isinstance(horario, dict) and horario.get("inicio") and horario.get("fin"):
+        return f"de {horario['inicio']} a {horario['fin']}"
+    return str(horario) if horario else None
+
+
+@dataclass
+class EstadisticasRespuestas:
+    faq: int = 0
+    aciertos: int = 0
+    fallos: int = 0  # llamadas al LLM
+    guardadas: int = 0
+    desalojadas: int = 0
+
+    @property
+    def tasa_aciertos(self) -> float:
+        """Mensajes respondidos sin el LLM"""
+        total = self.faq + self.aciertos + self.fallos
+        return (self.faq + self.aciertos) / total if total else 0.0
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "tasa_aciertos": round(self.tasa_aciertos, 4)}
+
+
+@dataclass
+class _Entrada:
+    respuesta: RespuestaIA
+    expira: float
+
+
+class CacheRespuestas:
+    """LRU de respuestas por clínica (un espacio de nombres y un límite por clínica)"""
+
+    def __init__(
+        self,
+        *,
+        max_por_clinica: int = Config.RESPUESTAS_CACHE_MAX_POR_CLINICA,
+        ttl: float = Config.RESPUESTAS_CACHE_TTL_SEGUNDOS,
+        confianzas: Iterable[str] = ("alta",),
+    ):
+        self.max_por_clinica = max_por_clinica
+        self.ttl = ttl
+        self.confianzas = frozenset(confianzas)
+        self._clinicas: Dict[Any, "OrderedDict[str, _Entrada]"] = {}
+        self.estadisticas: Dict[Any, EstadisticasRespuestas] = {}
+
+    def estadisticas_de(self, id_clinica: Any) -> EstadisticasRespuestas:
+        estadisticas = self.estadisticas.get(id_clinica)
+        if estadisticas is None:
+            estadisticas = self.estadisticas[id_clinica] = EstadisticasRespuestas()
+        return estadisticas
+
+    def obtener(self, id_clinica: Any, clave: str) -> Optional[RespuestaIA]:
+        entradas = self._clinicas.get(id_clinica)
+        entrada = entradas.get(clave) if entradas else None
+        if entrada is None:
+            return None
+        if entrada.expira <= time.monotonic():
+            del entradas[clave]
+            return None
+        entradas.move_to_end(clave)
+        return entrada.respuesta
+
+    def cacheable(self, clave: str, respuesta: RespuestaIA) -> bool:
+        return bool(clave) and respuesta.confianza in self.confianzas and not any(c.isdigit() for c in clave)
+
+    def guardar(self, id_clinica: Any, clave: str, respuesta: RespuestaIA) -> bool:
+        if not self.cacheable(clave, respuesta):
+            return False
+        entradas = self._clinicas.setdefault(id_clinica, OrderedDict())
+        entradas[clave] = _Entrada(RespuestaIA(respuesta.texto, respuesta.confianza, CACHE), time.monotonic() + self.ttl)
+        entradas.move_to_end(clave)
+        estadisticas = self.estadisticas_de(id_clinica)
+        estadisticas.guardadas += 1
+        while len(entradas) > self.max_por_clinica:
+            entradas.popitem(last=False)
+            estadisticas.desalojadas += 1
+        return True
+
+    def invalidar(self, id_clinica: Any = None) -> None:
+        """Descartar las respuestas (de una clínica o de todas) sin perder las estadísticas"""
+        if id_clinica is None:
+            self._clinicas.clear()
+        else:
+            self._clinicas.pop(id_clinica, None)
+
+    def tamanio(self, id_clinica: Any) -> int:
+        return len(self._clinicas.get(id_clinica) or ())
+
+    def limpiar(self, id_clinica: Any = None) -> None:
+        if id_clinica is None:
+            self._clinicas.clear()
+            self.estadisticas.clear()
+        else:
+            self._clinicas.pop(id_clinica, None)
+            self.estadisticas.pop(id_clinica, None)
+
+
+class AsistenteRespuestas:
+    """Responde un mensaje de una clínica probando FAQ, caché y recién después el LLM"""
+
+    def __init__(
+        self,
+        cliente: ClienteLLM,
+        cache: Optional[CacheRespuestas] = None,
+        *,
+        pipeline_logs: Optional[LogIAPipeline] = log_ia_pipeline,
+    ):
+        self.cliente = cliente
+        self.cache = cache or CacheRespuestas()
+        self.pipeline_logs = pipeline_logs
+        self._conocimiento: Dict[Any, ConocimientoClinica] = {}
+        self._desuscribir = None
+
+    async def conocimiento(self, db: AsyncSession, id_clinica: Any) -> ConocimientoClinica:
+        conocimiento = self._conocimiento.get(id_clinica)
+        if conocimiento is None:
+            clinica = await clinica_repo.get(db, id_clinica)
+            configuraciones = (clinica.configuraciones if clinica else None) or {}
+            especialidades = await especialidad_repo.get_filas(
+                db, columnas=["nombre", "preparacion_previa"],
+                condiciones=[especialidad_repo.model.preparacion_previa.isnot(None)], limit=10_000,
+            )
+            conocimiento = ConocimientoClinica(
+                nombre=clinica.nombre if clinica else "La clínica",
+                horario_atencion=_formatear_horario_atencion(configuraciones.get("horario_atencion")),
+                preparaciones={normalizar_texto(nombre): (nombre, texto) for nombre, texto in especialidades},
+            )
+            self._conocimiento[id_clinica] = conocimiento
+        return conocimiento
+
+    async def responder(self, db: AsyncSession, id_clinica: Any, mensaje: str) -> RespuestaIA:
+        clave = clave_mensaje(mensaje)
+        estadisticas = self.cache.estadisticas_de(id_clinica)
+        conocimiento = await self.conocimiento(db, id_clinica)
+
+        texto = conocimiento.responder(clave)
+        if texto is not None:
+            estadisticas.faq += 1
+            return RespuestaIA(texto, "alta", FAQ)
+
+        respuesta = self.cache.obtener(id_clinica, clave)
+        if respuesta is not None:
+            estadisticas.aciertos += 1
+            return respuesta
+
+        estadisticas.fallos += 1
+        with span("llm", self.cliente.nombre):
+            respuesta = await self.cliente.responder(mensaje, {"id_clinica": id_clinica, "clinica": conocimiento.nombre})
+        self.cache.guardar(id_clinica, clave, respuesta)
+        # Sin el pipeline iniciado (scripts, tests) la respuesta no se registra
+        if self.pipeline_logs is not None and self.pipeline_logs.activo:
+            await self.pipeline_logs.registrar({
+                "mensaje": mensaje, "respuesta_ia": respuesta.texto, "confianza": respuesta.confianza,
+                "metadatos": {"id_clinica": id_clinica},
+            })
+        return respuesta
+
+    async def precargar(self, db: AsyncSession, *, dias: int = 7, limite: int = 10_000) -> int:
+        """Cargar la caché con los LogIA recientes de confianza alta (del más viejo al más nuevo)"""
+        desde = datetime.now(timezone.utc) - timedelta(days=dias)
+        filas = await log_ia_repo.get_filas(
+            db, columnas=["mensaje", "respuesta_ia", "confianza", "metadatos"],
+            filters={"confianza": "alta"}, condiciones=[LogIA.fecha >= desde],
+            order_by=[LogIA.fecha.desc()], limit=limite,
+        )
+        cargadas = 0
+        for mensaje, texto, confianza, metadatos in reversed(filas):
+            id_clinica = (metadatos or {}).get("id_clinica")
+            if id_clinica is not None:
+                cargadas += self.cache.guardar(id_clinica, clave_mensaje(mensaje), RespuestaIA(texto, confianza))
+        return cargadas
+
+    def al_cambiar(self, evento: EventoCambio) -> None:
+        """Suscriptor del bus de cambios: los datos de las FAQ (y de las respuestas cacheadas) cambiaron"""
+        if evento.entidad == "clinicas" and evento.ids:
+            for id in evento.ids:
+                for clave in (id, str(id)):
+                    self._conocimiento.pop(clave, None)
+                    self.cache.invalidar(clave)
+        else:
+            self._conocimiento.clear()
+            self.cache.invalidar()
+
+    def suscribir(self) -> "AsistenteRespuestas":
+        if self._desuscribir is None:
+            self._desuscribir = bus_cambios.suscribir(self.al_cambiar, entidades=["clinicas", "especialidades"])
+        return self
+
+    def desuscribir(self) -> None:
+        if self._desuscribir is not None:
+            self._desuscribir()
+            self._desuscribir = None
@@ -0,0 +1,301 @@
+"""Envío de mensajes salientes de WhatsApp con límite de tasa por número y reparto justo.
+
+Cada clínica envía desde su propio `did_whatsapp` y el proveedor limita la tasa por número.
+DespachadorSalida mantiene una cola por DID y las atiende por turnos (round-robin): un
+envío masivo de recordatorios de una clínica no demora los mensajes de las demás. Antes
+de cada envío se toma un token del bucket del DID (LimitadorTasa, en Redis para que el
+límite valga entre procesos). Los errores transitorios (429, 5xx, red) se reintentan con
+backoff exponencial, respetando Retry-After; los demás errores no se reintentan.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Set
+
+import httpx
+import redis.asyncio as aioredis
+
+from app.config import Config
+from app.core.redis_async import crear_cliente_redis
+from app.service.limitador_tasa import LimitadorTasa, LimitadorTasaMemoria, LimitadorTasaRedis
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorEnvio(Exception):
+    """Error del proveedor al enviar un mensaje"""
+
+    def __init__(self, mensaje: str, *, reintentable: bool, espera: Optional[float] = None):
+        super().__init__(mensaje)
+        self.reintentable = reintentable
+        self.espera = espera
+
+
+class ClienteWhatsApp:
+    """Cliente HTTP del proveedor con pool de conexiones compartido (keep-alive)"""
+
+    def __init__(
+        self,
+        url_base: str = Config.WHATSAPP_API_URL,
+        token: Optional[str] = Config.WHATSAPP_API_TOKEN,
+        *,
+        conexiones: int = Config.SALIDA_WHATSAPP_CONEXIONES,
+        timeout: float = 10.0
+    ):
+        self.url_base = url_base.rstrip("/")
+        self.token = token
+        self.conexiones = conexiones
+        self.timeout = timeout
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.url_base,
+                headers={"Authorization": f"Bearer {self.token}"} if self.token else {},
+                limits=httpx.Limits(max_connections=self.conexiones, max_keepalive_connections=self.conexiones),
+                timeout=self.timeout,
+            )
+        return self._http
+
+    async def enviar(self, did: str, cuerpo: Dict[str, Any]) -> Optional[str]:
+        """Enviar desde `did`; devuelve el id del mensaje asignado por el proveedor"""
+        try:
+            respuesta = await self.http.post(f"/{did}/messages", json=cuerpo)
+        except httpx.TransportError as e:
+            raise ErrorEnvio(f"Error de red: {e!r}", reintentable=True)
+        if respuesta.status_code == 429 or respuesta.status_code >= 500:
+            retry_after = respuesta.headers.get("Retry-After")
+            raise ErrorEnvio(
+                f"HTTP {respuesta.status_code}: {respuesta.text[:200]}",
+                reintentable=True,
+                espera=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        if respuesta.status_code >= 400:
+            raise ErrorEnvio(f"HTTP {respuesta.status_code}: {respuesta.text[:200]}", reintentable=False)
+        mensajes = respuesta.json().get("messages") or [{}]
+        return mensajes[0].get("id")
+
+    async def cerrar(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+@dataclass
+class ResultadoEnvio:
+    did: str
+    destino: str
+    ok: bool
+    intentos: int
+    id_mensaje: Optional[str] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class Envio:
+    did: str
+    destino: str
+    cuerpo: Dict[str, Any]
+    futuro: asyncio.Future
+    intentos: int = 0
+
+
+@dataclass
+class EstadisticasSalida:
+    enviados: int = 0
+    fallidos: int = 0
+    reintentos: int = 0
+    demorados_por_tasa: int = 0
+    por_did: Dict[str, int] = field(default_factory=dict)
+
+
+class DespachadorSalida:
+    """Colas por DID atendidas por turnos, con límite de tasa, concurrencia y reintentos"""
+
+    def __init__(
+        self,
+        cliente: ClienteWhatsApp,
+        limitador: LimitadorTasa,
+        *,
+        concurrencia: int = Config.SALIDA_WHATSAPP_CONEXIONES,
+        max_intentos: int = Config.SALIDA_WHATSAPP_INTENTOS,
+        backoff: float = 0.5,
+        backoff_max: float = 30.0
+    ):
+        self.cliente = cliente
+        self.limitador = limitador
+        self.concurrencia = concurrencia
+        self.max_intentos = max_intentos
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.estadisticas = EstadisticasSalida()
+        self._colas: Dict[str, Deque[Envio]] = {}
+        self._turnos: Deque[str] = deque()  # DIDs con envíos pendientes, en orden de turno
+        self._listo_en: Dict[str, float] = {}  # DID -> momento en que vuelve a tener token
+        self._hay_trabajo = asyncio.Event()
+        self._sin_pendientes = asyncio.Event()
+        self._sin_pendientes.set()
+        self._pendientes = 0
+        self._en_vuelo: Set[asyncio.Task] = set()
+        self._reintentos: Dict[asyncio.TimerHandle, Envio] = {}
+        self._semaforo: Optional[asyncio.Semaphore] = None
+        self._planificador: Optional[asyncio.Task] = None
+
+    @property
+    def pendientes(self) -> int:
+        return self._pendientes
+
+    async def iniciar(self) -> None:
+        if self._planificador is not None and not self._planificador.done():
+            return
+        self._semaforo = asyncio.Semaphore(self.concurrencia)
+        self._planificador = asyncio.create_task(self._planificar(), name="salida-whatsapp")
+
+    async def detener(self, timeout: float = 10.0) -> None:
+        """Esperar a que se envíe lo pendiente (hasta `timeout`) y cerrar el cliente"""
+        if self._planificador is not None:
+            try:
+                await asyncio.wait_for(self._sin_pendientes.wait(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Salida de WhatsApp detenida con %s envíos pendientes", self._pendientes)
+            self._planificador.cancel()
+            await asyncio.gather(self._planificador, *self._en_vuelo, return_exceptions=True)
+            self._planificador = None
+            for temporizador, envio in self._reintentos.items():
+                temporizador.cancel()
+                self._resolver(envio, error="Despachador detenido")
+            self._reintentos.clear()
+            for cola in self._colas.values():
+                while cola:
+                    self._resolver(cola.popleft(), error="Despachador detenido")
+            self._turnos.clear()
+        await self.cliente.cerrar()
+
+    def encolar(self, did: str, destino: str, cuerpo: Dict[str, Any]) -> asyncio.Future:
+        """Encolar un envío; el futuro se resuelve con su ResultadoEnvio"""
+        envio = Envio(did, destino, {"messaging_product": "whatsapp", "to": destino, **cuerpo},
+                      asyncio.get_running_loop().create_future())
+        self._pendientes += 1
+        self._sin_pendientes.clear()
+        self._agregar(envio)
+        return envio.futuro
+
+    async def enviar_texto(self, did: str, destino: str, texto: str) -> ResultadoEnvio:
+        return await self.encolar(did, destino, {"type": "text", "text": {"body": texto}})
+
+    def _agregar(self, envio: Envio, *, al_frente: bool = False) -> None:
+        cola = self._colas.setdefault(envio.did, deque())
+        if not cola and envio.did not in self._turnos:
+            self._turnos.append(envio.did)
+        if al_frente:
+            cola.appendleft(envio)
+        else:
+            cola.append(envio)
+        self._hay_trabajo.set()
+
+    def _reintentar(self, envio: Envio) -> None:
+        for temporizador, pendiente in list(self._reintentos.items()):
+            if pendiente is envio:
+                del self._reintentos[temporizador]
+        self._agregar(envio, al_frente=True)
+
+    def _resolver(self, envio: Envio, *, id_mensaje: Optional[str] = None, error: Optional[str] = None) -> None:
+        if not envio.futuro.done():
+            envio.futuro.set_result(ResultadoEnvio(
+                envio.did, envio.destino, error is None, envio.intentos, id_mensaje, error
+            ))
+        self._pendientes -= 1
+        if self._pendientes == 0:
+            self._sin_pendientes.set()
+
+    async def _siguiente(self) -> Envio:
+        """Próximo envío por turnos entre los DIDs que tienen token disponible"""
+        while True:
+            ahora = time.monotonic()
+            proximo = None
+            for _ in range(len(self._turnos)):
+                did = self._turnos.popleft()
+                cola = self._colas.get(did)
+                if not cola:
+                    continue
+                if self._listo_en.get(did, 0) <= ahora:
+                    try:
+                        espera = await self.limitador.reservar(did)
+                    except Exception:
+                        logger.exception("Error consultando el límite de tasa de %s", did)
+                        espera = 1.0
+                    if espera == 0:
+                        envio = cola.popleft()
+                        if cola:
+                            self._turnos.append(did)
+                        return envio
+                    self.estadisticas.demorados_por_tasa += 1
+                    self._listo_en[did] = ahora + espera
+                self._turnos.append(did)
+                proximo = min(proximo or self._listo_en[did], self._listo_en[did])
+            # Nadie tiene token: esperar al primero que lo recupere o a un envío nuevo
+            self._hay_trabajo.clear()
+            timeout = None if proximo is None else max(0.0, proximo - time.monotonic())
+            try:
+                await asyncio.wait_for(self._hay_trabajo.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _planificar(self) -> None:
+        while True:
+            await self._semaforo.acquire()
+            try:
+                envio = await self._siguiente()
+            except BaseException:
+                self._semaforo.release()
+                raise
+            tarea = asyncio.create_task(self._enviar(envio))
+            self._en_vuelo.add(tarea)
+            tarea.add_done_callback(self._en_vuelo.discard)
+
+    async def _enviar(self, envio: Envio) -> None:
+        envio.intentos += 1
+        try:
+            id_mensaje = await self.cliente.enviar(envio.did, envio.cuerpo)
+        except ErrorEnvio as e:
+            if e.reintentable and envio.intentos < self.max_intentos:
+                espera = e.espera or min(self.backoff_max, self.backoff * 2 ** (envio.intentos - 1))
+                espera *= random.uniform(0.8, 1.2)
+                self.estadisticas.reintentos += 1
+                # Vuelve al frente de la cola de su DID cuando termina el backoff
+                temporizador = asyncio.get_running_loop().call_later(espera, self._reintentar, envio)
+                self._reintentos[temporizador] = envio
+            else:
+                self.estadisticas.fallidos += 1
+                logger.error("Envío a %s desde %s fallido tras %s intentos: %s", envio.destino, envio.did, envio.intentos, e)
+                self._resolver(envio, error=str(e))
+        except Exception as e:
+            self.estadisticas.fallidos += 1
+            logger.exception("Error inesperado enviando a %s desde %s", envio.destino, envio.did)
+            self._resolver(envio, error=repr(e))
+        else:
+            self.estadisticas.enviados += 1
+            self.estadisticas.por_did[envio.did] = self.estadisticas.por_did.get(envio.did, 0) + 1
+            self._resolver(envio, id_mensaje=id_mensaje)
+        finally:
+            self._semaforo.release()
+
+
+def crear_despachador_salida(
+    backend: str = Config.COLA_MENSAJES_BACKEND,
+    cliente_redis: Optional[aioredis.Redis] = None
+) -> DespachadorSalida:
+    """Despachador según el backend configurado; la instancia del proceso vive en app/core/recursos.py"""
+    tasa, capacidad = Config.SALIDA_WHATSAPP_TASA, Config.SALIDA_WHATSAPP_RAFAGA
+    if backend == "memoria":
+        limitador = LimitadorTasaMemoria(tasa, capacidad)
+    else:
+        limitador = LimitadorTasaRedis(
+            cliente_redis or crear_cliente_redis(), tasa, capacidad, prefijo="limite_tasa:whatsapp"
+        )
+    return DespachadorSalida(ClienteWhatsApp(), limitador)
@@ -0,0 +1,195 @@
+"""Pool de workers que consume la cola de mensajes entrantes.
+
+Un lector toma lotes de la cola y los reparte en `concurrencia` shards según la clave del
+mensaje (el wa_id, con particion_de): cada shard procesa de a un mensaje, así los mensajes
+de un mismo usuario se procesan en el orden en que llegaron (la sesión de redis_session
+depende de eso) y los de usuarios distintos en paralelo.
+
+Un mensaje que falla se reintenta en el mismo shard, con backoff, antes de pasar al
+siguiente del usuario; tras `max_entregas` intentos va a la dead-letter. El lector también
+reclama los mensajes que otro consumidor dejó sin confirmar más de `visibilidad` segundos
+(se cayó el proceso). Los mensajes que este pool tiene en mano (esperando en un shard o en
+proceso) no se reclaman y su inactividad se renueva cada `visibilidad / 3`, así un shard
+atrasado no hace que este u otro consumidor los vuelva a entregar.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import Config
+from app.service.cola_mensajes import ColaMensajes, MensajeCola, particion_de
+
+logger = logging.getLogger(__name__)
+
+Procesador = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+@dataclass
+class EstadisticasWorkers:
+    procesados: int = 0
+    fallidos: int = 0
+    reintentados: int = 0
+    reclamados: int = 0
+    dead_letter: int = 0
+
+
+class PoolWorkers:
+    """Consumidor de una ColaMensajes con orden por clave y paralelismo entre claves"""
+
+    def __init__(
+        self,
+        cola: ColaMensajes,
+        procesar: Procesador,
+        *,
+        concurrencia: int = Config.WORKERS_MENSAJES,
+        max_entregas: int = Config.COLA_MENSAJES_MAX_ENTREGAS,
+        visibilidad: float = Config.COLA_MENSAJES_VISIBILIDAD_SEGUNDOS,
+        lote: int = 50,
+        bloqueo: float = 1.0,
+        reintento: float = 0.5,
+        clave: str = "wa_id",
+        nombre: Optional[str] = None
+    ):
+        self.cola = cola
+        self.procesar = procesar
+        self.concurrencia = concurrencia
+        self.max_entregas = max_entregas
+        self.visibilidad = visibilidad
+        self.lote = lote
+        self.bloqueo = bloqueo
+        self.reintento = reintento
+        self.clave = clave
+        self.nombre = nombre or f"{socket.gethostname()}-{os.getpid()}"
+        self.estadisticas = EstadisticasWorkers()
+        self._shards: List[asyncio.Queue] = []
+        self._lector: Optional[asyncio.Task] = None
+        self._tareas: List[asyncio.Task] = []
+        # id -> mensaje, desde que el lector lo recibe hasta que se confirma o va a dead-letter
+        self._en_mano: Dict[str, MensajeCola] = {}
+        self._detenido = asyncio.Event()
+
+    @property
+    def activo(self) -> bool:
+        return any(not t.done() for t in self._tareas)
+
+    async def iniciar(self) -> None:
+        if self.activo:
+            return
+        await self.cola.asegurar_grupo()
+        self._detenido.clear()
+        # Colas chicas: si un shard se atrasa, el lector deja de leer (y los mensajes
+        # siguen en la cola, visibles para otros consumidores)
+        self._shards = [asyncio.Queue(maxsize=self.lote) for _ in range(self.concurrencia)]
+        self._tareas = [
+            asyncio.create_task(self._consumir_shard(shard), name=f"worker-mensajes-{i}")
+            for i, shard in enumerate(self._shards)
+        ]
+        self._lector = asyncio.create_task(self._leer(), name="lector-mensajes")
+        self._tareas.append(self._lector)
+        self._tareas.append(asyncio.create_task(self._renovar(), name="renovador-mensajes"))
+
+    async def detener(self, timeout: float = 10.0) -> None:
+        """Dejar de leer y esperar a que los shards terminen lo que ya tienen"""
+        self._detenido.set()
+        if not self._tareas:
+            return
+
+        async def drenar():
+            await self._lector
+            for shard in self._shards:
+                await shard.put(None)
+            await asyncio.gather(*self._tareas)
+
+        try:
+            await asyncio.wait_for(drenar(), timeout)
+        except asyncio.TimeoutError:
+            # Lo no confirmado queda pendiente en la cola y lo reclama otro consumidor
+            for tarea in self._tareas:
+                tarea.cancel()
+            await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+        self._en_mano.clear()
+
+    def shard_de(self, mensaje: MensajeCola) -> int:
+        return particion_de(mensaje.datos.get(self.clave), self.concurrencia)
+
+    async def _leer(self) -> None:
+        consumidor = f"{self.nombre}-lector"
+        ultimo_reclamo = time.monotonic()
+        while not self._detenido.is_set():
+            try:
+                mensajes = []
+                if time.monotonic() - ultimo_reclamo >= self.visibilidad / 2:
+                    ultimo_reclamo = time.monotonic()
+                    mensajes = await self.cola.reclamar(
+                        consumidor, inactividad_ms=int(self.visibilidad * 1000), cantidad=self.lote,
+                        excluir=set(self._en_mano)
+                    )
+                    self.estadisticas.reclamados += len(mensajes)
+                if not mensajes:
+                    mensajes = await self.cola.leer(
+                        consumidor, cantidad=self.lote, bloqueo_ms=int(self.bloqueo * 1000)
+                    )
+            except Exception:
+                logger.exception("Error leyendo la cola de mensajes")
+                await asyncio.sleep(self.bloqueo)
+                continue
+            for mensaje in mensajes:
+                self._en_mano[mensaje.id] = mensaje
+                await self._shards[self.shard_de(mensaje)].put(mensaje)
+
+    async def _renovar(self) -> None:
+        consumidor = f"{self.nombre}-lector"
+        while not self._detenido.is_set():
+            try:
+                await asyncio.wait_for(self._detenido.wait(), self.visibilidad / 3)
+            except asyncio.TimeoutError:
+                pass
+            if self._en_mano:
+                try:
+                    await self.cola.renovar(consumidor, list(self._en_mano.values()))
+                except Exception:
+                    logger.exception("Error renovando los mensajes en proceso")
+
+    async def _consumir_shard(self, shard: asyncio.Queue) -> None:
+        while True:
+            mensaje = await shard.get()
+            if mensaje is None:
+                return
+            try:
+                await self._procesar(mensaje)
+            except Exception:
+                # Falló el ack o la dead-letter: el mensaje queda pendiente y se reclama
+                logger.exception("Error confirmando el mensaje %s", mensaje.id)
+            finally:
+                self._en_mano.pop(mensaje.id, None)
+
+    async def _procesar(self, mensaje: MensajeCola) -> None:
+        while True:
+            if mensaje.entregas > self.max_entregas:
+                # Reclamado después de agotar los intentos (p. ej. tiró abajo al proceso)
+                await self.cola.enviar_a_dead_letter(mensaje, "máximo de entregas superado")
+                self.estadisticas.dead_letter += 1
+                return
+            try:
+                await self.procesar(mensaje.datos)
+            except Exception as e:
+                self.estadisticas.fallidos += 1
+                if mensaje.entregas >= self.max_entregas:
+                    logger.error("Mensaje %s a dead-letter tras %s entregas: %r", mensaje.id, mensaje.entregas, e)
+                    await self.cola.enviar_a_dead_letter(mensaje, repr(e))
+                    self.estadisticas.dead_letter += 1
+                    return
+                logger.warning("Error procesando el mensaje %s (entrega %s): %r", mensaje.id, mensaje.entregas, e)
+                # Se reintenta acá mismo para no adelantar el mensaje siguiente del usuario
+                await asyncio.sleep(self.reintento * 2 ** (mensaje.entregas - 1))
+                mensaje.entregas += 1
+                self.estadisticas.reintentados += 1
+                continue
+            await self.cola.confirmar(mensaje)
+            self.estadisticas.procesados += 1
+            return
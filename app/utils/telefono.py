@@ -0,0 +1,67 @@
+"""Normalización de teléfonos a E.164 ("+" país número), con las reglas de Argentina.
+
+WhatsApp manda el número sin "+" y, para celulares argentinos, con el 9 después del 54
+("5491123456789"). Los pacientes lo escriben de muchas formas: "+54 9 11 2345-6789",
+"011 15 2345-6789", "15 2345 6789", "(0351) 15-123-4567". Todas llevan al mismo E.164 del
+celular, +549 y los 10 dígitos de área y número (sin el 0 de larga distancia ni el 15).
+Los números argentinos se toman siempre como celulares: son los que usan WhatsApp.
+"""
+import re
+from typing import Optional
+
+from app.config import Config
+
+ARGENTINA = "54"
+
+_NO_DIGITO = re.compile(r"\D+")
+
+
+def _quitar_15(nacional: str) -> Optional[str]:
+    """Número de 12 dígitos con el 15 después del código de área (de 2, 3 o 4 dígitos)"""
+    largos = (2,) if nacional.startswith("11") else (3, 4)
+    for largo in largos:
+        if nacional[largo:largo + 2] == "15":
+            return nacional[:largo] + nacional[largo + 2:]
+    return None
+
+
+def _argentino(digitos: str, area: str) -> Optional[str]:
+    """E.164 de un número argentino sin el 54 (con o sin 0, 9 o 15)"""
+    if digitos.startswith("0"):
+        digitos = digitos[1:]
+    elif digitos.startswith("9") and len(digitos) in (11, 13):
+        digitos = digitos[1:]
+    elif digitos.startswith("15") and len(digitos) == 12 - len(area):
+        digitos = area + digitos[2:]
+    elif len(digitos) == 10 - len(area):
+        digitos = area + digitos
+    if len(digitos) == 12:
+        digitos = _quitar_15(digitos) or digitos
+    if len(digitos) != 10 or digitos[0] not in "123":
+        return None
+    return f"+{ARGENTINA}9{digitos}"
+
+
+def normalizar_telefono(
+    telefono: Optional[str], *, pais: str = Config.TELEFONO_PAIS, area: str = Config.TELEFONO_AREA
+) -> Optional[str]:
+    """E.164 del teléfono o None si no parece un número.
+
+    `pais` y `area` completan los números locales (sin código de país o de área).
+    """
+    if not telefono:
+        return None
+    texto = str(telefono).strip()
+    digitos = _NO_DIGITO.sub("", texto)
+    internacional = texto.startswith("+") or digitos.startswith("00")
+    if digitos.startswith("00"):
+        digitos = digitos[2:]
+    # Ningún número nacional argentino empieza con 5: "54..." largo es el código de país
+    if digitos.startswith(ARGENTINA) and (internacional or len(digitos) >= 12):
+        return _argentino(digitos[len(ARGENTINA):], area)
+    if internacional:
+        return f"+{digitos}" if 8 <= len(digitos) <= 15 else None
+    if pais == ARGENTINA:
+        return _argentino(digitos, area)
+    digitos = digitos.lstrip("0")
+    return f"+{pais}{digitos}" if 8 <= len(pais) + len(digitos) <= 15 else None
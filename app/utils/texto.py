@@ -0,0 +1,35 @@
+import re
+import unicodedata
+from typing import Set
+
+# Tratamientos que la gente escribe delante de los nombres y no ayudan a buscar
+TRATAMIENTOS = {"dr", "dra", "doctor", "doctora", "lic", "lica", "sr", "sra", "srta"}
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+
+def quitar_acentos(texto: str) -> str:
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas, sin acentos, sin puntuación y con espacios simples"""
+    if not texto:
+        return ""
+    texto = quitar_acentos(texto.casefold())
+    return " ".join(_NO_ALFANUMERICO.sub(" ", texto).split())
+
+
+def normalizar_nombre(texto: str) -> str:
+    """Como normalizar_texto, descartando tratamientos ("Dra. Gómez" -> "gomez")"""
+    return " ".join(p for p in normalizar_texto(texto).split() if p not in TRATAMIENTOS)
+
+
+def trigramas(texto: str) -> Set[str]:
+    """Trigramas al estilo pg_trgm: por palabra, con dos espacios delante y uno detrás"""
+    resultado = set()
+    for palabra in texto.split():
+        relleno = f"  {palabra} "
+        resultado.update(relleno[i:i + 3] for i in range(len(relleno) - 2))
+    return resultado
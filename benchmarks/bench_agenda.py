@@ -0,0 +1,127 @@
+"""Consultas de disponibilidad: snapshot de agenda contra consultar los turnos del día.
+
+Uso:
+    DATABASE_PG_URL=sqlite+aiosqlite:///:memory: python benchmarks/bench_agenda.py --profesionales 50 --dias 20
+
+Genera profesionales con horario de lunes a viernes y ~60% de los slots ocupados, y responde
+"¿qué horarios libres tiene el profesional X el día D?" de dos formas:
+- consulta: TurnoRepository.get_by_fecha_profesional y la grilla armada en cada pedido
+  (lo que haría un endpoint sin snapshot).
+- snapshot: Agenda.libres con los días ya construidos (el primer pedido de cada día
+  arma el snapshot; se mide aparte).
+Además mide cuánto tarda en reflejarse un turno nuevo (evento + aplicar_pendientes).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_PG_URL", "sqlite+aiosqlite:///:memory:")
+
+from app.config.database import AsyncSessionLocal, Base, engine
+from app.models.entities import Clinica, Paciente, Profesional, Turno
+from app.repositories.repositories import turno_repo
+from app.schemas.responses import TurnoCreate
+from app.service.agenda import ZONA, Agenda, DiaAgenda, local
+
+HORARIOS = {dia: [{"inicio": "08:00", "fin": "12:00"}, {"inicio": "14:00", "fin": "18:00"}]
+            for dia in ("lunes", "martes", "miércoles", "jueves", "viernes")}
+PRIMER_DIA = date(2026, 3, 2)
+
+
+async def poblar(profesionales: int, dias: int) -> tuple:
+    engine.echo = False  # el log de SQL distorsiona las mediciones
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    rng = random.Random(7)
+    async with AsyncSessionLocal() as db:
+        clinica = Clinica(nombre="Clínica", did_whatsapp="1", configuraciones={})
+        paciente = Paciente(dni="1", telefono="1", nombre="Paciente")
+        lista = [Profesional(nombre=f"Profesional {i}", horarios=HORARIOS) for i in range(profesionales)]
+        db.add_all([clinica, paciente, *lista])
+        await db.flush()
+        turnos = []
+        for profesional in lista:
+            for d in range(dias):
+                fecha = PRIMER_DIA + timedelta(days=d)
+                grilla = DiaAgenda.desde_horarios(HORARIOS, fecha, 30)
+                for momento in grilla.horarios(fecha):
+                    if rng.random() < 0.6:
+                        turnos.append(Turno(id_paciente=paciente.id, id_profesional=profesional.id,
+                                            id_clinica=clinica.id, fecha_hora=momento, estado="confirmado"))
+        db.add_all(turnos)
+        await db.commit()
+        return clinica.id, paciente.id, [p.id for p in lista], len(turnos)
+
+
+async def libres_con_consulta(db, id_profesional: int, fecha: date) -> list:
+    inicio = datetime.combine(fecha, datetime.min.time(), ZONA)
+    turnos = await turno_repo.get_by_fecha_profesional(
+        db, id_profesional=id_profesional, fecha_inicio=inicio, fecha_fin=inicio + timedelta(days=1)
+    )
+    grilla = DiaAgenda.desde_horarios(HORARIOS, fecha, 30)
+    ocupados = {local(t.fecha_hora).replace(tzinfo=ZONA) for t in turnos if t.estado != "cancelado"}
+    return [m for m in grilla.horarios(fecha) if m not in ocupados]
+
+
+async def main(profesionales: int, dias: int, consultas: int) -> None:
+    id_clinica, id_paciente, ids, total = await poblar(profesionales, dias)
+    print(f"{profesionales} profesionales x {dias} días, {total} turnos")
+    rng = random.Random(11)
+    pedidos = [(rng.choice(ids), PRIMER_DIA + timedelta(days=rng.randrange(dias))) for _ in range(consultas)]
+    agenda = Agenda().suscribir()
+
+    async with AsyncSessionLocal() as db:
+        inicio = time.perf_counter()
+        for id_profesional, fecha in pedidos:
+            esperado = await libres_con_consulta(db, id_profesional, fecha)
+        consulta = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for id_profesional in ids:
+            for d in range(dias):
+                await agenda.dia(db, id_profesional, PRIMER_DIA + timedelta(days=d))
+        armado = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for id_profesional, fecha in pedidos:
+            obtenido = await agenda.libres(db, id_profesional, fecha)
+        snapshot = time.perf_counter() - inicio
+        assert obtenido == esperado, "el snapshot no coincide con la consulta"
+
+        # Un turno nuevo se ve en la lectura siguiente
+        latencias = []
+        for id_profesional in ids[:20]:
+            fecha = PRIMER_DIA
+            libres = await agenda.libres(db, id_profesional, fecha)
+            if not libres:
+                continue
+            await turno_repo.create(db, obj_in=TurnoCreate(
+                id_paciente=id_paciente, id_profesional=id_profesional, id_clinica=id_clinica, fecha_hora=libres[0]
+            ))
+            inicio = time.perf_counter()
+            assert not await agenda.esta_libre(db, id_profesional, libres[0])
+            latencias.append(time.perf_counter() - inicio)
+        inconsistencias = await agenda.verificar(db)
+    agenda.desuscribir()
+
+    print(f"consulta por pedido: {consultas / consulta:10.0f} consultas/s ({consulta / consultas * 1e6:8.1f} us)")
+    print(f"snapshot:            {consultas / snapshot:10.0f} consultas/s ({snapshot / consultas * 1e6:8.1f} us)"
+          f"  -> x{consulta / snapshot:.0f}")
+    print(f"armado inicial:      {profesionales * dias / armado:10.0f} días/s")
+    if latencias:
+        print(f"turno nuevo visible: {sum(latencias) / len(latencias) * 1e6:8.1f} us de media")
+    print(f"inconsistencias:     {len(inconsistencias)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profesionales", type=int, default=50)
+    parser.add_argument("--dias", type=int, default=20)
+    parser.add_argument("--consultas", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.profesionales, args.dias, args.consultas))
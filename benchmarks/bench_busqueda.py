@@ -0,0 +1,117 @@
+"""Latencia y acierto de la búsqueda difusa sobre un corpus sintético de nombres.
+
+Uso:
+    python benchmarks/bench_busqueda.py --documentos 10000            # índice en memoria
+    python benchmarks/bench_busqueda.py --documentos 100000 --modo db  # base configurada
+
+El corpus combina nombres y apellidos frecuentes en Argentina; las consultas son nombres
+del corpus con errores típicos (sin acentos, una letra cambiada o faltante, "dr"/"dra").
+En modo db ATENCIÓN: vacía la tabla pacientes de la base configurada.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert
+
+from app.config.database import AsyncSessionLocal, engine, create_tables, close_db
+from app.models.entities import Paciente
+from app.service.busqueda import Buscador, IndiceBusquedaMemoria
+
+NOMBRES = [
+    "María", "José", "Juan", "Ana", "Carlos", "Lucía", "Martín", "Sofía", "Jorge", "Valentina",
+    "Luis", "Camila", "Miguel", "Julieta", "Diego", "Florencia", "Sebastián", "Agustina", "Andrés", "Rocío",
+]
+APELLIDOS = [
+    "González", "Rodríguez", "Gómez", "Fernández", "López", "Díaz", "Martínez", "Pérez", "García", "Sánchez",
+    "Romero", "Sosa", "Álvarez", "Torres", "Ruiz", "Ramírez", "Flores", "Acosta", "Benítez", "Medina",
+    "Herrera", "Suárez", "Aguirre", "Giménez", "Gutiérrez", "Pereyra", "Rojas", "Molina", "Castro", "Ortiz",
+]
+OBJETIVO_P95_MS = {"memoria": 10.0, "db": 20.0}
+
+
+def generar_corpus(cantidad: int, rnd: random.Random):
+    return [
+        f"{rnd.choice(NOMBRES)} {rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}"
+        for _ in range(cantidad)
+    ]
+
+
+def con_error(nombre: str, rnd: random.Random) -> str:
+    partes = nombre.split()
+    consulta = f"{partes[0]} {partes[2]}"
+    variante = rnd.randrange(4)
+    if variante == 0:
+        return consulta.lower()
+    if variante == 1:
+        i = rnd.randrange(1, len(consulta) - 1)
+        return consulta[:i] + consulta[i + 1:]
+    if variante == 2:
+        i = rnd.randrange(1, len(consulta) - 1)
+        return consulta[:i] + rnd.choice("aeiosnrl") + consulta[i + 1:]
+    return "dra " + consulta
+
+
+async def main(cantidad: int, consultas: int, modo: str):
+    rnd = random.Random(1234)
+    corpus = generar_corpus(cantidad, rnd)
+
+    if modo == "memoria":
+        indice = IndiceBusquedaMemoria()
+        inicio = time.perf_counter()
+        for i, nombre in enumerate(corpus):
+            indice.agregar("paciente", i, nombre)
+        print(f"índice construido: {cantidad} documentos en {time.perf_counter() - inicio:.2f}s")
+
+        async def buscar(q):
+            return indice.buscar(q, tipos=["paciente"], limite=5)
+    else:
+        engine.echo = False  # el log de SQL distorsiona las mediciones
+        await create_tables()
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Paciente))
+            await db.execute(insert(Paciente), [
+                {"dni": str(i), "telefono": str(i), "nombre": nombre} for i, nombre in enumerate(corpus)
+            ])
+            await db.commit()
+        buscador = Buscador()
+        sesion = AsyncSessionLocal()
+
+        async def buscar(q):
+            return await buscador.buscar(sesion, q, tipos=["paciente"], limite=5)
+
+    tiempos, aciertos = [], 0
+    for _ in range(consultas):
+        objetivo = rnd.randrange(cantidad)
+        consulta = con_error(corpus[objetivo], rnd)
+        inicio = time.perf_counter()
+        resultados = await buscar(consulta)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        # Un acierto es que el top 5 incluya un nombre igual al buscado (hay homónimos)
+        esperado = corpus[objetivo].split()
+        aciertos += any(
+            r.nombre.split()[0] == esperado[0] and r.nombre.split()[2] == esperado[2] for r in resultados
+        )
+
+    tiempos.sort()
+    p95 = tiempos[int(len(tiempos) * 0.95)]
+    print(f"modo={modo} consultas={consultas} p50={statistics.median(tiempos):.2f}ms p95={p95:.2f}ms")
+    print(f"acierto@5={aciertos / consultas:.1%} objetivo p95 < {OBJETIVO_P95_MS[modo]}ms: {'OK' if p95 < OBJETIVO_P95_MS[modo] else 'NO'}")
+    if modo == "db":
+        await sesion.close()
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documentos", type=int, default=10_000)
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--modo", choices=["memoria", "db"], default="memoria")
+    args = parser.parse_args()
+    asyncio.run(main(args.documentos, args.consultas, args.modo))
@@ -0,0 +1,91 @@
+"""Turnos de conversación por segundo (un núcleo) en el flujo de reserva.
+
+Uso:
+    python benchmarks/bench_conversacion.py --conversaciones 20000
+
+Cada conversación recorre saludo -> DNI -> especialidad -> horario -> confirmación (5
+mensajes, 8 pasos contando los resultados de efectos). Los efectos se resuelven en memoria,
+así se mide sólo el motor. Dos variantes:
+- paso: FlujoCompilado.paso puro, el estado queda en memoria.
+- snapshot: además, en cada mensaje se carga y guarda el snapshot como JSON (lo que hace
+  la sesión en Redis, sin la red) y se usa `conversar` (async).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.service.conversacion import (
+    BUSCAR_HORARIOS, BUSCAR_PACIENTE, Entrada, EstadoConversacion, compilar_flujo, conversar
+)
+from benchmarks.datos_sinteticos import ESPECIALIDADES
+
+MENSAJES = ["hola", "30111222", "cardio", "2", "si"]
+HORARIOS = [
+    {"inicio": f"2024-03-0{d}T09:00:00", "id_profesional": d, "profesional": f"Dr. Profesional {d}"}
+    for d in range(4, 9)
+]
+
+
+def resolver(efecto):
+    if efecto.nombre == BUSCAR_PACIENTE:
+        return 7
+    if efecto.nombre == BUSCAR_HORARIOS:
+        return HORARIOS
+    return True
+
+
+def solo_pasos(flujo, conversaciones: int) -> int:
+    turnos = 0
+    for _ in range(conversaciones):
+        estado = EstadoConversacion()
+        for texto in MENSAJES:
+            paso = flujo.paso(estado, Entrada(texto=texto))
+            turnos += 1
+            while paso.efecto is not None:
+                paso = flujo.paso(paso.estado, Entrada(resultado=resolver(paso.efecto)))
+            estado = paso.estado
+    return turnos
+
+
+async def con_snapshots(flujo, conversaciones: int) -> int:
+    async def ejecutar(efecto):
+        return resolver(efecto)
+
+    sesion = {}
+    turnos = 0
+    for i in range(conversaciones):
+        for texto in MENSAJES:
+            estado = EstadoConversacion.desde_snapshot(json.loads(sesion[i]) if i in sesion else None, flujo)
+            estado, _ = await conversar(flujo, estado, texto, ejecutar)
+            sesion[i] = json.dumps(estado.a_snapshot(flujo.huella), separators=(",", ":"))
+            turnos += 1
+    return turnos
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversaciones", type=int, default=20_000)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    flujo = compilar_flujo(1, "Clínica 1", {"flujo": {"alias_especialidades": {"cardio": "Cardiología"}}}, ESPECIALIDADES)
+    print(f"compilación: {(time.perf_counter() - inicio) * 1000:.2f} ms")
+
+    inicio = time.perf_counter()
+    turnos = solo_pasos(flujo, args.conversaciones)
+    segundos = time.perf_counter() - inicio
+    print(f"paso:     {turnos / segundos:>10,.0f} turnos/s ({segundos * 1e6 / turnos:.1f} µs/turno)")
+
+    inicio = time.perf_counter()
+    turnos = asyncio.run(con_snapshots(flujo, args.conversaciones))
+    segundos = time.perf_counter() - inicio
+    print(f"snapshot: {turnos / segundos:>10,.0f} turnos/s ({segundos * 1e6 / turnos:.1f} µs/turno)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Escalado de la API con la cantidad de procesos worker (serve.py).
+
+Uso:
+    python benchmarks/bench_escalado.py                        # 1, 2, 4... hasta los cores
+    python benchmarks/bench_escalado.py --workers 1,2,4,8 --duracion 15 --clientes 16
+
+Para cada cantidad de workers levanta `serve.py` en un puerto libre (cola en memoria, SQL
+sin echo) y lo carga con --clientes procesos que hacen POST /webhook/whatsapp con un
+payload de statuses (validación completa, sin encolar). Informa req/s, la aceleración
+respecto de 1 worker y la eficiencia (aceleración / workers).
+
+Los clientes corren en la misma máquina y compiten por CPU con el servidor: para medir el
+techo real, correrlos desde otra máquina con --url apuntando a un servidor ya levantado.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAYLOAD = json.dumps({
+    "object": "whatsapp_business_account",
+    "entry": [{"id": "1", "changes": [{"field": "messages", "value": {
+        "messaging_product": "whatsapp",
+        "metadata": {"display_phone_number": "5493815550000", "phone_number_id": "99"},
+        "statuses": [{"id": f"wamid.{i}", "status": "delivered", "timestamp": "1700000000",
+                      "recipient_id": "549381111"} for i in range(20)],
+    }}]}],
+}).encode()
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def cliente(url: str, hasta: float, resultados):
+    hechos = 0
+    with httpx.Client(base_url=url, headers={"Content-Type": "application/json"}) as http:
+        while time.time() < hasta:
+            respuesta = http.post("/webhook/whatsapp", content=PAYLOAD)
+            hechos += respuesta.status_code == 200
+    resultados.put(hechos)
+
+
+def cargar(url: str, clientes: int, duracion: float) -> float:
+    resultados = multiprocessing.Queue()
+    hasta = time.time() + duracion
+    procesos = [multiprocessing.Process(target=cliente, args=(url, hasta, resultados)) for _ in range(clientes)]
+    for p in procesos:
+        p.start()
+    total = sum(resultados.get() for _ in procesos)
+    for p in procesos:
+        p.join()
+    return total / duracion
+
+
+def levantar(workers: int) -> tuple:
+    puerto = puerto_libre()
+    entorno = dict(
+        os.environ,
+        WEB_CONCURRENCY=str(workers),
+        PORT=str(puerto),
+        HOST="127.0.0.1",
+        LOG_LEVEL="warning",
+        COLA_MENSAJES_BACKEND="memoria",
+        DATABASE_ECHO="false",
+    )
+    entorno.setdefault("DATABASE_PG_URL", "sqlite+aiosqlite:///:memory:")
+    servidor = subprocess.Popen([sys.executable, "serve.py"], cwd=RAIZ, env=entorno)
+    url = f"http://127.0.0.1:{puerto}"
+    limite = time.time() + 30
+    while time.time() < limite:
+        try:
+            httpx.post(f"{url}/webhook/whatsapp", content=PAYLOAD, timeout=1)
+            time.sleep(1)  # dar tiempo a que arranquen todos los workers
+            return servidor, url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    servidor.terminate()
+    raise RuntimeError("El servidor no arrancó")
+
+
+def main(lista_workers, clientes: int, duracion: float, url: str = None):
+    print(f"cores={os.cpu_count()} clientes={clientes} duracion={duracion}s")
+    base = None
+    for workers in lista_workers:
+        servidor = None
+        if url is None:
+            servidor, destino = levantar(workers)
+        else:
+            destino = url
+        try:
+            throughput = cargar(destino, clientes, duracion)
+        finally:
+            if servidor is not None:
+                servidor.terminate()
+                servidor.wait(timeout=30)
+        base = base or throughput
+        print(f"workers={workers:>2}  {throughput:>8,.0f} req/s  x{throughput / base:>4.1f}  "
+              f"eficiencia {throughput / base / workers:.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    cores = os.cpu_count() or 1
+    por_defecto = [w for w in (1, 2, 4, 8, 16, 32) if w <= cores] or [1]
+    parser.add_argument("--workers", type=lambda v: [int(w) for w in v.split(",")], default=por_defecto)
+    parser.add_argument("--clientes", type=int, default=max(4, cores * 2))
+    parser.add_argument("--duracion", type=float, default=10.0)
+    parser.add_argument("--url", default=None, help="servidor ya levantado (se ignora --workers)")
+    args = parser.parse_args()
+    main(args.workers if args.url is None else [0], args.clientes, args.duracion, args.url)
@@ -0,0 +1,104 @@
+"""Datos de referencia de HCWEB: llamada en vivo contra lectura del espejo local, y costo de sincronizar.
+
+Uso:
+    DATABASE_PG_URL=sqlite+aiosqlite:///:memory: python benchmarks/bench_espejo_hcweb.py --registros 20000 --demora 0.1
+
+- lectura: `--lecturas` consultas de un dataset de 20 registros, en vivo (WsHcweb.llamar contra
+  el servidor SOAP falso de bench_hcweb.py, `--demora` segundos por respuesta) y desde
+  `referencias_hcweb` (EspejoHcweb.registros).
+- sincronización de `--registros` registros (sin pasar por SOAP, EspejoHcweb.aplicar):
+  primera carga, otra vez sin cambios (sólo el hash del dataset), con un 1% modificado
+  (upsert del delta) y, como referencia, reescribiendo todo con un UPDATE por fila.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_PG_URL", "sqlite+aiosqlite:///:memory:")
+
+from sqlalchemy import update
+
+from app.config.database import AsyncSessionLocal, Base, engine
+from app.models.entities import ReferenciaHcweb
+from app.service.espejo_hcweb import DatasetHcweb, EspejoHcweb, hash_contenido
+from app.service.WsHcweb import RegistroClientesHcweb, ResultadoLlamada, Upstream
+from bench_hcweb import servir
+
+
+def registros(cantidad: int, version: int = 0, cambiados: int = 0) -> list:
+    return [{"id": i, "nombre": f"Dr. {i}", "matricula": f"MP-{i}", "especialidades": [i % 40],
+             "version": version if i < cambiados else 0} for i in range(cantidad)]
+
+
+async def cronometrar(corrutina) -> tuple:
+    inicio = time.perf_counter()
+    resultado = await corrutina
+    return time.perf_counter() - inicio, resultado
+
+
+async def main(cantidad: int, lecturas: int, demora: float) -> None:
+    engine.echo = False  # el log de SQL distorsiona las mediciones
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    puerto = multiprocessing.Value("i", 0)
+    proceso = multiprocessing.Process(target=servir, args=(puerto, demora, multiprocessing.Value("i", 0)), daemon=True)
+    proceso.start()
+    while not puerto.value:
+        await asyncio.sleep(0.01)
+    clientes = RegistroClientesHcweb({"hcweb": Upstream(f"http://127.0.0.1:{puerto.value}/ws.asmx", concurrencia=4, conexiones=4)})
+    espejo = EspejoHcweb([DatasetHcweb("turnos", "ObtenerTurnos")], clientes=clientes)
+    await espejo.sincronizar()
+
+    cliente = clientes.obtener("hcweb")
+    inicio = time.perf_counter()
+    for _ in range(lecturas):
+        assert len(await cliente.llamar("ObtenerTurnos", {})) == 20
+    vivo = time.perf_counter() - inicio
+    async with AsyncSessionLocal() as db:
+        inicio = time.perf_counter()
+        for _ in range(lecturas):
+            assert len(await espejo.registros(db, "turnos")) == 20
+        local = time.perf_counter() - inicio
+    await clientes.cerrar()
+    proceso.terminate()
+    print(f"lectura de 20 registros ({demora * 1000:.0f} ms en el upstream), {lecturas} veces")
+    print(f"  en vivo: {vivo / lecturas * 1000:8.2f} ms   local: {local / lecturas * 1000:8.2f} ms   -> x{vivo / local:.0f}")
+
+    dataset = DatasetHcweb("profesionales", "ObtenerProfesionales")
+    cambiados = cantidad // 100
+    print(f"\nsincronización de {cantidad} registros")
+    for nombre, valor in [
+        ("primera carga", registros(cantidad)),
+        ("sin cambios", registros(cantidad)),
+        (f"{cambiados} modificados", registros(cantidad, version=1, cambiados=cambiados)),
+    ]:
+        async with AsyncSessionLocal() as db:
+            segundos, resultado = await cronometrar(espejo.aplicar(db, dataset, ResultadoLlamada("ObtenerProfesionales", valor)))
+        print(f"  {nombre:<18} {segundos:7.2f}s  {resultado.estado:<12} +{resultado.insertados} ~{resultado.actualizados}")
+
+    async def fila_por_fila():
+        async with AsyncSessionLocal() as db:
+            for registro in registros(cantidad, version=2, cambiados=cantidad):
+                await db.execute(
+                    update(ReferenciaHcweb)
+                    .where(ReferenciaHcweb.dataset == "profesionales", ReferenciaHcweb.clave == str(registro["id"]))
+                    .values(datos=registro, hash=hash_contenido(registro))
+                )
+            await db.commit()
+
+    segundos, _ = await cronometrar(fila_por_fila())
+    print(f"  {'UPDATE por fila':<18} {segundos:7.2f}s  (referencia: reescribir todo sin delta)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--registros", type=int, default=20000)
+    parser.add_argument("--lecturas", type=int, default=50)
+    parser.add_argument("--demora", type=float, default=0.1)
+    args = parser.parse_args()
+    asyncio.run(main(args.registros, args.lecturas, args.demora))
@@ -0,0 +1,62 @@
+"""Exportación en streaming: throughput y pico de memoria según la cantidad de filas.
+
+Uso:
+    python benchmarks/bench_exportacion.py --escalas 1,10,40 --formato csv
+
+Para cada escala carga el dataset de datos_sinteticos.py, recorre los bloques de la
+StreamingResponse de /api/exportar/turnos (el body_iterator que consume el servidor; el
+transporte ASGI de httpx juntaría todo el body en memoria) y mide con tracemalloc el pico de
+memoria Python durante la exportación. Con streaming el pico no debería crecer con las filas.
+ATENCIÓN: vacía las tablas de la base configurada.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import AsyncSessionLocal, create_tables, close_db, engine
+from benchmarks.datos_sinteticos import cargar, generar, vaciar
+from app.routers.exportacion import exportar_turnos
+
+
+async def exportar(formato: str) -> tuple:
+    respuesta = await exportar_turnos(id_clinica=None, desde=None, hasta=None, formato=formato)
+    bytes_totales, lineas = 0, 0
+    async for bloque in respuesta.body_iterator:
+        bytes_totales += len(bloque)
+        lineas += bloque.count(b"\n")
+    return bytes_totales, lineas
+
+
+async def main(escalas, formato: str):
+    engine.echo = False
+    await create_tables()
+    for escala in escalas:
+        async with AsyncSessionLocal() as db:
+            await vaciar(db)
+            await cargar(db, generar(escala))
+            await db.commit()
+
+        inicio = time.perf_counter()
+        bytes_totales, lineas = await exportar(formato)
+        duracion = time.perf_counter() - inicio
+        # Segunda pasada para la memoria: tracemalloc hace todo varias veces más lento
+        tracemalloc.start()
+        await exportar(formato)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"escala {escala}x: {lineas:,} líneas, {bytes_totales / 1e6:.1f}MB en {duracion:.2f}s "
+              f"({lineas / duracion:,.0f} filas/s), pico de memoria {pico / 1e6:.1f}MB")
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escalas", default="1,10,40")
+    parser.add_argument("--formato", choices=["csv", "jsonl"], default="csv")
+    args = parser.parse_args()
+    asyncio.run(main([int(e) for e in args.escalas.split(",")], args.formato))
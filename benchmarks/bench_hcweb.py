@@ -0,0 +1,140 @@
+"""500 llamadas concurrentes a un upstream SOAP: cliente anterior contra cliente con pool.
+
+Uso:
+    python benchmarks/bench_hcweb.py --llamadas 500 --demora 0.1
+
+Levanta un servidor SOAP falso en otro proceso (ThreadingHTTPServer, keep-alive, `--demora`
+segundos por respuesta) y lanza `--llamadas` corrutinas a la vez, como harían los workers
+con muchas conversaciones pidiendo turnos:
+- antes: lo que hacía WsHcweb, requests.post sin sesión (una conexión TCP por llamada)
+  desde asyncio.to_thread, acotado por el pool de hilos por defecto.
+- pool: registro_hcweb.obtener().llamar con httpx (keep-alive) y el semáforo del upstream,
+  para cada valor de --concurrencias.
+Informa duración total, p50/p99 por llamada y conexiones TCP abiertas en el servidor.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from app.service.WsHcweb import RegistroClientesHcweb, Upstream, WsHcweb
+
+RESULTADO = json.dumps([{"id": i, "fecha": "2026-03-02T09:00:00", "profesional": f"Dr. {i}"} for i in range(20)])
+RESPUESTA = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+    '<ObtenerTurnosResponse xmlns="http://iosepscript.excelenciadigitial.net.ar/"><ObtenerTurnosResult>'
+    f"<ContainsErrors>false</ContainsErrors><SuccessMessage>{RESULTADO}</SuccessMessage><ErrorMessage></ErrorMessage>"
+    "</ObtenerTurnosResult></ObtenerTurnosResponse></soap:Body></soap:Envelope>"
+).encode()
+
+
+def servir(puerto, demora: float, conexiones, demoras=None) -> None:
+    """Servidor SOAP falso; `demoras` da la demora por método (SOAPAction), p. ej. {"Lento": 2.0}"""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # headers y body van en dos writes
+
+        def setup(self):
+            super().setup()
+            with conexiones.get_lock():
+                conexiones.value += 1
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            metodo = self.headers.get("SOAPAction", "").rsplit("/", 1)[-1]
+            time.sleep((demoras or {}).get(metodo, demora))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/xml; charset=utf-8")
+            self.send_header("Content-Length", str(len(RESPUESTA)))
+            self.end_headers()
+            self.wfile.write(RESPUESTA)
+
+        def log_message(self, *args):
+            pass
+
+    class Servidor(ThreadingHTTPServer):
+        request_queue_size = 1024
+
+        def handle_error(self, request, client_address):
+            pass  # el cliente canceló (plazo vencido) y cerró la conexión
+
+    servidor = Servidor(("127.0.0.1", 0), Handler)
+    servidor.daemon_threads = True
+    puerto.value = servidor.server_address[1]
+    servidor.serve_forever()
+
+
+def percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+async def medir(llamadas: int, llamar) -> tuple:
+    latencias = []
+
+    async def una(i: int):
+        inicio = time.perf_counter()
+        resultado = await llamar(i)
+        latencias.append(time.perf_counter() - inicio)
+        assert resultado and len(resultado) == 20
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una(i) for i in range(llamadas)))
+    return time.perf_counter() - inicio, latencias
+
+
+async def main(llamadas: int, demora: float, concurrencias: List[int]) -> None:
+    puerto = multiprocessing.Value("i", 0)
+    conexiones = multiprocessing.Value("i", 0)
+    proceso = multiprocessing.Process(target=servir, args=(puerto, demora, conexiones), daemon=True)
+    proceso.start()
+    while not puerto.value:
+        await asyncio.sleep(0.01)
+    url = f"http://127.0.0.1:{puerto.value}/ws.asmx"
+    print(f"{llamadas} llamadas concurrentes, {demora * 1000:.0f} ms por respuesta en el upstream")
+
+    antes = WsHcweb(url)
+
+    def llamada_anterior(i: int):
+        body = antes._build_soap_body("ObtenerTurnos", {"dni": str(i)})
+        respuesta = requests.post(url, data=body, headers=antes._headers("ObtenerTurnos"))
+        return antes._parse_response(respuesta.text, "ObtenerTurnos")
+
+    filas = []
+    conexiones.value = 0
+    total, latencias = await medir(llamadas, lambda i: asyncio.to_thread(llamada_anterior, i))
+    filas.append(("antes (hilos)", total, latencias, conexiones.value))
+
+    for concurrencia in concurrencias:
+        registro = RegistroClientesHcweb({"hcweb": Upstream(url, concurrencia=concurrencia, conexiones=concurrencia)})
+        conexiones.value = 0
+        cliente = registro.obtener("hcweb")
+        total, latencias = await medir(llamadas, lambda i: cliente.llamar("ObtenerTurnos", {"dni": str(i)}))
+        filas.append((f"pool x{concurrencia}", total, latencias, conexiones.value))
+        await registro.cerrar()
+    proceso.terminate()
+
+    base = filas[0][1]
+    print(f"{'cliente':<16}{'total s':>9}{'p50 ms':>9}{'p99 ms':>9}{'conexiones':>12}{'vs antes':>10}")
+    for nombre, total, latencias, abiertas in filas:
+        print(f"{nombre:<16}{total:9.2f}{percentil(latencias, 0.5) * 1000:9.0f}"
+              f"{percentil(latencias, 0.99) * 1000:9.0f}{abiertas:12d}{base / total:9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llamadas", type=int, default=500)
+    parser.add_argument("--demora", type=float, default=0.1)
+    parser.add_argument("--concurrencias", type=int, nargs="+", default=[20, 50])
+    args = parser.parse_args()
+    asyncio.run(main(args.llamadas, args.demora, args.concurrencias))
@@ -0,0 +1,96 @@
+"""Latencia de un turno del bot que necesita varias llamadas SOAP: en serie contra en lote.
+
+Uso:
+    python benchmarks/bench_hcweb_lote.py --turnos 30 --plazo 1.0
+
+Cada turno pide cobertura del paciente, profesionales disponibles y turnos existentes
+(demoras del upstream falso: 80, 120 y 150 ms). Se mide la latencia del turno:
+- serie (sync): tres WsHcweb.call_method seguidos, como antes.
+- serie (async): tres `await llamar(...)` seguidos.
+- lote: `llamar_lote` con las tres a la vez y `--plazo` segundos para el lote.
+En la segunda tabla ObtenerTurnos se cuelga (3 s): en serie el turno espera todo; el lote
+vuelve al vencer el plazo con las otras dos respuestas y un error de plazo para la tercera.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.service.WsHcweb import WsHcweb
+from benchmarks.bench_hcweb import servir
+
+LLAMADAS = [("ObtenerCobertura", {"dni": "30111222"}), ("ObtenerProfesionales", {"idEspecialidad": 3}),
+            ("ObtenerTurnos", {"dni": "30111222", "soloDisponibles": True})]
+DEMORAS = {"ObtenerCobertura": 0.08, "ObtenerProfesionales": 0.12, "ObtenerTurnos": 0.15}
+
+
+async def medir(turnos: int, turno) -> list:
+    latencias = []
+    for _ in range(turnos):
+        inicio = time.perf_counter()
+        await turno()
+        latencias.append(time.perf_counter() - inicio)
+    return latencias
+
+
+async def comparar(url: str, turnos: int, plazo: float) -> None:
+    cliente = WsHcweb(url)
+
+    async def serie_sync():
+        for metodo, parametros in LLAMADAS:
+            await asyncio.to_thread(cliente.call_method, metodo, parametros)
+
+    async def serie_async():
+        for metodo, parametros in LLAMADAS:
+            await cliente.llamar(metodo, parametros)
+
+    resultados = {}
+
+    async def lote():
+        resultados["ultimo"] = await cliente.llamar_lote(LLAMADAS, plazo=plazo)
+
+    filas = [("serie (sync)", await medir(turnos, serie_sync)),
+             ("serie (async)", await medir(turnos, serie_async)),
+             ("lote", await medir(turnos, lote))]
+    await cliente.cerrar()
+    base = statistics.median(filas[0][1])
+    print(f"{'':<16}{'p50 ms':>9}{'max ms':>9}{'vs serie':>10}")
+    for nombre, latencias in filas:
+        mediana = statistics.median(latencias)
+        print(f"{nombre:<16}{mediana * 1000:9.0f}{max(latencias) * 1000:9.0f}{base / mediana:9.1f}x")
+    errores = [f"{r.metodo}: {r.tipo_error}" for r in resultados["ultimo"] if not r.ok]
+    print(f"errores del último lote: {', '.join(errores) or 'ninguno'}")
+
+
+def levantar(demoras: dict) -> tuple:
+    puerto = multiprocessing.Value("i", 0)
+    conexiones = multiprocessing.Value("i", 0)
+    proceso = multiprocessing.Process(target=servir, args=(puerto, 0.0, conexiones, demoras), daemon=True)
+    proceso.start()
+    while not puerto.value:
+        time.sleep(0.01)
+    return proceso, f"http://127.0.0.1:{puerto.value}/ws.asmx"
+
+
+async def main(turnos: int, plazo: float) -> None:
+    for titulo, demoras, cantidad in (
+        ("upstream normal", DEMORAS, turnos),
+        ("ObtenerTurnos colgado 3 s", {**DEMORAS, "ObtenerTurnos": 3.0}, max(1, turnos // 10)),
+    ):
+        proceso, url = levantar(demoras)
+        print(f"\n{titulo}: {cantidad} turnos de {len(LLAMADAS)} llamadas, plazo del lote {plazo:g} s")
+        await comparar(url, cantidad, plazo)
+        proceso.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turnos", type=int, default=30)
+    parser.add_argument("--plazo", type=float, default=1.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.turnos, args.plazo))
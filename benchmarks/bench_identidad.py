@@ -0,0 +1,90 @@
+"""Resolución wa_id -> paciente por mensaje: consulta directa contra resolutor con caché.
+
+Uso:
+    DATABASE_PG_URL=sqlite+aiosqlite:///:memory: python benchmarks/bench_identidad.py --pacientes 20000 --mensajes 50000
+
+Los pacientes se cargan con teléfonos en formatos variados ("011 15 ...", "+54 9 ...",
+"15 ..."); los mensajes llegan con el wa_id de WhatsApp ("549..."), un 20% de números que no
+son de ningún paciente, y con la repetición típica de una conversación (varios mensajes
+seguidos del mismo número). Se compara:
+- consulta: PacienteRepository.get_by_telefono en cada mensaje.
+- resolutor: ResolutorIdentidad con la caché en memoria (positiva y negativa).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_PG_URL", "sqlite+aiosqlite:///:memory:")
+
+from sqlalchemy import insert
+
+from app.config.database import AsyncSessionLocal, Base, engine
+from app.models.entities import Paciente
+from app.repositories.repositories import paciente_repo
+from app.service.identidad import ResolutorIdentidad
+from app.utils.telefono import normalizar_telefono
+
+FORMATOS = ["011 15 {a}-{b}", "+54 9 11 {a} {b}", "15{a}{b}", "54911{a}{b}"]
+
+
+async def poblar(pacientes: int) -> list:
+    engine.echo = False  # el log de SQL distorsiona las mediciones
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    rng = random.Random(5)
+    numeros = rng.sample(range(10_000_000, 100_000_000), pacientes * 2)
+    filas = []
+    for i, numero in enumerate(numeros[:pacientes]):
+        a, b = divmod(numero, 10_000)
+        telefono = rng.choice(FORMATOS).format(a=a, b=f"{b:04d}")
+        filas.append({"dni": str(20_000_000 + i), "telefono": telefono, "nombre": f"Paciente {i}",
+                      "telefono_e164": normalizar_telefono(telefono)})
+    async with engine.begin() as conn:
+        for i in range(0, len(filas), 5000):
+            await conn.execute(insert(Paciente), filas[i:i + 5000])
+    return [f"54911{n}" for n in numeros]  # los primeros `pacientes` están registrados
+
+
+async def main(pacientes: int, mensajes: int) -> None:
+    numeros = await poblar(pacientes)
+    rng = random.Random(9)
+    trafico = []
+    while len(trafico) < mensajes:
+        registrados = rng.random() < 0.8
+        numero = numeros[rng.randrange(pacientes)] if registrados else numeros[pacientes + rng.randrange(pacientes)]
+        trafico.extend([numero] * rng.randint(1, 8))  # una conversación
+    trafico = trafico[:mensajes]
+
+    async with AsyncSessionLocal() as db:
+        inicio = time.perf_counter()
+        encontrados = 0
+        for wa_id in trafico:
+            encontrados += await paciente_repo.get_by_telefono(db, telefono=wa_id) is not None
+        consulta = time.perf_counter() - inicio
+
+        resolutor = ResolutorIdentidad()
+        inicio = time.perf_counter()
+        resueltos = 0
+        for wa_id in trafico:
+            resueltos += await resolutor.resolver(db, wa_id) is not None
+        cache = time.perf_counter() - inicio
+    assert encontrados == resueltos
+
+    estadisticas = resolutor.estadisticas
+    print(f"{pacientes} pacientes, {mensajes} mensajes ({encontrados} de pacientes registrados)")
+    print(f"consulta:  {mensajes / consulta:9.0f} mensajes/s ({consulta / mensajes * 1e6:7.1f} us)")
+    print(f"resolutor: {mensajes / cache:9.0f} mensajes/s ({cache / mensajes * 1e6:7.1f} us)  -> x{consulta / cache:.1f}")
+    print(f"consultas a la base: {estadisticas.consultas} de {mensajes} "
+          f"(aciertos {estadisticas.aciertos}, negativos {estadisticas.aciertos_negativos})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pacientes", type=int, default=20000)
+    parser.add_argument("--mensajes", type=int, default=50000)
+    args = parser.parse_args()
+    asyncio.run(main(args.pacientes, args.mensajes))
@@ -0,0 +1,78 @@
+"""Importación masiva: genera CSV con datos_sinteticos.py y los carga con ImportadorMasivo.
+
+Uso:
+    python benchmarks/bench_importacion.py --escala 200   # 1M turnos, 200k pacientes
+
+Objetivo: 1M de turnos en bastante menos de un minuto con PostgreSQL (COPY). En otros
+motores se usa INSERT por lotes y el número sólo sirve para comparar contra sí mismo.
+También se mide la lectura y conversión sin base (la parte de Python del pipeline).
+ATENCIÓN: vacía las tablas de la base configurada.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import AsyncSessionLocal, create_tables, close_db, engine
+from app.service.importacion import ImportadorMasivo, archivos_de_origen, leer_filas
+from benchmarks.datos_sinteticos import generar, vaciar
+
+OBJETIVO_TURNOS_POR_SEGUNDO = 50_000  # 1M en 20s
+
+
+def escribir_csv(directorio: str, datos) -> None:
+    for tabla, filas in datos.items():
+        if tabla == "profesional_especialidad" or not filas:
+            continue
+        with open(os.path.join(directorio, f"{tabla}.csv"), "w", encoding="utf-8", newline="") as destino:
+            escritor = csv.DictWriter(destino, fieldnames=list(filas[0]))
+            escritor.writeheader()
+            for fila in filas:
+                escritor.writerow({
+                    k: json.dumps(v, ensure_ascii=False) if isinstance(v, (dict, list)) else
+                    v.isoformat() if hasattr(v, "isoformat") else v
+                    for k, v in fila.items()
+                })
+
+
+async def main(escala: int, lote: int, concurrencia: int):
+    engine.echo = False
+    await create_tables()
+    with tempfile.TemporaryDirectory() as directorio:
+        inicio = time.perf_counter()
+        escribir_csv(directorio, generar(escala))
+        print(f"CSV generados en {time.perf_counter() - inicio:.1f}s")
+
+        inicio = time.perf_counter()
+        filas = sum(1 for _ in leer_filas(os.path.join(directorio, "turnos.csv")))
+        print(f"lectura de turnos.csv sin base: {filas:,} filas en {time.perf_counter() - inicio:.1f}s")
+
+        async with AsyncSessionLocal() as db:
+            await vaciar(db)
+        importador = ImportadorMasivo(lote=lote, concurrencia=concurrencia)
+        inicio = time.perf_counter()
+        resultados = await importador.importar(archivos_de_origen(directorio))
+        total = time.perf_counter() - inicio
+
+    for resultado in resultados.values():
+        print(f"{resultado.tabla:<26} {resultado.filas:>10,} filas {resultado.segundos:6.1f}s")
+    turnos = resultados["turnos"]
+    tasa = turnos.filas / turnos.segundos
+    print(f"total {total:.1f}s ({engine.dialect.name}); turnos {tasa:,.0f}/s "
+          f"objetivo >= {OBJETIVO_TURNOS_POR_SEGUNDO:,}/s: {'OK' if tasa >= OBJETIVO_TURNOS_POR_SEGUNDO else 'NO'}")
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escala", type=int, default=200)
+    parser.add_argument("--lote", type=int, default=50_000)
+    parser.add_argument("--concurrencia", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.escala, args.lote, args.concurrencia))
@@ -0,0 +1,145 @@
+"""Recall y latencia del índice vectorial (NumPy en memoria y, si hay, pgvector).
+
+Uso:
+    python benchmarks/bench_indice_vectorial.py --tamanios 1000,10000,100000 --consultas 500
+    python benchmarks/bench_indice_vectorial.py --pgvector   # con DATABASE_PG_URL a PostgreSQL + pgvector
+
+Corpus sintético de preguntas y respuestas de una clínica (plantillas combinadas); las
+consultas son paráfrasis de documentos del corpus (sin acentos, con saludos, palabras
+cambiadas de orden o faltantes). Se mide:
+- recall@k: fracción de consultas con su documento de origen en el top-k (calidad del
+  embebedor + búsqueda exacta). Con corpus grandes hay preguntas repetidas (misma plantilla
+  y valores, otro número de consulta): cuenta cualquier documento con la misma pregunta.
+- latencia por consulta de a una y en lotes de `--lote`.
+- con --pgvector: recall del HNSW frente a la búsqueda exacta y latencia del lote en la base.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.service.indice_vectorial import Documento, EmbebedorHashing, IndiceVectorialMemoria, recall_at_k
+from benchmarks.datos_sinteticos import ESPECIALIDADES
+
+TEMAS = ["turno", "estudio", "consulta", "receta", "orden", "resultado", "control", "certificado", "vacuna", "análisis"]
+ACCIONES = ["sacar", "cancelar", "cambiar", "retirar", "pedir", "renovar", "consultar", "pagar"]
+COBERTURAS = ["OSDE", "PAMI", "Swiss Medical", "Galeno", "IOMA", "particular", "Medifé", "OSECAC"]
+PLANTILLAS = [
+    "¿Cómo puedo {accion} un {tema} de {especialidad} con {cobertura}?",
+    "¿Dónde tengo que {accion} el {tema} de {especialidad}?",
+    "¿Cuánto cuesta {accion} un {tema} de {especialidad} si tengo {cobertura}?",
+    "¿Se puede {accion} el {tema} de {especialidad} por WhatsApp?",
+]
+SALUDOS = ["", "Hola, ", "Buenas tardes. ", "Buen día! "]
+
+
+def corpus(tamanio: int, rnd: random.Random):
+    textos = set()
+    while len(textos) < tamanio:
+        textos.add(rnd.choice(PLANTILLAS).format(
+            accion=rnd.choice(ACCIONES), tema=rnd.choice(TEMAS),
+            especialidad=rnd.choice(ESPECIALIDADES), cobertura=rnd.choice(COBERTURAS),
+        ) + f" (consulta {len(textos)})")
+    return [Documento("log_ia", i, 1, texto) for i, texto in enumerate(sorted(textos))]
+
+
+def parafrasear(texto: str, rnd: random.Random) -> str:
+    palabras = texto.split(" (consulta")[0].replace("¿", "").replace("?", "").split()
+    if len(palabras) > 4:
+        del palabras[rnd.randrange(len(palabras))]
+    if rnd.random() < 0.5:
+        i = rnd.randrange(len(palabras) - 1)
+        palabras[i], palabras[i + 1] = palabras[i + 1], palabras[i]
+    frase = rnd.choice(SALUDOS) + " ".join(palabras)
+    if rnd.random() < 0.5:
+        frase = frase.lower().replace("í", "i").replace("é", "e").replace("á", "a").replace("ó", "o")
+    return frase
+
+
+def percentil(valores, p):
+    return sorted(valores)[min(len(valores) - 1, int(p * len(valores)))]
+
+
+async def medir_pgvector(documentos, vectores, consultas, exactos, k, lote):
+    from sqlalchemy import delete, text
+    from app.config.database import AsyncSessionLocal, close_db
+    from app.service.indice_vectorial import IndiceVectorialPostgres
+
+    postgres = IndiceVectorialPostgres()
+    async with AsyncSessionLocal() as db:
+        if not await postgres.disponible(db):
+            print("  pgvector: no disponible (se necesita PostgreSQL con la migración a8c41f7e2d93)")
+            await close_db()
+            return
+        await db.execute(text("DELETE FROM documentos_vectoriales WHERE tipo = 'bench'"))
+        bench = [Documento("bench", d.id, -1, d.texto) for d in documentos]
+        for inicio in range(0, len(bench), 1000):
+            await postgres.poner(db, bench[inicio:inicio + 1000], vectores[inicio:inicio + 1000])
+        await db.commit()
+        tiempos, aproximados = [], []
+        for inicio in range(0, len(consultas), lote):
+            t0 = time.perf_counter()
+            aproximados.extend(await postgres.buscar(db, -1, consultas[inicio:inicio + lote], k, {"bench"}))
+            tiempos.append((time.perf_counter() - t0) / len(consultas[inicio:inicio + lote]))
+        aproximados = [[type(r)("log_ia", r.id, r.texto, r.puntaje) for r in fila] for fila in aproximados]
+        await db.execute(text("DELETE FROM documentos_vectoriales WHERE tipo = 'bench'"))
+        await db.commit()
+    await close_db()
+    print(f"  pgvector HNSW: recall vs exacto {recall_at_k(exactos, aproximados):.3f}, "
+          f"lote p50 {statistics.median(tiempos) * 1000:.3f} ms/consulta")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanios", default="1000,10000,100000")
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--lote", type=int, default=32)
+    parser.add_argument("--dimension", type=int, default=256)
+    parser.add_argument("--pgvector", action="store_true")
+    parser.add_argument("--semilla", type=int, default=1234)
+    args = parser.parse_args()
+
+    embebedor = EmbebedorHashing(args.dimension)
+    for tamanio in (int(t) for t in args.tamanios.split(",")):
+        rnd = random.Random(args.semilla)
+        documentos = corpus(tamanio, rnd)
+        t0 = time.perf_counter()
+        vectores = embebedor.embeber([d.texto for d in documentos])
+        indexado = time.perf_counter() - t0
+        indice = IndiceVectorialMemoria(args.dimension)
+        indice.poner(documentos, vectores)
+
+        origen = [rnd.randrange(tamanio) for _ in range(args.consultas)]
+        consultas = embebedor.embeber([parafrasear(documentos[i].texto, rnd) for i in origen])
+
+        de_a_una, resultados = [], []
+        for fila in consultas:
+            t0 = time.perf_counter()
+            resultados.extend(indice.buscar(1, fila[np.newaxis], args.k))
+            de_a_una.append(time.perf_counter() - t0)
+        en_lote = []
+        for inicio in range(0, len(consultas), args.lote):
+            t0 = time.perf_counter()
+            indice.buscar(1, consultas[inicio:inicio + args.lote], args.k)
+            en_lote.append((time.perf_counter() - t0) / len(consultas[inicio:inicio + args.lote]))
+
+        pregunta = [d.texto.split(" (consulta")[0] for d in documentos]
+        aciertos = sum(any(pregunta[r.id] == pregunta[i] for r in fila) for i, fila in zip(origen, resultados))
+        print(f"{tamanio} documentos (embebidos en {indexado:.2f}s):")
+        print(f"  recall@{args.k} de paráfrasis: {aciertos / len(origen):.3f}")
+        print(f"  de a una: p50 {statistics.median(de_a_una) * 1000:.3f} ms, p95 {percentil(de_a_una, 0.95) * 1000:.3f} ms")
+        print(f"  lotes de {args.lote}: p50 {statistics.median(en_lote) * 1000:.3f} ms/consulta")
+        if args.pgvector:
+            asyncio.run(medir_pgvector(documentos, vectores, consultas, resultados, args.k, args.lote))
+
+
+if __name__ == "__main__":
+    main()
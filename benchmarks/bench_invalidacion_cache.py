@@ -0,0 +1,109 @@
+"""Tasa de aciertos y lecturas viejas de la caché de catálogos según cómo se invalida.
+
+Uso:
+    python benchmarks/bench_invalidacion_cache.py --procesos 4 --lecturas 200000 --escrituras-por-mil 5
+
+Simula (reloj virtual, sin base ni HTTP) varios workers con su propia CacheHttp que atienden
+lecturas de detalle (/api/clinicas/{id}, con popularidad sesgada) y de listados, mientras
+algunas requests actualizan registros en un worker al azar. Una lectura es "vieja" si la
+respuesta cacheada es anterior a la última escritura de lo que devuelve. Estrategias:
+- ttl-largo / ttl-corto: sin invalidación, sólo vence por TTL.
+- tabla-local: cada escritura vacía la tabla en el worker que escribió (lo previo al bus).
+- tabla-procesos: lo mismo en todos los workers (bus + puente entre procesos).
+- id-procesos: eventos con ids en todos los workers: el detalle sólo cae si cambió su registro.
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.cache_http import CacheHttp
+from app.core.eventos import BusCambios, EventoCambio
+
+TABLA = "clinicas"
+LISTADO = (TABLA, "listado")
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self) -> float:
+        return self.ahora
+
+
+def simular(estrategia: str, args) -> dict:
+    rnd = random.Random(args.semilla)
+    reloj = Reloj()
+    ttl = args.ttl_corto if estrategia == "ttl-corto" else args.ttl
+    caches = [CacheHttp(ttl=ttl, max_entradas=args.registros + 10, reloj=reloj) for _ in range(args.procesos)]
+    buses = [BusCambios() for _ in caches]
+    for bus, cache in zip(buses, caches):
+        bus.suscribir(cache.al_cambiar)
+
+    # Versión vigente de cada registro y momento de la última escritura del listado
+    version = [0] * args.registros
+    version_tabla = 0
+    # Lo que quedó cacheado: versión del registro (detalle) o de la tabla (listado)
+    cacheado = [{} for _ in caches]
+    pesos = [1 / (i + 1) for i in range(args.registros)]
+    aciertos = fallos = viejas = 0
+
+    for _ in range(args.lecturas):
+        reloj.ahora += args.intervalo
+        proceso = rnd.randrange(args.procesos)
+        if rnd.random() * 1000 < args.escrituras_por_mil:
+            id = rnd.choices(range(args.registros), pesos)[0]
+            version[id] += 1
+            version_tabla += 1
+            evento = EventoCambio(TABLA, "update", (id,) if estrategia == "id-procesos" else ())
+            if estrategia == "tabla-local":
+                buses[proceso].publicar(evento)
+            elif estrategia in ("tabla-procesos", "id-procesos"):
+                for bus in buses:
+                    bus.publicar(evento)
+            continue
+
+        cache = caches[proceso]
+        if rnd.random() < args.proporcion_listados:
+            clave, ids, vigente = LISTADO, None, version_tabla
+        else:
+            id = rnd.choices(range(args.registros), pesos)[0]
+            clave, ids, vigente = (TABLA, id), [id], version[id]
+        if cache.obtener(clave) is not None:
+            aciertos += 1
+            viejas += cacheado[proceso][clave] != vigente
+        else:
+            fallos += 1
+            cache.guardar(clave, '"x"', b"{}", [TABLA], ids)
+            cacheado[proceso][clave] = vigente
+
+    total = aciertos + fallos
+    return {"aciertos": aciertos / total, "viejas": viejas / total, "lecturas": total}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--procesos", type=int, default=4)
+    parser.add_argument("--registros", type=int, default=500)
+    parser.add_argument("--lecturas", type=int, default=200_000)
+    parser.add_argument("--escrituras-por-mil", type=float, default=5)
+    parser.add_argument("--proporcion-listados", type=float, default=0.2)
+    parser.add_argument("--intervalo", type=float, default=0.002, help="segundos virtuales entre requests")
+    parser.add_argument("--ttl", type=float, default=60)
+    parser.add_argument("--ttl-corto", type=float, default=5)
+    parser.add_argument("--semilla", type=int, default=1234)
+    args = parser.parse_args()
+
+    print(f"{args.procesos} procesos, {args.registros} registros, {args.escrituras_por_mil}‰ escrituras, "
+          f"TTL {args.ttl:g}s (corto {args.ttl_corto:g}s)")
+    print(f"{'estrategia':<16}{'aciertos':>10}{'viejas':>10}")
+    for estrategia in ("ttl-largo", "ttl-corto", "tabla-local", "tabla-procesos", "id-procesos"):
+        r = simular(estrategia, args)
+        print(f"{estrategia:<16}{r['aciertos']:>9.1%}{r['viejas']:>9.2%}")
+
+
+if __name__ == "__main__":
+    main()
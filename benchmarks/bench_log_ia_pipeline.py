@@ -0,0 +1,81 @@
+"""Latencia por request de LogIA: `log_ia_repo.create` síncrono vs `LogIAPipeline.registrar`.
+
+Uso:
+    python benchmarks/bench_log_ia_pipeline.py --n 2000
+
+Usa la base de DATABASE_PG_URL (crea las tablas si faltan).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import AsyncSessionLocal, engine, create_tables, close_db
+from app.repositories.repositories import log_ia_repo
+from app.schemas.responses import LogIACreate
+from app.service.log_ia_pipeline import LogIAPipeline
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def resumen(nombre, tiempos):
+    ms = [t * 1000 for t in tiempos]
+    print(
+        f"{nombre:<28} media={statistics.mean(ms):8.3f}ms "
+        f"p50={percentil(ms, 0.50):8.3f}ms p99={percentil(ms, 0.99):8.3f}ms"
+    )
+    return statistics.mean(ms)
+
+
+def log(i):
+    return LogIACreate(
+        mensaje=f"Consulta {i}",
+        respuesta_ia=f"Respuesta {i}",
+        confianza="alta",
+        metadatos={"id_clinica": i % 5},
+    )
+
+
+async def main(n: int):
+    engine.echo = False  # el log de SQL distorsiona las mediciones
+    await create_tables()
+
+    sincronos = []
+    async with AsyncSessionLocal() as db:
+        for i in range(n):
+            inicio = time.perf_counter()
+            await log_ia_repo.create(db, obj_in=log(i))
+            sincronos.append(time.perf_counter() - inicio)
+
+    pipeline = LogIAPipeline()
+    await pipeline.iniciar()
+    encolados = []
+    for i in range(n):
+        inicio = time.perf_counter()
+        await pipeline.registrar(log(i))
+        encolados.append(time.perf_counter() - inicio)
+    inicio = time.perf_counter()
+    await pipeline.detener()
+    drenaje = time.perf_counter() - inicio
+
+    media_sync = resumen("log_ia_repo.create", sincronos)
+    media_pipe = resumen("log_ia_pipeline.registrar", encolados)
+    print(f"latencia ahorrada por request: {media_sync - media_pipe:.3f}ms")
+    print(
+        f"pipeline: {pipeline.estadisticas.lotes} lotes, "
+        f"drenaje final {drenaje * 1000:.1f}ms, {pipeline.estadisticas.como_dict()}"
+    )
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().n))
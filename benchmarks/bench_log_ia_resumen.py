@@ -0,0 +1,113 @@
+"""Agregación de confianza por hora/clínica: rollup vs agregación cruda sobre logs_ia.
+
+Uso:
+    python benchmarks/bench_log_ia_resumen.py --filas 10000000 --dias 30
+
+En PostgreSQL los logs se generan con generate_series (10M filas tardan unos minutos);
+en otros motores se insertan por lotes desde Python, útil sólo con volúmenes chicos.
+ATENCIÓN: vacía logs_ia y logs_ia_resumen_hora de la base configurada.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, func, insert, literal_column, select, text
+
+from app.config.database import AsyncSessionLocal, engine, create_tables, close_db
+from app.models.entities import LogIA, LogIAResumenHora
+from app.repositories.base import truncar_hora
+from app.repositories.repositories import log_ia_resumen_repo
+
+CONFIANZAS = ["baja", "media", "alta"]
+
+
+async def generar_logs(db, filas: int, desde: datetime, dias: int):
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(text(
+            """
+            INSERT INTO logs_ia (mensaje, respuesta_ia, confianza, fecha, metadatos)
+            SELECT 'mensaje ' || g, 'respuesta ' || g,
+                   (ARRAY['baja','media','alta'])[1 + g % 3],
+                   :desde + (random() * :segundos) * interval '1 second',
+                   json_build_object('id_clinica', 1 + g % 20)
+            FROM generate_series(1, :filas) AS g
+            """
+        ), {"desde": desde, "segundos": dias * 86400, "filas": filas})
+        await db.commit()
+        return
+
+    rnd = random.Random(42)
+    lote = 5000
+    for inicio in range(0, filas, lote):
+        await db.execute(insert(LogIA), [
+            {
+                "mensaje": f"mensaje {i}",
+                "respuesta_ia": f"respuesta {i}",
+                "confianza": CONFIANZAS[i % 3],
+                "fecha": desde + timedelta(seconds=rnd.random() * dias * 86400),
+                "metadatos": {"id_clinica": 1 + i % 20},
+            }
+            for i in range(inicio, min(filas, inicio + lote))
+        ])
+    await db.commit()
+
+
+async def agregacion_cruda(db, desde, hasta, id_clinica):
+    hora = truncar_hora(db, LogIA.fecha)
+    clinica = LogIA.metadatos["id_clinica"].as_integer()
+    query = select(hora, clinica, LogIA.confianza, func.count(literal_column("*"))).filter(
+        LogIA.fecha >= desde, LogIA.fecha < hasta, clinica == id_clinica
+    ).group_by(hora, clinica, LogIA.confianza)
+    return (await db.execute(query)).all()
+
+
+async def medir(nombre, funcion, repeticiones=5):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        await funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    mejor = min(tiempos) * 1000
+    print(f"{nombre:<36} mejor={mejor:10.2f}ms")
+    return mejor
+
+
+async def main(filas: int, dias: int):
+    engine.echo = False  # el log de SQL distorsiona las mediciones
+    await create_tables()
+    hasta = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    desde = hasta - timedelta(days=dias)
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(LogIA))
+        await db.execute(delete(LogIAResumenHora))
+        await db.commit()
+
+        inicio = time.perf_counter()
+        await generar_logs(db, filas, desde, dias)
+        print(f"generados {filas} logs en {time.perf_counter() - inicio:.1f}s")
+        inicio = time.perf_counter()
+        await log_ia_resumen_repo.reconstruir(db, log_model=LogIA, desde=desde, hasta=hasta + timedelta(hours=1))
+        print(f"rollup reconstruido en {time.perf_counter() - inicio:.1f}s")
+
+        ultimo_dia = hasta - timedelta(days=1)
+        cruda_dia = await medir("cruda: 24h, una clínica", lambda: agregacion_cruda(db, ultimo_dia, hasta, 7))
+        rollup_dia = await medir("rollup: 24h, una clínica", lambda: log_ia_resumen_repo.get_por_hora(db, desde=ultimo_dia, hasta=hasta, id_clinica=7))
+        cruda_todo = await medir("cruda: rango completo, una clínica", lambda: agregacion_cruda(db, desde, hasta, 7), 2)
+        rollup_todo = await medir("rollup: rango completo, una clínica", lambda: log_ia_resumen_repo.get_por_hora(db, desde=desde, hasta=hasta, id_clinica=7))
+        print(f"aceleración 24h: x{cruda_dia / rollup_dia:.0f}  rango completo: x{cruda_todo / rollup_todo:.0f}")
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=10_000_000)
+    parser.add_argument("--dias", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(main(args.filas, args.dias))
@@ -0,0 +1,73 @@
+"""Costo de la instrumentación habilitada y deshabilitada.
+
+Uso:
+    python benchmarks/bench_metricas.py --llamadas 200000 --requests 3000
+
+Mide el costo por llamada de una función decorada con @instrumentar y de un span, y el
+throughput de requests (ASGITransport, sin red) contra GET /api/auth/me con la
+instrumentación apagada y prendida.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.core.metricas import instrumentar, metricas, span
+from main import app
+
+
+def sin_instrumentar():
+    return 1
+
+
+@instrumentar("redis")
+def instrumentada():
+    return 1
+
+
+def costo_por_llamada(funcion, llamadas: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(llamadas):
+        funcion()
+    return (time.perf_counter() - inicio) / llamadas * 1e9
+
+
+def con_span():
+    with span("hcweb", "Metodo"):
+        return 1
+
+
+async def throughput(requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as cliente:
+        inicio = time.perf_counter()
+        for _ in range(requests):
+            await cliente.get("/api/auth/me")
+        return requests / (time.perf_counter() - inicio)
+
+
+async def main(llamadas: int, requests: int):
+    base = costo_por_llamada(sin_instrumentar, llamadas)
+    for habilitadas in (False, True):
+        metricas.habilitadas = habilitadas
+        metricas.reiniciar()
+        decorada = costo_por_llamada(instrumentada, llamadas)
+        bloque = costo_por_llamada(con_span, llamadas)
+        await throughput(200)  # calentamiento
+        rps = await throughput(requests)
+        estado = "habilitada  " if habilitadas else "deshabilitada"
+        print(f"{estado}: @instrumentar +{decorada - base:6.0f}ns/llamada  span {bloque - base:6.0f}ns  "
+              f"requests {rps:,.0f}/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llamadas", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+    asyncio.run(main(args.llamadas, args.requests))
@@ -0,0 +1,103 @@
+"""Especialidad <-> profesionales: join indexado vs lista JSON, con 10k profesionales.
+
+Uso:
+    python benchmarks/bench_profesional_especialidad.py --profesionales 10000
+
+ATENCIÓN: vacía profesionales, especialidades y profesional_especialidad de la base configurada.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert, select
+
+from app.config.database import AsyncSessionLocal, engine, create_tables, close_db
+from app.models.entities import Especialidad, Profesional, ProfesionalEspecialidad
+from app.repositories.repositories import especialidad_repo, profesional_repo
+
+ESPECIALIDADES = 60
+
+
+async def poblar(db, cantidad: int):
+    rnd = random.Random(7)
+    await db.execute(insert(Especialidad), [{"nombre": f"Especialidad {i:02d}"} for i in range(ESPECIALIDADES)])
+    ids = {e.nombre: e.id for e in (await db.execute(select(Especialidad))).scalars()}
+    nombres = sorted(ids)
+
+    profesionales = []
+    for i in range(cantidad):
+        propias = rnd.sample(nombres, rnd.randint(1, 3))
+        profesionales.append({"nombre": f"Profesional {i}", "especialidades": propias, "activo": True})
+    await db.execute(insert(Profesional), profesionales)
+
+    filas = (await db.execute(select(Profesional.id, Profesional.especialidades))).all()
+    await db.execute(insert(ProfesionalEspecialidad), [
+        {"id_profesional": id_profesional, "id_especialidad": ids[nombre]}
+        for id_profesional, propias in filas for nombre in propias
+    ])
+    await db.commit()
+    return ids, [f[0] for f in filas]
+
+
+async def escaneo_json(db, nombre):
+    """Lo que había antes: traer todos los profesionales y filtrar en Python"""
+    result = await db.execute(select(Profesional))
+    return [p for p in result.scalars() if nombre in (p.especialidades or [])]
+
+
+async def especialidades_desde_json(db, id_profesional):
+    profesional = await profesional_repo.get(db, id_profesional)
+    result = await db.execute(select(Especialidad).filter(Especialidad.nombre.in_(profesional.especialidades)))
+    return result.scalars().all()
+
+
+async def medir(nombre, funciones):
+    inicio = time.perf_counter()
+    for funcion in funciones:
+        await funcion()
+    ms = (time.perf_counter() - inicio) * 1000 / len(funciones)
+    print(f"{nombre:<44} {ms:9.3f}ms/consulta")
+    return ms
+
+
+async def main(cantidad: int):
+    engine.echo = False  # el log de SQL distorsiona las mediciones
+    await create_tables()
+    async with AsyncSessionLocal() as db:
+        for modelo in (ProfesionalEspecialidad, Profesional, Especialidad):
+            await db.execute(delete(modelo))
+        await db.commit()
+        ids, profesionales = await poblar(db, cantidad)
+
+        muestra = list(ids.items())[:20]
+        escaneo = await medir("especialidad->profesionales: escaneo JSON", [
+            lambda n=n: escaneo_json(db, n) for n, _ in muestra
+        ])
+        await medir("especialidad->profesionales: get_by_especialidad", [
+            lambda n=n: profesional_repo.get_by_especialidad(db, especialidad=n, limit=cantidad) for n, _ in muestra
+        ])
+        join = await medir("especialidad->profesionales: join indexado", [
+            lambda i=i: profesional_repo.get_by_id_especialidad(db, id_especialidad=i, limit=cantidad) for _, i in muestra
+        ])
+        print(f"  join vs escaneo: x{escaneo / join:.0f}")
+
+        muestra_prof = profesionales[:: max(1, len(profesionales) // 200)]
+        desde_json = await medir("profesional->especialidades: JSON + IN", [
+            lambda i=i: especialidades_desde_json(db, i) for i in muestra_prof
+        ])
+        join_prof = await medir("profesional->especialidades: join indexado", [
+            lambda i=i: especialidad_repo.get_by_profesional(db, id_profesional=i) for i in muestra_prof
+        ])
+        print(f"  join vs JSON + IN: x{desde_json / join_prof:.1f}")
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profesionales", type=int, default=10_000)
+    asyncio.run(main(parser.parse_args().profesionales))
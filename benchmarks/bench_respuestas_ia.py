@@ -0,0 +1,88 @@
+"""Tasa de respuestas sin LLM y latencia con la caché de respuestas por clínica.
+
+Uso (con una base vacía o descartable; usa las clínicas 1..N del dataset sintético):
+    DATABASE_PG_URL=sqlite+aiosqlite:///:memory: python benchmarks/bench_respuestas_ia.py --mensajes 20000
+
+Los mensajes siguen una distribución sesgada (pocas preguntas muy repetidas) y cada uno se
+escribe con variantes (mayúsculas, acentos, signos, saludos). Una parte trae números (DNI,
+fechas) y no se cachea. El LLM es ClienteLLMFalso con `--latencia-llm` simulada en la
+cuenta final (no se espera de verdad).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import AsyncSessionLocal, close_db, create_tables, engine
+from app.service.respuestas_ia import AsistenteRespuestas, CacheRespuestas, ClienteLLMFalso
+from benchmarks.datos_sinteticos import cargar, generar, vaciar
+
+PREGUNTAS = [
+    "¿Aceptan OSDE?", "¿Dónde queda la clínica?", "¿Hay estacionamiento?", "¿Atienden por PAMI?",
+    "¿Cuánto sale la consulta?", "¿Puedo pagar con tarjeta?", "¿Tienen guardia?", "¿Hacen análisis de sangre?",
+    "¿Necesito orden médica?", "¿Cómo cancelo un turno?", "¿Qué horario tienen?", "¿Cómo me preparo para cardiología?",
+] + [f"¿Atienden {tema}?" for tema in ("niños", "embarazadas", "urgencias", "a domicilio", "los sábados", "feriados")]
+PREFIJOS = ["", "Hola ", "hola, ", "Buenas tardes! ", "buen dia "]
+
+
+def variante(rnd: random.Random, pregunta: str) -> str:
+    texto = rnd.choice(PREFIJOS) + pregunta
+    if rnd.random() < 0.3:
+        texto = texto.lower().replace("¿", "").replace("?", "")
+    if rnd.random() < 0.2:
+        texto = texto.replace("á", "a").replace("é", "e").replace("ó", "o")
+    return texto
+
+
+async def main(args):
+    engine.echo = False
+    await create_tables()
+    async with AsyncSessionLocal() as db:
+        await vaciar(db)
+        await cargar(db, generar(1))
+        await db.commit()
+
+    rnd = random.Random(args.semilla)
+    pesos = [1 / (i + 1) for i in range(len(PREGUNTAS))]
+    respuestas = {p: (f"Respuesta a {p}", "alta") for p in PREGUNTAS}
+    mensajes = []
+    for _ in range(args.mensajes):
+        if rnd.random() < args.personales:
+            mensajes.append(f"mi dni es {rnd.randint(20_000_000, 40_000_000)}, ¿tengo turno?")
+        else:
+            mensajes.append(variante(rnd, rnd.choices(PREGUNTAS, pesos)[0]))
+
+    cliente = ClienteLLMFalso(respuestas)
+    asistente = AsistenteRespuestas(cliente, CacheRespuestas(max_por_clinica=args.max_por_clinica))
+    inicio = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        for mensaje in mensajes:
+            await asistente.responder(db, rnd.randint(1, args.clinicas), mensaje)
+    segundos = time.perf_counter() - inicio
+
+    total = {"faq": 0, "aciertos": 0, "fallos": 0}
+    for estadisticas in asistente.cache.estadisticas.values():
+        for clave in total:
+            total[clave] += getattr(estadisticas, clave)
+    sin_llm = (total["faq"] + total["aciertos"]) / len(mensajes)
+    print(f"{len(mensajes)} mensajes, {args.clinicas} clínicas: faq={total['faq']} caché={total['aciertos']} llm={total['fallos']}")
+    print(f"respondidos sin LLM: {sin_llm:.1%}")
+    print(f"costo local: {segundos * 1e6 / len(mensajes):.1f} µs/mensaje")
+    print(f"latencia media estimada con LLM de {args.latencia_llm:g}s: "
+          f"{args.latencia_llm:.3f}s sin caché -> {args.latencia_llm * (1 - sin_llm):.3f}s con caché")
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensajes", type=int, default=20_000)
+    parser.add_argument("--clinicas", type=int, default=5)
+    parser.add_argument("--personales", type=float, default=0.15, help="proporción de mensajes con datos personales")
+    parser.add_argument("--max-por-clinica", type=int, default=500)
+    parser.add_argument("--latencia-llm", type=float, default=1.5)
+    parser.add_argument("--semilla", type=int, default=1234)
+    asyncio.run(main(parser.parse_args()))
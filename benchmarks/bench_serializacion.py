@@ -0,0 +1,110 @@
+"""Serialización de 10k TurnoResponse con paciente, profesional y clínica anidados.
+
+Uso:
+    python benchmarks/bench_serializacion.py --items 10000
+
+Compara, sobre los mismos datos en memoria (sin base):
+- fastapi: validar objetos ORM con from_attributes + model_dump(mode="json") + json.dumps,
+  que es lo que hace un endpoint con response_model y JSONResponse.
+- typeadapter: TypeAdapter(List[TurnoResponse]) prearmado: validate_python + dump_json.
+- construct: tuplas -> model_construct (sin validar) + dump_json.
+- dicts+orjson: tuplas -> dicts con PlanRespuesta + orjson (el camino de /api/turnos).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+
+from app.core.respuestas import RespuestaORJSON
+from app.models.entities import Clinica, Paciente, Profesional, Turno
+from app.schemas.responses import TurnoListResponse, TurnoResponse
+from app.schemas.serializacion import PlanRespuesta, validar_orm, volcar_json
+
+
+def generar(cantidad: int):
+    """Objetos ORM transitorios y las tuplas equivalentes a BaseRepository.get_filas"""
+    inicio = datetime(2024, 3, 4, 8, tzinfo=timezone.utc)
+    clinicas = [Clinica(id=i, nombre=f"Clínica {i}", did_whatsapp=str(i), activa=True,
+                        configuraciones={"duracion_turno": 30}, fecha_creacion=inicio) for i in range(5)]
+    profesionales = [Profesional(id=i, nombre=f"Dr. Profesional {i}", especialidades=["Cardiología"],
+                                 horarios={"lunes": [{"inicio": "08:00", "fin": "12:00"}]}, activo=True,
+                                 fecha_creacion=inicio) for i in range(40)]
+    pacientes = [Paciente(id=i, dni=str(20_000_000 + i), telefono=f"549381{i:07d}", nombre=f"Paciente {i}",
+                          email=None, fecha_registro=inicio) for i in range(1000)]
+    turnos = []
+    for i in range(cantidad):
+        paciente, profesional, clinica = pacientes[i % 1000], profesionales[i % 40], clinicas[i % 5]
+        turnos.append(Turno(
+            id=i, id_paciente=paciente.id, id_profesional=profesional.id, id_clinica=clinica.id,
+            fecha_hora=inicio + timedelta(minutes=30 * i), estado="programado", observaciones=None,
+            fecha_creacion=inicio, paciente=paciente, profesional=profesional, clinica=clinica,
+        ))
+
+    plan = PlanRespuesta(TurnoResponse, Turno)
+
+    def valor(turno, columna):
+        if "." in columna:
+            relacion, campo = columna.split(".")
+            return getattr(getattr(turno, relacion), campo)
+        return getattr(turno, columna)
+
+    filas = [tuple(valor(t, c) for c in plan.columnas) for t in turnos]
+    return turnos, filas, plan
+
+
+def medir(nombre: str, funcion, repeticiones: int, referencia=None) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cuerpo = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    mediana = statistics.median(tiempos)
+    extra = f"  x{referencia / mediana:.1f}" if referencia else ""
+    print(f"{nombre:<14} {mediana:8.1f}ms  {len(cuerpo) / 1e6:5.2f}MB{extra}")
+    return mediana
+
+
+def main(cantidad: int, repeticiones: int):
+    turnos, filas, plan = generar(cantidad)
+    envoltura = {"total": cantidad, "page": 1, "size": cantidad}
+
+    def fastapi():
+        respuesta = TurnoListResponse.model_validate({"items": turnos, **envoltura}, from_attributes=True)
+        return json.dumps(respuesta.model_dump(mode="json"), ensure_ascii=False).encode()
+
+    def typeadapter():
+        return volcar_json(TurnoResponse, validar_orm(TurnoResponse, turnos))
+
+    def construct():
+        return volcar_json(TurnoResponse, plan.como_modelos(filas))
+
+    def dicts_orjson():
+        return RespuestaORJSON({"items": plan.como_dicts(filas), **envoltura}).body
+
+    # Los cuatro caminos producen los mismos datos
+    esperado = orjson.loads(fastapi())["items"]
+    assert orjson.loads(typeadapter()) == esperado
+    assert orjson.loads(construct()) == esperado
+    obtenido = orjson.loads(dicts_orjson())["items"]
+    assert [t["paciente"]["nombre"] for t in obtenido] == [t["paciente"]["nombre"] for t in esperado]
+
+    print(f"{cantidad:,} TurnoResponse anidados, mediana de {repeticiones} corridas")
+    base = medir("fastapi", fastapi, repeticiones)
+    medir("typeadapter", typeadapter, repeticiones, base)
+    medir("construct", construct, repeticiones, base)
+    medir("dicts+orjson", dicts_orjson, repeticiones, base)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeticiones", type=int, default=7)
+    args = parser.parse_args()
+    main(args.items, args.repeticiones)
@@ -0,0 +1,312 @@
+"""Suite de benchmarks: operaciones de BaseRepository, sesiones Redis y parseo de WsHcweb.
+
+Uso:
+    python benchmarks/bench_suite.py --escalas 1,10                      # imprime la tabla
+    python benchmarks/bench_suite.py --guardar benchmarks/baseline.json  # guarda la línea base
+    python benchmarks/bench_suite.py --comparar benchmarks/baseline.json # falla si hay regresiones
+
+Por cada escala carga el dataset de datos_sinteticos.py y mide cada operación varias veces
+(una sesión nueva por iteración, como un request). Se reportan p50/p95/mínimo en ms; la
+comparación usa el p50 y marca regresión cuando supera a la línea base en más de
+`--tolerancia` (y en más de 0.05ms, para no reaccionar al ruido de operaciones de µs).
+Las sesiones Redis se miden sólo si hay un servidor en REDIS_HOST:REDIS_PORT.
+ATENCIÓN: vacía las tablas de la base configurada.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import AsyncSessionLocal, create_tables, close_db, engine
+from app.models.entities import LogIA
+from app.repositories import redis_session
+from app.repositories.repositories import (
+    clinica_repo, especialidad_repo, log_ia_repo, log_ia_resumen_repo, paciente_repo, profesional_repo, turno_repo
+)
+from app.schemas.responses import LogIACreate, PacienteCreate, PacienteUpdate, TurnoCreate
+from app.service.WsHcweb import WsHcweb
+from benchmarks.datos_sinteticos import INICIO, cargar, generar, tamanios, vaciar
+
+MARGEN_RUIDO_MS = 0.05
+
+Operacion = Callable[[Any], Awaitable[Any]]
+
+
+def resumir_tiempos(tiempos: List[float]) -> Dict[str, float]:
+    ordenados = sorted(tiempos)
+    return {
+        "p50_ms": round(statistics.median(ordenados), 4),
+        "p95_ms": round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))], 4),
+        "min_ms": round(ordenados[0], 4),
+        "iteraciones": len(ordenados),
+    }
+
+
+async def medir(operacion: Operacion, iteraciones: int, presupuesto: float, con_sesion: bool = True) -> Dict[str, float]:
+    """Ejecutar `operacion(db)` hasta `iteraciones` veces o `presupuesto` segundos"""
+    tiempos = []
+    limite = time.perf_counter() + presupuesto
+    for i in range(iteraciones):
+        if con_sesion:
+            async with AsyncSessionLocal() as db:
+                inicio = time.perf_counter()
+                await operacion(db)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        else:
+            inicio = time.perf_counter()
+            await operacion(None)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        if i >= 4 and time.perf_counter() > limite:
+            break
+    return resumir_tiempos(tiempos)
+
+
+def operaciones_repositorios(escala: int, rnd: random.Random) -> Dict[str, Operacion]:
+    """Operaciones de BaseRepository y de los repositorios específicos sobre el dataset"""
+    n = tamanios(escala)
+    creados: List[int] = []
+    desde = INICIO + timedelta(days=7)
+
+    def paciente_nuevo() -> PacienteCreate:
+        return PacienteCreate(dni=str(rnd.randrange(10**9)), telefono=str(rnd.randrange(10**9)), nombre="Paciente Benchmark")
+
+    async def create(db):
+        creados.append((await paciente_repo.create(db, obj_in=paciente_nuevo())).id)
+
+    async def update(db):
+        paciente = await paciente_repo.get(db, rnd.randint(1, n["pacientes"]))
+        await paciente_repo.update(db, db_obj=paciente, obj_in=PacienteUpdate(email=f"{rnd.randrange(10**6)}@ejemplo.com"))
+
+    async def delete(db):
+        await paciente_repo.delete(db, id=creados.pop() if creados else -1)
+
+    async def bulk_create(db):
+        await paciente_repo.bulk_create(db, objs_in=[paciente_nuevo() for _ in range(50)])
+
+    return {
+        # BaseRepository
+        "base.create": create,
+        "base.get": lambda db: paciente_repo.get(db, rnd.randint(1, n["pacientes"])),
+        "base.get_multi": lambda db: turno_repo.get_multi(db, skip=rnd.randrange(n["turnos"] - 100), limit=100),
+        "base.get_multi_filtros": lambda db: turno_repo.get_multi(db, filters={"estado": "confirmado", "id_clinica": rnd.randint(1, n["clinicas"])}),
+        "base.get_count": lambda db: turno_repo.get_count(db, filters={"estado": "programado"}),
+        "base.update": update,
+        "base.delete": delete,
+        "base.get_by_field": lambda db: paciente_repo.get_by_field(db, field="dni", value=str(20_000_000 + rnd.randint(1, n["pacientes"]))),
+        "base.get_multi_by_field": lambda db: turno_repo.get_multi_by_field(db, field="id_profesional", value=rnd.randint(1, n["profesionales"])),
+        "base.get_multi_by_json": lambda db: log_ia_repo.get_multi_by_json(db, field="metadatos", contenido={"id_clinica": rnd.randint(1, n["clinicas"])}),
+        "base.exists": lambda db: turno_repo.exists(db, id=rnd.randint(1, n["turnos"])),
+        "base.bulk_create_50": bulk_create,
+        # Repositorios específicos
+        "clinica.get_by_whatsapp_did": lambda db: clinica_repo.get_by_whatsapp_did(db, did_whatsapp=f"54938{rnd.randint(1, n['clinicas']):07d}"),
+        "clinica.get_active_clinics": lambda db: clinica_repo.get_active_clinics(db),
+        "clinica.get_by_configuracion": lambda db: clinica_repo.get_by_configuracion(db, configuracion={"turnos_online": True}),
+        "profesional.get_by_especialidad": lambda db: profesional_repo.get_by_especialidad(db, especialidad="Cardiología"),
+        "profesional.get_by_id_especialidad": lambda db: profesional_repo.get_by_id_especialidad(db, id_especialidad=rnd.randint(1, 12)),
+        "especialidad.get_by_nombre": lambda db: especialidad_repo.get_by_nombre(db, nombre="Pediatría"),
+        "especialidad.get_by_profesional": lambda db: especialidad_repo.get_by_profesional(db, id_profesional=rnd.randint(1, n["profesionales"])),
+        "paciente.get_by_dni": lambda db: paciente_repo.get_by_dni(db, dni=str(20_000_000 + rnd.randint(1, n["pacientes"]))),
+        "paciente.get_by_telefono": lambda db: paciente_repo.get_by_telefono(db, telefono=f"549381{rnd.randint(1, n['pacientes']):07d}"),
+        "turno.get_by_fecha_profesional": lambda db: turno_repo.get_by_fecha_profesional(
+            db, id_profesional=rnd.randint(1, n["profesionales"]), fecha_inicio=desde, fecha_fin=desde + timedelta(days=7)
+        ),
+        "turno.get_by_paciente": lambda db: turno_repo.get_by_paciente(db, id_paciente=rnd.randint(1, n["pacientes"])),
+        "turno.create": lambda db: turno_repo.create(db, obj_in=TurnoCreate(
+            id_paciente=rnd.randint(1, n["pacientes"]), id_profesional=rnd.randint(1, n["profesionales"]),
+            id_clinica=rnd.randint(1, n["clinicas"]), fecha_hora=desde,
+        )),
+        "log_ia.create": lambda db: log_ia_repo.create(db, obj_in=LogIACreate(
+            mensaje="hola", respuesta_ia="hola", confianza="alta", metadatos={"id_clinica": 1},
+        )),
+        "log_ia.get_by_metadatos": lambda db: log_ia_repo.get_by_metadatos(db, metadatos={"id_clinica": rnd.randint(1, n["clinicas"])}),
+        "log_ia_resumen.get_totales": lambda db: log_ia_resumen_repo.get_totales(db, desde=INICIO, hasta=INICIO + timedelta(days=30)),
+        "log_ia_resumen.get_por_hora": lambda db: log_ia_resumen_repo.get_por_hora(
+            db, desde=INICIO, hasta=INICIO + timedelta(days=1), id_clinica=rnd.randint(1, n["clinicas"])
+        ),
+        "log_ia_resumen.reconstruir_1d": lambda db: log_ia_resumen_repo.reconstruir(
+            db, log_model=LogIA, desde=INICIO, hasta=INICIO + timedelta(days=1)
+        ),
+    }
+
+
+def redis_disponible() -> bool:
+    try:
+        return bool(redis_session.get_redis_client().ping())
+    except Exception:
+        return False
+
+
+def operaciones_sesion(rnd: random.Random) -> Dict[str, Operacion]:
+    """Funciones de redis_session (síncronas, como las usa el procesador de mensajes)"""
+    valor = {"paso": "elegir_especialidad", "opciones": list(range(20)), "paciente": {"dni": "20000001"}}
+
+    async def ejecutar(funcion, *args):
+        funcion(*args)
+
+    def wa_id():
+        return f"bench:{rnd.randrange(1000)}"
+
+    return {
+        "redis.set_user_session": lambda _: ejecutar(redis_session.set_user_session, wa_id(), "flujo", valor),
+        "redis.get_user_session": lambda _: ejecutar(redis_session.get_user_session, wa_id()),
+        "redis.update_user_session": lambda _: ejecutar(redis_session.update_user_session, wa_id(), "flujo", {"paso": "confirmar"}),
+        "redis.eliminar_sesion_usuario": lambda _: ejecutar(redis_session.eliminar_sesion_usuario, wa_id()),
+    }
+
+
+def respuesta_soap(metodo: str, items: int, error: bool = False) -> str:
+    """Respuesta SOAP con el formato de HCWEB: JSON en SuccessMessage"""
+    datos = [
+        {"IdTurno": i, "Fecha": "2024-03-04T09:30:00", "Profesional": f"Dr. Profesional {i % 40}",
+         "Especialidad": "Cardiología", "Paciente": {"Dni": str(20_000_000 + i), "Nombre": "María Pérez"}}
+        for i in range(items)
+    ]
+    mensaje = "" if error else json.dumps(datos).replace("&", "&amp;").replace("<", "&lt;")
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+        f'<{metodo}Response xmlns="http://iosepscript.excelenciadigitial.net.ar/"><{metodo}Result>'
+        f"<ContainsErrors>{'true' if error else 'false'}</ContainsErrors>"
+        f"<SuccessMessage>{mensaje}</SuccessMessage><ErrorMessage>{'Sin turnos' if error else ''}</ErrorMessage>"
+        f"</{metodo}Result></{metodo}Response></soap:Body></soap:Envelope>"
+    )
+
+
+def operaciones_hcweb() -> Dict[str, Operacion]:
+    """Armado del body y parseo de respuestas de WsHcweb (sin red)"""
+    cliente = WsHcweb()
+    respuestas = {items: respuesta_soap("ObtenerTurnos", items) for items in (1, 100, 1000)}
+    con_error = respuesta_soap("ObtenerTurnos", 0, error=True)
+    parametros = {"dni": "20000001", "idEspecialidades": list(range(10)), "soloDisponibles": True, "fecha": None}
+    logging.getLogger("app.service.WsHcweb").setLevel(logging.ERROR)  # el warning de parse_error en cada iteración
+
+    async def ejecutar(funcion, *args):
+        funcion(*args)
+
+    operaciones = {
+        "hcweb.build_soap_body": lambda _: ejecutar(cliente._build_soap_body, "ObtenerTurnos", parametros),
+        "hcweb.parse_error": lambda _: ejecutar(cliente._parse_response, con_error, "ObtenerTurnos"),
+    }
+    for items, xml in respuestas.items():
+        operaciones[f"hcweb.parse_{items}"] = (lambda xml: lambda _: ejecutar(cliente._parse_response, xml, "ObtenerTurnos"))(xml)
+    return operaciones
+
+
+async def correr(escalas: List[int], iteraciones: int, presupuesto: float, filtro: Optional[str]) -> Dict[str, Any]:
+    engine.echo = False  # el log de SQL distorsiona las mediciones
+    await create_tables()
+    resultados: Dict[str, Dict[str, Any]] = {}
+
+    for escala in escalas:
+        async with AsyncSessionLocal() as db:
+            await vaciar(db)
+            inicio = time.perf_counter()
+            await cargar(db, generar(escala))
+            await db.commit()
+        print(f"\n== escala {escala}x (carga {time.perf_counter() - inicio:.1f}s) ==")
+        rnd = random.Random(escala)
+        resultados[f"{escala}x"] = {}
+        for nombre, operacion in operaciones_repositorios(escala, rnd).items():
+            if filtro and filtro not in nombre:
+                continue
+            resultado = await medir(operacion, iteraciones, presupuesto)
+            resultados[f"{escala}x"][nombre] = resultado
+            imprimir(nombre, resultado)
+
+    # Sesiones y parseo no dependen del tamaño de la base
+    resultados["sin_escala"] = {}
+    grupos = [operaciones_hcweb()]
+    if redis_disponible():
+        grupos.append(operaciones_sesion(random.Random(0)))
+    else:
+        print("\nRedis no disponible: se omiten las operaciones de redis_session")
+    print("\n== sin escala ==")
+    for grupo in grupos:
+        for nombre, operacion in grupo.items():
+            if filtro and filtro not in nombre:
+                continue
+            resultado = await medir(operacion, iteraciones * 10, presupuesto, con_sesion=False)
+            resultados["sin_escala"][nombre] = resultado
+            imprimir(nombre, resultado)
+
+    await close_db()
+    return {"meta": metadatos(escalas), "resultados": resultados}
+
+
+def imprimir(nombre: str, resultado: Dict[str, float]) -> None:
+    print(f"{nombre:<38} p50={resultado['p50_ms']:>9.3f}ms p95={resultado['p95_ms']:>9.3f}ms n={resultado['iteraciones']}")
+
+
+def metadatos(escalas: List[int]) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "dialecto": engine.dialect.name,
+        "escalas": escalas,
+    }
+
+
+def comparar(actual: Dict[str, Any], base: Dict[str, Any], tolerancia: float) -> List[str]:
+    """Operaciones cuyo p50 empeoró más que la tolerancia respecto de la línea base"""
+    regresiones = []
+    for grupo, operaciones in actual["resultados"].items():
+        for nombre, resultado in operaciones.items():
+            anterior = base["resultados"].get(grupo, {}).get(nombre)
+            if anterior is None:
+                continue
+            p50, p50_base = resultado["p50_ms"], anterior["p50_ms"]
+            if p50 > p50_base * (1 + tolerancia) and p50 - p50_base > MARGEN_RUIDO_MS:
+                regresiones.append(f"{grupo} {nombre}: {p50_base:.3f}ms -> {p50:.3f}ms (+{(p50 / p50_base - 1):.0%})")
+    return regresiones
+
+
+async def main(args):
+    escalas = [int(e) for e in args.escalas.split(",")]
+    actual = await correr(escalas, args.iteraciones, args.presupuesto, args.filtro)
+
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as archivo:
+            json.dump(actual, archivo, indent=2, ensure_ascii=False)
+        print(f"\nlínea base guardada en {args.guardar}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        if base["meta"].get("dialecto") != actual["meta"]["dialecto"]:
+            print(f"\nATENCIÓN: la línea base es de {base['meta'].get('dialecto')}, esta corrida de {actual['meta']['dialecto']}")
+        regresiones = comparar(actual, base, args.tolerancia)
+        print(f"\ncomparado con {args.comparar} (commit {base['meta'].get('commit')}): "
+              f"{len(regresiones)} regresiones con tolerancia {args.tolerancia:.0%}")
+        for regresion in regresiones:
+            print("  " + regresion)
+        if regresiones:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escalas", default="1,10,100")
+    parser.add_argument("--iteraciones", type=int, default=50)
+    parser.add_argument("--presupuesto", type=float, default=2.0, help="segundos máximos por operación")
+    parser.add_argument("--filtro", help="medir sólo las operaciones que contienen este texto")
+    parser.add_argument("--guardar", help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", help="línea base JSON contra la que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    asyncio.run(main(parser.parse_args()))
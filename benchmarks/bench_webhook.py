@@ -0,0 +1,89 @@
+"""Carga sostenida sobre el webhook de WhatsApp: aceptación vs. procesamiento.
+
+Uso:
+    python benchmarks/bench_webhook.py --mensajes 5000 --clientes 50
+    python benchmarks/bench_webhook.py --backend redis --workers 16   # Redis configurado
+
+Los POST pasan por la app real (ASGITransport, sin red) y el procesamiento se simula con
+una espera de --latencia-ms por mensaje (lo que tardaría el bot). Se mide cuántos mensajes
+por segundo acepta el webhook, su p95 y cuántos por segundo drenan los workers.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.routers.webhook import get_cola_mensajes
+from app.service.cola_mensajes import ColaMensajesMemoria, crear_cola_mensajes
+from app.service.workers_mensajes import PoolWorkers
+from main import app
+
+
+def payload(n: int):
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"id": "1", "changes": [{"field": "messages", "value": {
+            "messaging_product": "whatsapp",
+            "metadata": {"display_phone_number": "5493815550000", "phone_number_id": "99"},
+            "messages": [{"from": f"54938{n % 1000:07d}", "id": f"wamid.{n}", "timestamp": "1700000000",
+                          "type": "text", "text": {"body": "quiero un turno"}}],
+        }}]}],
+    }
+
+
+async def main(mensajes: int, clientes: int, workers: int, latencia_ms: float, backend: str):
+    cola = ColaMensajesMemoria() if backend == "memoria" else crear_cola_mensajes("redis")
+    app.dependency_overrides[get_cola_mensajes] = lambda: cola
+    procesados = 0
+
+    async def procesar(datos):
+        nonlocal procesados
+        await asyncio.sleep(latencia_ms / 1000)
+        procesados += 1
+
+    pool = PoolWorkers(cola, procesar, concurrencia=workers, bloqueo=0.1)
+    await pool.iniciar()
+
+    tiempos = []
+    siguiente = iter(range(mensajes))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as cliente:
+        async def enviar():
+            for n in siguiente:
+                t = time.perf_counter()
+                respuesta = await cliente.post("/webhook/whatsapp", json=payload(n))
+                tiempos.append((time.perf_counter() - t) * 1000)
+                assert respuesta.status_code == 200
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(enviar() for _ in range(clientes)))
+        aceptacion = time.perf_counter() - inicio
+        while procesados < mensajes:
+            await asyncio.sleep(0.01)
+        total = time.perf_counter() - inicio
+
+    await pool.detener()
+    await cola.cerrar()
+    tiempos.sort()
+    print(f"backend={backend} mensajes={mensajes} clientes={clientes} workers={workers} latencia bot={latencia_ms}ms")
+    print(f"webhook: {mensajes / aceptacion:,.0f} msgs/s p50={statistics.median(tiempos):.2f}ms "
+          f"p95={tiempos[int(len(tiempos) * 0.95)]:.2f}ms")
+    print(f"workers: {mensajes / total:,.0f} msgs/s (techo teórico {workers * 1000 / latencia_ms:,.0f} msgs/s)")
+    print(f"estadísticas: {pool.estadisticas}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensajes", type=int, default=5000)
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--latencia-ms", type=float, default=20.0)
+    parser.add_argument("--backend", choices=["memoria", "redis"], default="memoria")
+    args = parser.parse_args()
+    asyncio.run(main(args.mensajes, args.clientes, args.workers, args.latencia_ms, args.backend))
@@ -0,0 +1,64 @@
+"""Throughput del pool de workers a medida que se agregan shards, con orden por usuario.
+
+Uso:
+    python benchmarks/bench_workers_mensajes.py --mensajes 5000 --usuarios 500
+    python benchmarks/bench_workers_mensajes.py --workers 1,4,16,64 --latencia-ms 5
+
+Cola en memoria; el procesamiento simula --latencia-ms de espera por mensaje (E/S del bot).
+Para cada cantidad de workers se informa msgs/s y se verifica que cada usuario recibió sus
+mensajes en orden. Con pocos usuarios el techo lo pone el usuario más activo, no los workers.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.service.cola_mensajes import ColaMensajesMemoria
+from app.service.workers_mensajes import PoolWorkers
+
+
+async def medir(workers: int, mensajes: int, usuarios: int, latencia_ms: float):
+    cola = ColaMensajesMemoria()
+    recibidos = {}
+
+    async def procesar(datos):
+        await asyncio.sleep(latencia_ms / 1000)
+        recibidos.setdefault(datos["wa_id"], []).append(datos["n"])
+
+    for n in range(mensajes):
+        wa_id = f"54938{n % usuarios:07d}"
+        await cola.publicar({"wa_id": wa_id, "n": n}, clave=wa_id)
+
+    pool = PoolWorkers(cola, procesar, concurrencia=workers, bloqueo=0.05)
+    inicio = time.perf_counter()
+    await pool.iniciar()
+    while pool.estadisticas.procesados < mensajes:
+        await asyncio.sleep(0.005)
+    duracion = time.perf_counter() - inicio
+    await pool.detener()
+
+    en_orden = all(secuencia == sorted(secuencia) for secuencia in recibidos.values())
+    return mensajes / duracion, en_orden
+
+
+async def main(mensajes: int, usuarios: int, latencia_ms: float, lista_workers):
+    print(f"mensajes={mensajes} usuarios={usuarios} latencia={latencia_ms}ms")
+    base = None
+    for workers in lista_workers:
+        throughput, en_orden = await medir(workers, mensajes, usuarios, latencia_ms)
+        base = base or throughput
+        print(f"workers={workers:>3}  {throughput:>9,.0f} msgs/s  x{throughput / base:>5.1f}  "
+              f"orden por usuario: {'OK' if en_orden else 'ROTO'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mensajes", type=int, default=3000)
+    parser.add_argument("--usuarios", type=int, default=500)
+    parser.add_argument("--latencia-ms", type=float, default=5.0)
+    parser.add_argument("--workers", type=lambda v: [int(w) for w in v.split(",")], default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+    asyncio.run(main(args.mensajes, args.usuarios, args.latencia_ms, args.workers))
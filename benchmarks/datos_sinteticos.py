@@ -0,0 +1,186 @@
+"""Datasets sintéticos reproducibles para los benchmarks, escalables por un factor entero.
+
+Escala 1x: 5 clínicas, 12 especialidades, 40 profesionales, 1.000 pacientes, 5.000 turnos
+y 2.000 logs IA. 10x y 100x multiplican todo salvo las especialidades (un catálogo fijo).
+Con la misma semilla y escala se generan exactamente las mismas filas, con ids explícitos
+para que las claves foráneas se resuelvan sin consultar la base.
+
+Uso como script (ATENCIÓN: vacía las tablas de la base configurada):
+    python benchmarks/datos_sinteticos.py --escala 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert, text
+
+from app.config.database import AsyncSessionLocal, Base, create_tables, close_db, engine
+from app.models.entities import LogIA
+from app.repositories.repositories import log_ia_resumen_repo
+
+TAMANIOS_1X = {"clinicas": 5, "profesionales": 40, "pacientes": 1_000, "turnos": 5_000, "logs_ia": 2_000}
+ESCALAS = (1, 10, 100)
+
+ESPECIALIDADES = [
+    "Cardiología", "Dermatología", "Pediatría", "Traumatología", "Ginecología", "Oftalmología",
+    "Neurología", "Clínica Médica", "Otorrinolaringología", "Urología", "Nutrición", "Kinesiología",
+]
+NOMBRES = ["María", "José", "Juan", "Ana", "Carlos", "Lucía", "Martín", "Sofía", "Jorge", "Valentina"]
+APELLIDOS = ["González", "Rodríguez", "Gómez", "Fernández", "López", "Díaz", "Martínez", "Pérez", "García", "Sosa"]
+DIAS = ["lunes", "martes", "miercoles", "jueves", "viernes", "sabado"]
+ESTADOS = ["programado", "confirmado", "cancelado", "completado"]
+CONFIANZAS = ["baja", "media", "alta"]
+
+# Fecha fija: los turnos y logs no dependen del día en que se corre el benchmark
+INICIO = datetime(2024, 3, 4, tzinfo=timezone.utc)
+DIAS_TURNOS = 60
+DIAS_LOGS = 30
+
+
+def tamanios(escala: int) -> Dict[str, int]:
+    return {tabla: cantidad * escala for tabla, cantidad in TAMANIOS_1X.items()}
+
+
+def _nombre(rnd: random.Random) -> str:
+    return f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}"
+
+
+def _horarios(rnd: random.Random) -> Dict[str, List[Dict[str, str]]]:
+    horarios = {}
+    for dia in rnd.sample(DIAS, rnd.randint(2, 4)):
+        inicio = rnd.choice([8, 9, 14, 15])
+        horarios[dia] = [{"inicio": f"{inicio:02d}:00", "fin": f"{inicio + 4:02d}:00"}]
+    return horarios
+
+
+def generar(escala: int = 1, semilla: int = 1234) -> Dict[str, List[Dict[str, Any]]]:
+    """Filas por tabla, listas para `insert(Modelo)` en orden de claves foráneas"""
+    rnd = random.Random(semilla)
+    n = tamanios(escala)
+
+    clinicas = [
+        {
+            "id": i,
+            "nombre": f"Clínica {i}",
+            "configuraciones": {
+                "duracion_turno": rnd.choice([15, 20, 30, 45]),
+                "horario_atencion": {"inicio": "08:00", "fin": "20:00"},
+                "turnos_online": rnd.random() < 0.7,
+            },
+            "did_whatsapp": f"54938{i:07d}",
+            "activa": rnd.random() < 0.9,
+        }
+        for i in range(1, n["clinicas"] + 1)
+    ]
+    especialidades = [
+        {"id": i, "nombre": nombre, "descripcion": f"Atención de {nombre.lower()}"}
+        for i, nombre in enumerate(ESPECIALIDADES, start=1)
+    ]
+    profesionales, profesional_especialidad = [], []
+    for i in range(1, n["profesionales"] + 1):
+        ids_especialidad = sorted(rnd.sample(range(1, len(ESPECIALIDADES) + 1), rnd.randint(1, 2)))
+        profesionales.append({
+            "id": i,
+            "nombre": f"Dr. {_nombre(rnd)}",
+            "especialidades": [ESPECIALIDADES[j - 1] for j in ids_especialidad],
+            "horarios": _horarios(rnd),
+            "activo": rnd.random() < 0.9,
+        })
+        profesional_especialidad.extend(
+            {"id_profesional": i, "id_especialidad": j} for j in ids_especialidad
+        )
+    pacientes = [
+        {
+            "id": i,
+            "dni": str(20_000_000 + i),
+            "telefono": f"549381{i:07d}",
+            "nombre": _nombre(rnd),
+            "email": f"paciente{i}@ejemplo.com" if rnd.random() < 0.5 else None,
+        }
+        for i in range(1, n["pacientes"] + 1)
+    ]
+    turnos = [
+        {
+            "id": i,
+            "id_paciente": rnd.randint(1, n["pacientes"]),
+            "id_profesional": rnd.randint(1, n["profesionales"]),
+            "id_clinica": rnd.randint(1, n["clinicas"]),
+            "fecha_hora": INICIO + timedelta(days=rnd.randrange(DIAS_TURNOS), minutes=30 * rnd.randrange(8 * 2, 20 * 2)),
+            "estado": rnd.choice(ESTADOS),
+            "observaciones": "Control" if rnd.random() < 0.2 else None,
+        }
+        for i in range(1, n["turnos"] + 1)
+    ]
+    logs_ia = [
+        {
+            "id": i,
+            "mensaje": f"Hola, quiero un turno para {rnd.choice(ESPECIALIDADES).lower()}",
+            "respuesta_ia": "Claro, ¿para qué día?",
+            "confianza": rnd.choice(CONFIANZAS),
+            "fecha": INICIO + timedelta(seconds=rnd.randrange(DIAS_LOGS * 86400)),
+            "metadatos": {"id_clinica": rnd.randint(1, n["clinicas"]), "wa_id": f"549381{rnd.randint(1, n['pacientes']):07d}"},
+        }
+        for i in range(1, n["logs_ia"] + 1)
+    ]
+    return {
+        "clinicas": clinicas,
+        "especialidades": especialidades,
+        "profesionales": profesionales,
+        "profesional_especialidad": profesional_especialidad,
+        "pacientes": pacientes,
+        "turnos": turnos,
+        "logs_ia": logs_ia,
+    }
+
+
+async def vaciar(db) -> None:
+    for tabla in reversed(Base.metadata.sorted_tables):
+        await db.execute(delete(tabla))
+    await db.commit()
+
+
+async def cargar(db, datos: Dict[str, List[Dict[str, Any]]], lote: int = 5_000) -> None:
+    """Insertar el dataset (executemany por lotes) y reconstruir el rollup de logs IA"""
+    for tabla in Base.metadata.sorted_tables:
+        filas = datos.get(tabla.name)
+        for inicio in range(0, len(filas or []), lote):
+            await db.execute(insert(tabla), filas[inicio:inicio + lote])
+    if db.get_bind().dialect.name == "postgresql":
+        # Los ids son explícitos: las secuencias tienen que seguir después del último
+        for tabla in Base.metadata.sorted_tables:
+            if "id" in tabla.c and datos.get(tabla.name):
+                await db.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{tabla.name}', 'id'), (SELECT max(id) FROM {tabla.name}))"
+                ))
+    await log_ia_resumen_repo.reconstruir(
+        db, log_model=LogIA, desde=INICIO, hasta=INICIO + timedelta(days=DIAS_LOGS + 1)
+    )
+
+
+async def main(escala: int, semilla: int):
+    engine.echo = False
+    await create_tables()
+    inicio = time.perf_counter()
+    datos = generar(escala, semilla)
+    generado = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await vaciar(db)
+        await cargar(db, datos)
+    print(f"escala {escala}x: " + ", ".join(f"{tabla}={len(filas)}" for tabla, filas in datos.items()))
+    print(f"generado en {generado - inicio:.2f}s, cargado en {time.perf_counter() - generado:.2f}s")
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--escala", type=int, default=1)
+    parser.add_argument("--semilla", type=int, default=1234)
+    args = parser.parse_args()
+    asyncio.run(main(args.escala, args.semilla))
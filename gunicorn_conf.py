@@ -0,0 +1,25 @@
+"""Configuración de gunicorn para producción: `gunicorn main:app -c gunicorn_conf.py`.
+
+Requiere `pip install gunicorn uvicorn-worker`. Ver serve.py para el arranque sólo con uvicorn.
+"""
+import multiprocessing
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Sin preload: cada worker importa la app y crea sus pools en el lifespan. Con
+# preload_app = True también funciona (app/core/recursos.py descarta el pool heredado y
+# app/core/eventos.py regenera el origen de los eventos en cada worker),
+# pero no se gana nada porque nada pesado se crea en la importación.
+preload_app = False
+
+# SIGTERM: tiempo para terminar los requests en curso y drenar las colas internas
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+timeout = int(os.getenv("WORKER_TIMEOUT", 60))
+keepalive = 5
+
+# Reciclar workers de a poco para acotar el crecimiento de memoria
+max_requests = int(os.getenv("MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
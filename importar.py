@@ -0,0 +1,72 @@
+"""Importación masiva de CSV/JSONL (ver app/service/importacion.py).
+
+Uso:
+    python importar.py datos/                        # todos los archivos con nombre de tabla
+    python importar.py datos/ --tablas turnos        # sólo turnos (FKs a ids existentes)
+    python importar.py datos/ --lote 100000 --concurrencia 4
+
+Cada tabla se carga en una transacción: si falla, no queda nada a medias de esa tabla.
+Las filas descartadas (p. ej. un turno de un paciente que no está en el origen) se listan
+al final sin cortar la importación. Con EVENTOS_CAMBIOS_BACKEND=redis o postgres los eventos
+de la importación llegan a los procesos de la API, que descartan sus cachés de esas tablas.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.config import Config
+from app.config.database import close_db, engine
+from app.core.eventos import crear_puente_cambios
+from app.core.redis_async import crear_cliente_redis
+from app.service.importacion import ImportadorMasivo, ResultadoTabla, archivos_de_origen
+
+
+def informar(resultado: ResultadoTabla) -> None:
+    tasa = resultado.filas / resultado.segundos if resultado.segundos else 0
+    print(f"  {resultado.tabla}: {resultado.filas:,} filas ({tasa:,.0f}/s)", flush=True)
+
+
+async def main(args) -> int:
+    engine.echo = False
+    archivos = archivos_de_origen(args.directorio, args.tablas)
+    if not archivos:
+        print(f"No hay archivos importables en {args.directorio}")
+        return 1
+    print("Importando " + ", ".join(f"{tabla} ({ruta})" for tabla, ruta in archivos.items()))
+
+    cliente_redis = crear_cliente_redis() if Config.EVENTOS_CAMBIOS_BACKEND == "redis" else None
+    puente = crear_puente_cambios(cliente_redis=cliente_redis, engine=engine)
+    importador = ImportadorMasivo(lote=args.lote, concurrencia=args.concurrencia, progreso=informar)
+    if puente is not None:
+        try:
+            await puente.iniciar()
+        except Exception:
+            # La importación sigue: los otros procesos se quedan con el TTL de sus cachés
+            logging.getLogger(__name__).warning("No se pudo iniciar el puente de eventos de cambios", exc_info=True)
+            puente = None
+    try:
+        resultados = await importador.importar(archivos)
+    finally:
+        if puente is not None:
+            await puente.detener()  # espera a que salgan los eventos pendientes
+        if cliente_redis is not None:
+            await cliente_redis.aclose()
+        await close_db()
+
+    print("\nResumen:")
+    for resultado in resultados.values():
+        print(f"  {resultado.tabla:<26} {resultado.filas:>10,} filas  {resultado.descartadas:>6,} descartadas  {resultado.segundos:6.1f}s")
+        for error in resultado.errores:
+            print(f"      {error}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directorio")
+    parser.add_argument("--tablas", type=lambda v: v.split(","), default=None)
+    parser.add_argument("--lote", type=int, default=50_000)
+    parser.add_argument("--concurrencia", type=int, default=4)
+    sys.exit(asyncio.run(main(parser.parse_args())))
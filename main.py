@@ -1,10 +1,39 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app.core.metricas import MiddlewareMetricas
+from app.core.recursos import recursos
 from app.routers.router import router
+from app.routers.analitica import router as analitica_router
+from app.routers.busqueda import router as busqueda_router
+from app.routers.catalogo import router as catalogo_router
+from app.routers.exportacion import router as exportacion_router
+from app.routers.metricas import router as metricas_router
+from app.routers.turnos import router as turnos_router
+from app.routers.webhook import router as webhook_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Cada proceso worker crea sus pools al arrancar y drena el trabajo pendiente al cerrar
+    await recursos.iniciar()
+    yield
+    await recursos.detener()
+
 
 app = FastAPI(
     title="Chatbot AI",
     description="Un bot conversacional multi-institucional con FastAPI y LangGraph.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
-app.include_router(router)
\ No newline at end of file
+app.add_middleware(MiddlewareMetricas)
+
+app.include_router(router)
+app.include_router(analitica_router)
+app.include_router(busqueda_router)
+app.include_router(catalogo_router)
+app.include_router(exportacion_router)
+app.include_router(turnos_router)
+app.include_router(webhook_router)
+app.include_router(metricas_router)
@@ -0,0 +1,43 @@
+"""Arranque de la API con varios procesos worker.
+
+Uso:
+    python serve.py                          # WEB_CONCURRENCY procesos (por defecto uno por core)
+    WEB_CONCURRENCY=4 PORT=8080 python serve.py
+
+Alternativa con gunicorn (pip install gunicorn uvicorn-worker):
+    gunicorn main:app -c gunicorn_conf.py
+
+Cada worker es un proceso independiente que ejecuta el lifespan de main.py: crea sus propios
+pools (app/core/recursos.py) y, al recibir SIGTERM, deja de aceptar conexiones, espera hasta
+GRACEFUL_TIMEOUT segundos a que terminen los requests en curso y drena las colas internas.
+Con COLA_MENSAJES_BACKEND=redis los workers de mensajes corren aparte (worker.py).
+"""
+import os
+import socket
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+
+def configuracion() -> uvicorn.Config:
+    return uvicorn.Config(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", 8000)),
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        timeout_graceful_shutdown=int(os.getenv("GRACEFUL_TIMEOUT", 30)),
+        log_level=os.getenv("LOG_LEVEL", "info"),
+        access_log=os.getenv("ACCESS_LOG", "false").lower() == "true",
+    )
+
+
+if __name__ == "__main__":
+    config = configuracion()
+    if config.workers <= 1:
+        uvicorn.Server(config).run()
+    else:
+        # Las conexiones aceptadas por los workers heredan las opciones del socket compartido;
+        # sin TCP_NODELAY cada respuesta keep-alive espera ~40ms (Nagle + delayed ACK)
+        sock = config.bind_socket()
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        Multiprocess(config, sockets=[sock]).run()
@@ -0,0 +1,49 @@
+"""Sincronización del espejo local de datos de referencia de HCWEB (ver app/service/espejo_hcweb.py).
+
+Uso:
+    python sincronizar_hcweb.py                          # todos los datasets, una vez
+    python sincronizar_hcweb.py --datasets profesionales
+    python sincronizar_hcweb.py --continuo               # cada ESPEJO_HCWEB_INTERVALO_SEGUNDOS
+
+Con varios workers de la API la sincronización periódica corre acá (o en un solo proceso
+con ESPEJO_HCWEB_HABILITADO): los workers sólo leen de la base.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.config.database import AsyncSessionLocal, close_db, engine
+from app.service.espejo_hcweb import ERROR, EspejoHcweb
+from app.service.WsHcweb import registro_hcweb
+
+
+async def main(args) -> int:
+    engine.echo = False
+    espejo = EspejoHcweb()
+    try:
+        if args.continuo:
+            await espejo.iniciar()
+            await asyncio.Event().wait()
+        resultados = await espejo.sincronizar(args.datasets)
+        async with AsyncSessionLocal() as db:
+            estado = {fila["dataset"]: fila for fila in await espejo.estado(db)}
+    finally:
+        await espejo.detener()
+        await registro_hcweb.cerrar()
+        await close_db()
+
+    for resultado in resultados:
+        print(f"  {resultado.dataset:<16} {resultado.estado:<12} {resultado.registros:>7,} registros  "
+              f"+{resultado.insertados} ~{resultado.actualizados} -{resultado.eliminados}  {resultado.segundos:5.2f}s")
+        if resultado.error:
+            print(f"      {resultado.error} (último éxito: {estado[resultado.dataset]['ultimo_exito']})")
+    return 1 if any(r.estado == ERROR for r in resultados) else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--datasets", type=lambda v: v.split(","), default=None)
+    parser.add_argument("--continuo", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,6 @@
+import os
+from dotenv import load_dotenv
+
+# Sin DATABASE_PG_URL configurada, los tests corren sobre SQLite en memoria
+load_dotenv()
+os.environ.setdefault("DATABASE_PG_URL", "sqlite+aiosqlite:///:memory:")
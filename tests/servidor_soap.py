@@ -0,0 +1,92 @@
+"""Upstream SOAP falso para los tests del cliente de HCWEB y del espejo local"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+
+def respuesta_soap(metodo: str, resultado: Any = None, error: str = "") -> str:
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>'
+        f'<{metodo}Response xmlns="http://iosepscript.excelenciadigitial.net.ar/"><{metodo}Result>'
+        f"<ContainsErrors>{'true' if error else 'false'}</ContainsErrors>"
+        f"<SuccessMessage>{json.dumps(resultado) if resultado is not None else ''}</SuccessMessage>"
+        f"<ErrorMessage>{error}</ErrorMessage>"
+        f"</{metodo}Result></{metodo}Response></soap:Body></soap:Envelope>"
+    )
+
+
+class ServidorSoapFalso:
+    """Upstream SOAP en un hilo: `metodos` da el resultado de cada método a partir del body"""
+
+    def __init__(
+        self,
+        metodos: Dict[str, Callable[[str], Any]],
+        demora: float = 0.0,
+        *,
+        demoras: Optional[Dict[str, float]] = None,
+        errores: Optional[Dict[str, str]] = None,
+    ):
+        self.metodos = metodos
+        self.demora = demora
+        self.demoras = demoras or {}
+        self.errores = errores or {}
+        self.llamadas: Dict[str, int] = {}
+        self.en_curso = 0
+        self.max_en_curso = 0
+        self.conexiones = 0
+        self._lock = threading.Lock()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def setup(self):
+                super().setup()
+                with servidor._lock:
+                    servidor.conexiones += 1
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+                metodo = self.headers["SOAPAction"].rsplit("/", 1)[-1]
+                with servidor._lock:
+                    servidor.llamadas[metodo] = servidor.llamadas.get(metodo, 0) + 1
+                    servidor.en_curso += 1
+                    servidor.max_en_curso = max(servidor.max_en_curso, servidor.en_curso)
+                try:
+                    demora = servidor.demoras.get(metodo, servidor.demora)
+                    if demora:
+                        time.sleep(demora)
+                    if metodo in servidor.errores:
+                        estado, xml = 200, respuesta_soap(metodo, error=servidor.errores[metodo])
+                    elif metodo in servidor.metodos:
+                        estado, xml = 200, respuesta_soap(metodo, servidor.metodos[metodo](body))
+                    else:
+                        estado, xml = 500, "metodo desconocido"
+                finally:
+                    with servidor._lock:
+                        servidor.en_curso -= 1
+                datos = xml.encode()
+                self.send_response(estado)
+                self.send_header("Content-Type", "text/xml; charset=utf-8")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.http.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.http.server_address[1]}/ws.asmx"
+        self._hilo = threading.Thread(target=self.http.serve_forever, daemon=True)
+
+    def __enter__(self) -> "ServidorSoapFalso":
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.http.shutdown()
+        self.http.server_close()
@@ -0,0 +1,154 @@
+import os
+from dotenv import load_dotenv
+
+# Sin DATABASE_PG_URL configurada, los tests corren sobre SQLite en memoria
+load_dotenv()
+os.environ.setdefault("DATABASE_PG_URL", "sqlite+aiosqlite:///:memory:")
+from datetime import date, datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, update
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.models.entities import Clinica, Paciente, Profesional, Turno
+from app.repositories.repositories import turno_repo
+from app.schemas.responses import TurnoCreate, TurnoUpdate
+from app.core.eventos import EventoCambio
+from app.service.agenda import ZONA, Agenda, AlmacenAgendaMemoria, DiaAgenda
+
+pytestmark = pytest.mark.asyncio
+
+LUNES = date(2026, 3, 2)
+HORARIOS = {"lunes": [{"inicio": "08:00", "fin": "10:00"}, {"inicio": "14:00", "fin": "15:00"}],
+            "miércoles": [{"inicio": "09:00", "fin": "12:00"}]}
+
+
+def a_las(hora: int, minuto: int = 0, fecha: date = LUNES) -> datetime:
+    return datetime(fecha.year, fecha.month, fecha.day, hora, minuto, tzinfo=ZONA)
+
+
+@pytest_asyncio.fixture
+async def datos():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        clinica = Clinica(nombre="Clínica Norte", did_whatsapp="1", configuraciones={})
+        paciente = Paciente(dni="30111222", telefono="5491100000000", nombre="Ana Pérez")
+        profesional = Profesional(nombre="Dra. Gómez", horarios=HORARIOS)
+        db.add_all([clinica, paciente, profesional])
+        await db.flush()
+        db.add(Turno(id_paciente=paciente.id, id_profesional=profesional.id, id_clinica=clinica.id,
+                     fecha_hora=a_las(8, 30), estado="confirmado"))
+        await db.commit()
+        ids = {"clinica": clinica.id, "paciente": paciente.id, "profesional": profesional.id}
+    agenda = Agenda().suscribir()
+    yield agenda, ids
+    agenda.desuscribir()
+    async with engine.begin() as conn:
+        for tabla in (Turno, Profesional, Paciente, Clinica):
+            await conn.execute(delete(tabla))
+
+
+class TestDiaAgenda:
+    """Tests para la grilla de un día"""
+
+    async def test_grilla_desde_horarios(self):
+        dia = DiaAgenda.desde_horarios(HORARIOS, LUNES, 30)
+        assert dia.inicio == 8 * 60 and dia.habilitados.bit_count() == 6
+        assert [m.strftime("%H:%M") for m in dia.horarios(LUNES)] == ["08:00", "08:30", "09:00", "09:30", "14:00", "14:30"]
+        miercoles = DiaAgenda.desde_horarios(HORARIOS, date(2026, 3, 4), 45)
+        assert [m.strftime("%H:%M") for m in miercoles.horarios(date(2026, 3, 4))] == ["09:00", "09:45", "10:30", "11:15"]
+        assert DiaAgenda.desde_horarios(HORARIOS, date(2026, 3, 3), 30).habilitados == 0
+
+    async def test_ocupar_liberar_y_fuera_de_grilla(self):
+        dia = DiaAgenda.desde_horarios(HORARIOS, LUNES, 30)
+        dia.ocupar(1, dia.slot(a_las(9)))
+        dia.ocupar(2, dia.slot(a_las(9, 10)))
+        assert not dia.esta_libre(a_las(9)) and dia.esta_libre(a_las(9, 30)) and not dia.esta_libre(a_las(12))
+        assert dia.resumen() == {"habilitados": 6, "ocupados": 1, "libres": 5, "fuera_de_grilla": 1}
+        dia.liberar(1)
+        assert dia.esta_libre(a_las(9))
+        assert DiaAgenda.desde_cabecera(dia.cabecera(), dict(dia.turnos)) == dia
+
+
+class TestAlmacenAgendaMemoria:
+    """Tests para el vencimiento de los días en memoria"""
+
+    async def test_descarta_los_menos_usados_y_los_vencidos(self, monkeypatch):
+        reloj = [1000.0]
+        monkeypatch.setattr("app.service.agenda.monotonic", lambda: reloj[0])
+        almacen = AlmacenAgendaMemoria(ttl_dias=1, maximo_dias=2)
+        for i, id_turno in enumerate((1, 2, 3)):
+            dia = DiaAgenda.desde_horarios(HORARIOS, LUNES, 30)
+            dia.ocupar(id_turno, 0)
+            await almacen.guardar((i, LUNES), dia)
+            if i == 1:
+                await almacen.obtener((0, LUNES))  # el 1 pasa a ser el menos usado
+        assert sorted(await almacen.dias()) == [(0, LUNES), (2, LUNES)]
+        assert await almacen.liberar(2) is None
+
+        reloj[0] += 86400
+        assert await almacen.obtener((0, LUNES)) is None
+        await almacen.guardar((3, LUNES), DiaAgenda.desde_horarios(HORARIOS, LUNES, 30))
+        assert await almacen.dias() == [(3, LUNES)]
+        assert await almacen.liberar(3) is None
+
+
+class TestAgenda:
+    """Tests para los snapshots con actualización incremental"""
+
+    async def test_snapshot_y_cambios_de_turnos(self, datos):
+        agenda, ids = datos
+        async with AsyncSessionLocal() as db:
+            assert not await agenda.esta_libre(db, ids["profesional"], a_las(8, 30))
+            assert len(await agenda.libres(db, ids["profesional"], LUNES)) == 5
+
+            nuevo = await turno_repo.create(db, obj_in=TurnoCreate(
+                id_paciente=ids["paciente"], id_profesional=ids["profesional"], id_clinica=ids["clinica"], fecha_hora=a_las(14)
+            ))
+            assert [m.strftime("%H:%M") for m in await agenda.ocupados(db, ids["profesional"], LUNES)] == ["08:30", "14:00"]
+
+            await turno_repo.update(db, db_obj=nuevo, obj_in=TurnoUpdate(fecha_hora=a_las(14, 30)))
+            assert await agenda.esta_libre(db, ids["profesional"], a_las(14))
+            assert not await agenda.esta_libre(db, ids["profesional"], a_las(14, 30))
+
+            await turno_repo.update(db, db_obj=nuevo, obj_in=TurnoUpdate(estado="cancelado"))
+            assert await agenda.esta_libre(db, ids["profesional"], a_las(14, 30))
+            assert agenda.construidos == 1
+            assert await agenda.verificar(db) == []
+
+    async def test_cambios_pendientes_acotados(self, datos, monkeypatch):
+        agenda, ids = datos
+        monkeypatch.setattr(Agenda, "MAXIMO_PENDIENTES", 3)
+        async with AsyncSessionLocal() as db:
+            await agenda.libres(db, ids["profesional"], LUNES)
+            for id_turno in range(100, 110):
+                agenda.al_cambiar(EventoCambio("turnos", "update", (id_turno,)))
+            assert agenda._pendientes == {0}
+            assert len(await agenda.libres(db, ids["profesional"], LUNES)) == 5
+            assert agenda.construidos == 2
+
+    async def test_evento_sin_ids_descarta_todo(self, datos):
+        agenda, ids = datos
+        async with AsyncSessionLocal() as db:
+            await agenda.libres(db, ids["profesional"], LUNES)
+            agenda.al_cambiar(EventoCambio("turnos", "importacion"))
+            assert agenda._pendientes == {0}
+            await agenda.libres(db, ids["profesional"], LUNES)
+            assert agenda.construidos == 2
+
+    async def test_verificar_detecta_y_repara(self, datos):
+        agenda, ids = datos
+        async with AsyncSessionLocal() as db:
+            await agenda.libres(db, ids["profesional"], LUNES)
+            # Cambios por fuera de los repositorios: no hay eventos
+            await db.execute(update(Turno).values(estado="cancelado"))
+            await db.execute(update(Profesional).values(horarios={"lunes": [{"inicio": "08:00", "fin": "09:00"}]}))
+            await db.commit()
+
+            inconsistencias = await agenda.verificar(db, reparar=True)
+            assert len(inconsistencias) == 1
+            assert inconsistencias[0].grilla and len(inconsistencias[0].sobrantes) == 1
+            assert await agenda.verificar(db) == []
+            assert len(await agenda.libres(db, ids["profesional"], LUNES)) == 2
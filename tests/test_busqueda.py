@@ -0,0 +1,116 @@
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.models.entities import Especialidad, Paciente, Profesional
+from app.repositories.repositories import especialidad_repo, paciente_repo
+from app.schemas.responses import EspecialidadUpdate, PacienteCreate
+from app.service.busqueda import IndiceBusquedaMemoria, buscador
+from app.utils.texto import normalizar_nombre, normalizar_texto
+from main import app
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def indice():
+    indice = IndiceBusquedaMemoria()
+    indice.agregar("especialidad", 1, "Cardiología", "Especialidad que se ocupa del corazón")
+    indice.agregar("especialidad", 2, "Dermatología", "Especialidad médica de la piel")
+    indice.agregar("profesional", 10, "Dra. Ana Gómez")
+    indice.agregar("profesional", 11, "Dr. Carlos Gomes")
+    indice.agregar("profesional", 12, "Dr. Roberto Silva")
+    indice.agregar("paciente", 20, "María González")
+    return indice
+
+
+class TestNormalizacion:
+    """Tests para la normalización de texto"""
+
+    async def test_normalizar_texto(self):
+        assert normalizar_texto("  Cardiología,   INFANTIL ") == "cardiologia infantil"
+
+    async def test_normalizar_nombre_quita_tratamientos(self):
+        assert normalizar_nombre("Dra. Ana Gómez") == "ana gomez"
+
+
+class TestIndiceBusquedaMemoria:
+    """Tests para el índice de trigramas en memoria"""
+
+    async def test_sin_acentos(self, indice):
+        resultados = indice.buscar("cardiologia")
+        assert (resultados[0].tipo, resultados[0].id) == ("especialidad", 1)
+        assert resultados[0].puntaje > 0.9
+
+    async def test_con_tratamiento_y_error_de_tipeo(self, indice):
+        resultados = indice.buscar("dra gomez", tipos=["profesional"])
+        assert [r.id for r in resultados][:2] == [10, 11]
+        assert 12 not in [r.id for r in resultados]
+
+    async def test_busca_en_descripcion(self, indice):
+        assert indice.buscar("piel")[0].id == 2
+
+    async def test_filtra_por_tipo_y_limite(self, indice):
+        resultados = indice.buscar("gonzalez", tipos=["profesional"])
+        assert all(r.tipo == "profesional" for r in resultados)
+        assert len(indice.buscar("a", limite=1)) <= 1
+
+    async def test_reindexar_y_quitar(self, indice):
+        indice.agregar("profesional", 12, "Dr. Roberto Sosa")
+        assert indice.buscar("silva") == []
+        indice.quitar("profesional", 12)
+        assert indice.buscar("sosa") == []
+        assert len(indice) == 5
+
+
+class TestEndpointBusqueda:
+    """Tests para /api/busqueda sobre SQLite (usa el índice en memoria)"""
+
+    @pytest_asyncio.fixture
+    async def datos(self):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSessionLocal() as db:
+            db.add_all([
+                Paciente(dni="1", telefono="1", nombre="Juan Pérez"),
+                Profesional(nombre="Dra. Ana García", activo=True),
+                Especialidad(nombre="Traumatología", descripcion="Lesiones del sistema musculoesquelético"),
+            ])
+            await db.commit()
+        buscador.invalidar()
+        yield
+        buscador.invalidar()
+        async with engine.begin() as conn:
+            for modelo in (Paciente, Profesional, Especialidad):
+                await conn.execute(delete(modelo))
+
+    async def test_busqueda_rankeada(self, datos):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            respuesta = await client.get("/api/busqueda", params={"q": "traumatologia"})
+            solo_pacientes = await client.get("/api/busqueda", params={"q": "juan perez", "tipo": "paciente"})
+
+        assert respuesta.status_code == 200
+        assert respuesta.json()[0]["nombre"] == "Traumatología"
+        assert [r["tipo"] for r in solo_pacientes.json()] == ["paciente"]
+
+    async def test_indice_sigue_los_cambios(self, datos):
+        buscador.suscribir()
+        try:
+            async with AsyncSessionLocal() as db:
+                assert [r.nombre for r in await buscador.buscar(db, "traumatologia")] == ["Traumatología"]
+                cargado = buscador.indice
+                nuevo = await paciente_repo.create(db, obj_in=PacienteCreate(dni="2", telefono="2", nombre="Lucía Fernández"))
+                especialidad, = (await db.execute(select(Especialidad))).scalars().all()
+                await especialidad_repo.update(db, db_obj=especialidad, obj_in=EspecialidadUpdate(nombre="Ortopedia"))
+
+                assert [r.id for r in await buscador.buscar(db, "lucia fernandez", tipos=["paciente"])] == [nuevo.id]
+                assert [r.nombre for r in await buscador.buscar(db, "ortopedia", tipos=["especialidad"])] == ["Ortopedia"]
+                assert buscador.indice is cargado  # sin recargar el índice entero
+
+                await paciente_repo.delete(db, id=nuevo.id)
+                assert await buscador.buscar(db, "lucia fernandez", tipos=["paciente"]) == []
+        finally:
+            buscador.desuscribir()
@@ -0,0 +1,113 @@
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.core.cache_http import cache_http, coincide_etag
+from app.models.entities import Clinica, Especialidad, Profesional, ProfesionalEspecialidad
+from app.repositories.repositories import especialidad_repo, profesional_repo
+from app.schemas.responses import EspecialidadUpdate, ProfesionalCreate
+from main import app
+
+pytestmark = pytest.mark.asyncio
+
+HACE_TIEMPO = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest_asyncio.fixture
+async def catalogo():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        # Fechas viejas explícitas: SQLite guarda CURRENT_TIMESTAMP con resolución de segundos
+        db.add_all([
+            Especialidad(nombre="Cardiología", fecha_creacion=HACE_TIEMPO),
+            Especialidad(nombre="Pediatría", fecha_creacion=HACE_TIEMPO),
+            Clinica(nombre="Norte", did_whatsapp="1", configuraciones={"duracion_turno": 30}, fecha_creacion=HACE_TIEMPO),
+        ])
+        await db.commit()
+        await profesional_repo.create(db, obj_in=ProfesionalCreate(nombre="Dra. López", especialidades=["Pediatría"]))
+    cache_http.limpiar()
+    cache_http.suscribir()
+    yield
+    cache_http.desuscribir()
+    cache_http.limpiar()
+    async with engine.begin() as conn:
+        for modelo in (ProfesionalEspecialidad, Profesional, Especialidad, Clinica):
+            await conn.execute(delete(modelo))
+
+
+async def obtener(ruta, etag=None, **params):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(ruta, params=params, headers={"If-None-Match": etag} if etag else {})
+
+
+class TestCatalogo:
+    """Tests para los endpoints de catálogo con ETag y caché de respuestas"""
+
+    async def test_etag_y_304(self, catalogo):
+        primera = await obtener("/api/especialidades")
+        assert primera.status_code == 200
+        assert [e["nombre"] for e in primera.json()["items"]] == ["Cardiología", "Pediatría"]
+        etag = primera.headers["etag"]
+
+        segunda = await obtener("/api/especialidades", etag=etag)
+        assert segunda.status_code == 304 and segunda.content == b""
+        assert segunda.headers["etag"] == etag
+        assert cache_http.estadisticas.aciertos == 1 and cache_http.estadisticas.no_modificados == 1
+
+        # Sin caché del servidor (otro proceso), el ETag se recalcula igual desde la base
+        cache_http.limpiar()
+        assert (await obtener("/api/especialidades", etag=etag)).status_code == 304
+
+    async def test_escritura_invalida(self, catalogo):
+        etag = (await obtener("/api/especialidades")).headers["etag"]
+        async with AsyncSessionLocal() as db:
+            especialidad = await especialidad_repo.get_by_nombre(db, nombre="Cardiología")
+            await especialidad_repo.update(db, db_obj=especialidad, obj_in=EspecialidadUpdate(descripcion="Corazón"))
+        assert cache_http.estadisticas.invalidaciones == 1
+
+        respuesta = await obtener("/api/especialidades", etag=etag)
+        assert respuesta.status_code == 200
+        assert respuesta.headers["etag"] != etag
+        assert respuesta.json()["items"][0]["descripcion"] == "Corazón"
+
+    async def test_borrado_cambia_la_version(self, catalogo):
+        etag = (await obtener("/api/especialidades")).headers["etag"]
+        async with engine.begin() as conn:
+            # Por fuera de los repositorios: la caché no se entera, el ETag sí
+            await conn.execute(delete(Especialidad).where(Especialidad.nombre == "Pediatría"))
+        cache_http.limpiar()
+        respuesta = await obtener("/api/especialidades", etag=etag)
+        assert respuesta.status_code == 200 and respuesta.json()["total"] == 1
+
+    async def test_detalle_y_filtros(self, catalogo):
+        async with AsyncSessionLocal() as db:
+            pediatria = await especialidad_repo.get_by_nombre(db, nombre="Pediatría")
+            cardiologia = await especialidad_repo.get_by_nombre(db, nombre="Cardiología")
+
+        profesionales = await obtener("/api/profesionales", id_especialidad=pediatria.id)
+        assert [p["nombre"] for p in profesionales.json()["items"]] == ["Dra. López"]
+        assert (await obtener("/api/profesionales", id_especialidad=cardiologia.id)).json()["items"] == []
+
+        # El listado por especialidad depende también de especialidades; el general no
+        await obtener("/api/profesionales")
+        async with AsyncSessionLocal() as db:
+            await especialidad_repo.update(db, db_obj=cardiologia, obj_in=EspecialidadUpdate(descripcion="Corazón"))
+        assert cache_http.estadisticas.invalidaciones == 2
+
+        clinicas = (await obtener("/api/clinicas", activa=True)).json()["items"]
+        detalle = await obtener(f"/api/clinicas/{clinicas[0]['id']}")
+        assert detalle.json()["configuraciones"] == {"duracion_turno": 30}
+        assert (await obtener(f"/api/clinicas/{clinicas[0]['id']}", etag=detalle.headers["etag"])).status_code == 304
+        assert (await obtener("/api/clinicas/999")).status_code == 404
+
+    async def test_if_none_match(self):
+        assert coincide_etag('W/"abc", "def"', '"abc"')
+        assert coincide_etag("*", '"abc"')
+        assert not coincide_etag('"abd"', '"abc"')
+        assert not coincide_etag(None, '"abc"')
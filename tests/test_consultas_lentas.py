@@ -0,0 +1,95 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.core.consultas_lentas import (
+    RegistroConsultasLentas, leer_registros, normalizar_parametros, normalizar_sql, opciones_explain, resumir
+)
+from app.models.entities import Clinica
+from app.repositories.repositories import clinica_repo
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def clinicas():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add_all([Clinica(nombre=f"Clínica {i}", did_whatsapp=f"54938100{i}") for i in range(3)])
+        await db.commit()
+    yield
+    async with engine.begin() as conn:
+        await conn.execute(delete(Clinica))
+
+
+@pytest.fixture
+def registro(tmp_path):
+    registro = RegistroConsultasLentas(umbral_ms=0, muestreo_explain=1.0, archivo=str(tmp_path / "lentas.jsonl"))
+    registro.instalar(engine)
+    yield registro
+    registro.desinstalar()
+
+
+class TestNormalizacion:
+    """Tests para la normalización de SQL y parámetros"""
+
+    async def test_colapsa_listas_y_espacios(self):
+        sql = "SELECT *\n  FROM turnos WHERE id IN ($1, $2, $3) AND estado = $4"
+        assert normalizar_sql(sql) == "SELECT * FROM turnos WHERE id IN (...) AND estado = $4"
+        assert normalizar_sql("SELECT 1 WHERE a IN (?, ?)") == normalizar_sql("SELECT 1 WHERE a IN (?, ?, ?, ?)")
+
+    async def test_parametros_acotados(self):
+        normalizados = normalizar_parametros(("x" * 100, 5, [1, 2, 3], None))
+        assert normalizados[0].startswith("x" * 32) and normalizados[0].endswith("(100)")
+        assert normalizados[1:] == [5, {"tipo": "list", "largo": 3}, None]
+        assert normalizar_parametros([(1,), (2,)]) == {"filas": 2, "primera": [1]}
+
+    async def test_explain_sin_analyze_si_bloquea_o_escribe(self):
+        con_analyze = "ANALYZE, BUFFERS, FORMAT JSON"
+        assert opciones_explain("SELECT * FROM turnos WHERE id = $1") == con_analyze
+        assert opciones_explain("WITH t AS (SELECT id FROM turnos) SELECT * FROM t") == con_analyze
+        assert opciones_explain("SELECT * FROM turnos WHERE id = $1 FOR UPDATE") == "FORMAT JSON"
+        assert opciones_explain("SELECT * FROM turnos FOR NO KEY UPDATE SKIP LOCKED") == "FORMAT JSON"
+        assert opciones_explain("select * from turnos for share of turnos nowait") == "FORMAT JSON"
+        assert opciones_explain("SELECT * FROM turnos FOR KEY SHARE") == "FORMAT JSON"
+        assert opciones_explain("WITH b AS (DELETE FROM turnos RETURNING id) SELECT count(*) FROM b") == "FORMAT JSON"
+
+
+class TestRegistroConsultasLentas:
+    """Tests para el registro de consultas lentas sobre el engine"""
+
+    async def test_registra_consulta_con_origen(self, clinicas, registro):
+        async with AsyncSessionLocal() as db:
+            await clinica_repo.get_multi(db, filters={"activa": True}, limit=10)
+        await registro.esperar_planes()
+
+        consultas = [r for r in leer_registros(registro.archivo) if r["tipo"] == "consulta"]
+        select = next(r for r in consultas if r["sql"].startswith("SELECT") and "FROM clinicas" in r["sql"])
+        assert select["repositorio"] == "ClinicaRepository.get_multi"
+        assert select["duracion_ms"] >= 0
+        assert 10 in select["parametros"]
+        # Sin PostgreSQL no hay EXPLAIN
+        assert not any(r["tipo"] == "plan" for r in leer_registros(registro.archivo))
+
+    async def test_umbral_y_desinstalar(self, clinicas, tmp_path):
+        registro = RegistroConsultasLentas(umbral_ms=10_000, archivo=str(tmp_path / "nada.jsonl"))
+        registro.instalar(engine)
+        async with AsyncSessionLocal() as db:
+            await clinica_repo.get_multi(db)
+        registro.desinstalar()
+        assert registro.registradas == 0
+
+    async def test_rotacion_y_resumen(self, clinicas, tmp_path):
+        registro = RegistroConsultasLentas(umbral_ms=0, archivo=str(tmp_path / "rota.jsonl"), max_bytes=2000, copias=3)
+        registro.instalar(engine)
+        async with AsyncSessionLocal() as db:
+            for _ in range(20):
+                await clinica_repo.get_by_whatsapp_did(db, did_whatsapp="549381000")
+        registro.desinstalar()
+
+        assert (tmp_path / "rota.jsonl.1").exists()
+        resumen = resumir(leer_registros(registro.archivo))
+        assert resumen[0]["origenes"] == ["ClinicaRepository.get_by_whatsapp_did"]
+        assert 1 < resumen[0]["cantidad"] <= 20
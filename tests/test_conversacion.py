@@ -0,0 +1,160 @@
+import json
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.core.eventos import EventoCambio, bus_cambios
+from app.models.entities import Clinica, Especialidad
+from app.service.conversacion import (
+    BUSCAR_HORARIOS, BUSCAR_PACIENTE, CONFIRMAR, DERIVADO, ESPECIALIDAD, FIN, HORARIO, IDENTIFICAR, RESERVAR,
+    Entrada, EstadoConversacion, FlujosClinicas, compilar_flujo, conversar
+)
+
+pytestmark = pytest.mark.asyncio
+
+HORARIOS = [
+    {"inicio": "2024-03-04T09:00:00", "id_profesional": 3, "profesional": "Dra. Ana López"},
+    {"inicio": "2024-03-05T10:30:00", "id_profesional": 4, "profesional": "Dr. Juan Díaz"},
+]
+
+
+@pytest.fixture
+def flujo():
+    configuraciones = {"duracion_turno": 30, "flujo": {"alias_especialidades": {"cardio": "Cardiología"}}}
+    return compilar_flujo(1, "Clínica Norte", configuraciones, ["Pediatría", "Cardiología"])
+
+
+def ejecutor(pacientes=None, horarios=HORARIOS, reservas=True):
+    efectos = []
+
+    async def ejecutar(efecto):
+        efectos.append(efecto)
+        if efecto.nombre == BUSCAR_PACIENTE:
+            return (pacientes or {"30111222": 7}).get(efecto.datos["dni"])
+        if efecto.nombre == BUSCAR_HORARIOS:
+            return horarios
+        return reservas
+
+    ejecutar.efectos = efectos
+    return ejecutar
+
+
+async def charlar(flujo, textos, ejecutar, estado=None):
+    estado = estado or EstadoConversacion()
+    respuestas = []
+    for texto in textos:
+        estado, nuevas = await conversar(flujo, estado, texto, ejecutar)
+        respuestas.append(nuevas)
+    return estado, respuestas
+
+
+class TestFlujoReserva:
+    """Tests para el flujo de reserva de turnos"""
+
+    async def test_reserva_completa(self, flujo):
+        ejecutar = ejecutor()
+        estado, respuestas = await charlar(flujo, ["hola", "30.111.222", "cardio", "2", "Sí"], ejecutar)
+
+        assert estado.nodo == FIN
+        assert "Clínica Norte" in respuestas[0][0]
+        assert "1. Cardiología\n2. Pediatría" in respuestas[1][0]
+        assert "mar 05/03 10:30 - Dr. Juan Díaz" in respuestas[2][0]
+        assert "mar 05/03 10:30" in respuestas[4][0]
+        assert [e.nombre for e in ejecutar.efectos] == [BUSCAR_PACIENTE, BUSCAR_HORARIOS, RESERVAR]
+        assert ejecutar.efectos[-1].datos == {"id_paciente": 7, "id_profesional": 4, "inicio": "2024-03-05T10:30:00"}
+
+    async def test_transiciones_puras(self, flujo):
+        estado = EstadoConversacion(ESPECIALIDAD, datos={"p": 7})
+        paso = flujo.paso(estado, Entrada(texto="2"))
+        # No modifica el estado recibido; pide el efecto en vez de consultar
+        assert estado.datos == {"p": 7} and estado.pendiente is None
+        assert paso.efecto.nombre == BUSCAR_HORARIOS and paso.efecto.datos["especialidad"] == "Pediatría"
+
+        paso = flujo.paso(paso.estado, Entrada(resultado=[]))
+        assert paso.estado.nodo == ESPECIALIDAD and "No hay horarios" in paso.respuestas[0]
+
+    async def test_reintentos_cancelacion_y_reserva_fallida(self, flujo):
+        estado, respuestas = await charlar(flujo, ["hola", "abc", "99999999"], ejecutor())
+        assert estado.nodo == IDENTIFICAR and estado.intentos == 2
+        assert "99999999" in respuestas[2][0]
+        estado, respuestas = await charlar(flujo, ["123"], ejecutor(), estado)
+        assert estado.nodo == DERIVADO
+
+        estado, respuestas = await charlar(flujo, ["Cancelar"], ejecutor(), estado)
+        assert estado == EstadoConversacion()
+
+        ejecutar = ejecutor(reservas=False)
+        estado, respuestas = await charlar(flujo, ["hola", "30111222", "pediatria", "1", "si"], ejecutar)
+        assert estado.nodo == HORARIO
+        assert respuestas[-1][0] == flujo.mensajes["no_reservado"]
+        assert [e.nombre for e in ejecutar.efectos][-2:] == [RESERVAR, BUSCAR_HORARIOS]
+
+    async def test_configuracion_de_la_clinica(self):
+        sin_turnos = compilar_flujo(2, "Sur", {"turnos_online": False}, ["Pediatría"])
+        estado, respuestas = await charlar(sin_turnos, ["hola"], ejecutor())
+        assert estado.nodo == DERIVADO and "no da turnos" in respuestas[0][-1]
+        assert HORARIO not in sin_turnos.manejadores
+
+        sin_dni = compilar_flujo(3, "Este", {"flujo": {"identificar_paciente": False, "mensajes": {"saludo": "Buenas, {clinica}"}}}, ["Pediatría"])
+        estado, respuestas = await charlar(sin_dni, ["hola"], ejecutor())
+        assert estado.nodo == ESPECIALIDAD and respuestas[0][0] == "Buenas, Este"
+
+
+class TestSnapshots:
+    """Tests para el estado guardado en la sesión"""
+
+    async def test_snapshot_compacto(self, flujo):
+        estado, _ = await charlar(flujo, ["hola", "30111222", "cardio", "1"], ejecutor())
+        assert estado.nodo == CONFIRMAR
+        snapshot = json.loads(json.dumps(estado.a_snapshot(flujo.huella)))
+        assert len(json.dumps(snapshot, separators=(",", ":"))) < 300
+
+        restaurado = EstadoConversacion.desde_snapshot(snapshot, flujo)
+        assert restaurado == estado
+        estado, respuestas = await charlar(flujo, ["si"], ejecutor(), restaurado)
+        assert estado.nodo == FIN
+
+    async def test_snapshot_de_otro_flujo(self, flujo):
+        sin_dni = compilar_flujo(1, "Clínica Norte", {"turnos_online": False}, ["Pediatría"])
+        snapshot = EstadoConversacion(IDENTIFICAR, 1).a_snapshot(flujo.huella)
+        assert EstadoConversacion.desde_snapshot(snapshot, sin_dni) == EstadoConversacion()
+        assert EstadoConversacion.desde_snapshot(snapshot, flujo).intentos == 1
+
+
+@pytest_asyncio.fixture
+async def clinica():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        clinica = Clinica(nombre="Norte", did_whatsapp="549381000", configuraciones={"turnos_online": True})
+        db.add_all([clinica, Especialidad(nombre="Cardiología")])
+        await db.commit()
+    yield clinica
+    async with engine.begin() as conn:
+        await conn.execute(delete(Especialidad))
+        await conn.execute(delete(Clinica))
+
+
+class TestFlujosClinicas:
+    """Tests para la compilación y recompilación de flujos por clínica"""
+
+    async def test_compila_una_vez_y_recompila_con_eventos(self, clinica):
+        flujos = FlujosClinicas().suscribir().suscribir()
+        try:
+            async with AsyncSessionLocal() as db:
+                flujo = await flujos.obtener(db, clinica.id)
+                assert await flujos.obtener(db, clinica.id) is flujo
+                assert await flujos.obtener(db, 999) is None
+                assert flujo.especialidades["cardiologia"] == "Cardiología"
+
+                bus_cambios.publicar(EventoCambio("clinicas", "update", (clinica.id + 1,)))
+                assert await flujos.obtener(db, clinica.id) is flujo
+                bus_cambios.publicar(EventoCambio("especialidades", "create", (5,)))
+                assert await flujos.obtener(db, clinica.id) is not flujo
+            assert flujos.compilaciones == 2
+        finally:
+            flujos.desuscribir()
+        bus_cambios.publicar(EventoCambio("clinicas", "update", (clinica.id,)))
+        assert flujos._flujos
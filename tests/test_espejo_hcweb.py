@@ -0,0 +1,137 @@
+import os
+from dotenv import load_dotenv
+
+# Sin DATABASE_PG_URL configurada, los tests corren sobre SQLite en memoria
+load_dotenv()
+os.environ.setdefault("DATABASE_PG_URL", "sqlite+aiosqlite:///:memory:")
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.core.eventos import bus_cambios
+from app.models.entities import ReferenciaHcweb, SincronizacionHcweb
+from app.repositories.repositories import sincronizacion_hcweb_repo
+from app.service.espejo_hcweb import ERROR, OK, SIN_CAMBIOS, DatasetHcweb, EspejoHcweb
+from app.service.WsHcweb import RegistroClientesHcweb, Upstream
+from tests.servidor_soap import ServidorSoapFalso
+
+pytestmark = pytest.mark.asyncio
+
+PROFESIONALES = [{"id": i, "nombre": f"Dr. {i}", "especialidades": [i % 3]} for i in range(1, 6)]
+COBERTURAS = [{"codigo": "OSEP", "planes": ["210", "310"]}, {"codigo": "PAMI", "planes": []}]
+
+
+@pytest_asyncio.fixture
+async def upstream():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    datos = {"ObtenerProfesionales": list(PROFESIONALES), "ObtenerCoberturas": list(COBERTURAS)}
+    with ServidorSoapFalso({metodo: (lambda body, m=metodo: datos[m]) for metodo in datos}) as servidor:
+        clientes = RegistroClientesHcweb({"hcweb": Upstream(servidor.url, concurrencia=4, conexiones=4)})
+        espejo = EspejoHcweb(
+            [DatasetHcweb("profesionales", "ObtenerProfesionales"), DatasetHcweb("coberturas", "ObtenerCoberturas", clave="codigo")],
+            clientes=clientes, plazo=5,
+        )
+        yield espejo, servidor, datos
+        await clientes.cerrar()
+    async with engine.begin() as conn:
+        await conn.execute(delete(ReferenciaHcweb))
+        await conn.execute(delete(SincronizacionHcweb))
+
+
+class TestEspejoHcweb:
+    """Tests para el espejo local de datos de referencia de HCWEB"""
+
+    async def test_primera_sincronizacion_y_lectura_local(self, upstream):
+        espejo, servidor, _ = upstream
+        resultados = {r.dataset: r for r in await espejo.sincronizar()}
+        assert servidor.llamadas == {"ObtenerProfesionales": 1, "ObtenerCoberturas": 1}
+        assert resultados["profesionales"].estado == OK and resultados["profesionales"].insertados == 5
+        assert resultados["coberturas"].insertados == 2
+
+        async with AsyncSessionLocal() as db:
+            assert await espejo.registros(db, "profesionales") == PROFESIONALES
+            assert await espejo.registro(db, "coberturas", "OSEP") == COBERTURAS[0]
+            assert await espejo.registro(db, "profesionales", 3) == PROFESIONALES[2]
+            assert await espejo.registro(db, "profesionales", 99) is None
+            estado = {fila["dataset"]: fila for fila in await espejo.estado(db)}
+        assert estado["profesionales"]["estado"] == OK and estado["profesionales"]["registros"] == 5
+        assert estado["profesionales"]["ultimo_exito"] is not None and estado["profesionales"]["error"] is None
+
+    async def test_sin_cambios_no_escribe_y_delta_por_hash(self, upstream):
+        espejo, _, datos = upstream
+        await espejo.sincronizar()
+        eventos = []
+        desuscribir = bus_cambios.suscribir(eventos.append)
+        try:
+            resultado, = await espejo.sincronizar(["profesionales"])
+            assert resultado.estado == SIN_CAMBIOS and resultado.registros == 5
+            assert (resultado.insertados, resultado.actualizados, resultado.eliminados) == (0, 0, 0)
+            assert eventos == []
+
+            # Uno modificado (con las claves en otro orden), uno que ya no viene y uno nuevo
+            datos["ObtenerProfesionales"] = [
+                {"especialidades": [9], "nombre": "Dr. 1", "id": 1}, *PROFESIONALES[1:3], PROFESIONALES[4],
+                {"id": 6, "nombre": "Dr. 6", "especialidades": []},
+            ]
+            resultado, = await espejo.sincronizar(["profesionales"])
+        finally:
+            desuscribir()
+        assert resultado.estado == OK and resultado.registros == 5
+        assert (resultado.insertados, resultado.actualizados, resultado.eliminados) == (1, 1, 1)
+        assert [(e.entidad, e.operacion, e.ids) for e in eventos] == [("referencias_hcweb", "sincronizacion", ("profesionales",))]
+
+        async with AsyncSessionLocal() as db:
+            registros = await espejo.registros(db, "profesionales")
+        assert [r["id"] for r in registros] == [1, 2, 3, 5, 6]
+        assert registros[0]["especialidades"] == [9]
+
+    async def test_error_del_upstream_conserva_los_datos(self, upstream):
+        espejo, servidor, _ = upstream
+        await espejo.sincronizar()
+        servidor.errores["ObtenerProfesionales"] = "Servicio no disponible"
+        resultados = {r.dataset: r for r in await espejo.sincronizar()}
+        assert resultados["profesionales"].estado == ERROR
+        assert "Servicio no disponible" in resultados["profesionales"].error
+        assert resultados["coberturas"].estado == SIN_CAMBIOS
+
+        async with AsyncSessionLocal() as db:
+            assert len(await espejo.registros(db, "profesionales")) == 5
+            fila = await sincronizacion_hcweb_repo.get_by_field(db, field="dataset", value="profesionales")
+            assert fila.estado == ERROR and fila.registros == 5 and fila.ultimo_exito < fila.ultimo_intento
+
+        # Al volver el upstream, el hash es el mismo de antes: no hay nada que escribir
+        del servidor.errores["ObtenerProfesionales"]
+        resultado, = await espejo.sincronizar(["profesionales"])
+        assert resultado.estado == SIN_CAMBIOS
+
+    async def test_respuesta_vacia_no_borra_el_dataset(self, upstream):
+        espejo, _, datos = upstream
+        await espejo.sincronizar()
+        datos["ObtenerProfesionales"] = []
+        resultado, = await espejo.sincronizar(["profesionales"])
+        assert resultado.estado == ERROR and "vacía" in resultado.error
+
+        async with AsyncSessionLocal() as db:
+            assert len(await espejo.registros(db, "profesionales")) == 5
+            fila = await sincronizacion_hcweb_repo.get_by_field(db, field="dataset", value="profesionales")
+            assert fila.estado == ERROR and fila.registros == 5
+
+        # Con permitir_vacio la lista vacía es un dato válido
+        espejo.datasets["profesionales"] = DatasetHcweb("profesionales", "ObtenerProfesionales", permitir_vacio=True)
+        resultado, = await espejo.sincronizar(["profesionales"])
+        assert resultado.estado == OK and resultado.eliminados == 5
+        async with AsyncSessionLocal() as db:
+            assert await espejo.registros(db, "profesionales") == []
+
+    async def test_upstream_desconocido_no_frena_a_los_demas(self, upstream):
+        espejo, _, _ = upstream
+        espejo.datasets["turnos"] = DatasetHcweb("turnos", "ObtenerTurnos", upstream="inexistente")
+        resultados = {r.dataset: r for r in await espejo.sincronizar()}
+        assert resultados["profesionales"].estado == OK and resultados["coberturas"].estado == OK
+        assert resultados["turnos"].estado == ERROR and "inexistente" in resultados["turnos"].error
+
+        async with AsyncSessionLocal() as db:
+            fila = await sincronizacion_hcweb_repo.get_by_field(db, field="dataset", value="turnos")
+        assert fila.estado == ERROR and fila.ultimo_exito is None
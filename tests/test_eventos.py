@@ -0,0 +1,131 @@
+import asyncio
+import os
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.core.cache_http import CacheHttp
+from app.core.eventos import BusCambios, EventoCambio, PuenteCambios, bus_cambios
+from app.models.entities import Clinica, Especialidad
+from app.repositories.repositories import clinica_repo, especialidad_repo
+from app.schemas.responses import ClinicaCreate, EspecialidadCreate, EspecialidadUpdate
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def base():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with engine.begin() as conn:
+        await conn.execute(delete(Especialidad))
+        await conn.execute(delete(Clinica))
+
+
+@pytest.fixture
+def eventos():
+    recibidos = []
+    baja = bus_cambios.suscribir(recibidos.append, entidades=["especialidades"])
+    yield recibidos
+    baja()
+
+
+class PuenteMemoria(PuenteCambios):
+    """Puente que guarda los mensajes enviados en vez de usar Redis o PostgreSQL"""
+
+    def __init__(self, bus):
+        super().__init__(bus=bus, canal="prueba")
+        self.enviados = []
+
+    async def _publicar(self, mensaje):
+        self.enviados.append(mensaje)
+
+    async def _escuchar(self):
+        await asyncio.Event().wait()
+
+
+class TestBusCambios:
+    """Tests para los eventos que publican los repositorios después del commit"""
+
+    async def test_eventos_de_mutaciones(self, base, eventos):
+        async with AsyncSessionLocal() as db:
+            especialidad = await especialidad_repo.create(db, obj_in=EspecialidadCreate(nombre="Cardiología"))
+            await especialidad_repo.update(db, db_obj=especialidad, obj_in=EspecialidadUpdate(descripcion="Corazón"))
+            await clinica_repo.bulk_create(db, objs_in=[ClinicaCreate(nombre="Norte", did_whatsapp="1")])
+            await especialidad_repo.delete(db, id=especialidad.id)
+
+        # Sólo las especialidades: la suscripción filtra por entidad
+        assert [(e.operacion, e.ids) for e in eventos] == [
+            ("create", (especialidad.id,)), ("update", (especialidad.id,)), ("delete", (especialidad.id,))
+        ]
+        assert {e.entidad for e in eventos} == {"especialidades"}
+
+    async def test_invalidacion_por_id(self):
+        bus = BusCambios()
+        cache = CacheHttp(ttl=60)
+        bus.suscribir(cache.al_cambiar)
+        cache.guardar(("clinicas", 1), '"a"', b"{}", ["clinicas"], ids=[1])
+        cache.guardar(("clinicas", 2), '"b"', b"{}", ["clinicas"], ids=[2])
+        cache.guardar(("clinicas", None, 1, 100), '"c"', b"[]", ["clinicas"])
+
+        # Los ids pueden llegar como texto desde otro proceso
+        bus.publicar(EventoCambio("clinicas", "update", ("1",)))
+        assert cache.obtener(("clinicas", 1)) is None
+        assert cache.obtener(("clinicas", 2)) is not None
+        assert cache.obtener(("clinicas", None, 1, 100)) is None
+
+        bus.publicar(EventoCambio("profesionales", "update", (2,)))
+        assert cache.obtener(("clinicas", 2)) is not None
+        assert cache.estadisticas.invalidaciones == 2
+
+
+class TestPuenteCambios:
+    """Tests para el reenvío de eventos entre procesos"""
+
+    async def test_reenvia_propios_y_publica_ajenos(self):
+        bus = BusCambios()
+        recibidos = []
+        bus.suscribir(recibidos.append)
+        puente = PuenteMemoria(bus)
+        await puente.iniciar()
+
+        bus.publicar(EventoCambio("turnos", "create", (5,)))
+        ajeno = EventoCambio("turnos", "delete", (6,), origen="otro-proceso")
+        puente.recibir(ajeno.a_mensaje())
+        # Un mensaje propio que vuelve por el canal no se publica dos veces
+        puente.recibir(EventoCambio("turnos", "update", (5,)).a_mensaje())
+        puente.recibir("no es json")
+        await puente.detener()
+
+        assert [EventoCambio.desde_mensaje(m).ids for m in puente.enviados] == [(5,)]
+        assert [(e.operacion, e.origen) for e in recibidos] == [("create", recibidos[0].origen), ("delete", "otro-proceso")]
+        assert (bus.publicados, bus.recibidos) == (1, 1)
+        assert bus.puente is None
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requiere fork")
+    @pytest.mark.filterwarnings("ignore:This process .* is multi-threaded")
+    async def test_workers_de_un_fork_tienen_origen_propio(self):
+        """Con gunicorn --preload los workers son forks del proceso que importó el módulo"""
+        lectura, escritura = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.write(escritura, EventoCambio("turnos", "update", (9,)).a_mensaje().encode())
+            os._exit(0)
+        os.close(escritura)
+        mensaje = os.read(lectura, 4096).decode()
+        os.close(lectura)
+        os.waitpid(pid, 0)
+
+        bus = BusCambios()
+        recibidos = []
+        bus.suscribir(recibidos.append)
+        puente = PuenteMemoria(bus)
+        await puente.iniciar()
+        puente.recibir(mensaje)  # evento de un worker hermano
+        await puente.detener()
+        assert [e.ids for e in recibidos] == [(9,)]
+        assert recibidos[0].origen.startswith(f"{pid}-")
+
@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.models.entities import Clinica, Paciente, Profesional, Turno
+from main import app
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def agenda():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        norte, sur = Clinica(nombre="Norte", did_whatsapp="1"), Clinica(nombre="Sur", did_whatsapp="2")
+        profesional = Profesional(nombre="Dra. López")
+        pacientes = [Paciente(dni=str(i), telefono=str(i), nombre=f"Paciente, {i}") for i in range(3)]
+        db.add_all([norte, sur, profesional, *pacientes])
+        await db.flush()
+        for dia in range(1, 6):
+            db.add(Turno(
+                id_paciente=pacientes[dia % 2].id, id_profesional=profesional.id, id_clinica=norte.id,
+                fecha_hora=datetime(2024, 3, dia, 9, tzinfo=timezone.utc), observaciones="con \"comillas\"" if dia == 1 else None,
+            ))
+        db.add(Turno(id_paciente=pacientes[2].id, id_profesional=profesional.id, id_clinica=sur.id,
+                     fecha_hora=datetime(2024, 3, 2, 9, tzinfo=timezone.utc)))
+        await db.commit()
+        datos = {"norte": norte.id, "sur": sur.id, "pacientes": [p.id for p in pacientes]}
+    yield datos
+    async with engine.begin() as conn:
+        for modelo in (Turno, Paciente, Profesional, Clinica):
+            await conn.execute(delete(modelo))
+
+
+async def obtener(ruta, **params):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(ruta, params=params)
+
+
+class TestExportacion:
+    """Tests para las exportaciones en streaming"""
+
+    async def test_turnos_csv_por_clinica_y_rango(self, agenda, monkeypatch):
+        monkeypatch.setattr("app.routers.exportacion.LOTE_EXPORTACION", 2)
+        respuesta = await obtener(
+            "/api/exportar/turnos", id_clinica=agenda["norte"],
+            desde="2024-03-02T00:00:00+00:00", hasta="2024-03-05T00:00:00+00:00",
+        )
+        assert respuesta.status_code == 200
+        assert respuesta.headers["content-type"].startswith("text/csv")
+        assert 'filename="turnos_clinica_' in respuesta.headers["content-disposition"]
+        filas = list(csv.DictReader(io.StringIO(respuesta.text)))
+        assert [f["fecha_hora"][:10] for f in filas] == ["2024-03-02", "2024-03-03", "2024-03-04"]
+        assert {f["id_clinica"] for f in filas} == {str(agenda["norte"])}
+        assert filas[0]["observaciones"] == ""
+
+    async def test_turnos_jsonl(self, agenda):
+        respuesta = await obtener("/api/exportar/turnos", formato="jsonl", id_clinica=agenda["norte"])
+        filas = [json.loads(linea) for linea in respuesta.text.splitlines()]
+        assert respuesta.headers["content-type"] == "application/x-ndjson"
+        assert len(filas) == 5
+        assert filas[0]["observaciones"] == 'con "comillas"'
+        assert filas[0]["estado"] == "programado"
+
+    async def test_pacientes_con_turnos_en_la_clinica(self, agenda):
+        respuesta = await obtener("/api/exportar/pacientes", id_clinica=agenda["sur"])
+        filas = list(csv.DictReader(io.StringIO(respuesta.text)))
+        assert [f["id"] for f in filas] == [str(agenda["pacientes"][2])]
+        assert filas[0]["nombre"] == "Paciente, 2"
+
+        vacia = await obtener("/api/exportar/pacientes", id_clinica=999)
+        assert vacia.text.strip() == "id,dni,telefono,nombre,email,fecha_registro"
+
+    async def test_parametros_invalidos(self):
+        assert (await obtener("/api/exportar/turnos", formato="xlsx")).status_code == 400
+        respuesta = await obtener("/api/exportar/pacientes", desde="2024-03-02", hasta="2024-03-01")
+        assert respuesta.status_code == 400
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+
+from app.service.WsHcweb import ErrorHcweb, RegistroClientesHcweb, Upstream, WsHcweb
+from tests.servidor_soap import ServidorSoapFalso
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestWsHcweb:
+    """Tests para el cliente SOAP con pool y límite de concurrencia"""
+
+    async def test_llamar_y_limite_de_concurrencia(self):
+        with ServidorSoapFalso({"ObtenerTurnos": lambda body: [{"dni": body.split("<dni>")[1].split("<")[0]}]}, demora=0.02) as servidor:
+            abiertos, cerrados = [], []
+
+            async def al_cerrar(cliente):
+                cerrados.append(cliente.nombre)
+
+            cliente = WsHcweb(servidor.url, concurrencia=3, conexiones=3, al_abrir=[lambda c: abiertos.append(c.nombre)], al_cerrar=[al_cerrar])
+            resultados = await asyncio.gather(*(cliente.llamar("ObtenerTurnos", {"dni": str(i)}) for i in range(20)))
+            assert [r[0]["dni"] for r in resultados] == [str(i) for i in range(20)]
+            assert servidor.max_en_curso <= 3 and servidor.conexiones <= 3
+            assert cliente.en_curso == 0 and cliente.llamadas == 20
+
+            with pytest.raises(ErrorHcweb):
+                await cliente.llamar("Inexistente", {})
+            # La versión sincrónica sigue disponible para código que corre en hilos
+            assert await asyncio.to_thread(cliente.call_method, "ObtenerTurnos", {"dni": "7"}) == [{"dni": "7"}]
+            await cliente.cerrar()
+            assert abiertos == ["hcweb"] and cerrados == ["hcweb"]
+
+    async def test_lote_con_plazo_y_errores_por_llamada(self):
+        metodos = {"ObtenerCobertura": lambda body: {"plan": "210"}, "ObtenerProfesionales": lambda body: [1, 2],
+                   "ObtenerTurnos": lambda body: [], "Lento": lambda body: "tarde"}
+        with ServidorSoapFalso(metodos, demora=0.05, demoras={"Lento": 1.0}, errores={"ObtenerTurnos": "Sin turnos"}) as servidor:
+            cliente = WsHcweb(servidor.url)
+            inicio = time.perf_counter()
+            resultados = await cliente.llamar_lote([
+                ("ObtenerCobertura", {"dni": "1"}), ("ObtenerProfesionales", {"idEspecialidad": 3}),
+                ("ObtenerTurnos", {"dni": "1"}), ("Inexistente", {}), ("Lento", {}),
+            ], plazo=0.3)
+            duracion = time.perf_counter() - inicio
+            await cliente.cerrar()
+
+        assert 0.3 <= duracion < 0.6  # en paralelo y sin esperar al lento
+        assert [r.metodo for r in resultados] == ["ObtenerCobertura", "ObtenerProfesionales", "ObtenerTurnos", "Inexistente", "Lento"]
+        assert [r.valor for r in resultados[:2]] == [{"plan": "210"}, [1, 2]] and resultados[0].ok
+        assert [r.tipo_error for r in resultados] == [None, None, "upstream", "http", "plazo"]
+        assert "Sin turnos" in resultados[2].error
+        assert await WsHcweb("http://127.0.0.1:1/").llamar_lote([]) == []
+
+    async def test_cancelar_el_lote_cancela_sus_llamadas(self):
+        with ServidorSoapFalso({"Lento": lambda body: "tarde"}, demora=1.0) as servidor:
+            cliente = WsHcweb(servidor.url)
+            lote = asyncio.create_task(cliente.llamar_lote([("Lento", {}), ("Lento", {})], plazo=5))
+            await asyncio.sleep(0.1)
+            assert cliente.en_curso == 2
+            lote.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await lote
+            assert cliente.en_curso == 0 and cliente.llamadas == 2
+            await cliente.cerrar()
+
+    async def test_call_method_envuelve_errores_de_red(self):
+        with pytest.raises(ErrorHcweb, match="Error de red en hcweb.ObtenerTurnos"):
+            await asyncio.to_thread(WsHcweb("http://127.0.0.1:1/", timeout=1).call_method, "ObtenerTurnos", {})
+
+
+class TestRegistroClientesHcweb:
+    """Tests para el registro de clientes por upstream y event loop"""
+
+    async def test_un_cliente_por_upstream_y_loop(self):
+        registro = RegistroClientesHcweb({
+            "hcweb": Upstream("http://hcweb", concurrencia=5, conexiones=5),
+            "mercedario": Upstream("http://mercedario", concurrencia=2, conexiones=2),
+        })
+        hcweb = registro.obtener("hcweb")
+        assert registro.obtener("hcweb") is hcweb
+        mercedario = registro.obtener("mercedario")
+        assert mercedario is not hcweb and mercedario.concurrencia == 2
+
+        async def en_otro_loop():
+            return registro.obtener("hcweb")
+
+        otro = await asyncio.to_thread(asyncio.run, en_otro_loop())
+        assert otro is not hcweb and otro.url == hcweb.url
+
+        await registro.cerrar()
+        assert registro.obtener("hcweb") is not hcweb
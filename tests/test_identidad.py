@@ -0,0 +1,130 @@
+import os
+from dotenv import load_dotenv
+
+# Sin DATABASE_PG_URL configurada, los tests corren sobre SQLite en memoria
+load_dotenv()
+os.environ.setdefault("DATABASE_PG_URL", "sqlite+aiosqlite:///:memory:")
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.core.eventos import EventoCambio
+from app.models.entities import Paciente
+from app.repositories.repositories import paciente_repo
+from app.schemas.responses import PacienteCreate, PacienteUpdate
+from app.service.identidad import NO_REGISTRADO, CacheIdentidadMemoria, ResolutorIdentidad
+from app.utils.telefono import normalizar_telefono
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def resolutor():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    reloj = [0.0]
+    resolutor = ResolutorIdentidad(CacheIdentidadMemoria(reloj=lambda: reloj[0]), ttl_positivo=100, ttl_negativo=10)
+    resolutor.suscribir()
+    yield resolutor, reloj
+    resolutor.desuscribir()
+    async with engine.begin() as conn:
+        await conn.execute(delete(Paciente))
+
+
+class TestNormalizarTelefono:
+    """Tests para la normalización a E.164"""
+
+    @pytest.mark.parametrize("telefono", [
+        "5491123456789", "+54 9 11 2345-6789", "541123456789", "011 15 2345-6789",
+        "15 2345 6789", "2345-6789", "(011) 2345 6789", "91123456789",
+    ])
+    async def test_formatos_argentinos(self, telefono):
+        assert normalizar_telefono(telefono) == "+5491123456789"
+
+    async def test_interior_extranjeros_e_invalidos(self):
+        assert normalizar_telefono("(0351) 15-123-4567") == "+5493511234567"
+        assert normalizar_telefono("+54 9 351 15 123 4567") == "+5493511234567"
+        assert normalizar_telefono("+1 (415) 555-0100") == "+14155550100"
+        assert normalizar_telefono("0034 612 345 678") == "+34612345678"
+        assert normalizar_telefono("") is None and normalizar_telefono("123") is None
+
+
+class TestResolutorIdentidad:
+    """Tests para la resolución wa_id -> paciente con caché positiva y negativa"""
+
+    async def test_cache_positiva_y_negativa(self, resolutor):
+        resolutor, reloj = resolutor
+        async with AsyncSessionLocal() as db:
+            paciente = await paciente_repo.create(db, obj_in=PacienteCreate(
+                dni="30111222", telefono="011 15 2345-6789", nombre="Ana Pérez"
+            ))
+            assert paciente.telefono_e164 == "+5491123456789"
+            assert (await paciente_repo.get_by_telefono(db, telefono="5491123456789")).id == paciente.id
+
+            for _ in range(3):
+                assert await resolutor.resolver(db, "5491123456789") == paciente.id
+                assert await resolutor.resolver(db, "5491199999999") is None
+            assert resolutor.estadisticas.como_dict() == {
+                "aciertos": 2, "aciertos_negativos": 2, "consultas": 2, "invalidos": 0
+            }
+            reloj[0] = 11  # vence la negativa, no la positiva
+            await resolutor.resolver(db, "5491123456789")
+            await resolutor.resolver(db, "5491199999999")
+            assert resolutor.estadisticas.consultas == 3
+
+    async def test_invalidacion_por_cambios_de_pacientes(self, resolutor):
+        resolutor, _ = resolutor
+        async with AsyncSessionLocal() as db:
+            paciente = await paciente_repo.create(db, obj_in=PacienteCreate(
+                dni="30111222", telefono="1123456789", nombre="Ana Pérez"
+            ))
+            assert await resolutor.resolver(db, "5491123456789") == paciente.id
+            assert await resolutor.resolver(db, "5491187654321") is None
+
+            # Cambia de número: el anterior deja de resolver y el nuevo sale de la caché negativa
+            await paciente_repo.update(db, db_obj=paciente, obj_in=PacienteUpdate(telefono="+54 9 11 8765-4321"))
+            assert await resolutor.resolver(db, "5491187654321") == paciente.id
+            assert await resolutor.resolver(db, "5491123456789") is None
+
+            # Un paciente nuevo con un número que estaba en la caché negativa
+            otro = await paciente_repo.create(db, obj_in=PacienteCreate(
+                dni="30999888", telefono="15 2345-6789", nombre="Luis Díaz"
+            ))
+            assert await resolutor.resolver(db, "5491123456789") == otro.id
+
+            await paciente_repo.delete(db, id=otro.id)
+            assert await resolutor.resolver(db, "5491123456789") is None
+
+    async def test_bulk_create_normaliza_telefonos(self, resolutor):
+        resolutor, _ = resolutor
+        async with AsyncSessionLocal() as db:
+            pacientes = await paciente_repo.bulk_create(db, objs_in=[
+                PacienteCreate(dni="30111222", telefono="011 15 5555-1234", nombre="Ana Pérez"),
+                PacienteCreate(dni="30999888", telefono="+54 9 351 444-5566", nombre="Luis Díaz"),
+            ])
+            assert [p.telefono_e164 for p in pacientes] == ["+5491155551234", "+5493514445566"]
+            assert (await paciente_repo.get_by_telefono(db, telefono="+5491155551234")).id == pacientes[0].id
+            assert await resolutor.resolver(db, "5493514445566") == pacientes[1].id
+
+    async def test_cache_acotada_y_pendientes_acotados(self, resolutor, monkeypatch):
+        _, reloj = resolutor
+        cache = CacheIdentidadMemoria(reloj=lambda: reloj[0], maximo=2, intervalo_limpieza=50)
+        await cache.guardar("+541", 1, ttl=100)
+        await cache.guardar("+542", 2, ttl=100)
+        await cache.obtener("+541")
+        await cache.guardar("+543", NO_REGISTRADO, ttl=10)  # sale el 2, el menos usado
+        assert (await cache.obtener("+542"), cache._pacientes) == (None, {1: "+541"})
+
+        reloj[0] = 60  # la limpieza periódica se lleva el negativo vencido sin que nadie lo lea
+        await cache.guardar("+544", 4, ttl=100)
+        assert set(cache._telefonos) == {"+541", "+544"} and set(cache._pacientes) == {1, 4}
+
+        resolutor = ResolutorIdentidad(cache)
+        monkeypatch.setattr(ResolutorIdentidad, "MAXIMO_PENDIENTES", 3)
+        for id_paciente in range(10):
+            resolutor.al_cambiar(EventoCambio("pacientes", "update", (id_paciente,)))
+        assert resolutor._pendientes == set()
+        async with AsyncSessionLocal() as db:
+            await resolutor.aplicar_pendientes(db)
+        assert cache._telefonos == {} and cache._pacientes == {}
@@ -0,0 +1,132 @@
+import json
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.core.eventos import bus_cambios
+from app.models.entities import (
+    Clinica, Especialidad, LogIA, LogIAResumenHora, Paciente, Profesional, ProfesionalEspecialidad, Turno
+)
+from app.service.importacion import ImportadorMasivo, _orden_topologico, archivos_de_origen
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def base_vacia():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with engine.begin() as conn:
+        for tabla in reversed(Base.metadata.sorted_tables):
+            await conn.execute(delete(tabla))
+
+
+def escribir(directorio, nombre, contenido):
+    (directorio / nombre).write_text(contenido, encoding="utf-8")
+
+
+@pytest.fixture
+def origen(tmp_path):
+    escribir(tmp_path, "clinicas.csv",
+             "id,nombre,did_whatsapp,configuraciones\n"
+             "c-1,Clínica Norte,549381000001,\"{\"\"duracion_turno\"\": 30}\"\n"
+             "c-2,Clínica Sur,549381000002,\n")
+    escribir(tmp_path, "especialidades.csv", "id,nombre\n7,Cardiología\n8,Pediatría\n")
+    escribir(tmp_path, "pacientes.jsonl", "\n".join(json.dumps(p) for p in [
+        {"id": 100, "dni": "30111222", "telefono": "5493811111111", "nombre": "María Pérez"},
+        {"id": 101, "dni": "30111223", "telefono": "5493812222222", "nombre": "Juan Gómez", "email": "juan@ejemplo.com"},
+    ]))
+    escribir(tmp_path, "profesionales.jsonl", json.dumps(
+        {"id": 55, "nombre": "Dra. Ana López", "especialidades": ["Pediatría", "Inexistente"],
+         "horarios": {"lunes": [{"inicio": "08:00", "fin": "12:00"}]}}
+    ))
+    escribir(tmp_path, "turnos.csv",
+             "id,id_paciente,id_profesional,id_clinica,fecha_hora,estado\n"
+             "1,100,55,c-1,2024-03-04T09:00:00,confirmado\n"
+             "2,101,55,c-2,2024-03-04T09:30:00-03:00,\n"
+             "3,999,55,c-1,2024-03-04T10:00:00,programado\n")
+    escribir(tmp_path, "logs_ia.jsonl", json.dumps(
+        {"mensaje": "hola", "respuesta_ia": "hola", "confianza": "alta",
+         "fecha": "2024-03-04T09:15:00+00:00", "metadatos": {"id_clinica": "c-2"}}
+    ))
+    escribir(tmp_path, "notas.csv", "x\n1\n")
+    return tmp_path
+
+
+class TestImportadorMasivo:
+    """Tests para la importación masiva sobre SQLite (INSERT por lotes en vez de COPY)"""
+
+    async def test_orden_por_dependencias(self, origen):
+        archivos = archivos_de_origen(str(origen))
+        assert "notas" not in archivos
+        orden = _orden_topologico(["turnos", "logs_ia", "profesionales", "pacientes", "clinicas", "especialidades"])
+        assert orden.index("turnos") > max(orden.index(t) for t in ("pacientes", "profesionales", "clinicas"))
+        assert orden.index("profesionales") > orden.index("especialidades")
+
+    async def test_importa_y_traduce_claves(self, base_vacia, origen):
+        async with AsyncSessionLocal() as db:
+            db.add(Clinica(nombre="Existente", did_whatsapp="1"))
+            await db.commit()
+
+        avances = []
+        eventos = []
+        desuscribir = bus_cambios.suscribir(eventos.append)
+        importador = ImportadorMasivo(lote=1, progreso=lambda r: avances.append((r.tabla, r.filas)))
+        try:
+            resultados = await importador.importar(archivos_de_origen(str(origen)))
+        finally:
+            desuscribir()
+
+        # Un evento sin ids por tabla escrita, después de todas las transacciones
+        assert sorted((e.entidad, e.operacion, e.ids) for e in eventos) == sorted(
+            (tabla, "importacion", ()) for tabla in resultados
+        )
+        assert "profesional_especialidad" in resultados
+        assert resultados["turnos"].filas == 2
+        assert resultados["turnos"].descartadas == 1
+        assert "pacientes 999" in resultados["turnos"].errores[0]
+        assert resultados["profesional_especialidad"].filas == 1
+        assert ("turnos", 2) in avances
+
+        async with AsyncSessionLocal() as db:
+            clinicas = {c.nombre: c for c in (await db.execute(select(Clinica))).scalars()}
+            pacientes = {p.dni: p for p in (await db.execute(select(Paciente))).scalars()}
+            profesional = (await db.execute(select(Profesional))).scalar_one()
+            turnos = (await db.execute(select(Turno).order_by(Turno.fecha_hora))).scalars().all()
+            log = (await db.execute(select(LogIA))).scalar_one()
+            asociacion = (await db.execute(select(ProfesionalEspecialidad))).scalar_one()
+            pediatria = (await db.execute(select(Especialidad).filter(Especialidad.nombre == "Pediatría"))).scalar_one()
+            resumen = (await db.execute(select(LogIAResumenHora))).scalar_one()
+
+        # Ids nuevos después de los existentes; las FKs apuntan a ellos
+        assert clinicas["Clínica Norte"].id == 2
+        assert clinicas["Clínica Norte"].configuraciones == {"duracion_turno": 30}
+        assert clinicas["Clínica Sur"].activa is True
+        assert profesional.activo is True
+        assert [t.id_paciente for t in turnos] == [pacientes["30111222"].id, pacientes["30111223"].id]
+        assert turnos[0].id_clinica == clinicas["Clínica Norte"].id and turnos[0].estado == "confirmado"
+        assert turnos[1].estado == "programado"
+        assert log.metadatos == {"id_clinica": clinicas["Clínica Sur"].id}
+        assert (asociacion.id_profesional, asociacion.id_especialidad) == (profesional.id, pediatria.id)
+        assert (resumen.id_clinica, resumen.cantidad) == (clinicas["Clínica Sur"].id, 1)
+
+    async def test_referencias_a_ids_existentes(self, base_vacia, tmp_path):
+        async with AsyncSessionLocal() as db:
+            paciente = Paciente(dni="1", telefono="1", nombre="Existente")
+            profesional = Profesional(nombre="Dr. Existente")
+            clinica = Clinica(nombre="Existente", did_whatsapp="1")
+            db.add_all([paciente, profesional, clinica])
+            await db.commit()
+        escribir(tmp_path, "turnos.csv",
+                 "id_paciente,id_profesional,id_clinica,fecha_hora\n"
+                 f"{paciente.id},{profesional.id},{clinica.id},2024-03-04T09:00:00\n")
+
+        resultados = await ImportadorMasivo().importar(archivos_de_origen(str(tmp_path)))
+
+        assert resultados["turnos"].filas == 1
+        async with AsyncSessionLocal() as db:
+            turno = (await db.execute(select(Turno))).scalar_one()
+        assert turno.id_paciente == paciente.id
@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, update
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.core.eventos import EventoCambio, bus_cambios
+from app.models.entities import Clinica, Especialidad, LogIA
+from app.service.indice_vectorial import (
+    Documento, EmbebedorHashing, IndiceVectorial, IndiceVectorialMemoria, recall_at_k
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def datos():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        norte = Clinica(nombre="Clínica Norte", did_whatsapp="1",
+                        configuraciones={"horario_atencion": {"inicio": "08:00", "fin": "20:00"}, "estacionamiento": "gratuito"})
+        sur = Clinica(nombre="Clínica Sur", did_whatsapp="2", configuraciones={})
+        eco = Especialidad(nombre="Ecografía", descripcion="Estudios por imágenes",
+                           preparacion_previa="Ayuno de 8 horas y vejiga llena")
+        db.add_all([norte, sur, eco, Especialidad(nombre="Dermatología", descripcion="Enfermedades de la piel")])
+        await db.flush()
+        db.add_all([
+            LogIA(mensaje="¿Aceptan la obra social OSDE?", respuesta_ia="Sí, OSDE.", confianza="alta", metadatos={"id_clinica": norte.id}),
+            LogIA(mensaje="¿Aceptan la obra social OSDE?", respuesta_ia="No.", confianza="alta", metadatos={"id_clinica": sur.id}),
+            LogIA(mensaje="¿Aceptan Swiss Medical?", respuesta_ia="Tal vez", confianza="baja", metadatos={"id_clinica": norte.id}),
+        ])
+        await db.commit()
+    yield norte, sur, eco
+    async with engine.begin() as conn:
+        for tabla in (LogIA, Especialidad, Clinica):
+            await conn.execute(delete(tabla))
+
+
+class TestEmbebedorHashing:
+    """Tests para el embebedor determinístico"""
+
+    async def test_normalizado_y_determinista(self):
+        textos = ["¿Cómo me preparo para la ecografía?", "preparacion ecografia", ""]
+        vectores = EmbebedorHashing(64).embeber(textos)
+        assert vectores.dtype == np.float32 and vectores.shape == (3, 64)
+        assert np.allclose(np.linalg.norm(vectores[:2], axis=1), 1.0) and not vectores[2].any()
+        assert np.array_equal(vectores, EmbebedorHashing(64).embeber(textos))
+        assert vectores[0] @ vectores[1] > 0.3
+
+
+class TestIndiceVectorialMemoria:
+    """Tests para el índice NumPy por clínica"""
+
+    async def test_poner_quitar_y_buscar_en_lote(self):
+        embebedor = EmbebedorHashing(64)
+        indice = IndiceVectorialMemoria(64)
+        documentos = [Documento("log_ia", i, i % 2, f"pregunta numero {i} sobre tema {i}") for i in range(100)]
+        documentos.append(Documento("especialidad", 1, None, "Cardiología: estudios del corazón"))
+        indice.poner(documentos, embebedor.embeber([d.texto for d in documentos]))
+        indice.quitar([("log_ia", 0), ("log_ia", 2)])
+        assert len(indice) == 99 and indice.cantidad(0) == 48
+
+        consultas = embebedor.embeber(["pregunta numero 4 sobre tema 4", "corazón cardiología", "pregunta numero 2 sobre tema 2"])
+        resultados = indice.buscar(0, consultas, k=3)
+        assert resultados[0][0].id == 4 and resultados[0][0].puntaje == pytest.approx(1.0, abs=1e-4)
+        assert resultados[1][0].tipo == "especialidad"
+        assert all(r.id % 2 == 0 for r in resultados[2] if r.tipo == "log_ia")
+        assert ("log_ia", 2) not in {(r.tipo, r.id) for r in resultados[2]}
+
+        # Mismo resultado que la búsqueda exacta consulta por consulta
+        exactos = [indice.buscar(0, consultas[i:i + 1], k=3)[0] for i in range(3)]
+        assert recall_at_k(exactos, resultados) == 1.0
+        assert [r.tipo for r in indice.buscar(0, consultas[1:2], k=5, tipos={"especialidad"})[0]] == ["especialidad"]
+
+
+class TestIndiceVectorial:
+    """Tests para la carga incremental desde la base"""
+
+    async def test_sincroniza_y_busca_por_clinica(self, datos):
+        norte, sur, eco = datos
+        indice = IndiceVectorial(EmbebedorHashing(128))
+        async with AsyncSessionLocal() as db:
+            resultados = await indice.buscar(db, norte.id, ["¿tengo que ir en ayunas a la ecografía?", "aceptan osde"], k=2)
+            assert (resultados[0][0].tipo, resultados[0][0].id) == ("especialidad", eco.id)
+            assert "Sí, OSDE." in resultados[1][0].texto
+            # La respuesta de confianza baja no se indexa; la de la otra clínica no aparece
+            assert len(indice.memoria) == 6
+            assert all("No." not in r.texto for r in resultados[1])
+
+            # Sin cambios no se re-embebe nada; un cambio re-embebe sólo esa fila
+            embebidos = indice.embebidos
+            assert await indice.sincronizar(db) == 0
+            await db.execute(update(Especialidad).filter(Especialidad.id == eco.id).values(descripcion="Ecodoppler"))
+            await db.commit()
+            indice.al_cambiar(EventoCambio("especialidades", "update", (eco.id,)))
+            db.add(LogIA(mensaje="¿Hay estacionamiento?", respuesta_ia="Sí", confianza="alta", metadatos={"id_clinica": sur.id}))
+            await db.commit()
+            assert await indice.sincronizar(db) == 2
+            assert indice.embebidos == embebidos + 2
+
+            await db.execute(delete(Especialidad).filter(Especialidad.id == eco.id))
+            await db.commit()
+            suscriptores = len(bus_cambios._suscriptores)
+            indice.suscribir().suscribir()
+            try:
+                assert len(bus_cambios._suscriptores) == suscriptores + 1
+                bus_cambios.publicar(EventoCambio("especialidades", "delete", (eco.id,)))
+            finally:
+                indice.desuscribir()
+            assert len(bus_cambios._suscriptores) == suscriptores
+            resultados = await indice.buscar(db, sur.id, ["ecografía", "estacionamiento"], k=3)
+        assert all(r.tipo != "especialidad" or r.id != eco.id for r in resultados[0])
+        assert resultados[1][0].texto.startswith("¿Hay estacionamiento?")
+
+    async def test_buscar_indexa_logs_nuevos(self, datos):
+        """Los LogIA no emiten eventos: buscar los lee solo, sin llamar a sincronizar"""
+        norte, _, _ = datos
+        indice = IndiceVectorial(EmbebedorHashing(128), intervalo_logs=0)
+        async with AsyncSessionLocal() as db:
+            await indice.buscar(db, norte.id, ["osde"])
+            db.add(LogIA(mensaje="¿Atienden por PAMI?", respuesta_ia="Sí, PAMI.", confianza="alta", metadatos={"id_clinica": norte.id}))
+            await db.commit()
+            resultados = await indice.buscar(db, norte.id, ["atienden pami"], k=1)
+        assert resultados[0][0].texto.startswith("¿Atienden por PAMI?")
+
@@ -0,0 +1,124 @@
+import asyncio
+from datetime import date
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select, delete
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.models.entities import LogIA
+from app.schemas.responses import LogIACreate
+from app.service.log_ia_pipeline import LogIAPipeline
+from app.service.log_ia_retencion import nombre_particion, sumar_meses
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def tablas():
+    """Crear las tablas y vaciar logs_ia entre tests"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with engine.begin() as conn:
+        await conn.execute(delete(LogIA))
+
+
+async def contar_logs() -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(func.count(LogIA.id)))
+        return result.scalar()
+
+
+def log(i: int) -> LogIACreate:
+    return LogIACreate(
+        mensaje=f"mensaje {i}",
+        respuesta_ia=f"respuesta {i}",
+        confianza="alta",
+        metadatos={"id_clinica": 1}
+    )
+
+
+class TestLogIAPipeline:
+    """Tests para la ingesta por lotes de LogIA"""
+
+    async def test_flush_por_tamano_de_lote(self, tablas):
+        """Un lote completo se escribe sin esperar el intervalo"""
+        pipeline = LogIAPipeline(max_cola=100, max_lote=5, intervalo_flush=30)
+        await pipeline.iniciar()
+        for i in range(5):
+            assert await pipeline.registrar(log(i))
+
+        for _ in range(50):
+            if pipeline.estadisticas.escritos == 5:
+                break
+            await asyncio.sleep(0.02)
+        assert pipeline.estadisticas.lotes == 1
+        assert await contar_logs() == 5
+        await pipeline.detener()
+
+    async def test_flush_por_tiempo(self, tablas):
+        """Un lote incompleto se escribe al vencer el intervalo"""
+        pipeline = LogIAPipeline(max_cola=100, max_lote=500, intervalo_flush=0.05)
+        await pipeline.iniciar()
+        await pipeline.registrar(log(1))
+        await pipeline.registrar(log(2))
+        await asyncio.sleep(0.3)
+
+        assert pipeline.estadisticas.escritos == 2
+        assert await contar_logs() == 2
+        await pipeline.detener()
+
+    async def test_detener_escribe_pendientes(self, tablas):
+        """Al detener no se pierde nada de lo encolado"""
+        pipeline = LogIAPipeline(max_cola=1000, max_lote=50, intervalo_flush=30)
+        await pipeline.iniciar()
+        for i in range(120):
+            await pipeline.registrar({"mensaje": "m", "respuesta_ia": f"r{i}"})
+        await pipeline.detener()
+
+        assert pipeline.pendientes == 0
+        assert await contar_logs() == 120
+
+    async def test_descartar_nuevos_con_cola_llena(self, tablas):
+        """Con la cola llena, la política por defecto rechaza el log nuevo"""
+        pipeline = LogIAPipeline(max_cola=3, politica="descartar_nuevos")
+        pipeline._cola = asyncio.Queue(maxsize=3)  # sin tarea de escritura
+        resultados = [await pipeline.registrar(log(i)) for i in range(5)]
+
+        assert resultados == [True, True, True, False, False]
+        assert pipeline.estadisticas.descartados == 2
+        assert [r["mensaje"] for r in pipeline._tomar_disponibles()] == ["mensaje 0", "mensaje 1", "mensaje 2"]
+
+    async def test_descartar_antiguos_con_cola_llena(self, tablas):
+        """Con descartar_antiguos se conservan los logs más recientes"""
+        pipeline = LogIAPipeline(max_cola=3, politica="descartar_antiguos")
+        pipeline._cola = asyncio.Queue(maxsize=3)
+        for i in range(5):
+            assert await pipeline.registrar(log(i))
+
+        assert pipeline.estadisticas.descartados == 2
+        assert [r["mensaje"] for r in pipeline._tomar_disponibles()] == ["mensaje 2", "mensaje 3", "mensaje 4"]
+
+    async def test_bloquear_aplica_backpressure_acotada(self, tablas):
+        """Con bloquear, el productor espera como máximo `espera_bloqueo`"""
+        pipeline = LogIAPipeline(max_cola=1, politica="bloquear", espera_bloqueo=0.01)
+        pipeline._cola = asyncio.Queue(maxsize=1)
+        assert await pipeline.registrar(log(1))
+        assert not await pipeline.registrar(log(2))
+        assert pipeline.estadisticas.descartados == 1
+
+    async def test_politica_invalida(self):
+        with pytest.raises(ValueError, match="Política de descarte inválida"):
+            LogIAPipeline(politica="tirar_todo")
+
+
+class TestParticionesLogIA:
+    """Tests para los helpers de particionado mensual"""
+
+    async def test_nombre_particion(self):
+        assert nombre_particion(date(2026, 3, 17)) == "logs_ia_2026_03"
+
+    async def test_sumar_meses_cruza_anio(self):
+        assert sumar_meses(date(2026, 11, 20), 3) == date(2027, 2, 1)
+        assert sumar_meses(date(2026, 1, 5), -12) == date(2025, 1, 1)
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.models.entities import LogIA, LogIAResumenHora
+from app.repositories.repositories import log_ia_repo, log_ia_resumen_repo
+from app.schemas.responses import LogIACreate
+from app.service.log_ia_pipeline import LogIAPipeline
+from main import app
+
+pytestmark = pytest.mark.asyncio
+
+HORA = datetime(2026, 10, 19, 14, 0, tzinfo=timezone.utc)
+
+
+@pytest_asyncio.fixture
+async def tablas():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+    async with engine.begin() as conn:
+        await conn.execute(delete(LogIA))
+        await conn.execute(delete(LogIAResumenHora))
+
+
+def log(minuto: int, confianza, id_clinica=None) -> dict:
+    return {
+        "mensaje": "hola",
+        "respuesta_ia": "respuesta",
+        "confianza": confianza,
+        "fecha": HORA + timedelta(minutes=minuto),
+        "metadatos": {"id_clinica": id_clinica} if id_clinica is not None else None,
+    }
+
+
+async def totales():
+    async with AsyncSessionLocal() as db:
+        return await log_ia_resumen_repo.get_totales(db, desde=HORA, hasta=HORA + timedelta(hours=3))
+
+
+class TestLogIAResumen:
+    """Tests para el rollup de confianza por hora y clínica"""
+
+    async def test_pipeline_mantiene_rollup(self, tablas):
+        """Cada lote escrito por el pipeline suma al rollup"""
+        pipeline = LogIAPipeline(max_lote=100, intervalo_flush=30)
+        await pipeline.iniciar()
+        for registro in [log(1, "alta", 1), log(2, "alta", 1), log(3, "baja", 1), log(70, "media", 2), log(5, None)]:
+            await pipeline.registrar(registro)
+        await pipeline.detener()
+
+        assert await totales() == {
+            0: {"sin_dato": 1},
+            1: {"alta": 2, "baja": 1},
+            2: {"media": 1},
+        }
+
+    async def test_create_del_repositorio_mantiene_rollup(self, tablas):
+        """Los logs creados uno a uno también se cuentan"""
+        async with AsyncSessionLocal() as db:
+            await log_ia_repo.create(db, obj_in=LogIACreate(mensaje="a", respuesta_ia="b", confianza="media", metadatos={"id_clinica": 3}))
+            await log_ia_repo.create(db, obj_in=LogIACreate(mensaje="a", respuesta_ia="b", confianza="media", metadatos={"id_clinica": "3"}))
+            filas = await log_ia_resumen_repo.get_totales(
+                db, desde=datetime.now(timezone.utc) - timedelta(hours=2), hasta=datetime.now(timezone.utc) + timedelta(hours=2)
+            )
+        assert filas == {3: {"media": 2}}
+
+    async def test_bulk_create_y_delete_mantienen_rollup(self, tablas):
+        """Los logs creados en lote suman y los eliminados restan"""
+        ahora = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as db:
+            logs = await log_ia_repo.bulk_create(db, objs_in=[
+                LogIACreate(mensaje="a", respuesta_ia="b", confianza=confianza, metadatos={"id_clinica": 4})
+                for confianza in ["alta", "alta", "baja"]
+            ])
+            await log_ia_repo.delete(db, id=logs[0].id)
+            await log_ia_repo.delete(db, id=logs[2].id)
+            filas = await log_ia_resumen_repo.get_totales(db, desde=ahora - timedelta(hours=2), hasta=ahora + timedelta(hours=2))
+        assert filas == {4: {"alta": 1}}
+
+    async def test_update_mueve_el_log_de_grupo(self, tablas):
+        """Cambiar la confianza o la clínica de un log lo pasa de una fila del rollup a otra"""
+        ahora = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as db:
+            creado = await log_ia_repo.create(db, obj_in=LogIACreate(mensaje="a", respuesta_ia="b", confianza="baja", metadatos={"id_clinica": 5}))
+            await log_ia_repo.create(db, obj_in=LogIACreate(mensaje="a", respuesta_ia="b", confianza="baja", metadatos={"id_clinica": 5}))
+            log = await log_ia_repo.get(db, creado.id)
+            await log_ia_repo.update(db, db_obj=log, obj_in=LogIACreate(
+                mensaje="a", respuesta_ia="b", confianza="alta", metadatos={"id_clinica": 6, "revisado": True}
+            ))
+            await log_ia_repo.update(db, db_obj=log, obj_in=LogIACreate(mensaje="otra", respuesta_ia="b"))
+            filas = await log_ia_resumen_repo.get_totales(db, desde=ahora - timedelta(hours=2), hasta=ahora + timedelta(hours=2))
+        assert filas == {5: {"baja": 1}, 6: {"alta": 1}}
+
+    async def test_reconstruir_coincide_con_incremental(self, tablas):
+        """Recalcular desde logs_ia da lo mismo que el mantenimiento incremental"""
+        pipeline = LogIAPipeline(max_lote=3, intervalo_flush=30)
+        await pipeline.iniciar()
+        for i in range(20):
+            await pipeline.registrar(log(i * 7, ["baja", "media", "alta"][i % 3], i % 2))
+        await pipeline.registrar(log(3, "alta", "sin-numero"))  # va a SIN_CLINICA en los dos caminos
+        await pipeline.detener()
+        incremental = await totales()
+
+        async with AsyncSessionLocal() as db:
+            await log_ia_resumen_repo.reconstruir(db, log_model=LogIA, desde=HORA, hasta=HORA + timedelta(hours=3))
+        assert await totales() == incremental
+
+    async def test_endpoints_leen_el_rollup(self, tablas):
+        """Los endpoints de analítica agrupan por hora y por clínica"""
+        async with AsyncSessionLocal() as db:
+            await log_ia_resumen_repo.incrementar(db, registros=[log(1, "alta", 1), log(2, "baja", 1), log(61, "alta", 1)])
+            await db.commit()
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            params = {"desde": HORA.isoformat(), "hasta": (HORA + timedelta(hours=3)).isoformat(), "id_clinica": 1}
+            horas = await client.get("/api/analitica/logs-ia/confianza/horas", params=params)
+            totales_resp = await client.get("/api/analitica/logs-ia/confianza/totales", params=params)
+            invalido = await client.get("/api/analitica/logs-ia/confianza/totales", params={"desde": params["hasta"], "hasta": params["desde"]})
+
+        assert horas.status_code == 200
+        assert [(f["confianza"], f["cantidad"]) for f in horas.json()] == [("alta", 1), ("baja", 1), ("alta", 1)]
+        assert totales_resp.json() == [{"id_clinica": 1, "baja": 1, "media": 0, "alta": 2, "sin_dato": 0, "total": 3}]
+        assert invalido.status_code == 400
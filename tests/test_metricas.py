@@ -0,0 +1,97 @@
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.core.metricas import Histograma, instrumentar, instrumentar_engine, metricas, span
+from app.models.entities import Paciente
+from app.service.busqueda import buscador
+from main import app
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def habilitadas():
+    instrumentar_engine(engine)
+    metricas.habilitadas = True
+    metricas.reiniciar()
+    yield metricas
+    metricas.habilitadas = False
+    metricas.reiniciar()
+
+
+class TestHistograma:
+    """Tests para los histogramas y la exportación"""
+
+    async def test_cuantiles_y_buckets(self):
+        h = Histograma()
+        for ms in range(1, 101):
+            h.observar(ms / 1000)
+        cuantiles = h.cuantiles()
+        assert cuantiles[0.5] == pytest.approx(0.051)
+        assert cuantiles[0.99] == pytest.approx(0.1)
+        assert h.cantidad == 100
+        # <= 1ms cae en el primer bucket, > 10s en +Inf
+        assert h.conteos[0] == 1 and h.conteos[-1] == 0
+
+    async def test_exportar_formato_prometheus(self, habilitadas):
+        metricas.observar("http_request_duration_seconds", 0.02, method="GET", route="/x", status="200")
+        texto = metricas.exportar()
+        assert "# TYPE http_request_duration_seconds histogram" in texto
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/x",status="200",le="0.025"} 1' in texto
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/x",status="200",le="+Inf"} 1' in texto
+        assert 'http_request_duration_seconds_count{method="GET",route="/x",status="200"} 1' in texto
+        assert 'quantile="0.95"' in texto
+
+    async def test_deshabilitadas_no_registra(self):
+        @instrumentar("redis")
+        def operacion():
+            return 1
+
+        metricas.reiniciar()
+        with span("hcweb", "Metodo"):
+            assert operacion() == 1
+        assert metricas.exportar() == "\n"
+
+
+class TestMiddlewareMetricas:
+    """Tests para la instrumentación de requests, base de datos y spans propios"""
+
+    @pytest_asyncio.fixture
+    async def datos(self):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSessionLocal() as db:
+            db.add(Paciente(dni="1", telefono="1", nombre="Juan Pérez"))
+            await db.commit()
+        buscador.invalidar()
+        yield
+        buscador.invalidar()
+        async with engine.begin() as conn:
+            await conn.execute(delete(Paciente))
+
+    async def test_request_con_spans_de_db(self, habilitadas, datos):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            respuesta = await client.get("/api/busqueda", params={"q": "juan"})
+            exportado = await client.get("/metrics")
+
+        assert respuesta.status_code == 200
+        assert "db;dur=" in respuesta.headers["server-timing"]
+        assert "app;dur=" in respuesta.headers["server-timing"]
+        assert metricas.histograma("http_request_duration_seconds", method="GET", route="/api/busqueda", status="200").cantidad == 1
+        assert metricas.histograma("db_query_duration_seconds", operacion="SELECT").cantidad >= 1
+        assert 'route="/api/busqueda"' in exportado.text
+
+    async def test_spans_propios(self, habilitadas):
+        @instrumentar("redis")
+        async def get_sesion():
+            return {}
+
+        await get_sesion()
+        with span("hcweb", "ObtenerTurnos"):
+            pass
+        assert metricas.histograma("redis_duration_seconds", operacion="get_sesion").cantidad == 1
+        assert metricas.histograma("hcweb_call_duration_seconds", metodo="ObtenerTurnos").cantidad == 1
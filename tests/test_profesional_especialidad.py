@@ -0,0 +1,107 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.models.entities import Especialidad, Profesional, ProfesionalEspecialidad
+from app.repositories.repositories import especialidad_repo, profesional_repo
+from app.schemas.responses import EspecialidadCreate, EspecialidadUpdate, ProfesionalCreate, ProfesionalUpdate
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def db_session():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        yield session
+    async with engine.begin() as conn:
+        await conn.execute(delete(ProfesionalEspecialidad))
+        await conn.execute(delete(Profesional))
+        await conn.execute(delete(Especialidad))
+
+
+@pytest_asyncio.fixture
+async def especialidades(db_session):
+    return {
+        nombre: await especialidad_repo.create(db_session, obj_in=EspecialidadCreate(nombre=nombre))
+        for nombre in ["Cardiología", "Dermatología", "Clínica Médica"]
+    }
+
+
+class TestProfesionalEspecialidad:
+    """Tests para la asociación indexada profesional <-> especialidad"""
+
+    async def test_create_asocia_especialidades(self, db_session, especialidades):
+        """Al crear, la lista JSON se refleja en profesional_especialidad"""
+        uno = await profesional_repo.create(db_session, obj_in=ProfesionalCreate(nombre="Dr. Uno", especialidades=["Cardiología", "Clínica Médica"]))
+        await profesional_repo.create(db_session, obj_in=ProfesionalCreate(nombre="Dra. Dos", especialidades=["Cardiología"]))
+        await profesional_repo.create(db_session, obj_in=ProfesionalCreate(nombre="Dr. Tres", especialidades=["Dermatología"]))
+
+        cardiologos = await profesional_repo.get_by_id_especialidad(db_session, id_especialidad=especialidades["Cardiología"].id)
+        assert [p.nombre for p in cardiologos] == ["Dr. Uno", "Dra. Dos"]
+
+        propias = await especialidad_repo.get_by_profesional(db_session, id_profesional=uno.id)
+        assert [e.nombre for e in propias] == ["Cardiología", "Clínica Médica"]
+
+    async def test_bulk_create_asocia_especialidades(self, db_session, especialidades):
+        """Los profesionales creados en lote también quedan en profesional_especialidad"""
+        await profesional_repo.bulk_create(db_session, objs_in=[
+            ProfesionalCreate(nombre="Dr. Uno", especialidades=["Cardiología"]),
+            ProfesionalCreate(nombre="Dra. Dos", especialidades=["Cardiología", "Dermatología"]),
+            ProfesionalCreate(nombre="Dr. Tres", especialidades=[]),
+        ])
+
+        cardiologos = await profesional_repo.get_by_id_especialidad(db_session, id_especialidad=especialidades["Cardiología"].id)
+        assert [p.nombre for p in cardiologos] == ["Dr. Uno", "Dra. Dos"]
+        dermatologos = await profesional_repo.get_by_id_especialidad(db_session, id_especialidad=especialidades["Dermatología"].id)
+        assert [p.nombre for p in dermatologos] == ["Dra. Dos"]
+
+    async def test_update_resincroniza(self, db_session, especialidades):
+        """Cambiar la lista reemplaza las asociaciones; otros cambios no las tocan"""
+        profesional = await profesional_repo.create(db_session, obj_in=ProfesionalCreate(nombre="Dr. Uno", especialidades=["Cardiología"]))
+        await profesional_repo.update(db_session, db_obj=profesional, obj_in=ProfesionalUpdate(especialidades=["Dermatología"]))
+        await profesional_repo.update(db_session, db_obj=profesional, obj_in=ProfesionalUpdate(nombre="Dr. Uno Bis"))
+
+        propias = await especialidad_repo.get_by_profesional(db_session, id_profesional=profesional.id)
+        assert [e.nombre for e in propias] == ["Dermatología"]
+        assert await profesional_repo.get_by_id_especialidad(db_session, id_especialidad=especialidades["Cardiología"].id) == []
+
+    async def test_nombres_desconocidos_se_ignoran(self, db_session, especialidades):
+        profesional = await profesional_repo.create(db_session, obj_in=ProfesionalCreate(nombre="Dr. Uno", especialidades=["Cardiología", "No Existe"]))
+
+        propias = await especialidad_repo.get_by_profesional(db_session, id_profesional=profesional.id)
+        assert [e.nombre for e in propias] == ["Cardiología"]
+        assert profesional.especialidades == ["Cardiología", "No Existe"]
+
+    async def test_crear_especialidad_asocia_profesionales(self, db_session, especialidades):
+        """Un nombre desconocido queda asociado cuando se crea la especialidad"""
+        profesional = await profesional_repo.create(db_session, obj_in=ProfesionalCreate(nombre="Dra. Uno", especialidades=["Pediatría"]))
+        pediatria = await especialidad_repo.create(db_session, obj_in=EspecialidadCreate(nombre="Pediatría"))
+
+        pediatras = await profesional_repo.get_by_id_especialidad(db_session, id_especialidad=pediatria.id)
+        assert [p.id for p in pediatras] == [profesional.id]
+
+    async def test_renombrar_especialidad_resincroniza(self, db_session, especialidades):
+        """Renombrar desasocia a quienes tenían el nombre viejo y asocia a los del nuevo"""
+        cardiologo = await profesional_repo.create(db_session, obj_in=ProfesionalCreate(nombre="Dr. Uno", especialidades=["Cardiología"]))
+        pediatra = await profesional_repo.create(db_session, obj_in=ProfesionalCreate(nombre="Dra. Dos", especialidades=["Pediatría"]))
+        especialidad = especialidades["Cardiología"]
+        await especialidad_repo.update(db_session, db_obj=especialidad, obj_in=EspecialidadUpdate(nombre="Pediatría"))
+
+        asociados = await profesional_repo.get_by_id_especialidad(db_session, id_especialidad=especialidad.id)
+        assert [p.id for p in asociados] == [pediatra.id]
+        assert await especialidad_repo.get_by_profesional(db_session, id_profesional=cardiologo.id) == []
+
+    async def test_inactivos_se_excluyen(self, db_session, especialidades):
+        await profesional_repo.create(db_session, obj_in=ProfesionalCreate(nombre="Dr. Inactivo", especialidades=["Cardiología"], activo=False))
+        id_cardiologia = especialidades["Cardiología"].id
+
+        assert await profesional_repo.get_by_id_especialidad(db_session, id_especialidad=id_cardiologia) == []
+        assert len(await profesional_repo.get_by_id_especialidad(db_session, id_especialidad=id_cardiologia, solo_activos=False)) == 1
+
+    async def test_get_by_nombre(self, db_session, especialidades):
+        encontrada = await especialidad_repo.get_by_nombre(db_session, nombre="Dermatología")
+        assert encontrada.id == especialidades["Dermatología"].id
+        assert await especialidad_repo.get_by_nombre(db_session, nombre="Otra") is None
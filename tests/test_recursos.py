@@ -0,0 +1,59 @@
+import asyncio
+import os
+
+import pytest
+
+from app.core.cache_http import cache_http
+from app.core.eventos import EventoCambio, bus_cambios
+from app.core.recursos import Recursos
+from app.repositories import redis_session
+from app.service.cola_mensajes import ColaMensajesMemoria
+from app.service.log_ia_pipeline import log_ia_pipeline
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestRecursos:
+    """Tests para el ciclo de vida de los recursos del proceso"""
+
+    async def test_iniciar_y_detener(self):
+        recursos = Recursos("memoria")
+        with pytest.raises(RuntimeError):
+            recursos.requerir("cola_mensajes")
+
+        await recursos.iniciar()
+        assert recursos.iniciado
+        assert isinstance(recursos.requerir("cola_mensajes"), ColaMensajesMemoria)
+        assert recursos.workers_mensajes.activo
+        assert log_ia_pipeline.activo
+        # Iniciar dos veces en el mismo proceso no duplica nada
+        workers = recursos.workers_mensajes
+        await recursos.iniciar()
+        assert recursos.workers_mensajes is workers
+
+        # La caché de catálogos se suscribe al bus con el lifespan, no al importarla
+        cache_http.guardar("clave", '"e"', b"{}", ["especialidades"])
+        bus_cambios.publicar(EventoCambio("especialidades", "update", (1,)))
+        assert cache_http.obtener("clave") is None
+
+        await recursos.detener()
+        assert not recursos.iniciado
+        cache_http.guardar("clave", '"e"', b"{}", ["especialidades"])
+        bus_cambios.publicar(EventoCambio("especialidades", "update", (1,)))
+        assert cache_http.obtener("clave") is not None
+        cache_http.limpiar()
+        assert not workers.activo
+        assert not log_ia_pipeline.activo
+
+    async def test_un_cliente_de_sesiones_por_proceso(self, monkeypatch):
+        cliente = redis_session.get_redis_client()
+        assert await asyncio.to_thread(redis_session.get_redis_client) is cliente
+        assert redis_session.get_redis_client().connection_pool is cliente.connection_pool
+
+        # En un hijo de fork se crea otro, sin cerrar el del padre
+        monkeypatch.setattr(os, "getpid", lambda: -1)
+        hijo = redis_session.get_redis_client()
+        assert hijo is not cliente and redis_session.get_redis_client() is hijo
+        redis_session.cerrar_redis_client()
+        assert redis_session.get_redis_client() is not hijo
+        redis_session.cerrar_redis_client()
@@ -0,0 +1,69 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select, type_coerce
+from sqlalchemy.dialects import postgresql
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.models.entities import Clinica, Profesional
+from app.repositories.base import contiene_json
+from app.repositories.repositories import clinica_repo, profesional_repo
+from app.schemas.responses import ClinicaCreate, ProfesionalCreate
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def db_session():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        yield session
+    async with engine.begin() as conn:
+        await conn.execute(delete(Profesional))
+        await conn.execute(delete(Clinica))
+
+
+class TestContieneJson:
+    """Tests para la semántica de @> usada fuera de PostgreSQL"""
+
+    async def test_objetos_y_arreglos(self):
+        documento = {"duracion_turno": 30, "dias": ["lunes", "martes"], "horario": {"inicio": "08:00"}}
+        assert contiene_json(documento, {"duracion_turno": 30})
+        assert contiene_json(documento, {"dias": ["martes"], "horario": {"inicio": "08:00"}})
+        assert not contiene_json(documento, {"dias": ["sabado"]})
+        assert not contiene_json(documento, {"duracion_turno": 45})
+        assert contiene_json(["Cardiología", "Clínica"], ["Cardiología"])
+        assert contiene_json(["Cardiología"], "Cardiología")
+        assert not contiene_json(None, ["Cardiología"])
+
+    async def test_postgres_usa_operador_de_contencion(self):
+        """En PostgreSQL la consulta se resuelve con @> sobre JSONB"""
+        columna = type_coerce(Profesional.especialidades, postgresql.JSONB)
+        sql = str(select(Profesional).filter(columna.contains(["Cardiología"])).compile(dialect=postgresql.dialect()))
+        assert "profesionales.especialidades @>" in sql
+
+
+class TestRepositoriosJson:
+    """Tests para las consultas por contenido JSON de los repositorios"""
+
+    async def test_profesionales_por_especialidad(self, db_session):
+        for nombre, especialidades, activo in [
+            ("Dr. Uno", ["Cardiología"], True),
+            ("Dra. Dos", ["Cardiología", "Clínica Médica"], True),
+            ("Dr. Tres", ["Dermatología"], True),
+            ("Dr. Inactivo", ["Cardiología"], False),
+        ]:
+            await profesional_repo.create(db_session, obj_in=ProfesionalCreate(nombre=nombre, especialidades=especialidades, activo=activo))
+
+        cardiologos = await profesional_repo.get_by_especialidad(db_session, especialidad="Cardiología")
+        assert [p.nombre for p in cardiologos] == ["Dr. Uno", "Dra. Dos"]
+
+        todos = await profesional_repo.get_by_especialidad(db_session, especialidad="Cardiología", solo_activos=False)
+        assert len(todos) == 3
+
+    async def test_clinicas_por_configuracion(self, db_session):
+        await clinica_repo.create(db_session, obj_in=ClinicaCreate(nombre="A", did_whatsapp="1", configuraciones={"duracion_turno": 30}))
+        await clinica_repo.create(db_session, obj_in=ClinicaCreate(nombre="B", did_whatsapp="2", configuraciones={"duracion_turno": 45}))
+
+        clinicas = await clinica_repo.get_by_configuracion(db_session, configuracion={"duracion_turno": 45})
+        assert [c.nombre for c in clinicas] == ["B"]
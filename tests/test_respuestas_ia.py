@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.core.eventos import EventoCambio, bus_cambios
+from app.models.entities import Clinica, Especialidad, LogIA, LogIAResumenHora
+from app.service.log_ia_pipeline import LogIAPipeline
+from app.service.respuestas_ia import (
+    CACHE, FAQ, LLM, AsistenteRespuestas, CacheRespuestas, ClienteLLMFalso, RespuestaIA, clave_mensaje
+)
+
+pytestmark = pytest.mark.asyncio
+
+RESPUESTAS = {
+    "¿Aceptan OSDE?": ("Sí, trabajamos con OSDE.", "alta"),
+    "me duele la cabeza": ("Te recomiendo consultar con Clínica Médica.", "media"),
+}
+
+
+@pytest_asyncio.fixture
+async def clinicas():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        norte = Clinica(nombre="Clínica Norte", did_whatsapp="1", configuraciones={"horario_atencion": {"inicio": "08:00", "fin": "20:00"}})
+        sur = Clinica(nombre="Clínica Sur", did_whatsapp="2", configuraciones={})
+        db.add_all([norte, sur, Especialidad(nombre="Cardiología", preparacion_previa="Venir con ropa cómoda.")])
+        await db.commit()
+    yield norte, sur
+    async with engine.begin() as conn:
+        for tabla in (LogIAResumenHora, LogIA, Especialidad, Clinica):
+            await conn.execute(delete(tabla))
+
+
+class TestCacheRespuestas:
+    """Tests para la caché de respuestas por clínica"""
+
+    async def test_normalizacion(self):
+        assert clave_mensaje("Hola!! ¿Aceptan   OSDE?") == clave_mensaje("aceptan osde") == "aceptan osde"
+
+    async def test_lru_por_clinica_y_confianza(self):
+        cache = CacheRespuestas(max_por_clinica=2, ttl=60)
+        alta = RespuestaIA("x", "alta")
+        assert cache.guardar(1, "a", alta) and cache.guardar(1, "b", alta)
+        assert not cache.guardar(1, "c", RespuestaIA("x", "media"))
+        assert not cache.guardar(1, "mi dni es 30111222", alta)
+        cache.obtener(1, "a")
+        cache.guardar(1, "d", alta)
+
+        assert cache.obtener(1, "b") is None
+        assert cache.obtener(1, "a").origen == CACHE
+        assert cache.obtener(2, "a") is None
+        assert cache.estadisticas_de(1).desalojadas == 1
+
+
+class TestAsistenteRespuestas:
+    """Tests para el orden FAQ -> caché -> LLM"""
+
+    async def test_faq_cache_y_llm(self, clinicas):
+        norte, sur = clinicas
+        cliente = ClienteLLMFalso(RESPUESTAS)
+        asistente = AsistenteRespuestas(cliente, CacheRespuestas(ttl=60))
+        async with AsyncSessionLocal() as db:
+            horario = await asistente.responder(db, norte.id, "Buenas, ¿en qué horario atienden?")
+            preparacion = await asistente.responder(db, norte.id, "¿Cómo me preparo para cardiología?")
+            sin_horario = await asistente.responder(db, sur.id, "¿Qué horario tienen?")
+            primera = await asistente.responder(db, norte.id, "¿Aceptan OSDE?")
+            segunda = await asistente.responder(db, norte.id, "hola aceptan osde")
+            otra_clinica = await asistente.responder(db, sur.id, "Aceptan OSDE")
+            media = [await asistente.responder(db, norte.id, "me duele la cabeza") for _ in range(2)]
+
+        assert (horario.origen, horario.texto) == (FAQ, "Clínica Norte atiende de 08:00 a 20:00.")
+        assert preparacion.origen == FAQ and "ropa cómoda" in preparacion.texto
+        assert sin_horario.origen == LLM
+        assert (primera.origen, segunda.origen, otra_clinica.origen) == (LLM, CACHE, LLM)
+        assert segunda.texto == primera.texto
+        assert [r.origen for r in media] == [LLM, LLM]
+        assert len(cliente.llamadas) == 5
+
+        estadisticas = asistente.cache.estadisticas_de(norte.id)
+        assert (estadisticas.faq, estadisticas.aciertos, estadisticas.fallos) == (2, 1, 3)
+        assert estadisticas.como_dict()["tasa_aciertos"] == 0.5
+
+    async def test_respuestas_del_llm_van_al_pipeline_de_logs(self, clinicas):
+        norte, _ = clinicas
+        pipeline = LogIAPipeline(max_cola=100, max_lote=100, intervalo_flush=30)
+        await pipeline.iniciar()
+        try:
+            asistente = AsistenteRespuestas(ClienteLLMFalso(RESPUESTAS), CacheRespuestas(ttl=60), pipeline_logs=pipeline)
+            async with AsyncSessionLocal() as db:
+                await asistente.responder(db, norte.id, "¿En qué horario atienden?")
+                await asistente.responder(db, norte.id, "¿Aceptan OSDE?")
+                await asistente.responder(db, norte.id, "aceptan osde")
+        finally:
+            await pipeline.detener()
+
+        # Sólo la respuesta del LLM: la FAQ y el acierto de caché no generan LogIA
+        assert pipeline.estadisticas.escritos == 1
+        async with AsyncSessionLocal() as db:
+            log, = (await db.execute(select(LogIA))).scalars().all()
+        assert (log.mensaje, log.respuesta_ia, log.confianza) == ("¿Aceptan OSDE?", "Sí, trabajamos con OSDE.", "alta")
+        assert log.metadatos == {"id_clinica": norte.id}
+
+    async def test_precarga_desde_logs_y_cambios(self, clinicas):
+        norte, _ = clinicas
+        ahora = datetime.now(timezone.utc)
+        async with AsyncSessionLocal() as db:
+            db.add_all([
+                LogIA(mensaje="¿Aceptan OSDE?", respuesta_ia="Sí, con OSDE.", confianza="alta", fecha=ahora, metadatos={"id_clinica": norte.id}),
+                LogIA(mensaje="¿Hay estacionamiento?", respuesta_ia="No.", confianza="baja", fecha=ahora, metadatos={"id_clinica": norte.id}),
+                LogIA(mensaje="¿Dónde queda?", respuesta_ia="En el centro.", confianza="alta", fecha=ahora - timedelta(days=30), metadatos={"id_clinica": norte.id}),
+            ])
+            await db.commit()
+            cliente = ClienteLLMFalso()
+            asistente = AsistenteRespuestas(cliente, CacheRespuestas(ttl=60))
+            assert await asistente.precargar(db) == 1
+            respuesta = await asistente.responder(db, norte.id, "aceptan OSDE")
+            assert (respuesta.origen, respuesta.texto) == (CACHE, "Sí, con OSDE.")
+            assert not cliente.llamadas
+
+            conocimiento = await asistente.conocimiento(db, norte.id)
+            suscriptores = len(bus_cambios._suscriptores)
+            asistente.suscribir().suscribir()
+            try:
+                assert len(bus_cambios._suscriptores) == suscriptores + 1
+                bus_cambios.publicar(EventoCambio("clinicas", "update", (norte.id,)))
+            finally:
+                asistente.desuscribir()
+            assert len(bus_cambios._suscriptores) == suscriptores
+            assert await asistente.conocimiento(db, norte.id) is not conocimiento
+            # Las respuestas cacheadas de la clínica también se descartan (p. ej. un horario viejo)
+            assert asistente.cache.tamanio(norte.id) == 0
+            respuesta = await asistente.responder(db, norte.id, "aceptan OSDE")
+            assert respuesta.origen == LLM and len(cliente.llamadas) == 1
+
+    async def test_faq_solo_para_preguntas_cortas(self, clinicas):
+        """Un mensaje que nombra el horario o una preparación pero pide otra cosa va al LLM"""
+        norte, _ = clinicas
+        async with AsyncSessionLocal() as db:
+            await db.merge(Especialidad(nombre="Ecografía", preparacion_previa="Ayuno de 6 horas."))
+            await db.commit()
+            cliente = ClienteLLMFalso()
+            asistente = AsistenteRespuestas(cliente, CacheRespuestas(ttl=60))
+            mensajes = [
+                "Quiero cambiar el horario de mi turno",
+                "No abren los domingos? necesito reprogramar",
+                "No puedo llevar a mi hijo a la ecografía, cancelen",
+            ]
+            respuestas = [await asistente.responder(db, norte.id, mensaje) for mensaje in mensajes]
+            faq = [
+                await asistente.responder(db, norte.id, "¿A qué hora abren?"),
+                await asistente.responder(db, norte.id, "Hola, ¿qué preparación necesito para la ecografía?"),
+            ]
+        assert [r.origen for r in respuestas] == [LLM, LLM, LLM]
+        assert cliente.llamadas == mensajes
+        assert [r.origen for r in faq] == [FAQ, FAQ] and "Ayuno" in faq[1].texto
@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.service.limitador_tasa import LimitadorTasaMemoria
+from app.service.salida_whatsapp import ClienteWhatsApp, DespachadorSalida
+
+pytestmark = pytest.mark.asyncio
+
+
+class ProveedorFalso(ThreadingHTTPServer):
+    """Proveedor local: registra cada envío y responde según `fallas` (destino -> códigos)"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ManejadorProveedor)
+        self.recibidos = []
+        self.fallas = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class ManejadorProveedor(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        cuerpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        did = self.path.strip("/").split("/")[0]
+        with self.server.lock:
+            codigos = self.server.fallas.get(cuerpo["to"])
+            codigo = codigos.pop(0) if codigos else 200
+            self.server.recibidos.append((time.monotonic(), did, cuerpo["to"], codigo))
+            numero = len(self.server.recibidos)
+        respuesta = json.dumps({"messages": [{"id": f"wamid.{numero}"}]} if codigo == 200 else {"error": codigo}).encode()
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(respuesta)))
+        self.end_headers()
+        self.wfile.write(respuesta)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def proveedor():
+    servidor = ProveedorFalso()
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+async def despachador(proveedor, *, tasa=1000.0, capacidad=1000.0, **opciones):
+    despachador = DespachadorSalida(
+        ClienteWhatsApp(proveedor.url, "token", conexiones=8),
+        LimitadorTasaMemoria(tasa, capacidad),
+        concurrencia=8,
+        backoff=0.01,
+        **opciones
+    )
+    await despachador.iniciar()
+    return despachador
+
+
+class TestDespachadorSalida:
+    """Tests para el envío saliente contra un proveedor falso local"""
+
+    async def test_envia_y_devuelve_id(self, proveedor):
+        salida = await despachador(proveedor)
+        resultado = await salida.enviar_texto("did1", "549381111", "Recordatorio de turno")
+        await salida.detener()
+
+        assert resultado.ok and resultado.intentos == 1
+        assert resultado.id_mensaje == "wamid.1"
+        assert proveedor.recibidos[0][1:3] == ("did1", "549381111")
+
+    async def test_reintenta_errores_transitorios(self, proveedor):
+        proveedor.fallas = {"549381111": [500, 429], "549382222": [400]}
+        salida = await despachador(proveedor, max_intentos=3)
+        transitorio = salida.encolar("did1", "549381111", {"type": "text", "text": {"body": "a"}})
+        permanente = salida.encolar("did1", "549382222", {"type": "text", "text": {"body": "b"}})
+        transitorio, permanente = await transitorio, await permanente
+        await salida.detener()
+
+        assert transitorio.ok and transitorio.intentos == 3
+        # Un 4xx no se reintenta
+        assert not permanente.ok and permanente.intentos == 1
+        assert "400" in permanente.error
+        assert salida.estadisticas.reintentos == 2
+
+    async def test_respeta_limite_por_did(self, proveedor):
+        salida = await despachador(proveedor, tasa=20, capacidad=2)
+        inicio = time.monotonic()
+        futuros = [salida.encolar("did1", f"54938{i}", {"type": "text", "text": {"body": "x"}}) for i in range(12)]
+        for futuro in futuros:
+            assert (await futuro).ok
+        duracion = time.monotonic() - inicio
+        await salida.detener()
+
+        # 2 de ráfaga + 10 a 20/s: no menos de ~0.5s
+        assert duracion >= 0.45
+        # En ningún momento se enviaron más que la ráfaga más lo repuesto desde el inicio
+        for enviados, (t, *_) in enumerate(sorted(proveedor.recibidos), start=1):
+            assert enviados <= 2 + 20 * (t - inicio) + 1
+
+    async def test_reparto_justo_entre_clinicas(self, proveedor):
+        salida = await despachador(proveedor, tasa=50, capacidad=1)
+        masivo = [salida.encolar("clinica_a", f"549381{i:03d}", {"type": "text", "text": {"body": "x"}}) for i in range(40)]
+        puntual = [salida.encolar("clinica_b", f"549382{i:03d}", {"type": "text", "text": {"body": "y"}}) for i in range(4)]
+        for futuro in masivo + puntual:
+            await futuro
+        await salida.detener()
+
+        orden = [did for _, did, _, _ in sorted(proveedor.recibidos)]
+        # La clínica B no espera a que termine el envío masivo de A
+        ultimo_b = max(i for i, did in enumerate(orden) if did == "clinica_b")
+        assert ultimo_b < 12
+        assert salida.estadisticas.por_did == {"clinica_a": 40, "clinica_b": 4}
@@ -0,0 +1,90 @@
+from datetime import datetime, timezone
+
+import httpx
+import orjson
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select
+from sqlalchemy.orm import selectinload
+
+from app.config.database import AsyncSessionLocal, engine, Base
+from app.core.respuestas import RespuestaORJSON
+from app.models.entities import Clinica, Paciente, Profesional, Turno
+from app.repositories.repositories import turno_repo
+from app.schemas.responses import EstadoTurno, TurnoResponse
+from app.schemas.serializacion import PlanRespuesta, validar_orm, volcar_json
+from main import app
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest_asyncio.fixture
+async def turnos():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        clinica = Clinica(nombre="Norte", did_whatsapp="1", configuraciones={"duracion_turno": 30})
+        profesional = Profesional(nombre="Dra. López", especialidades=["Pediatría"])
+        paciente = Paciente(dni="1", telefono="1", nombre="Juan Pérez")
+        db.add_all([clinica, profesional, paciente])
+        await db.flush()
+        for dia in (3, 1, 2):
+            db.add(Turno(id_paciente=paciente.id, id_profesional=profesional.id, id_clinica=clinica.id,
+                         fecha_hora=datetime(2024, 3, dia, 9, tzinfo=timezone.utc), estado="confirmado"))
+        await db.commit()
+        ids = {"clinica": clinica.id, "paciente": paciente.id}
+    yield ids
+    async with engine.begin() as conn:
+        for modelo in (Turno, Paciente, Profesional, Clinica):
+            await conn.execute(delete(modelo))
+
+
+class TestSerializacion:
+    """Tests para el armado de respuestas desde tuplas y la respuesta orjson"""
+
+    async def test_from_attributes_en_respuestas(self, turnos):
+        async with AsyncSessionLocal() as db:
+            turno = (await db.execute(select(Turno).options(
+                selectinload(Turno.paciente), selectinload(Turno.profesional), selectinload(Turno.clinica)
+            ).limit(1))).scalar_one()
+            respuesta = TurnoResponse.model_validate(turno)
+        assert respuesta.estado == EstadoTurno.CONFIRMADO
+        assert respuesta.paciente.nombre == "Juan Pérez"
+
+    async def test_plan_equivale_a_validar(self, turnos):
+        plan = PlanRespuesta(TurnoResponse, Turno)
+        assert "paciente.nombre" in plan.columnas and "clinica.configuraciones" in plan.columnas
+        assert "paciente.fecha_creacion" not in plan.columnas  # pacientes no tiene esa columna
+
+        async with AsyncSessionLocal() as db:
+            filas = await turno_repo.get_filas(db, columnas=plan.columnas)
+            orm = (await db.execute(select(Turno).order_by(Turno.id).options(
+                selectinload(Turno.paciente), selectinload(Turno.profesional), selectinload(Turno.clinica)
+            ))).scalars().all()
+        validados = validar_orm(TurnoResponse, orm)
+
+        assert plan.como_dicts(filas) == [v.model_dump() for v in validados]
+        construidos = plan.como_modelos(filas)
+        assert construidos[0].clinica.configuraciones == {"duracion_turno": 30}
+        assert orjson.loads(volcar_json(TurnoResponse, construidos)) == orjson.loads(volcar_json(TurnoResponse, validados))
+
+    async def test_endpoint_turnos(self, turnos):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            respuesta = await client.get("/api/turnos", params={
+                "id_clinica": turnos["clinica"], "desde": "2024-03-02T00:00:00Z", "size": 1,
+            })
+        assert respuesta.status_code == 200
+        cuerpo = respuesta.json()
+        assert cuerpo["total"] == 2 and cuerpo["size"] == 1
+        assert cuerpo["items"][0]["fecha_hora"].startswith("2024-03-02T09:00:00")
+        assert cuerpo["items"][0]["paciente"] == {
+            "id": turnos["paciente"], "dni": "1", "telefono": "1", "nombre": "Juan Pérez", "email": None,
+            "fecha_registro": cuerpo["items"][0]["paciente"]["fecha_registro"],
+            "fecha_creacion": None, "fecha_actualizacion": None,
+        }
+
+    async def test_respuesta_orjson_con_modelos(self):
+        respuesta = RespuestaORJSON({"items": [TurnoResponse.model_construct(id=1, estado=EstadoTurno.CANCELADO)]})
+        assert orjson.loads(respuesta.body)["items"][0]["estado"] == "cancelado"
+        assert RespuestaORJSON(b'{"ya":"serializado"}').body == b'{"ya":"serializado"}'
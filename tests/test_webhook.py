@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+
+import httpx
+import pytest
+
+from app.config import Config
+from app.routers.webhook import get_cola_mensajes
+from app.service.cola_mensajes import ColaMensajesMemoria
+from app.service.workers_mensajes import PoolWorkers
+from main import app
+
+pytestmark = pytest.mark.asyncio
+
+
+def payload(*mensajes):
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "1",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"display_phone_number": "5493815550000", "phone_number_id": "99"},
+                    "messages": [
+                        {"from": wa_id, "id": f"wamid.{i}", "timestamp": "1700000000",
+                         "type": "text", "text": {"body": texto}}
+                        for i, (wa_id, texto) in enumerate(mensajes)
+                    ],
+                },
+            }],
+        }],
+    }
+
+
+async def esperar(condicion, timeout=2.0):
+    limite = asyncio.get_running_loop().time() + timeout
+    while not condicion():
+        assert asyncio.get_running_loop().time() < limite, "timeout esperando la condición"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def cola():
+    cola = ColaMensajesMemoria()
+    app.dependency_overrides[get_cola_mensajes] = lambda: cola
+    yield cola
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def cliente():
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+class TestEndpointWebhook:
+    """Tests para /webhook/whatsapp"""
+
+    async def test_encola_y_responde(self, cola, cliente):
+        async with cliente:
+            respuesta = await cliente.post("/webhook/whatsapp", json=payload(("549381111", "hola"), ("549382222", "turno")))
+
+        assert respuesta.status_code == 200
+        assert respuesta.json() == {"encolados": 2}
+        mensajes = await cola.leer("test", bloqueo_ms=10)
+        assert [(m.datos["wa_id"], m.datos["texto"]) for m in mensajes] == [("549381111", "hola"), ("549382222", "turno")]
+        assert mensajes[0].datos["did_whatsapp"] == "5493815550000"
+
+    async def test_payload_invalido(self, cola, cliente):
+        async with cliente:
+            respuesta = await cliente.post("/webhook/whatsapp", content=b"{\"object\": 1}")
+        assert respuesta.status_code == 400
+
+    async def test_firma(self, cola, cliente, monkeypatch):
+        monkeypatch.setattr(Config, "WHATSAPP_APP_SECRET", "secreto")
+        cuerpo = json.dumps(payload(("549381111", "hola"))).encode()
+        firma = "sha256=" + hmac.new(b"secreto", cuerpo, hashlib.sha256).hexdigest()
+        async with cliente:
+            sin_firma = await cliente.post("/webhook/whatsapp", content=cuerpo)
+            con_firma = await cliente.post("/webhook/whatsapp", content=cuerpo, headers={"X-Hub-Signature-256": firma})
+        assert sin_firma.status_code == 403
+        assert con_firma.status_code == 200
+
+    async def test_verificacion(self, cliente, monkeypatch):
+        monkeypatch.setattr(Config, "WHATSAPP_VERIFY_TOKEN", "token")
+        parametros = {"hub.mode": "subscribe", "hub.verify_token": "token", "hub.challenge": "123"}
+        async with cliente:
+            ok = await cliente.get("/webhook/whatsapp", params=parametros)
+            mal = await cliente.get("/webhook/whatsapp", params={**parametros, "hub.verify_token": "otro"})
+        assert (ok.status_code, ok.text) == (200, "123")
+        assert mal.status_code == 403
+
+
+class TestPoolWorkers:
+    """Tests para el consumo de la cola: orden, ack, reintento y dead-letter"""
+
+    async def test_procesa_y_confirma(self):
+        cola, procesados = ColaMensajesMemoria(), []
+
+        async def procesar(datos):
+            procesados.append(datos["n"])
+
+        pool = PoolWorkers(cola, procesar, concurrencia=3, bloqueo=0.05)
+        await pool.iniciar()
+        for n in range(20):
+            await cola.publicar({"n": n})
+        await esperar(lambda: len(procesados) == 20)
+        await pool.detener()
+
+        assert sorted(procesados) == list(range(20))
+        assert cola.cantidad_pendientes == 0
+        assert pool.estadisticas.procesados == 20
+
+    async def test_reintenta_y_manda_a_dead_letter(self):
+        cola, intentos = ColaMensajesMemoria(), {}
+
+        async def procesar(datos):
+            intentos[datos["n"]] = intentos.get(datos["n"], 0) + 1
+            if datos["n"] == 1 or intentos[datos["n"]] < 2:
+                raise RuntimeError("falla")
+
+        pool = PoolWorkers(cola, procesar, concurrencia=2, max_entregas=3, bloqueo=0.02, reintento=0.01)
+        await pool.iniciar()
+        await cola.publicar({"n": 0})
+        await cola.publicar({"n": 1})
+        await esperar(lambda: cola.cantidad_pendientes == 0)
+        await pool.detener()
+
+        # n=0 falla una vez y se procesa en la segunda entrega; n=1 agota las 3
+        assert intentos == {0: 2, 1: 3}
+        assert [d["datos"]["n"] for d in cola.dead_letter] == [1]
+        assert cola.dead_letter[0]["entregas"] == 3
+        assert "falla" in cola.dead_letter[0]["error"]
+        assert pool.estadisticas.procesados == 1
+
+    async def test_orden_por_usuario_y_paralelismo_entre_usuarios(self):
+        cola, rnd = ColaMensajesMemoria(), random.Random(7)
+        recibidos, en_curso, maximo, solapados = {}, set(), 0, 0
+
+        async def procesar(datos):
+            nonlocal maximo, solapados
+            # Nunca dos mensajes del mismo usuario a la vez (un assert acá sólo provocaría un reintento)
+            solapados += datos["wa_id"] in en_curso
+            en_curso.add(datos["wa_id"])
+            maximo = max(maximo, len(en_curso))
+            await asyncio.sleep(rnd.random() * 0.003)
+            en_curso.discard(datos["wa_id"])
+            recibidos.setdefault(datos["wa_id"], []).append(datos["n"])
+
+        pool = PoolWorkers(cola, procesar, concurrencia=8, bloqueo=0.02)
+        await pool.iniciar()
+        for n in range(30):
+            for usuario in range(20):
+                await cola.publicar({"wa_id": f"54938{usuario}", "n": n}, clave=f"54938{usuario}")
+        await esperar(lambda: pool.estadisticas.procesados == 600, timeout=10)
+        await pool.detener()
+
+        assert solapados == 0
+        assert len(recibidos) == 20
+        assert all(secuencia == list(range(30)) for secuencia in recibidos.values())
+        assert maximo > 1
+
+    async def test_falla_no_adelanta_al_siguiente_del_usuario(self):
+        cola, orden = ColaMensajesMemoria(), []
+        fallo = {"pendiente": True}
+
+        async def procesar(datos):
+            if datos["n"] == 0 and fallo.pop("pendiente", False):
+                raise RuntimeError("falla transitoria")
+            orden.append(datos["n"])
+
+        pool = PoolWorkers(cola, procesar, concurrencia=4, bloqueo=0.02, reintento=0.01)
+        await pool.iniciar()
+        for n in range(3):
+            await cola.publicar({"wa_id": "549381111", "n": n})
+        await esperar(lambda: len(orden) == 3)
+        await pool.detener()
+
+        assert orden == [0, 1, 2]
+
+    async def test_no_reclama_lo_que_espera_en_un_shard(self):
+        cola, procesados = ColaMensajesMemoria(), []
+
+        async def procesar(datos):
+            await asyncio.sleep(0.1)
+            procesados.append(datos["n"])
+
+        # 10 mensajes de 0.1s del mismo usuario: el último espera ~1s en el shard, más que la visibilidad
+        primero = PoolWorkers(cola, procesar, concurrencia=1, visibilidad=0.3, bloqueo=0.02, nombre="a")
+        segundo = PoolWorkers(cola, procesar, concurrencia=1, visibilidad=0.3, bloqueo=0.02, nombre="b")
+        for n in range(10):
+            await cola.publicar({"wa_id": "549381111", "n": n})
+        await primero.iniciar()
+        await esperar(lambda: not cola._nuevos)
+        await segundo.iniciar()
+        await esperar(lambda: cola.cantidad_pendientes == 0, timeout=5)
+        await asyncio.sleep(0.4)  # una ronda más de reclamos
+        await primero.detener()
+        await segundo.detener()
+
+        assert procesados == list(range(10))
+        assert primero.estadisticas.reclamados == segundo.estadisticas.reclamados == 0
+
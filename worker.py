@@ -0,0 +1,48 @@
+"""Proceso de workers de mensajes entrantes (backend redis).
+
+Uso:
+    python worker.py                       # todas las particiones
+    python worker.py --particiones 0,1     # sólo las particiones 0 y 1
+
+Con COLA_MENSAJES_PARTICIONES > 1, cada partición debe consumirla un solo proceso para
+mantener el orden de los mensajes de cada usuario: p. ej. con 4 particiones y 2 procesos,
+uno con `--particiones 0,1` y otro con `--particiones 2,3`. Dentro del proceso, los
+mensajes se reparten por wa_id entre WORKERS_MENSAJES shards. SIGTERM/SIGINT terminan los
+mensajes en curso antes de salir.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.config.database import close_db
+from app.repositories.redis_session import cerrar_redis_client
+from app.service.cola_mensajes import crear_cola_mensajes
+from app.service.procesador_mensajes import procesar_mensaje
+from app.service.workers_mensajes import PoolWorkers
+
+
+async def main(particiones):
+    # Los clientes se crean dentro del loop del proceso (ver app/core/recursos.py)
+    cola = crear_cola_mensajes(propias=particiones)
+    pool = PoolWorkers(cola, procesar_mensaje)
+    detener = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for senal in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(senal, detener.set)
+
+    await pool.iniciar()
+    logging.info("Workers de mensajes iniciados: %s x %s shards", pool.nombre, pool.concurrencia)
+    await detener.wait()
+    await pool.detener()
+    await cola.cerrar()
+    cerrar_redis_client()
+    await close_db()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--particiones", type=lambda v: [int(p) for p in v.split(",")], default=None)
+    args = parser.parse_args()
+    asyncio.run(main(args.particiones))